@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------------------------
+# Copyright (c) 2010-2020 Denis Machard
+# This file is part of the extensive automation project
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301 USA
+# -------------------------------------------------------------------
+
+"""
+Decoding of the events of the test results in a pool of processes
+Without qt, this module is also imported by the processes of the pool
+"""
+
+import sys
+import base64
+import threading
+import collections
+
+try:
+    import cPickle
+except ImportError: # support python 3
+    import pickle as cPickle
+
+try:
+    import concurrent.futures
+    import multiprocessing
+except ImportError: # not available with python2
+    concurrent = None
+
+import Libs.NetLayerLib.Messages as Messages
+
+# number of lines decoded by a process in one time
+CHUNK_LINES = 500
+
+EXECUTOR = None
+WORKERS = 0
+
+def decodeLine(line):
+    """
+    Decode one line of the test result, base64 and pickle
+
+    @param line: line of the test result
+    @type line: string
+
+    @return: event
+    @rtype: dict
+    """
+    l = base64.b64decode(line)
+    if sys.version_info > (3,): # python3 support
+        event = cPickle.loads( l, encoding="bytes")
+        event = Messages.bytes_to_unicode(event)
+    else:
+        event = cPickle.loads( l )
+    return event
+
+def decodeLines(lines):
+    """
+    Decode a chunk of lines, called in the processes of the pool
+
+    @param lines: list of (line number, line)
+    @type lines: list
+
+    @return: list of (line number, event or None, error or None)
+    @rtype: list
+    """
+    ret = []
+    for n, line in lines:
+        try:
+            ret.append( (n, decodeLine(line), None) )
+        except Exception as e:
+            ret.append( (n, None, "unable to load line %s: %s" % (n, e)) )
+    return ret
+
+def initialize(workers=0):
+    """
+    Configure the pool, the processes are started on the first use
+
+    @param workers: number of processes, 0 for the number of cpu
+    @type workers: integer
+    """
+    global WORKERS
+    WORKERS = workers
+
+def getWorkers():
+    """
+    Return the number of processes of the pool
+    """
+    if concurrent is None:
+        return 1
+    return WORKERS or multiprocessing.cpu_count()
+    
+def executor():
+    """
+    Return the pool of processes
+    None if not available or with only one process, the lines are decoded in the thread of the job
+    """
+    global EXECUTOR
+    if EXECUTOR is None and getWorkers() > 1:
+        try:
+            # spawn and not fork, the gui process has threads
+            EXECUTOR = concurrent.futures.ProcessPoolExecutor( max_workers=getWorkers(),
+                                                               mp_context=multiprocessing.get_context("spawn") )
+        except Exception as e:
+            EXECUTOR = None
+    return EXECUTOR
+
+def finalize():
+    """
+    Stop the pool of processes
+    """
+    global EXECUTOR
+    if EXECUTOR is not None:
+        EXECUTOR.shutdown(wait=False)
+        EXECUTOR = None
+
+class DecodingJob(threading.Thread):
+    """
+    Read the lines, decode the chunks in parallel
+    and deliver the events in the order of the lines
+    """
+    def __init__(self, lines, onEvents, onFinished, chunkSize=CHUNK_LINES):
+        """
+        Constructor
+
+        @param lines: iterator on (line number, line)
+        @type lines: iterator
+
+        @param onEvents: called with the list of (line number, event, error) decoded
+        @type onEvents: function
+
+        @param onFinished: called at the end of the job
+        @type onFinished: function
+
+        @param chunkSize: number of lines by chunk
+        @type chunkSize: integer
+        """
+        threading.Thread.__init__(self)
+        self.lines = lines
+        self.onEvents = onEvents
+        self.onFinished = onFinished
+        self.chunkSize = chunkSize
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        """
+        Cancel the job, no more events are delivered
+        """
+        self.cancelled.set()
+
+    def chunks(self):
+        """
+        Return the lines by chunks
+        """
+        chunk = []
+        for line in self.lines:
+            chunk.append( line )
+            if len(chunk) >= self.chunkSize:
+                yield chunk
+                chunk = []
+                if self.cancelled.is_set(): return
+        if len(chunk):
+            yield chunk
+
+    def run(self):
+        """
+        Job loop
+        """
+        try:
+            pool = executor()
+            maxPending = 2 * getWorkers()
+            pending = collections.deque()
+            for chunk in self.chunks():
+                if self.cancelled.is_set():
+                    break
+                if pool is None:
+                    self.onEvents( decodeLines(chunk) )
+                    continue
+                pending.append( pool.submit(decodeLines, chunk) )
+                while len(pending) >= maxPending or ( len(pending) and pending[0].done() ):
+                    events = pending.popleft().result()
+                    if not self.cancelled.is_set(): self.onEvents( events )
+
+            while len(pending) and not self.cancelled.is_set():
+                self.onEvents( pending.popleft().result() )
+            for future in pending:
+                future.cancel()
+        except Exception as e:
+            self.onEvents( [ (-1, None, "decoding error: %s" % e) ] )
+        self.onFinished()
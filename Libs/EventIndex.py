@@ -0,0 +1,332 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------------------------
+# Copyright (c) 2010-2020 Denis Machard
+# This file is part of the extensive automation project
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301 USA
+# -------------------------------------------------------------------
+
+"""
+Inverted index on the events of a test result, all testcases included
+The events are indexed in a thread, the search returns the testcase id
+and the position of the event in the testcase
+"""
+
+import sys
+import re
+import array
+import threading
+
+try:
+    import Queue
+except ImportError: # support python 3
+    import queue as Queue
+
+from Libs import Logger
+import Libs.EventDecoder as EventDecoder
+
+# unicode = str with python3
+if sys.version_info > (3,):
+    unicode = str
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# only the beginning of the message is indexed
+MAX_TEXT_INDEXED = 2048
+# length of the text kept for the results
+MAX_TEXT_RESULT = 100
+# max number of results returned
+MAX_RESULTS = 1000
+
+# prefixes of the field tokens
+FIELD_LEVEL = "level:"
+FIELD_FROM = "from:"
+FIELD_TIME = "time:"
+
+def getText(value):
+    """
+    Return the value as text
+
+    @param value: value of the event
+    @type value: object
+
+    @return: text
+    @rtype: string
+    """
+    if isinstance(value, bytes):
+        return value.decode("utf8", "ignore")
+    if isinstance(value, unicode):
+        return value
+    return "%s" % value
+
+def getTestId(event):
+    """
+    Return the id of the testcase or of the script of the event
+
+    @param event: event
+    @type event: dict
+
+    @return: test id
+    @rtype: string
+    """
+    if event.get('event') == 'testcase':
+        return "%s" % event['tc_id']
+    return "%s" % event['script_id']
+
+def getTokens(event):
+    """
+    Return the tokens of the event
+
+    @param event: event
+    @type event: dict
+
+    @return: tokens
+    @rtype: set
+    """
+    tokens = set()
+    if 'level' in event:
+        tokens.add( FIELD_LEVEL + getText(event['level']).lower() )
+    if 'from-component' in event:
+        component = getText(event['from-component']).lower()
+        tokens.add( FIELD_FROM + component )
+        tokens.update( TOKEN_RE.findall(component) )
+    if 'timestamp' in event:
+        # 19:45:04.7822, indexed by hour, minute and second
+        parts = getText(event['timestamp']).split(".")[0].split(":")
+        for i in range(1, len(parts)+1):
+            tokens.add( FIELD_TIME + ":".join(parts[:i]) )
+    if 'short-msg' in event:
+        text = getText(event['short-msg'])[:MAX_TEXT_INDEXED].lower()
+        tokens.update( TOKEN_RE.findall(text) )
+    return tokens
+
+def getTerms(query):
+    """
+    Return the terms of the query, the field terms are kept as is,
+    the words are splitted like the text of the events
+
+    @param query: words or field:value separated by spaces, * at the end for a prefix
+    @type query: string
+
+    @return: list of (term, prefix)
+    @rtype: list
+    """
+    terms = []
+    for word in query.lower().split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*")
+        if word.startswith( (FIELD_LEVEL, FIELD_FROM, FIELD_TIME) ):
+            if len(word.split(":", 1)[1]):
+                terms.append( (word, prefix) )
+            continue
+        tokens = TOKEN_RE.findall(word)
+        for i, token in enumerate(tokens):
+            terms.append( (token, prefix and i == len(tokens)-1) )
+    return terms
+
+class EventIndex(Logger.ClassLogger):
+    """
+    Inverted index, token to the list of events
+    """
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.lock = threading.Lock()
+        self.queue = Queue.Queue()
+        self.thread = None
+        self.job = None
+        # incremented on clear, the events queued before are ignored
+        self.generation = 0
+        self.initIndex()
+
+    def initIndex(self):
+        """
+        Initialize the index
+        """
+        # token -> ids of the events, in the order of insertion
+        self.postings = {}
+        # id -> (test id, position, timestamp, level, component, text)
+        self.docs = []
+
+    def add(self, testId, position, event):
+        """
+        Add an event to index, the event is indexed in the thread
+
+        @param testId: testcase id
+        @type testId: string
+
+        @param position: position of the event in the testcase
+        @type position: integer
+
+        @param event: event
+        @type event: dict
+        """
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run)
+            self.thread.daemon = True
+            self.thread.start()
+        self.queue.put( (self.generation, testId, position, event) )
+
+    def run(self):
+        """
+        Thread indexing the events queued
+        """
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            generation, testId, position, event = item
+            try:
+                self.index(testId=testId, position=position, event=event, generation=generation)
+            except Exception as e:
+                self.error( "unable to index the event: %s" % e )
+
+    def index(self, testId, position, event, generation):
+        """
+        Index the event
+
+        @param testId: testcase id
+        @type testId: string
+
+        @param position: position of the event in the testcase
+        @type position: integer
+
+        @param event: event
+        @type event: dict
+
+        @param generation: generation of the index when the event has been added
+        @type generation: integer
+        """
+        tokens = getTokens(event)
+        doc = ( testId, position, getText(event.get('timestamp', '')),
+                getText(event.get('level', '')), getText(event.get('from-component', '')),
+                getText(event.get('short-msg', '')).split("\n")[0][:MAX_TEXT_RESULT] )
+        with self.lock:
+            if generation != self.generation:
+                return
+            docId = len(self.docs)
+            self.docs.append( doc )
+            for token in tokens:
+                ids = self.postings.get(token)
+                if ids is None:
+                    ids = array.array('L')
+                    self.postings[token] = ids
+                ids.append( docId )
+
+    def indexLines(self, lines):
+        """
+        Decode and index all the lines of a test result in background,
+        the position of the events is computed for each testcase
+
+        @param lines: iterator on (line number, line)
+        @type lines: iterator
+        """
+        generation = self.generation
+        positions = {}
+        def onEvents(events):
+            """
+            On a batch of events decoded, in the thread of the job
+            """
+            for n, event, err in events:
+                if event is None:
+                    continue
+                try:
+                    testId = getTestId(event)
+                except KeyError:
+                    continue
+                position = positions.get(testId, 0)
+                positions[testId] = position + 1
+                self.index(testId=testId, position=position, event=event, generation=generation)
+
+        self.cancel()
+        self.job = EventDecoder.DecodingJob( lines=lines, onEvents=onEvents, onFinished=lambda: None )
+        self.job.daemon = True
+        self.job.start()
+
+    def isIndexing(self):
+        """
+        Return True if events are waiting to be indexed
+        """
+        if self.job is not None and self.job.is_alive():
+            return True
+        return not self.queue.empty()
+
+    def search(self, query, maxResults=MAX_RESULTS):
+        """
+        Search the events matching all the terms of the query
+
+        @param query: words or field:value separated by spaces, * at the end for a prefix
+        @type query: string
+
+        @param maxResults: max number of results returned
+        @type maxResults: integer
+
+        @return: number of events matching and the first results,
+                 (test id, position, timestamp, level, component, text)
+        @rtype: tuple
+        """
+        terms = getTerms(query)
+        if not len(terms):
+            return (0, [])
+
+        with self.lock:
+            matches = None
+            for term, prefix in terms:
+                if prefix:
+                    ids = set()
+                    for token, tokenIds in self.postings.items():
+                        if token.startswith(term):
+                            ids.update( tokenIds )
+                else:
+                    ids = self.postings.get(term, ())
+                if matches is None:
+                    matches = set(ids)
+                else:
+                    matches.intersection_update(ids)
+                if not len(matches):
+                    return (0, [])
+
+            docIds = sorted(matches)
+            return ( len(docIds), [ self.docs[docId] for docId in docIds[:maxResults] ] )
+
+    def cancel(self):
+        """
+        Cancel the indexing of the lines in progress
+        """
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
+
+    def clear(self):
+        """
+        Remove all the events of the index
+        """
+        self.cancel()
+        with self.lock:
+            self.generation += 1
+            self.initIndex()
+
+    def close(self):
+        """
+        Stop the thread and the indexing in progress
+        """
+        self.clear()
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread = None
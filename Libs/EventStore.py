@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------------------------
+# Copyright (c) 2010-2020 Denis Machard
+# This file is part of the extensive automation project
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301 USA
+# -------------------------------------------------------------------
+
+"""
+Store of the events of a test result, by testcase
+The events of the testcases least recently used are written in a temporary file
+when the memory budget is exceeded, and read again on demand
+"""
+
+import sys
+import zlib
+import tempfile
+import collections
+
+try:
+    import cPickle
+except ImportError: # support python 3
+    import pickle as cPickle
+
+from Libs import Logger
+
+# unicode = str with python3
+if sys.version_info > (3,):
+    unicode = str
+
+# approximate size in memory of a dict and of the values which are not strings
+DICT_SIZE = 240
+VALUE_SIZE = 32
+
+def estimateSize(ob):
+    """
+    Return the approximate size in memory of the event
+
+    @param ob: event or value of the event
+    @type ob: object
+
+    @return: size in bytes
+    @rtype: integer
+    """
+    if isinstance(ob, (bytes, unicode)):
+        return VALUE_SIZE + len(ob)
+    if isinstance(ob, dict):
+        size = DICT_SIZE
+        for k, v in ob.items():
+            size += estimateSize(k) + estimateSize(v)
+        return size
+    if isinstance(ob, (list, tuple)):
+        size = VALUE_SIZE
+        for v in ob:
+            size += estimateSize(v)
+        return size
+    return VALUE_SIZE
+
+class Entry(object):
+    """
+    Events of one testcase
+    """
+    def __init__(self):
+        """
+        Constructor
+        """
+        # blocks written in the file, (offset, length)
+        self.blocks = []
+        # events written in the file, loaded in memory or None
+        self.head = []
+        # events not written in the file
+        self.tail = []
+        # size in memory of the head and the tail
+        self.size = 0
+        # number of events
+        self.count = 0
+
+class EventStore(Logger.ClassLogger):
+    """
+    Events by testcase id, bounded in memory
+    """
+    def __init__(self, maxMemory=256*1024*1024, spillPath=None, index=None):
+        """
+        Constructor
+
+        @param maxMemory: memory budget in bytes
+        @type maxMemory: integer
+
+        @param spillPath: folder of the temporary file, the default temporary folder if None
+        @type spillPath: string/none
+
+        @param index: index of the events added, not indexed if None
+        @type index: eventindex/none
+        """
+        self.maxMemory = maxMemory
+        self.spillPath = spillPath
+        self.index = index
+        self.entries = collections.OrderedDict()
+        self.selected = None
+        self.memory = 0
+        self.spill = None
+        self.spillSize = 0
+
+    def __contains__(self, testId):
+        """
+        Return True if events exist for the testcase
+        """
+        return testId in self.entries
+
+    def __getitem__(self, testId):
+        """
+        Return the events of the testcase, read from the file if needed
+
+        @param testId: testcase id
+        @type testId: string
+
+        @return: events
+        @rtype: list
+        """
+        entry = self.entries[testId]
+        self.entries.move_to_end(testId)
+        if entry.head is not None:
+            return entry.head + entry.tail
+
+        entry.head = self.readBlocks(entry=entry)
+        size = sum( estimateSize(event) for event in entry.head )
+        entry.size += size
+        self.memory += size
+        events = entry.head + entry.tail
+        if self.memory > self.maxMemory:
+            self.checkMemory()
+        return events
+
+    def __delitem__(self, testId):
+        """
+        Remove the events of the testcase,
+        the blocks in the file are lost until the next clear
+        """
+        entry = self.entries.pop(testId)
+        self.memory -= entry.size
+        if self.selected == testId:
+            self.selected = None
+
+    def __len__(self):
+        """
+        Return the number of testcases
+        """
+        return len(self.entries)
+
+    def keys(self):
+        """
+        Return the testcases ids
+        """
+        return list(self.entries.keys())
+
+    def append(self, testId, event):
+        """
+        Add an event to the testcase
+
+        @param testId: testcase id
+        @type testId: string
+
+        @param event: event
+        @type event: dict
+        """
+        entry = self.entries.get(testId)
+        if entry is None:
+            entry = Entry()
+            self.entries[testId] = entry
+        else:
+            self.entries.move_to_end(testId)
+
+        if self.index is not None:
+            self.index.add(testId=testId, position=entry.count, event=event)
+
+        size = estimateSize(event)
+        entry.tail.append( event )
+        entry.count += 1
+        entry.size += size
+        self.memory += size
+        if self.memory > self.maxMemory:
+            self.checkMemory()
+
+    def select(self, testId):
+        """
+        Keep the events of the testcase in memory, until another selection
+
+        @param testId: testcase id
+        @type testId: string
+        """
+        self.selected = testId
+
+    def checkMemory(self):
+        """
+        Write the testcases least recently used in the file
+        until the memory used is in the budget, except the selected one
+        """
+        for testId in list(self.entries.keys()):
+            if self.memory <= self.maxMemory:
+                break
+            if testId == self.selected:
+                continue
+            self.evict(entry=self.entries[testId])
+
+    def evict(self, entry):
+        """
+        Write the tail of the testcase in the file and remove the events from memory
+
+        @param entry: events of the testcase
+        @type entry: entry
+        """
+        if len(entry.tail):
+            try:
+                entry.blocks.append( self.writeBlock(events=entry.tail) )
+            except Exception as e:
+                self.error( "unable to write the events: %s" % e )
+                return
+        self.memory -= entry.size
+        entry.head = None
+        entry.tail = []
+        entry.size = 0
+
+    def writeBlock(self, events):
+        """
+        Write events at the end of the file
+
+        @param events: events
+        @type events: list
+
+        @return: offset and length of the block
+        @rtype: tuple
+        """
+        if self.spill is None:
+            # removed automatically when closed
+            self.spill = tempfile.TemporaryFile(prefix="events_", dir=self.spillPath)
+            self.spillSize = 0
+        block = zlib.compress( cPickle.dumps(events, protocol=cPickle.HIGHEST_PROTOCOL), 1 )
+        offset = self.spillSize
+        self.spill.seek(offset)
+        self.spill.write(block)
+        self.spillSize += len(block)
+        return (offset, len(block))
+
+    def readBlocks(self, entry):
+        """
+        Read the events of the testcase from the file
+
+        @param entry: events of the testcase
+        @type entry: entry
+
+        @return: events
+        @rtype: list
+        """
+        events = []
+        for offset, length in entry.blocks:
+            self.spill.seek(offset)
+            events.extend( cPickle.loads( zlib.decompress( self.spill.read(length) ) ) )
+        return events
+
+    def getMemory(self):
+        """
+        Return the approximate memory used by the events in bytes
+        """
+        return self.memory
+
+    def getDisk(self):
+        """
+        Return the size of the temporary file in bytes
+        """
+        return self.spillSize
+
+    def clear(self):
+        """
+        Remove all events, the temporary file is deleted
+        """
+        self.entries.clear()
+        self.selected = None
+        self.memory = 0
+        self.close()
+
+    def close(self):
+        """
+        Close and delete the temporary file
+        """
+        if self.spill is not None:
+            try:
+                self.spill.close()
+            except Exception:
+                pass
+            self.spill = None
+        self.spillSize = 0
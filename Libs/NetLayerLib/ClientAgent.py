@@ -63,7 +63,9 @@ class ClientAgent(TcpClient.TcpClientThread, TransactionManager.TransactionManag
     def __init__(self, typeAgent, agentName = None, startAuto = False, inactivityTimeout = 60,
             keepAliveInterval = 40, timeoutTcpConnect=5, responseTimeout=30.0, forceClose=True, 
             selectTimeout=0.01, wsSupport=False, sslSupport=False, pickleVer=2, regType=TYPE_REG_ANONYMOUS,
-            regLogin='', regPass='', tcpKeepAlive=True, tcpKeepIdle=3, tcpKeepCnt=3, tcpKeepIntvl=3):
+            regLogin='', regPass='', tcpKeepAlive=True, tcpKeepIdle=3, tcpKeepCnt=3, tcpKeepIntvl=3,
+            reactor=None, fifoCallback=None, binarySupport=True, compression=None, compressionLevel=-1,
+            compressionMinSize=0):
         """
         Constructor
 
@@ -78,11 +80,30 @@ class ClientAgent(TcpClient.TcpClientThread, TransactionManager.TransactionManag
 
         @param timeoutTcpConnect:
         @type timeoutTcpConnect: float
+
+        @param reactor: shared io loop
+        @type reactor: Reactor or None
+
+        @param fifoCallback: shared callback thread
+        @type fifoCallback: FifoCallbackThread or None
+
+        @param binarySupport: offer the binary format of messages on registration
+        @type binarySupport: boolean
+
+        @param compression: compression of the body offered on registration, None to keep zlib only
+        @type compression: string or None
+
+        @param compressionLevel: compression level, -1 for the default level
+        @type compressionLevel: integer
+
+        @param compressionMinSize: bodies smaller than this size are not compressed
+        @type compressionMinSize: integer
         """
         TcpClient.TcpClientThread.__init__(self, inactivityTimeout=inactivityTimeout, keepAliveInterval=keepAliveInterval, timeout=timeoutTcpConnect,
                                             selectTimeout=selectTimeout, wsSupport=wsSupport, sslSupport=sslSupport,
-                                            tcpKeepAlive=tcpKeepAlive, tcpKeepIdle=tcpKeepIdle, tcpKeepCnt=tcpKeepCnt, tcpKeepIntvl=tcpKeepIntvl)
-        TransactionManager.TransactionManager.__init__(self)
+                                            tcpKeepAlive=tcpKeepAlive, tcpKeepIdle=tcpKeepIdle, tcpKeepCnt=tcpKeepCnt, tcpKeepIntvl=tcpKeepIntvl,
+                                            reactor=reactor)
+        TransactionManager.TransactionManager.__init__(self, fifoCallback=fifoCallback)
         self.__responseCmdTimeout = responseTimeout
         self.__codec = Messages.Messages( userId = agentName, pickleVer=pickleVer )
         self.__agentName = agentName
@@ -94,6 +115,12 @@ class ClientAgent(TcpClient.TcpClientThread, TransactionManager.TransactionManag
         self.__connected = False
         self.__forceClose = forceClose
         
+        self.__binarySupport = binarySupport
+        self.__compression = compression
+        self.__compressionLevel = compressionLevel
+        self.__compressionMinSize = compressionMinSize
+        self.__codecOffered = False
+        
         self.regType = regType
         self.regLogin = regLogin
         self.regPass = regPass
@@ -190,6 +217,10 @@ class ClientAgent(TcpClient.TcpClientThread, TransactionManager.TransactionManag
         except Exception as e:
             self.error('unable to decode new message: %s' % str(e) )
         else:
+            # switch the format on the registration response, before to read the next packet
+            if self.__codecOffered and decoded[0] == 'response':
+                self.__codecOffered = False
+                self.onCodecNegotiated(response=decoded[1])
             try:
                 TransactionManager.TransactionManager.onMessage( self, decoded  )
             except Exception as e:
@@ -202,6 +233,33 @@ class ClientAgent(TcpClient.TcpClientThread, TransactionManager.TransactionManag
         self.__connected = True
         self.onConnectionSuccessful()
 
+    def onCodecNegotiated(self, response):
+        """
+        Activate the format of messages and the compression selected by the server on registration
+        The text format and zlib are kept if the server does not support them
+
+        @param response: registration response
+        @type response: dict
+        """
+        codec = Messages.CODEC_TEXT
+        compression = None
+        if response['code'] == Messages.RSP_CODE_OK[0] and isinstance(response['body'], dict):
+            codec = response['body'].get('codec', Messages.CODEC_TEXT)
+            compression = response['body'].get('compression')
+        if codec == Messages.CODEC_BINARY:
+            self.trace('Binary format activated')
+            self.__codec.setCodec( Messages.CODEC_BINARY )
+            TcpClient.TcpClientThread.setFraming(self, TcpClient.FRAMING_LENGTH)
+        if isinstance(compression, dict):
+            try:
+                self.__codec.setCompression( algo=compression['algo'], 
+                                             level=int(compression.get('level', -1)),
+                                             minSize=int(compression.get('min-size', 0)) )
+            except Exception as e:
+                self.error('unable to activate the compression: %s' % str(e) )
+            else:
+                self.trace('Compression activated: %s' % compression['algo'])
+
     def onProxyConnection(self):
         """
         Reimplementation from TcpClientThread
@@ -228,6 +286,19 @@ class ClientAgent(TcpClient.TcpClientThread, TransactionManager.TransactionManag
                     'reg-login': self.regLogin,
                     'reg-pass': self.regPass
                 }
+        self.__codec.setCodec( Messages.CODEC_TEXT )
+        self.__codec.setCompression( algo=None )
+        if self.__binarySupport:
+            data['codecs'] = [ Messages.CODEC_BINARY, Messages.CODEC_TEXT ]
+            self.__codecOffered = True
+        if self.__compression is not None:
+            data['compressions'] = Messages.supportedCompressions()
+            data['compression'] = { 
+                                    'algo': self.__compression, 
+                                    'level': self.__compressionLevel, 
+                                    'min-size': self.__compressionMinSize 
+                                  }
+            self.__codecOffered = True
 
         rsp = self.hello(data, cancelEvent=cancelEvent)
         if rsp is None : 
@@ -261,6 +332,9 @@ class ClientAgent(TcpClient.TcpClientThread, TransactionManager.TransactionManag
         """
         self.__registered = False
         self.__connected = False
+        self.__codecOffered = False
+        self.__codec.setCodec( Messages.CODEC_TEXT )
+        self.__codec.setCompression( algo=None )
 
     def onRegistrationRefused (self, err):
         """
@@ -413,12 +487,15 @@ class ClientAgent(TcpClient.TcpClientThread, TransactionManager.TransactionManag
         @rtype:
         """
         # encode message
+        ret = None
+        transaction = None
         try:
-            ret = None
-            tid, event = TransactionManager.TransactionManager.newTransaction(self, waitResponse = True)
+            transaction = TransactionManager.TransactionManager.newTransaction(self, waitResponse = True)
+            tid = transaction.tid
             encoded = self.__codec.cmd( tid = tid, body = data )
         except Exception as e:
             self.error( 'unable to encode cmd message: %s' % str(e) )
+            if transaction is not None: transaction.release()
         else:
             try:
                 # send packet
@@ -429,10 +506,12 @@ class ClientAgent(TcpClient.TcpClientThread, TransactionManager.TransactionManag
                 if timeout > 0:
                     maxTime = timeout
                 self.trace("-> REQUEST %s, timeout of %s" % (tid,maxTime) )
-                ret = TransactionManager.TransactionManager.waitResponse(self, event, tid, responseTimeout=maxTime, cancelEvent=cancelEvent)
+                ret = TransactionManager.TransactionManager.waitResponse(self, transaction, responseTimeout=maxTime, 
+                                                                         cancelEvent=cancelEvent)
             except Exception as e:
                 self.error( '[cmd] %s' % str(e) )
-            return ret
+                transaction.release()
+        return ret
  
     def hello(self, data, cancelEvent=None):
         """
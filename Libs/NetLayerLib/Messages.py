@@ -31,10 +31,22 @@ except ImportError: # support python 3
     import pickle as cPickle
 import zlib
 import base64
+import binascii
+import re
 import sys
 import json
 import time
+import struct
 
+# optional compression libraries
+try:
+    import lz4.frame as lz4frame
+except ImportError:
+    lz4frame = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 # unicode = str with python3
 if sys.version_info > (3,):
@@ -42,6 +54,7 @@ if sys.version_info > (3,):
     
 HEAD_SEP            = b" "
 BODY_SEP            = b"\n"
+BODY_SEP_RE         = re.compile(BODY_SEP)
 
 RSQ_CMD             = b"RSQ"
 RSQ_NOTIFY          = b"NOTIFY"
@@ -51,6 +64,44 @@ RSP_CODE_FORBIDDEN  = ( b"403", b"FORBIDDEN" )
 RSP_CODE_FAILED     = ( b"400", b"FAILED" )
 RSP_CODE_ERROR      = ( b"500", b"ERROR" )
 
+# codecs negotiated on registration
+CODEC_TEXT          = "text"
+CODEC_BINARY        = "binary"
+
+# binary header: tid, op length, desc length
+BIN_HEADER          = struct.Struct("!IBH")
+
+# compression of the body negotiated on registration
+# without negotiation the body is always zipped with the default level
+COMPRESSION_NONE    = "none"
+COMPRESSION_ZLIB    = "zlib"
+COMPRESSION_LZ4     = "lz4"
+COMPRESSION_ZSTD    = "zstd"
+
+# the negotiated body starts with one byte for the algorithm used
+COMPRESSION_TAGS    = { 
+                        COMPRESSION_NONE: b"\x00", 
+                        COMPRESSION_ZLIB: b"\x01", 
+                        COMPRESSION_LZ4: b"\x02", 
+                        COMPRESSION_ZSTD: b"\x03" 
+                      }
+COMPRESSION_ALGOS   = dict( (v[0], k) for k, v in COMPRESSION_TAGS.items() )
+
+def supportedCompressions():
+    """
+    Return the compression algorithms available, the best first
+
+    @return: list of algorithms
+    @rtype: list
+    """
+    ret = []
+    if zstandard is not None:
+        ret.append( COMPRESSION_ZSTD )
+    if lz4frame is not None:
+        ret.append( COMPRESSION_LZ4 )
+    ret.extend( [ COMPRESSION_ZLIB, COMPRESSION_NONE ] )
+    return ret
+
 CMD_ERROR           = -1
 CMD_HELLO           = 0
 CMD_GET_PROBE       = 1
@@ -74,41 +125,70 @@ def bytes2str(val):
 import pickle
 
 
+UNICODE_CONTAINERS = (list, tuple, dict)
+
 def bytes_to_unicode(ob):
     """
     Byte to unicode with exception...
     Only for py3, will be removed on future version...
+
+    Single pass over the object: bytes are decoded while nested containers
+    are walked, dicts are updated in place, lists and tuples are rebuilt once.
+    In a list or tuple the bytes are kept as is if one of them is not utf-8.
+
+    @param ob: object to convert
+    @type ob: list/tuple/dict/other
     """
     t = type(ob)
-    if t in (list, tuple):
+    if t is dict:
+        return dict_to_unicode(ob)
+    if t is list or t is tuple:
+        return seq_to_unicode(ob, t)
+    return ob
+
+def seq_to_unicode(ob, t):
+    """
+    Convert a list or a tuple, all bytes items are decoded or none of them
+
+    @param ob: list or tuple to convert
+    @type ob: list/tuple
+
+    @param t: type of the object
+    @type t: type
+    """
+    try:
+        l = [i.decode('utf-8') if type(i) is bytes else i for i in ob]
+    except UnicodeDecodeError:
+        l = ob # keep as bytes
+    l = [bytes_to_unicode(i) if type(i) in UNICODE_CONTAINERS else i for i in l]
+    return tuple(l) if t is tuple else l
+
+def dict_to_unicode(ob):
+    """
+    Convert a dict in place, keys and values are decoded one by one
+
+    @param ob: dict to convert
+    @type ob: dict
+    """
+    byte_keys = [i for i in ob if type(i) is bytes]
+    for bk in byte_keys:
+        v = ob.pop(bk)
         try:
-            l = [str(i, 'utf-8') if type(i) is bytes else i for i in ob]
-        except UnicodeDecodeError as e:
-            l = [ i for i in ob] # keep as bytes
-        l = [bytes_to_unicode(i) if type(i) in (list, tuple, dict) else i for i in l]
-        ro = tuple(l) if t is tuple else l
-    elif t is dict:
-        byte_keys = [i for i in ob if type(i) is bytes]
-        for bk in byte_keys:
-            v = ob[bk]
-            del(ob[bk])
+            ob[bk.decode('utf-8')] = v
+        except UnicodeDecodeError:
+            ob[bk] = v # keep as bytes
+    for k, v in ob.items():
+        tv = type(v)
+        if tv is bytes:
             try:
-                ob[str(bk,'utf-8')] = v
-            except UnicodeDecodeError as e:
-                ob[bk] = v # keep as bytes
-        for k in ob:
-            if type(ob[k]) is bytes:
-                try:
-                    ob[k] = str(ob[k], 'utf-8')
-                except UnicodeDecodeError as e:
-                    ob[k] = ob[k] # keep as bytes
-            elif type(ob[k]) in (list, tuple, dict):
-                ob[k] = bytes_to_unicode(ob[k])
-        ro = ob
-    else:
-        ro = ob
-        print("unprocessed object: {0} {1}".format(t, ob))
-    return ro
+                ob[k] = v.decode('utf-8')
+            except UnicodeDecodeError:
+                pass # keep as bytes
+        elif tv is dict:
+            dict_to_unicode(v)
+        elif tv is list or tv is tuple:
+            ob[k] = seq_to_unicode(v, tv)
+    return ob
     
 class Messages(object):
     """
@@ -130,6 +210,117 @@ class Messages(object):
         self.__userId = userId
         self.__useJson = useJson
         self.__pickleProtocol = pickleVer
+        self.__codec = CODEC_TEXT
+        self.__compression = None
+        self.__compressionLevel = -1
+        self.__compressionMinSize = 0
+
+    def setCompression (self, algo=None, level=-1, minSize=0):
+        """
+        Set the compression of the body
+        None (default) to zip all bodies without the algorithm byte
+
+        @param algo: COMPRESSION_NONE, COMPRESSION_ZLIB, COMPRESSION_LZ4, COMPRESSION_ZSTD or None
+        @type algo: string/none
+
+        @param level: compression level, -1 for the default level of the algorithm
+        @type level: integer
+
+        @param minSize: bodies smaller than this size are not compressed
+        @type minSize: integer
+        """
+        if algo is not None and algo not in supportedCompressions():
+            raise Exception('unsupported compression: %s' % algo)
+        self.__compression = algo
+        self.__compressionLevel = level
+        self.__compressionMinSize = minSize
+
+    def getCompression (self):
+        """
+        Return the compression of the body
+
+        @return: algorithm, level and minimum size
+        @rtype: tuple
+        """
+        return (self.__compression, self.__compressionLevel, self.__compressionMinSize)
+
+    def compress (self, data):
+        """
+        Compress the body according to the compression negotiated
+
+        @param data: body serialized
+        @type data: bytes
+
+        @return: body compressed
+        @rtype: bytes
+        """
+        algo = self.__compression
+        if algo is None:
+            return zlib.compress(data)
+            
+        level = self.__compressionLevel
+        if len(data) < self.__compressionMinSize:
+            algo = COMPRESSION_NONE
+        
+        if algo == COMPRESSION_ZLIB:
+            compressed = zlib.compress(data, level)
+        elif algo == COMPRESSION_LZ4:
+            if level < 0:
+                compressed = lz4frame.compress(data)
+            else:
+                compressed = lz4frame.compress(data, compression_level=level)
+        elif algo == COMPRESSION_ZSTD:
+            if level < 0:
+                compressed = zstandard.ZstdCompressor().compress(data)
+            else:
+                compressed = zstandard.ZstdCompressor(level=level).compress(data)
+        else:
+            compressed = data
+        return COMPRESSION_TAGS[algo] + compressed
+
+    def decompress (self, data):
+        """
+        Decompress the body according to the compression negotiated
+
+        @param data: body compressed
+        @type data: bytes or memoryview
+
+        @return: body serialized
+        @rtype: bytes
+        """
+        if self.__compression is None:
+            return zlib.decompress(data)
+            
+        algo = COMPRESSION_ALGOS.get(data[0])
+        if algo == COMPRESSION_NONE:
+            return bytes(data[1:])
+        elif algo == COMPRESSION_ZLIB:
+            return zlib.decompress(data[1:])
+        elif algo == COMPRESSION_LZ4 and lz4frame is not None:
+            return lz4frame.decompress(data[1:])
+        elif algo == COMPRESSION_ZSTD and zstandard is not None:
+            return zstandard.ZstdDecompressor().decompress(data[1:])
+        raise Exception('unsupported compression: %s' % data[0])
+
+    def setCodec (self, codec):
+        """
+        Set the format of messages, text (default) or binary
+
+        @param codec: CODEC_TEXT or CODEC_BINARY
+        @type codec: string
+        """
+        if codec not in [ CODEC_TEXT, CODEC_BINARY ]:
+            raise Exception('unknown codec: %s' % codec)
+        self.__codec = codec
+
+    def getCodec (self):
+        """
+        Return the format of messages
+
+        @return: CODEC_TEXT or CODEC_BINARY
+        @rtype: string
+        """
+        return self.__codec
 
     def setUserId (self, userId):
         """
@@ -172,6 +363,9 @@ class Messages(object):
             if op not in [ RSQ_CMD, RSQ_NOTIFY ]:
                 raise Exception('unknown request: %s' % op)
 
+        if self.__codec == CODEC_BINARY:
+            return self.encodeBinary(op=op, tid=tid, desc=desc, body=body)
+            
         # prepare the head of the message
         if sys.version_info > (3,): # python 3 support
             if not isinstance(desc, bytes):
@@ -185,14 +379,14 @@ class Messages(object):
         if body: 
             if not self.__useJson:
                 pickled = cPickle.dumps(body, protocol=self.__pickleProtocol)
-                bod = zlib.compress(pickled)
+                bod = self.compress(pickled)
                 if sys.version_info >= (3,10):
                     ret.append(base64.encodebytes(bod))
                 else:
                     ret.append( base64.encodestring(bod) )
             else:
                 json_data = json.dumps(body, ensure_ascii=False)
-                compressed = zlib.compress( json_data )
+                compressed = self.compress( json_data )
                 if sys.version_info >= (3,10):
                     ret.append(base64.encodebytes(compressed))
                 else:
@@ -205,36 +399,69 @@ class Messages(object):
 
         return rslt
 
+    def encodeBinary (self, op, tid, desc, body = None):
+        """
+        Encode a message in the binary format
+        header (tid, op and desc lengths), op, desc and the body zipped without base64
+
+        @param op: operator
+        @type op:
+
+        @param tid: transaction id
+        @type tid:
+
+        @param desc: description
+        @type desc:
+
+        @param body: content of the message
+        @type body:
+
+        @return: the message encoded
+        @rtype: bytes
+        """
+        if not isinstance(desc, bytes):
+            desc = desc.encode('utf8')
+        ret = [ BIN_HEADER.pack(tid, len(op), len(desc)), op, desc ]
+        if body: 
+            if not self.__useJson:
+                ret.append( self.compress( cPickle.dumps(body, protocol=self.__pickleProtocol) ) )
+            else:
+                ret.append( self.compress( json.dumps(body, ensure_ascii=False).encode('utf8') ) )
+        return b''.join(ret)
+
     def decode (self, msgraw):
         """
         Decode a message: request or response
 
         @param msgraw:
-        @type msgraw:
+        @type msgraw: bytes or memoryview
 
         @return: request or response
         @rtype: typle
         """
-        # split the body
-        msg = msgraw.split(BODY_SEP, 1)
+        if self.__codec == CODEC_BINARY:
+            return self.decodeBinary(msgraw=msgraw)
+            
+        # split the body, the search works on memoryview without copy
+        sep = BODY_SEP_RE.search(msgraw)
 
         # no body in the message
-        if len(msg) == 1:
-            head = msg[0].split(HEAD_SEP)
+        if sep is None:
+            head = bytes(msgraw).split(HEAD_SEP)
             body = b''
 
         # header with body
-        elif len(msg) == 2:
+        else:
             # extract the header of the message
-            head = msg[0].split(HEAD_SEP)
+            head = bytes(msgraw[:sep.start()]).split(HEAD_SEP)
             
             # extract the body 
             # the body is encoded in the base 64 and zipped
             if sys.version_info > (3,): # support python3
-                decoded = base64.b64decode(msg[1])
+                decoded = binascii.a2b_base64(msgraw[sep.end():])
             else:
-                decoded = base64.decodestring(msg[1]) # deprecated function
-            decompressed_data = zlib.decompress(decoded)
+                decoded = base64.decodestring(msgraw[sep.end():]) # deprecated function
+            decompressed_data = self.decompress(decoded)
             if not self.__useJson:
                 if sys.version_info > (3,): # support python3
                     body =  cPickle.loads( decompressed_data, encoding="bytes")
@@ -243,9 +470,49 @@ class Messages(object):
                     body =  cPickle.loads( decompressed_data )
             else:
                 body = json.loads( decompressed_data, encoding="ISO-8859-1" )
-        else:
-            raise Exception('invalid message')
 
+        return self.makeMessage(head=head, body=body)
+
+    def decodeBinary (self, msgraw):
+        """
+        Decode a message in the binary format
+
+        @param msgraw:
+        @type msgraw: bytes or memoryview
+
+        @return: request or response
+        @rtype: typle
+        """
+        tid, opLen, descLen = BIN_HEADER.unpack_from(msgraw, 0)
+        offset = BIN_HEADER.size
+        op = bytes(msgraw[offset:offset+opLen])
+        offset += opLen
+        desc = bytes(msgraw[offset:offset+descLen])
+        offset += descLen
+        
+        body = b''
+        if len(msgraw) > offset:
+            decompressed_data = self.decompress(msgraw[offset:])
+            if not self.__useJson:
+                body =  cPickle.loads( decompressed_data, encoding="bytes")
+                body = bytes_to_unicode(body) # convert bytes to unicode with exceptions, workaround
+            else:
+                body = json.loads( decompressed_data )
+        return self.makeMessage(head=[ op, tid, desc ], body=body)
+
+    def makeMessage (self, head, body):
+        """
+        Make the final message from the head and the body decoded
+
+        @param head: op, tid and desc
+        @type head: list
+
+        @param body: body decoded
+        @type body:
+
+        @return: request or response
+        @rtype: typle
+        """
         # the final message is a dictionary with the following keys
         #  - tid key = transaction id
         #  - body key = content of the message
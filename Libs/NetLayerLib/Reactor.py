@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------------------------
+# Copyright (c) 2010-2020 Denis Machard
+# This file is part of the extensive automation project
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301 USA
+# -------------------------------------------------------------------
+
+
+"""
+Reactor module, one io loop shared by several tcp clients
+"""
+import sys
+
+# unicode = str with python3
+if sys.version_info > (3,):
+    unicode = str
+
+import threading
+import selectors
+import socket
+
+class Reactor(threading.Thread):
+    """
+    Io loop thread shared by tcp clients created with the reactor argument
+    """
+    def __init__(self):
+        """
+        Constructor
+        """
+        threading.Thread.__init__(self)
+        self.running = True
+        self.selector = selectors.DefaultSelector()
+        self.mutex = threading.RLock()
+        self.clients = []
+        
+        # self-pipe to wake up the selector
+        self.wakeupReader, self.wakeupWriter = socket.socketpair()
+        self.wakeupReader.setblocking(False)
+        self.wakeupWriter.setblocking(False)
+        self.selector.register(self.wakeupReader, selectors.EVENT_READ)
+
+    def attach(self, client):
+        """
+        Add a tcp client in the loop
+
+        @param client:
+        @type client: TcpClientThread
+        """
+        self.mutex.acquire()
+        client.detached.clear()
+        self.clients.append(client)
+        self.mutex.release()
+        self.wakeup()
+
+    def getNbClients(self):
+        """
+        Return the number of clients attached
+
+        @return:
+        @rtype: integer
+        """
+        self.mutex.acquire()
+        ret = len(self.clients)
+        self.mutex.release()
+        return ret
+
+    def wakeup(self):
+        """
+        Wake up the loop
+        """
+        try:
+            self.wakeupWriter.send(b'\x00')
+        except (socket.error, ValueError):
+            pass # pipe full or closed, the loop is already awake
+
+    def drainWakeup(self):
+        """
+        Consume the wake up signals
+        """
+        try:
+            while self.wakeupReader.recv(4096):
+                pass
+        except (socket.error, ValueError):
+            pass
+
+    def run(self):
+        """
+        Main loop
+        """
+        while self.running:
+            self.mutex.acquire()
+            clients = list(self.clients)
+            self.mutex.release()
+
+            # register sockets of connected clients and compute the next timer
+            timeouts = []
+            for client in clients:
+                if client.running and client.event.isSet() and client.socket is not None:
+                    try:
+                        client.flushQueue()
+                        client.registerSocket( client.ioEvents() )
+                    except Exception as e:
+                        client.handleIoError(e)
+                    else:
+                        timeout = client.nextTimeout()
+                        if timeout is not None:
+                            timeouts.append(timeout)
+                else:
+                    client.unregisterSocket()
+            
+            ready = {}
+            try:
+                for key, events in self.selector.select( min(timeouts) if timeouts else None ):
+                    if key.fileobj is self.wakeupReader:
+                        self.drainWakeup()
+                    else:
+                        ready[ id(key.data) ] = events
+            except Exception as e:
+                self.error( "generic error on select: %s" % str(e) )
+
+            if not self.running:
+                break
+                
+            # dispatch events and timers to clients
+            for client in clients:
+                if client.running and client.event.isSet():
+                    client.processIo( ready.get(id(client), 0) )
+                client.checkCloseSocket()
+                if not client.running:
+                    self.detach(client)
+
+        self.mutex.acquire()
+        clients = list(self.clients)
+        self.mutex.release()
+        for client in clients:
+            self.detach(client)
+        self.selector.close()
+        self.wakeupReader.close()
+        self.wakeupWriter.close()
+
+    def detach(self, client):
+        """
+        Remove a tcp client from the loop
+
+        @param client:
+        @type client: TcpClientThread
+        """
+        self.mutex.acquire()
+        if client in self.clients:
+            self.clients.remove(client)
+        self.mutex.release()
+        client.unregisterSocket()
+        client.onDisconnection()
+        client.detached.set()
+
+    def stop(self):
+        """
+        Stops the thread
+        """
+        self.running = False
+        self.wakeup()
+
+    def error(self, txt):
+        """
+        You should override this method
+
+        @param txt:
+        @type txt:
+        """
+        print(txt)
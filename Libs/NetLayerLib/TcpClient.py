@@ -32,6 +32,7 @@ except NameError: # support python3
     
 import threading
 import select
+import selectors
 import socket
 try:
     import Queue
@@ -63,6 +64,11 @@ else:
         Connection reset exception
         """
         pass
+    class BlockingIOError(Exception): 
+        """
+        Blocking io exception
+        """
+        pass
     
 try:
     import WebSocket
@@ -74,6 +80,180 @@ PROXY_TYPE_SOCKS4           = 0
 PROXY_TYPE_SOCKS5           = 1
 PROXY_TYPE_HTTP             = 2
 
+# max number of buffers given to one sendmsg call
+SEND_IOV_MAX                = 1024
+
+# max size read from the socket in one call
+RECV_SIZE                   = 65536
+
+# raised by the non-blocking sockets of the reactor when the operation must be retried
+WOULD_BLOCK                 = (BlockingIOError, ssl.SSLWantReadError, ssl.SSLWantWriteError)
+
+# packets separated by the terminator or prefixed by their length
+FRAMING_TERMINATOR          = 0
+FRAMING_LENGTH              = 1
+FRAME_LENGTH                = struct.Struct("!I")
+
+class ReceiveBuffer(object):
+    """
+    Growable receive buffer, frames are returned as memoryview without copy
+    A frame is valid until the next read in the buffer
+    """
+    def __init__(self, capacity=RECV_SIZE):
+        """
+        Constructor
+
+        @param capacity: initial size of the buffer
+        @type capacity: integer
+        """
+        self.data = bytearray(capacity)
+        self.start = 0
+        self.end = 0
+        self.scanPos = 0
+
+    def __len__(self):
+        """
+        Return the number of bytes not consumed
+        """
+        return self.end - self.start
+
+    def reserve(self, size):
+        """
+        Make room at the end of the buffer for size bytes
+
+        @param size: number of bytes
+        @type size: integer
+        """
+        if len(self.data) - self.end >= size:
+            return
+        live = self.end - self.start
+        if not live:
+            self.start = self.end = self.scanPos = 0
+            if len(self.data) >= size:
+                return
+        capacity = len(self.data)
+        while capacity - live < size:
+            capacity *= 2
+        # a new array is allocated, views already given remain valid
+        data = bytearray(capacity)
+        data[:live] = memoryview(self.data)[self.start:self.end]
+        self.scanPos -= self.start
+        self.data = data
+        self.start = 0
+        self.end = live
+
+    def recvInto(self, sock, size=RECV_SIZE):
+        """
+        Read data from the socket directly in the buffer
+
+        @param sock: socket
+        @type sock: socket
+
+        @param size: max number of bytes to read
+        @type size: integer
+
+        @return: number of bytes read
+        @rtype: integer
+        """
+        self.reserve(size)
+        n = sock.recv_into( memoryview(self.data)[self.end:self.end+size], size )
+        self.end += n
+        return n
+
+    def extend(self, data):
+        """
+        Append data at the end of the buffer
+
+        @param data: data to append
+        @type data: bytes-like
+        """
+        size = len(data)
+        self.reserve(size)
+        self.data[self.end:self.end+size] = data
+        self.end += size
+
+    def view(self):
+        """
+        Return the data not consumed
+
+        @return: data
+        @rtype: memoryview
+        """
+        return memoryview(self.data)[self.start:self.end]
+
+    def getvalue(self):
+        """
+        Return a copy of the data not consumed
+
+        @return: data
+        @rtype: bytes
+        """
+        return bytes(self.data[self.start:self.end])
+
+    def consume(self, size):
+        """
+        Remove size bytes at the beginning of the buffer
+
+        @param size: number of bytes
+        @type size: integer
+        """
+        self.start = min(self.start + size, self.end)
+        if self.scanPos < self.start:
+            self.scanPos = self.start
+        if self.start == self.end:
+            self.start = self.end = self.scanPos = 0
+
+    def reset(self, data=b''):
+        """
+        Replace the content of the buffer
+
+        @param data: new content
+        @type data: bytes-like
+        """
+        self.start = self.end = self.scanPos = 0
+        if data:
+            self.extend(data)
+
+    def nextFrame(self, terminator):
+        """
+        Return the next frame ended by the terminator or None, the search
+        starts from the last position checked
+
+        @param terminator: frame terminator
+        @type terminator: bytes
+
+        @return: frame without the terminator
+        @rtype: memoryview or None
+        """
+        pos = self.data.find(terminator, self.scanPos, self.end)
+        if pos == -1:
+            # keep the position, the terminator can be split between two reads
+            self.scanPos = max(self.start, self.end - len(terminator) + 1)
+            return None
+        frame = memoryview(self.data)[self.start:pos]
+        self.consume( pos + len(terminator) - self.start )
+        return frame
+
+    def nextSizedFrame(self):
+        """
+        Return the next frame prefixed by its length or None
+
+        @return: frame without the length
+        @rtype: memoryview or None
+        """
+        live = self.end - self.start
+        if live < FRAME_LENGTH.size:
+            return None
+        size = FRAME_LENGTH.unpack_from(self.data, self.start)[0]
+        if live < FRAME_LENGTH.size + size:
+            # make room for the complete frame, avoid several copies on big frames
+            self.reserve( FRAME_LENGTH.size + size - live )
+            return None
+        begin = self.start + FRAME_LENGTH.size
+        frame = memoryview(self.data)[begin:begin+size]
+        self.consume( FRAME_LENGTH.size + size )
+        return frame
+
 class TcpClientThread(threading.Thread):
     """
     Tcp client thread
@@ -83,7 +263,8 @@ class TcpClientThread(threading.Thread):
                         selectTimeout=0.01, terminator=b'\x00',  
                         sslSupport=False, sslVersion=ssl.PROTOCOL_TLSv1, checkSsl=False,
                         wsSupport=False, wsMaxPayloadSize=WebSocket.WEBSOCKET_MAX_BASIC_DATA1024,
-                        tcpKeepAlive=True, tcpKeepIdle=3, tcpKeepCnt=3, tcpKeepIntvl=3):
+                        tcpKeepAlive=True, tcpKeepIdle=3, tcpKeepCnt=3, tcpKeepIntvl=3, reactor=None,
+                        wsCompression=True):
         """
         TCP Client thread
 
@@ -108,7 +289,7 @@ class TcpClientThread(threading.Thread):
         @param proxyUserId: default value : client
         @type proxyUserId: string
 
-        @param selectTimeout: socket io timeout, default value of 0.01
+        @param selectTimeout: deprecated, the io loop sleeps until the next socket event or timer
         @type selectTimeout: integer
 
         @param terminator: packet terminator, default value 0x00
@@ -125,6 +306,12 @@ class TcpClientThread(threading.Thread):
 
         @param wsMaxPayloadSize: websocket payload size
         @type wsMaxPayloadSize: integer
+
+        @param reactor: shared io loop, the client does not run its own thread if provided
+        @type reactor: Reactor or None
+
+        @param wsCompression: offer the permessage-deflate extension on websocket handshake
+        @type wsCompression: boolean
         """
         threading.Thread.__init__(self)
         self.serverAddress = serverAddress
@@ -145,6 +332,11 @@ class TcpClientThread(threading.Thread):
         self.wsHandshakeSuccess = False
         self.wsKey = b''
         self.wsMaxPayloadSize = wsMaxPayloadSize
+        self.wsCompression = wsCompression
+        self.wsFragments = []
+        self.wsFragmentsOpcode = None
+        self.wsFragmentsCompressed = False
+        self.wsSendMutex = threading.RLock()
         
         # ssl
         self.sslSupport = sslSupport
@@ -153,17 +345,37 @@ class TcpClientThread(threading.Thread):
         if sslSupport: self.trace('Ssl activated - version %s' % self.sslVersion)       
             
         # buffer
-        self.buf = b''
-        self.bufWs = b''
+        self.rxBuffer = ReceiveBuffer()
+        self.rxBufferWs = ReceiveBuffer()
         self.queue = Queue.Queue(0)
         self.event = threading.Event()
         self.socket = None
+        
+        # io loop, the self-pipe wakes up the selector on new queued packets
+        self.reactor = reactor
+        self.detached = threading.Event()
+        self.selectorSocket = None
+        self.selectorEvents = 0
+        if reactor is not None:
+            self.selector = reactor.selector
+        else:
+            self.selector = selectors.DefaultSelector()
+            self.wakeupReader, self.wakeupWriter = socket.socketpair()
+            self.wakeupReader.setblocking(False)
+            self.wakeupWriter.setblocking(False)
+            self.selector.register(self.wakeupReader, selectors.EVENT_READ)
+        self.outgoing = []
         self.running = True
         self.closeSocket = False
+        self.closeDeadline = None
+        self.sslHandshaking = False
+        self.sslHandshakeEvents = 0
+        self.sslHandshakeDeadline = None
         self.inactivityServer = False
         self.timeout = timeout
         
         self.terminator = terminator
+        self.framing = FRAMING_TERMINATOR
         self.keepAlivePdu = b''
         self.inactivityTimeout = inactivityTimeout
         self.keepAliveInterval = keepAliveInterval
@@ -176,6 +388,20 @@ class TcpClientThread(threading.Thread):
         
         self.trace('Tcp Client Thread Initialized')
         
+    @property
+    def buf(self):
+        """
+        Copy of the data received and not consumed, used on handshakes
+        """
+        return self.rxBuffer.getvalue()
+
+    @buf.setter
+    def buf(self, value):
+        """
+        Replace the data received and not consumed
+        """
+        self.rxBuffer.reset(value)
+
     def unsetProxy(self):
         """
         Unset the proxy
@@ -312,6 +538,9 @@ class TcpClientThread(threading.Thread):
             self.wsKey = self.wsCodec.createSecWsKey()
             headers.append("Sec-WebSocket-Key: %s" % self.wsKey )
             headers.append("Sec-WebSocket-Version: %s" % WebSocket.WEBSOCKET_VERSION)
+            self.wsCodec.resetExtensions()
+            if self.wsCompression:
+                headers.append("Sec-WebSocket-Extensions: %s" % self.wsCodec.createExtensionsOffer())
             headers.append("")
             headers.append("")
 
@@ -342,7 +571,12 @@ class TcpClientThread(threading.Thread):
         else:
             self.trace( "connecting from %s to %s" % ( str(self.localAddress), str(self.serverAddress)) )
         try:
-            self.buf = b''
+            self.rxBuffer.reset()
+            self.rxBufferWs.reset()
+            self.framing = FRAMING_TERMINATOR
+            self.outgoing = []
+            self.closeDeadline = None
+            self.sslHandshaking = False
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             if self.tcpKeepAlive: self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
             if sys.platform == "win32":
@@ -373,16 +607,20 @@ class TcpClientThread(threading.Thread):
             self.socket.bind(self.localAddress)
             if self.proxyAddress is not None:
                 self.socket.connect(self.proxyAddress)
+                self.setNonBlocking()
                 self.lastActivityTimestamp = time.time()
                 self.lastKeepAliveTimestamp = time.time()
                 self.event.set()
+                self.wakeup()
                 self.trace("proxy connected.")
                 self.onProxyConnection()
             else:
                 self.socket.connect(self.serverAddress)
+                self.setNonBlocking()
                 self.lastActivityTimestamp = time.time()
                 self.lastKeepAliveTimestamp = time.time()           
                 self.event.set()
+                self.wakeup()
                 self.trace("connected.")
                 self.onConnection()
         except socket.timeout as e:
@@ -400,11 +638,159 @@ class TcpClientThread(threading.Thread):
                 self.error("%s." % ( str(e) ) )
                 self.onConnectionRefused(err = str(e))
     
+    def setNonBlocking(self):
+        """
+        Set the socket connected in non-blocking mode with the shared reactor,
+        a slow server must not block the io of the other clients
+        """
+        if self.reactor is not None:
+            self.socket.setblocking(False)
+
+    def start(self):
+        """
+        Start the io thread or attach the client to the shared reactor
+        """
+        if self.reactor is not None:
+            self.reactor.attach(self)
+        else:
+            threading.Thread.start(self)
+
+    def join(self, timeout=None):
+        """
+        Wait the end of the io thread or the detachment from the reactor
+
+        @param timeout: max time to wait in seconds
+        @type timeout: float or None
+        """
+        if self.reactor is not None:
+            self.detached.wait(timeout)
+        else:
+            threading.Thread.join(self, timeout)
+
     def closeConnection(self):
         """
         Close TCP connection (RESET)
         """
         self.closeSocket = True
+        self.wakeup()
+
+    def wakeup(self):
+        """
+        Wake up the io loop
+        """
+        if self.reactor is not None:
+            self.reactor.wakeup()
+            return
+        try:
+            self.wakeupWriter.send(b'\x00')
+        except (socket.error, ValueError):
+            pass # pipe full or closed, the loop is already awake
+
+    def drainWakeup(self):
+        """
+        Consume the wake up signals
+        """
+        try:
+            while self.wakeupReader.recv(4096):
+                pass
+        except (socket.error, ValueError):
+            pass
+
+    def registerSocket(self, events):
+        """
+        Register the current socket in the selector with the events provided
+
+        @param events: selector events mask
+        @type events: integer
+        """
+        if self.selectorSocket is not self.socket:
+            self.unregisterSocket()
+            self.selector.register(self.socket, events, self)
+            self.selectorSocket = self.socket
+            self.selectorEvents = events
+        elif self.selectorEvents != events:
+            self.selector.modify(self.socket, events, self)
+            self.selectorEvents = events
+
+    def unregisterSocket(self):
+        """
+        Remove the socket from the selector
+        """
+        if self.selectorSocket is not None:
+            try:
+                self.selector.unregister(self.selectorSocket)
+            except (KeyError, ValueError):
+                pass
+            self.selectorSocket = None
+            self.selectorEvents = 0
+
+    def keepAliveNeeded(self):
+        """
+        Return True if keep-alive must be sent on this connection
+
+        @return: keep-alive status
+        @rtype: boolean
+        """
+        if not self.keepAliveInterval:
+            return False
+        if self.wsSupport:
+            return self.wsHandshakeSuccess
+        if self.proxyAddress is not None:
+            return self.proxyConnectSuccess
+        return True
+
+    def nextTimeout(self):
+        """
+        Return the delay before the next timer (inactivity or keep-alive)
+
+        @return: delay in seconds or None if no timer
+        @rtype: float
+        """
+        deadlines = []
+        if self.inactivityTimeout:
+            deadlines.append( self.lastActivityTimestamp + self.inactivityTimeout )
+        if self.keepAliveNeeded():
+            deadlines.append( self.lastKeepAliveTimestamp + self.keepAliveInterval )
+        if self.sslHandshaking:
+            deadlines.append( self.sslHandshakeDeadline )
+        if self.closeSocket and self.closeDeadline is not None:
+            deadlines.append( self.closeDeadline )
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - time.time())
+
+    def flushQueue(self):
+        """
+        Move queued messages to the outgoing buffers
+        """
+        while True:
+            try:
+                self.outgoing.append( self.queue.get(False) )
+            except Queue.Empty:
+                break
+
+    def sendOutgoing(self):
+        """
+        Send the outgoing buffers with one system call
+        """
+        if not self.outgoing:
+            return
+        if hasattr(self.socket, "sendmsg") and not isinstance(self.socket, ssl.SSLSocket):
+            sent = self.socket.sendmsg( self.outgoing[:SEND_IOV_MAX] )
+        else:
+            if len(self.outgoing) > 1:
+                self.outgoing = [ b''.join(self.outgoing) ]
+            sent = self.socket.send( self.outgoing[0] )
+
+        # remove sent data, keep the remaining part of a partial write
+        while sent:
+            size = len(self.outgoing[0])
+            if sent >= size:
+                del self.outgoing[0]
+                sent -= size
+            else:
+                self.outgoing[0] = memoryview(self.outgoing[0])[sent:]
+                sent = 0
 
     def run(self):
         """
@@ -413,143 +799,268 @@ class TcpClientThread(threading.Thread):
         while self.running: 
             self.event.wait()
             if self.running:
+                mask = 0
                 try:
-                    # check if we have incoming data
-                    if self.socket is not None:             
-                        r, w, e = select.select([ self.socket ], [], [ self.socket ], self.selectTimeout)
-                        if self.socket in e:
-                            raise EOFError("socket select error: disconnecting")
-                        elif self.socket in r:
-                            read = self.socket.recv(8192)
-                            if not read:
-                                raise EOFError("no more data, connection lost")
+                    if self.socket is not None:
+                        self.flushQueue()
+                        self.registerSocket( self.ioEvents() )
+                        for key, events in self.selector.select( self.nextTimeout() ):
+                            if key.fileobj is self.wakeupReader:
+                                self.drainWakeup()
                             else:
-                                self.lastActivityTimestamp = time.time()
-                                self.buf = b''.join([self.buf,read])
-                                self.onIncomingData()
-                        
-                        # Check inactivity timeout 
-                        elif self.inactivityTimeout:
-                            if time.time() - self.lastActivityTimestamp > self.inactivityTimeout:
-                                if self.proxyAddress is not None:
-                                    raise EOFError("Inactivity proxy/server timeout")
-                                else:
-                                    raise EOFError("Inactivity timeout")
-
-                        if self.wsSupport:
-                            # Prepare Keep-Alive if needed
-                            keepAlive = False
-                            if self.wsSupport and self.wsHandshakeSuccess:
-                                keepAlive = True
-
-                            if keepAlive:
-                                if self.keepAliveInterval:
-                                    if time.time() - self.lastKeepAliveTimestamp > self.keepAliveInterval:
-                                        self.lastKeepAliveTimestamp = time.time()
-                                        wsping, pingId = self.wsCodec.encodePing()
-                                        self.trace("sending ws ping message id=%s" % pingId)                                        
-                                        self.queue.put(wsping)
-                        else: # old style
-                            # Prepare Keep-Alive if needed
-                            keepAlive = False
-                            if self.proxyAddress is not None and self.proxyConnectSuccess:
-                                keepAlive = True
-                            else:
-                                if self.proxyAddress is None:
-                                    keepAlive = True
-
-                            # Send (queue) a Keep-Alive if needed, old style
-                            if keepAlive:
-                                if self.keepAliveInterval:                                    
-                                    if time.time() - self.lastKeepAliveTimestamp > self.keepAliveInterval:
-                                        self.lastKeepAliveTimestamp = time.time()
-                                        self.trace("sending keep-alive")
-                                        self.sendPacket( self.keepAlivePdu )
-
-                        # send queued messages
-                        while not self.queue.empty():
-                            r, w, e = select.select([ ], [ self.socket ], [ self.socket ], self.selectTimeout)
-                            if self.socket in e:
-                                raise EOFError("socket select error when sending a message: disconnecting")
-                            elif self.socket in w:  
-                                try:
-                                    message = self.queue.get(False)
-                                    self.socket.sendall(message)
-                                    del message
-                                except Queue.Empty:
-                                    if self.closeSocket:
-                                        self.event.set()
-                                except Exception as e:
-                                    self.error("unable to send message: " + str(e))
-                            else:
-                                break
-                except EOFError as e:
-                    if "Inactivity timeout" in str(e):
-                        self.error( "disconnecting, inactivity timeout" )
-                        self.inactivityServer = True
-                        # self.onInactivityTimeout()
-                        self.event.clear()
-                        self.closeSocket = True
-                    else:
-                        self.error( "disconnected by the server: %s" % str(e) )
-                        self.onDisconnection(byServer=True)
-                        self.event.clear()
-                
-                # new with python3
-                except ConnectionAbortedError as e:
-                    self.error( "connection aborted by peer" )
-                    self.onDisconnection(byServer=True)
-                    self.event.clear()  
-                except ConnectionRefusedError as e:
-                    self.error( "connection refused by peer" )
-                    self.onDisconnection(byServer=True)
-                    self.event.clear()  
-                except ConnectionResetError as e:
-                    self.error( "connection reseted by peer" )
-                    self.onDisconnection(byServer=True)
-                    self.event.clear()
-                # end of new
-                
-                # new in v20, for alpine support
-                except select.error as e:
-                    _errno, _ = e
-                    if _errno != errno.EINTR:
-                        raise
-                # end of new 
-                
+                                mask = events
                 except Exception as e:
-                    if "[Errno 10054]" in str(e):
-                        self.error( "connection reseted by peer" )
-                        self.onDisconnection(byServer=True)
-                        self.event.clear()
-                    else:
-                        self.error( "generic error on run: %s" % str(e) )
-                        self.closeSocket = True
-                        self.event.clear()
+                    self.handleIoError(e)
+                else:
+                    self.processIo(mask)
             
             # close socket
-            if self.closeSocket:
-                self.trace("cleanup socked")
-                if self.socket is not None:
-                    # cleanup the queue
-                    while not self.queue.empty():
-                        try:
-                            message = self.queue.get(False)
-                            self.socket.sendall(message)
-                        except Queue.Empty:
-                            pass
-                    # close the tcp connection
-                    self.trace("closing socket")
-                    self.socket.close()
-                    # cleanup the buffer
-                    self.buf = b''
-                    self.closeSocket = False
-                    self.onDisconnection(inactivityServer=self.inactivityServer)
-                    self.event.clear()
-                    self.trace("closed")
+            self.checkCloseSocket()
 
+        self.unregisterSocket()
+        self.selector.close()
+        self.wakeupReader.close()
+        self.wakeupWriter.close()
         self.onDisconnection()
 
+    def ioEvents(self):
+        """
+        Return the selector events expected for the socket
+
+        @return: selector events mask
+        @rtype: integer
+        """
+        if self.sslHandshaking:
+            return self.sslHandshakeEvents
+        events = selectors.EVENT_READ
+        if self.outgoing:
+            events |= selectors.EVENT_WRITE
+        return events
+
+    def processIo(self, mask):
+        """
+        Handle socket events, timers and pending messages
+
+        @param mask: selector events ready on the socket
+        @type mask: integer
+        """
+        try:
+            # check if we have incoming data
+            if self.socket is not None:
+                if self.closeSocket or not self.running:
+                    pass
+                elif self.sslHandshaking:
+                    self.continueSslHandshake()
+                    return
+                elif mask & selectors.EVENT_READ:
+                    try:
+                        read = self.rxBuffer.recvInto(self.socket, RECV_SIZE)
+                    except WOULD_BLOCK:
+                        # ssl record not complete on the non-blocking socket
+                        read = None
+                    if read is None:
+                        pass
+                    elif not read:
+                        raise EOFError("no more data, connection lost")
+                    else:
+                        self.lastActivityTimestamp = time.time()
+                        # data already decrypted are not seen by the selector
+                        if isinstance(self.socket, ssl.SSLSocket):
+                            while self.socket.pending():
+                                self.rxBuffer.recvInto(self.socket, self.socket.pending())
+                        self.onIncomingData()
+                
+                # Check inactivity timeout 
+                elif self.inactivityTimeout:
+                    if time.time() - self.lastActivityTimestamp > self.inactivityTimeout:
+                        if self.proxyAddress is not None:
+                            raise EOFError("Inactivity proxy/server timeout")
+                        else:
+                            raise EOFError("Inactivity timeout")
+
+                # Send (queue) a Keep-Alive if needed
+                if self.keepAliveNeeded():
+                    if time.time() - self.lastKeepAliveTimestamp > self.keepAliveInterval:
+                        self.lastKeepAliveTimestamp = time.time()
+                        if self.wsSupport:
+                            wsping, pingId = self.wsCodec.encodePing()
+                            self.trace("sending ws ping message id=%s" % pingId)
+                            self.queue.put(wsping)
+                        else: # old style
+                            self.trace("sending keep-alive")
+                            self.sendPacket( self.keepAlivePdu )
+
+                # send queued messages, coalesced in one write
+                if mask & selectors.EVENT_WRITE:
+                    try:
+                        self.sendOutgoing()
+                    except socket.timeout:
+                        pass
+                    except WOULD_BLOCK:
+                        pass
+                    except (socket.error, ssl.SSLError) as e:
+                        if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                            raise
+        except Exception as e:
+            self.handleIoError(e)
+
+    def handleIoError(self, e):
+        """
+        Handle an error raised by the io loop
+
+        @param e: exception
+        @type e: Exception
+        """
+        if isinstance(e, EOFError):
+            if "Inactivity timeout" in str(e):
+                self.error( "disconnecting, inactivity timeout" )
+                self.inactivityServer = True
+                # self.onInactivityTimeout()
+                self.event.clear()
+                self.closeSocket = True
+            else:
+                self.error( "disconnected by the server: %s" % str(e) )
+                self.onDisconnection(byServer=True)
+                self.event.clear()
+        
+        # new with python3
+        elif isinstance(e, ConnectionAbortedError):
+            self.error( "connection aborted by peer" )
+            self.onDisconnection(byServer=True)
+            self.event.clear()  
+        elif isinstance(e, ConnectionRefusedError):
+            self.error( "connection refused by peer" )
+            self.onDisconnection(byServer=True)
+            self.event.clear()  
+        elif isinstance(e, ConnectionResetError):
+            self.error( "connection reseted by peer" )
+            self.onDisconnection(byServer=True)
+            self.event.clear()
+        # end of new
+        
+        # new in v20, for alpine support
+        elif isinstance(e, select.error) and e.errno == errno.EINTR:
+            pass
+        # end of new 
+        
+        elif "[Errno 10054]" in str(e):
+            self.error( "connection reseted by peer" )
+            self.onDisconnection(byServer=True)
+            self.event.clear()
+        else:
+            self.error( "generic error on run: %s" % str(e) )
+            self.closeSocket = True
+            self.event.clear()
+
+    def checkCloseSocket(self):
+        """
+        Close the socket if requested
+        """
+        if self.closeSocket:
+            # the pending messages are sent before
+            if self.socket is not None and not self.flushOutgoing():
+                return
+            self.trace("cleanup socked")
+            if self.socket is not None:
+                self.outgoing = []
+                self.closeDeadline = None
+                # close the tcp connection
+                self.trace("closing socket")
+                self.unregisterSocket()
+                self.socket.close()
+                # cleanup the buffer
+                self.rxBuffer.reset()
+                self.rxBufferWs.reset()
+                self.closeSocket = False
+                self.onDisconnection(inactivityServer=self.inactivityServer)
+                self.event.clear()
+                self.trace("closed")
+
+    def flushOutgoing(self):
+        """
+        Send the pending messages before closing the socket, the non-blocking
+        socket of the reactor is flushed on the next write events until the timeout
+
+        @return: True when the socket can be closed
+        @rtype: boolean
+        """
+        # cleanup the queue
+        self.flushQueue()
+        try:
+            if self.reactor is None:
+                for message in self.outgoing:
+                    self.socket.sendall(message)
+                return True
+
+            if self.closeDeadline is None:
+                self.closeDeadline = time.time() + self.timeout
+            if self.sslHandshaking:
+                return True
+            try:
+                self.sendOutgoing()
+            except WOULD_BLOCK:
+                pass
+            # stopped or disconnected, not flushed by the loop anymore
+            if not self.running or not self.event.isSet():
+                return True
+            return not self.outgoing or time.time() >= self.closeDeadline
+        except Exception as e:
+            self.error("unable to send message: " + str(e))
+        return True
+
+    def startSslHandshake(self):
+        """
+        Start the ssl handshake in the tunnel of the proxy,
+        continued on the events of the non-blocking socket of the reactor
+        """
+        certReqs = ssl.CERT_NONE
+        if self.checkSsl: certReqs = ssl.CERT_REQUIRED
+        try:
+            self.socket = ssl.wrap_socket( self.socket, cert_reqs=certReqs, ssl_version=self.sslVersion,
+                                           do_handshake_on_connect=False )
+        except Exception as e:
+            self.onSslHandshakeError(err=e)
+        else:
+            self.sslHandshaking = True
+            self.sslHandshakeEvents = selectors.EVENT_WRITE
+            self.sslHandshakeDeadline = time.time() + self.timeout
+
+    def continueSslHandshake(self):
+        """
+        Continue the ssl handshake in the tunnel of the proxy
+        """
+        try:
+            self.socket.do_handshake()
+        except ssl.SSLWantReadError:
+            self.sslHandshakeEvents = selectors.EVENT_READ
+        except ssl.SSLWantWriteError:
+            self.sslHandshakeEvents = selectors.EVENT_WRITE
+        except Exception as e:
+            self.onSslHandshakeError(err=e)
+            return
+        else:
+            self.sslHandshaking = False
+            self.proxyConnectSuccess = True
+            self.buf = b''
+            self.onProxyConnectionSuccess()
+            return
+            
+        if time.time() >= self.sslHandshakeDeadline:
+            self.onSslHandshakeError(err="handshake timeout")
+
+    def onSslHandshakeError(self, err):
+        """
+        Close the connection on ssl handshake error in the tunnel of the proxy
+
+        @param err: error
+        @type err: string or Exception
+        """
+        self.sslHandshaking = False
+        self.buf = b''
+        self.closeConnection()
+        self.error( "SSL Http proxy refuses to establish the tunnel: %s" % err )
+        self.onProxyConnectionError( err="The SSL HTTP proxy refuses to establish the tunnel")
+
     def onIncomingData(self):
         """
         Called on incoming data
@@ -558,8 +1069,8 @@ class TcpClientThread(threading.Thread):
             if self.running:
                 # handle proxy handshake
                 readTrueData = False
-                if self.proxyAddress is not None and not self.proxyConnectSuccess and self.buf:
-                    self.trace( 'data received for proxy handshake of len %s' %  len(self.buf) )
+                if self.proxyAddress is not None and not self.proxyConnectSuccess and len(self.rxBuffer):
+                    self.trace( 'data received for proxy handshake of len %s' %  len(self.rxBuffer) )
                     readTrueData = self.decodeProxyResponse()
                     if self.proxyConnectSuccess:
                         self.onProxyConnectionSuccess()
@@ -568,11 +1079,11 @@ class TcpClientThread(threading.Thread):
                     
                 # handle websocket handshake
                 readTrueData = False
-                if self.wsSupport and not self.wsHandshakeSuccess and self.buf:           
+                if self.wsSupport and not self.wsHandshakeSuccess and len(self.rxBuffer):           
                     if not readTrueData and not self.proxyConnectSuccess and self.proxyAddress is not None: 
                         pass
                     else:
-                        self.trace( 'data received for ws handshake of len %s' %  len(self.buf) )
+                        self.trace( 'data received for ws handshake of len %s' %  len(self.rxBuffer) )
                         readTrueData = self.decodeWsHandshake()
                         if self.wsHandshakeSuccess:
                             self.onWsHanshakeSuccess()
@@ -582,52 +1093,113 @@ class TcpClientThread(threading.Thread):
                 # handle other data
                 if readTrueData: # other than proxy and websocket handshake
                     if self.wsSupport:
-                        (data, opcode, left, needmore) = self.wsCodec.decodeWsData(buffer=self.buf)
-                        self.buf = left
-                        if not needmore:
-                            if opcode == WebSocket.WEBSOCKET_OPCODE_TEXT:
-                                self.bufWs = b''.join([self.bufWs, data]) 
-                            else:
-                                if opcode == WebSocket.WEBSOCKET_OPCODE_PONG:
-                                    self.trace("received ws pong message id=%s" % data)
-                                elif opcode == WebSocket.WEBSOCKET_OPCODE_PING:
-                                    self.trace("received ws ping message id=%s" % data)     
-                                    wspong = self.wsCodec.encodePong(data=data)
-                                    self.queue.put(wspong)
-                                    self.trace("sending pong message id=%s" % data)                                 
-                                else:
-                                    self.error('unknown ws opcode received: %s' % opcode) 
-
-                            self.readBufferWs()
-                            if len(self.buf) >= 2:
-                                self.onIncomingData()
-
+                        self.readFramesWs()
                     else: # old style
                         self.readBuffer()
 
         except Exception as e:
             self.error("error on incoming data: %s" % e )
 
+    def readFramesWs(self):
+        """
+        Decode all complete websocket frames of the buffer
+        """
+        while len(self.rxBuffer) >= 2:
+            (data, opcode, fin, compressed, consumed, needmore) = self.wsCodec.decodeWsFrame(buffer=self.rxBuffer.view())
+            if needmore:
+                break
+            if opcode in [ WebSocket.WEBSOCKET_OPCODE_TEXT, WebSocket.WEBSOCKET_OPCODE_BINARY, 
+                           WebSocket.WEBSOCKET_OPCODE_CONTINUATION ]:
+                if opcode != WebSocket.WEBSOCKET_OPCODE_CONTINUATION:
+                    self.wsFragments = []
+                    self.wsFragmentsOpcode = opcode
+                    self.wsFragmentsCompressed = bool(compressed)
+                    
+                # the compressed message is inflated when the last fragment is received,
+                # otherwise the payload is appended directly in the ws buffer
+                if self.wsFragmentsCompressed:
+                    self.wsFragments.append( bytes(data) )
+                    if fin:
+                        self.rxBufferWs.extend( self.wsCodec.inflate(b''.join(self.wsFragments)) )
+                        self.wsFragments = []
+                else:
+                    self.rxBufferWs.extend(data)
+            else:
+                data = bytes(data)
+                if opcode == WebSocket.WEBSOCKET_OPCODE_PONG:
+                    self.trace("received ws pong message id=%s" % data)
+                elif opcode == WebSocket.WEBSOCKET_OPCODE_PING:
+                    self.trace("received ws ping message id=%s" % data)     
+                    wspong = self.wsCodec.encodePong(data=data)
+                    self.queue.put(wspong)
+                    self.trace("sending pong message id=%s" % data)
+                elif opcode == WebSocket.WEBSOCKET_OPCODE_CLOSE:
+                    self.trace("received ws close message")
+                    self.closeConnection()
+                else:
+                    self.error('unknown ws opcode received: %s' % opcode) 
+            del data
+            self.rxBuffer.consume(consumed)
+        self.readBufferWs()
+
+    def nextFrame(self, buffer):
+        """
+        Return the next packet of the buffer according to the framing
+
+        @param buffer: receive buffer
+        @type buffer: ReceiveBuffer
+
+        @return: packet
+        @rtype: memoryview or None
+        """
+        if self.framing == FRAMING_LENGTH:
+            return buffer.nextSizedFrame()
+        return buffer.nextFrame(self.terminator)
+
+    def setFraming(self, framing):
+        """
+        Change the framing of packets, must be called from the io loop
+        (handleIncomingPacket) to apply on the next packet received
+
+        @param framing: FRAMING_TERMINATOR or FRAMING_LENGTH
+        @type framing: integer
+        """
+        self.trace("framing changed to %s" % framing)
+        self.framing = framing
+
+    def framePacket(self, packet):
+        """
+        Add the terminator or the length to the packet
+
+        @param packet: packet
+        @type packet: bytes
+        """
+        if self.framing == FRAMING_LENGTH:
+            return FRAME_LENGTH.pack(len(packet)) + packet
+        return packet + self.terminator
+
     def readBufferWs(self):
         """
         Read buffer for websocket
         """
-        pdus = self.bufWs.split(self.terminator)
-        for pdu in pdus[:-1]:
+        while True:
+            pdu = self.nextFrame(self.rxBufferWs)
+            if pdu is None:
+                break
             self.handleIncomingPacket(pdu)
-        self.bufWs = pdus[-1]
 
     def readBuffer(self):
         """
         Read tcp buffer
         """
-        pdus = self.buf.split(self.terminator)
-        for pdu in pdus[:-1]:
+        while True:
+            pdu = self.nextFrame(self.rxBuffer)
+            if pdu is None:
+                break
             if not pdu == self.keepAlivePdu:
                 self.handleIncomingPacket(pdu)
             else:
                 self.trace("received keep-alive from server")
-        self.buf = pdus[-1]
         
     def decodeWsHandshake(self):
         """
@@ -664,6 +1236,9 @@ class TcpClientThread(threading.Thread):
                             self.onWsHanshakeError( err="Handshake ws refused")
                         else:
                             self.trace('Ws handshake accepted')
+                            if self.wsCompression and self.wsCodec.checkingWsExtensions(response=rsp):
+                                self.trace('Ws compression activated')
+                            self.wsFragments = []
                             self.wsHandshakeSuccess = True
                             if len(datasplitted) > 1:
                                 self.buf = datasplitted[1]
@@ -734,7 +1309,11 @@ class TcpClientThread(threading.Thread):
                             # tunnel established
                             # continue with ssl if needed
                             self.trace('Proxy tunnel established')
-                            if self.sslSupport:
+                            if self.sslSupport and self.reactor is not None:
+                                # non-blocking socket, the handshake is continued by the loop
+                                self.buf = b''
+                                self.startSslHandshake()
+                            elif self.sslSupport:
                                 certReqs = ssl.CERT_NONE
                                 if self.checkSsl: certReqs = ssl.CERT_REQUIRED
                                 try:
@@ -784,6 +1363,7 @@ class TcpClientThread(threading.Thread):
         """
         self.running = False
         self.event.set()
+        self.wakeup()
         self.trace('Tcp Client Thread Stopped')
 
     def sendHttpPacket(self, packet):
@@ -800,6 +1380,7 @@ class TcpClientThread(threading.Thread):
                 self.queue.put( bytes(packet, "UTF-8") )
             else:
                 self.queue.put( packet )
+        self.wakeup()
 
     def sendPacket(self, packet):
         """
@@ -812,38 +1393,49 @@ class TcpClientThread(threading.Thread):
 
             if sys.version_info[0] == 3: # python 3 support
                 if isinstance(packet, bytes): 
-                    payload_data = packet + self.terminator
+                    payload_data = self.framePacket(packet)
                 else:
-                    payload_data = bytes(packet, "UTF-8") + self.terminator
+                    payload_data = self.framePacket(bytes(packet, "UTF-8"))
             else:
-                payload_data = packet + self.terminator
+                payload_data = self.framePacket(packet)
 
-            # make chunk
-            if sys.version_info[0] == 3: # python 3 support
-                chunks=[payload_data[x:x+self.wsMaxPayloadSize] for x in range(0, len(payload_data), self.wsMaxPayloadSize)]
+            # one frame per message if the compression is negotiated with the server,
+            # chunked in several text frames otherwise (servers without fragmentation support)
+            if self.wsCodec.deflateActivated:
+                # the compression context is shared, messages are encoded and queued in order
+                self.wsSendMutex.acquire()
+                try:
+                    self.queue.put( self.wsCodec.encodeMessage(data=payload_data) )
+                finally:
+                    self.wsSendMutex.release()
             else:
-                chunks=[payload_data[x:x+self.wsMaxPayloadSize] for x in xrange(0, len(payload_data), self.wsMaxPayloadSize)]
+                # make chunk
+                if sys.version_info[0] == 3: # python 3 support
+                    chunks=[payload_data[x:x+self.wsMaxPayloadSize] for x in range(0, len(payload_data), self.wsMaxPayloadSize)]
+                else:
+                    chunks=[payload_data[x:x+self.wsMaxPayloadSize] for x in xrange(0, len(payload_data), self.wsMaxPayloadSize)]
 
-            # encode data in the websocket packet and enqueue it
-            for chunk in chunks:
-                # encode in text websocket
-                wsdata = self.wsCodec.encodeText(data=chunk)
+                # encode data in the websocket packet and enqueue it
+                for chunk in chunks:
+                    # encode in text websocket
+                    wsdata = self.wsCodec.encodeText(data=chunk)
 
-                if isinstance(packet, bytes): # python 3 support
-                    self.queue.put(wsdata) 
-                else:
-                    if sys.version_info[0] == 3: # python 3 support
-                        self.queue.put( bytes(wsdata, "UTF-8") )
+                    if isinstance(packet, bytes): # python 3 support
+                        self.queue.put(wsdata) 
                     else:
-                        self.queue.put( wsdata  )
+                        if sys.version_info[0] == 3: # python 3 support
+                            self.queue.put( bytes(wsdata, "UTF-8") )
+                        else:
+                            self.queue.put( wsdata  )
         else:
             if isinstance(packet, bytes): # python 3 support
-                self.queue.put(packet + self.terminator)
+                self.queue.put( self.framePacket(packet) )
             else:
                 if sys.version_info[0] == 3: # python 3 support
-                    self.queue.put( bytes(packet, "UTF-8") + self.terminator )
+                    self.queue.put( self.framePacket(bytes(packet, "UTF-8")) )
                 else:
-                    self.queue.put( packet + self.terminator )
+                    self.queue.put( self.framePacket(packet) )
+        self.wakeup()
         
     def handleIncomingPacket(self, pdu):
         """
@@ -38,17 +38,178 @@ except ImportError: # support python3
 import threading
 import time
 
+class CancelEvent(threading.Event):
+    """
+    External event to cancel the wait of transactions,
+    the transactions waited are cancelled as soon as the event is set
+    """
+    def __init__(self):
+        """
+        Constructor
+        """
+        threading.Event.__init__(self)
+        self.__mutex = threading.Lock()
+        self.__transactions = set()
+
+    def set(self):
+        """
+        Set the event and cancel the transactions waited
+        """
+        threading.Event.set(self)
+        self.__mutex.acquire()
+        transactions = list(self.__transactions)
+        self.__transactions.clear()
+        self.__mutex.release()
+        for transaction in transactions:
+            if not transaction.done():
+                transaction.cancel()
+
+    def register(self, transaction):
+        """
+        Add a transaction waited
+
+        @param transaction:
+        @type transaction: Transaction
+
+        @return: False if the event is already set
+        @rtype: boolean
+        """
+        self.__mutex.acquire()
+        try:
+            if self.isSet():
+                return False
+            self.__transactions.add(transaction)
+            return True
+        finally:
+            self.__mutex.release()
+
+    def unregister(self, transaction):
+        """
+        Remove a transaction waited
+
+        @param transaction:
+        @type transaction: Transaction
+        """
+        self.__mutex.acquire()
+        self.__transactions.discard(transaction)
+        self.__mutex.release()
+
+class Transaction(object):
+    """
+    Outgoing transaction, future like object
+    """
+    def __init__(self, tid, client = 0, waitResponse = False, release = None):
+        """
+        Constructor
+
+        @param tid: transaction id
+        @type tid: integer
+
+        @param client:
+        @type client:
+
+        @param waitResponse: synchronous transaction
+        @type waitResponse: boolean
+
+        @param release: called when the transaction is terminated
+        @type release: callable
+        """
+        self.tid = tid
+        self.client = client
+        self.timestamp = time.time()
+        self.waitResponse = waitResponse
+        self.response = None
+        self.event = threading.Event()
+        self.__cancelled = False
+        self.__release = release
+
+    def done(self):
+        """
+        Return True if the response is received or the transaction cancelled
+
+        @return:
+        @rtype: boolean
+        """
+        return self.event.isSet()
+
+    def cancelled(self):
+        """
+        Return True if the transaction is cancelled
+
+        @return:
+        @rtype: boolean
+        """
+        return self.__cancelled
+
+    def setResponse(self, response):
+        """
+        Set the response and wake up the waiter
+
+        @param response:
+        @type response:
+        """
+        self.response = response
+        self.event.set()
+
+    def cancel(self):
+        """
+        Cancel the transaction and wake up the waiter
+        """
+        self.__cancelled = True
+        self.event.set()
+        self.release()
+
+    def release(self):
+        """
+        Remove the transaction from the manager
+        """
+        if self.__release is not None:
+            self.__release(self)
+
+    def result(self, timeout = None, cancelEvent = None):
+        """
+        Wait the response until the deadline
+        Returns None on timeout or cancellation
+
+        @param timeout: max time to wait in seconds, infinite if None
+        @type timeout: float or None
+
+        @param cancelEvent: external event to cancel the wait
+        @type cancelEvent: CancelEvent or None
+
+        @return:
+        @rtype:
+        """
+        # the response and the cancel event both wake up the waiter
+        if cancelEvent is not None and not cancelEvent.register(self):
+            if not self.done():
+                self.cancel()
+        remaining = None
+        if timeout is not None:
+            remaining = max(0.0, self.timestamp + timeout - time.time())
+        self.event.wait(remaining)
+        if cancelEvent is not None:
+            cancelEvent.unregister(self)
+        self.release()
+        if self.__cancelled:
+            return None
+        return self.response
+
 class TransactionManager(object):
     """
     Transaction manager
     """
     ID_MAX = 99999
-    def __init__(self):
+    def __init__(self, fifoCallback = None):
         """
         Constructor
+
+        @param fifoCallback: shared callback thread, started and stopped by the owner
+        @type fifoCallback: FifoCallbackThread or None
         """
         self.__started = False
-        self.__fifo_incoming_events_thread = None
+        self.__fifo_incoming_events_thread = fifoCallback
+        self.__fifo_shared = fifoCallback is not None
         
         self.__mutex = threading.RLock()
         self.__transactionId = 0
@@ -80,69 +241,52 @@ class TransactionManager(object):
         @type client:
 
         @return:
-        @rtype:
+        @rtype: Transaction
         """
-        event = None
         transactionId = self.getNewTransactionId()
-        if waitResponse: 
-            event = threading.Event()
+        transaction = Transaction( tid=transactionId, client=client, waitResponse=waitResponse,
+                                   release=self.releaseTransaction )
         self.__mutex.acquire()
-        transaction = { 'tid': transactionId, 'timestamp': time.time(), 'event': event }
         self.__outgoingTransactions[ (client, transactionId) ] = transaction
         self.__mutex.release()      
-        return transactionId, event
+        return transaction
     
-    def waitResponse(self, event, transactionId, responseTimeout = 30.0, client = 0, cancelEvent=None):
+    def releaseTransaction(self, transaction):
         """
-        Wait response
+        Remove the transaction from the outgoing list
 
-        @param event:
-        @type event:
+        @param transaction:
+        @type transaction: Transaction
+        """
+        self.__mutex.acquire()
+        key = (transaction.client, transaction.tid)
+        if self.__outgoingTransactions.get(key) is transaction:
+            del self.__outgoingTransactions[key]
+        self.__mutex.release()
+
+    def waitResponse(self, transaction, responseTimeout = 30.0, cancelEvent=None):
+        """
+        Wait response
 
-        @param transactionId:
-        @type transactionId:
+        @param transaction:
+        @type transaction: Transaction
 
         @param responseTimeout:
         @type responseTimeout:
 
-        @param client:
-        @type client:
+        @param cancelEvent: external event to cancel the wait
+        @type cancelEvent: CancelEvent or None
 
         @return:
         @rtype:
         """
-        timeout = False
-        startTime = self.__outgoingTransactions[ (client,transactionId) ]['timestamp'] 
-        if cancelEvent is not None:
-            while (not event.isSet()) and (not timeout) and (not cancelEvent.isSet()):
-                time.sleep(0.1)
-                if (time.time() - startTime) >= responseTimeout:
-                    timeout = True      
-        else:
-            while (not event.isSet()) and (not timeout):
-                time.sleep(0.1)
-                if (time.time() - startTime) >= responseTimeout:
-                    timeout = True
-        if cancelEvent is not None:
-            if cancelEvent.isSet():
-                self.__mutex.acquire()
-                del self.__outgoingTransactions[ (client,transactionId) ]
-                self.__mutex.release()
-                self.trace("request transaction id %s cancelled" % (transactionId) )
-                return None
-                
-        if not timeout:
-            self.__mutex.acquire()
-            response = self.__outgoingTransactions[ (client,transactionId) ]['response']
-            del self.__outgoingTransactions[ (client,transactionId) ]
-            self.__mutex.release()
-            return response
-        else:
-            self.__mutex.acquire()
-            del self.__outgoingTransactions[ (client,transactionId) ]
-            self.__mutex.release()
-            self.trace("client %s timeout on synchronous request transaction id %s" % (client,transactionId) )
-            return None
+        response = transaction.result(timeout=responseTimeout, cancelEvent=cancelEvent)
+        if transaction.cancelled():
+            self.trace("request transaction id %s cancelled" % (transaction.tid) )
+        elif not transaction.done():
+            self.trace("client %s timeout on synchronous request transaction id %s" % (transaction.client, 
+                                                                                       transaction.tid) )
+        return response
     
     def onMessage(self, message, client = 0):
         """
@@ -163,15 +307,13 @@ class TransactionManager(object):
             self.__mutex.acquire()
             if (client, transactionId) in self.__outgoingTransactions:
                 entry = self.__outgoingTransactions[ (client,transactionId) ]
-                # synchronous request ?
-                if entry['event']:
-                    self.__outgoingTransactions[(client,transactionId) ]['response'] = mess
-                    entry['event'].set()
-                else:
+                # asynchronous request ?
+                if not entry.waitResponse:
                     del self.__outgoingTransactions[ (client,transactionId) ]
                 self.__mutex.release()
-                self.trace("<-- %s %s %s from %s - took %fs" % ( mess['code'], transactionId, mess['phrase'], client, time.time() - entry['timestamp'] ))
-                if not entry['event']:
+                entry.setResponse(mess)
+                self.trace("<-- %s %s %s from %s - took %fs" % ( mess['code'], transactionId, mess['phrase'], client, time.time() - entry.timestamp ))
+                if not entry.waitResponse:
                     self.__fifo_incoming_events_thread.putItem(lambda: self.onResponse(client, transactionId, mess))
             else:
                 self.__mutex.release()
@@ -184,8 +326,9 @@ class TransactionManager(object):
         Start the manager
         """
         if not self.__started:
-            self.__fifo_incoming_events_thread = FifoCallBack.FifoCallbackThread()
-            self.__fifo_incoming_events_thread.start()
+            if not self.__fifo_shared:
+                self.__fifo_incoming_events_thread = FifoCallBack.FifoCallbackThread()
+                self.__fifo_incoming_events_thread.start()
             self.__started = True
             self.trace("Transaction Manager Started." )
     
@@ -194,8 +337,9 @@ class TransactionManager(object):
         Stop the manager
         """
         if self.__started:
-            self.__fifo_incoming_events_thread.stop()
-            self.__fifo_incoming_events_thread.join()
+            if not self.__fifo_shared:
+                self.__fifo_incoming_events_thread.stop()
+                self.__fifo_incoming_events_thread.join()
             self.__started = False
             self.trace("Transaction Manager Stopped." )
 
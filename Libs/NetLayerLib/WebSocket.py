@@ -31,6 +31,7 @@ import base64
 import struct
 import threading
 import hashlib
+import zlib
 
 # unicode = str with python3
 if sys.version_info > (3,):
@@ -38,8 +39,10 @@ if sys.version_info > (3,):
     
 WEBSOCKET_VERSION           = 13
 
+WEBSOCKET_OPCODE_CONTINUATION = 0
 WEBSOCKET_OPCODE_TEXT       = 1
 WEBSOCKET_OPCODE_BINARY     = 2
+WEBSOCKET_OPCODE_CLOSE      = 8
 WEBSOCKET_OPCODE_PING       = 9
 WEBSOCKET_OPCODE_PONG       = 10
 
@@ -47,6 +50,11 @@ WEBSOCKET_MAX_BASIC_DATA    = 125
 WEBSOCKET_MAX_BASIC_DATA1024= 1024
 WEBSOCKET_EXT_DATA          = 65535
 
+# rfc7692, compression extension
+WEBSOCKET_EXT_DEFLATE       = "permessage-deflate"
+WEBSOCKET_DEFLATE_TAIL      = b"\x00\x00\xff\xff"
+WEBSOCKET_MAX_WINDOW_BITS   = 15
+
 # Websocket payload
 #  0                   1                   2                   3
 #      0 1 2 3 4 5 6 7 8 9 0 1 2 3 4 5 6 7 8 9 0 1 2 3 4 5 6 7 8 9 0 1
@@ -89,6 +97,105 @@ class WebSocketCodec(object):
         self.pingId = 0
         self.pingMutex = threading.RLock()
         self.debug=debug
+        self.resetExtensions()
+
+    def resetExtensions(self):
+        """
+        Disable the extensions, called before a new handshake
+        """
+        self.deflateActivated = False
+        self.deflateLevel = zlib.Z_DEFAULT_COMPRESSION
+        self.clientNoContextTakeover = False
+        self.serverNoContextTakeover = False
+        self.clientWindowBits = WEBSOCKET_MAX_WINDOW_BITS
+        self.serverWindowBits = WEBSOCKET_MAX_WINDOW_BITS
+        self.compressor = None
+        self.decompressor = None
+
+    def createExtensionsOffer(self):
+        """
+        Return the value of the sec-websocket-extensions header sent on handshake
+        """
+        return "%s; client_max_window_bits" % WEBSOCKET_EXT_DEFLATE
+
+    def checkingWsExtensions(self, response):
+        """
+        Activate the extensions accepted by the server on handshake
+
+        @param response: http response
+        @type response: string
+
+        @return: True if the compression is activated
+        @rtype: boolean
+        """
+        self.resetExtensions()
+        try:
+            for hdr in response.splitlines()[1:]:
+                k, v = hdr.split(b':', 1)
+                if k.lower().strip() != b'sec-websocket-extensions':
+                    continue
+                for ext in v.split(b','):
+                    params = [ p.strip().lower() for p in ext.split(b';') ]
+                    if params[0] != WEBSOCKET_EXT_DEFLATE.encode('utf-8'):
+                        continue
+                    for param in params[1:]:
+                        name, _, value = param.partition(b'=')
+                        value = value.strip(b'"')
+                        if name == b'client_no_context_takeover':
+                            self.clientNoContextTakeover = True
+                        elif name == b'server_no_context_takeover':
+                            self.serverNoContextTakeover = True
+                        elif name == b'client_max_window_bits' and value:
+                            self.clientWindowBits = int(value)
+                        elif name == b'server_max_window_bits' and value:
+                            self.serverWindowBits = int(value)
+                    self.deflateActivated = True
+                    break
+        except Exception as e:
+            self.parent.error( 'unable to check extensions: %s' % e )
+            self.resetExtensions()
+        if self.debug:
+            self.parent.trace( "ws deflate activated: %s" % self.deflateActivated )
+        return self.deflateActivated
+
+    def deflate(self, data):
+        """
+        Compress the payload of a message, rfc7692
+
+        @param data: data to compress
+        @type data: bytes
+        """
+        if self.compressor is None or self.clientNoContextTakeover:
+            self.compressor = zlib.compressobj(self.deflateLevel, zlib.DEFLATED, -self.clientWindowBits)
+        compressed = self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        if compressed.endswith(WEBSOCKET_DEFLATE_TAIL):
+            compressed = compressed[:-len(WEBSOCKET_DEFLATE_TAIL)]
+        return compressed
+
+    def inflate(self, data):
+        """
+        Decompress the payload of a message, rfc7692
+
+        @param data: data to decompress
+        @type data: bytes
+        """
+        if self.decompressor is None or self.serverNoContextTakeover:
+            self.decompressor = zlib.decompressobj(-self.serverWindowBits)
+        return self.decompressor.decompress(data + WEBSOCKET_DEFLATE_TAIL)
+
+    def unmask(self, key, data):
+        """
+        Unmask the payload of a frame
+
+        @param key: masking key of 4 bytes
+        @type key: bytes
+
+        @param data: payload masked
+        @type data: bytes-like
+        """
+        length = len(data)
+        keys = (bytes(key) * (length // 4 + 1))[:length]
+        return (int.from_bytes(data, 'big') ^ int.from_bytes(keys, 'big')).to_bytes(length, 'big')
     
     def getNewPingId(self):
         """
@@ -232,76 +339,83 @@ class WebSocketCodec(object):
         @param buffer: buffer
         @type buffer: string
         """
-        payload = ''
+        payload, opcode, fin, rsv1, consumed, needMore = self.decodeWsFrame(buffer=buffer)
+        if needMore:
+            return (b'', opcode, buffer, needMore)
+        return (bytes(payload), opcode, buffer[consumed:], needMore)
+
+    def decodeWsFrame(self, buffer):
+        """
+        Decode one ws frame at the beginning of the buffer
+        The payload returned is a slice of the buffer, no copy with a memoryview
+        Fragments are returned one by one, the reassembly is done by the caller
+
+        @param buffer: buffer
+        @type buffer: bytes-like
+
+        @return: payload, opcode, fin, rsv1 (compressed), number of bytes consumed, need more data
+        @rtype: tuple
+        """
+        payload = b''
         opcode = None
-        left = ''
-        needMore=False
+        fin = 1
+        rsv1 = 0
+        consumed = 0
+        needMore = True
         try:
-            try:
-                hdrs_len = 2
-                # B = 1 octet
-                # H = 2 octets
-                # I = 4 octets
-                fixed_hdr= struct.unpack('!2B', buffer[:hdrs_len])
-                remaining = buffer[hdrs_len:]
-            except struct.error as e:
-                left = buffer # need more data
-                needMore = True
-            else:
+            hdrs_len = 2
+            if len(buffer) < hdrs_len:
+                return (payload, opcode, fin, rsv1, consumed, needMore)
+            # B = 1 octet
+            # H = 2 octets
+            # Q = 8 octets
+            fixed_hdr = struct.unpack_from('!2B', buffer, 0)
 
-                fin = fixed_hdr[0] >> 7 & 1
-                rsv1 = fixed_hdr[0] >> 6 & 1
-                rsv2 = fixed_hdr[0] >> 5 & 1
-                rsv3 = fixed_hdr[0] >> 4 & 1    
-                opcode = fixed_hdr[0] & 0xf
-                
-                has_mask = fixed_hdr[1] >> 7 & 1
-                length = fixed_hdr[1] & 0x7f
+            fin = fixed_hdr[0] >> 7 & 1
+            rsv1 = fixed_hdr[0] >> 6 & 1
+            rsv2 = fixed_hdr[0] >> 5 & 1
+            rsv3 = fixed_hdr[0] >> 4 & 1    
+            opcode = fixed_hdr[0] & 0xf
+            
+            has_mask = fixed_hdr[1] >> 7 & 1
+            length = fixed_hdr[1] & 0x7f
+            if self.debug:
+                self.parent.trace( "ws header: %s, %s, %s, %s, %s, %s, %s" % (fin, rsv1, rsv2, rsv3, opcode, has_mask, length) )
+            
+            if length == 126:
+                if len(buffer) < hdrs_len+2:
+                    return (b'', opcode, fin, rsv1, consumed, needMore)
+                length = struct.unpack_from('!H', buffer, hdrs_len)[0]
+                hdrs_len += 2
+            elif length == 127:
+                if len(buffer) < hdrs_len+8:
+                    return (b'', opcode, fin, rsv1, consumed, needMore)
+                length = struct.unpack_from('!Q', buffer, hdrs_len)[0]
+                hdrs_len += 8
+            if self.debug:
+                self.parent.trace( "ws payload length: %s" % length)
+
+            mask_key = None
+            if has_mask:
+                if len(buffer) < hdrs_len+4:
+                    return (b'', opcode, fin, rsv1, consumed, needMore)
+                mask_key = buffer[hdrs_len:hdrs_len+4]
+                hdrs_len += 4
+
+            if len(buffer) < hdrs_len+length:
                 if self.debug:
-                    self.parent.trace( "ws header: %s, %s, %s, %s, %s, %s, %s" % (fin, rsv1, rsv2, rsv3, opcode, has_mask, length) )
-                
-                if length == 126:
-                    try:
-                        hdrs_extended_len = 2
-                        size = buffer[hdrs_len:hdrs_len+hdrs_extended_len]
-                        ext_lenght_hdr= struct.unpack('!H', buffer[hdrs_len:hdrs_len+hdrs_extended_len])
-                    except struct.error as e:
-                        left = buffer # need more data
-                        needMore = True
-                    else:
-                        length_ext = ext_lenght_hdr[0] 
-                        if self.debug:
-                            self.parent.trace( "ws lenght extended: %s" % length_ext)
-                        if fin:
-                            if len(buffer) < hdrs_len+hdrs_extended_len+length_ext:
-                                if self.debug:
-                                    self.parent.trace( "data extended, need more data (%s/%s)" % (len(buffer), length_ext) )
-                                left = buffer # need more data
-                                needMore = True
-                            else:
-                                payload = buffer[hdrs_len+hdrs_extended_len:hdrs_len+hdrs_extended_len+length_ext]
-                                left = buffer[hdrs_len+hdrs_extended_len+length_ext:]
-                        else:
-                            left = buffer # need more data
-                            needMore = True
-                else:   
-                    if fin:
-                        if len(buffer) < hdrs_len+length:
-                            if self.debug:
-                                self.parent.trace( "data, need more data (%s/%s)" % (len(buffer), length) )
-                            left = buffer # need mode data
-                            needMore = True
-                        else:
-                            payload = buffer[hdrs_len:hdrs_len+length]
-                            left = buffer[hdrs_len+length:]
-                    else:
-                        left = buffer # need mode data
-                        needMore = True
+                    self.parent.trace( "data, need more data (%s/%s)" % (len(buffer), hdrs_len+length) )
+            else:
+                payload = buffer[hdrs_len:hdrs_len+length]
+                if mask_key is not None:
+                    payload = self.unmask(key=mask_key, data=payload)
+                consumed = hdrs_len+length
+                needMore = False
         except Exception as e:
             self.parent.error( 'unable to decode ws data: %s' % e )
-        return (payload, opcode, left, needMore)
+        return (payload, opcode, fin, rsv1, consumed, needMore)
         
-    def encodeWsData(self, data, opcode):
+    def encodeWsData(self, data, opcode, fin=1, rsv1=0):
         """
         Encode ws message
 
@@ -310,30 +424,28 @@ class WebSocketCodec(object):
 
         @param opcode: opcode
         @type opcode: integer
+
+        @param fin: final fragment
+        @type fin: integer
+
+        @param rsv1: compressed payload
+        @type rsv1: integer
         """
         ws_packet = []
         try:
-            fin = 1
-            rsv1 = 0
             rsv2 = 0
             rsv3 = 0
-            opcode = opcode
             mask = 0
             length = len(data)
             
             byte1 = opcode | rsv3 << 4 | rsv2 << 5 | rsv1 << 6| fin << 7
-            byte2 = length | mask << 7
-
-            if len(data) <= 125:
-                fmt = '!2B'
-                fixed_hdr = struct.pack(fmt, byte1, byte2 )
-            elif len(data) > 125 and len(data) <=65535:
-                fmt = '!2BH'
-                byte2 = 126 | mask << 7
-                bytesnext = len(data)
-                fixed_hdr = struct.pack(fmt, byte1, byte2, bytesnext)
+
+            if length <= 125:
+                fixed_hdr = struct.pack('!2B', byte1, length | mask << 7 )
+            elif length <= 65535:
+                fixed_hdr = struct.pack('!2BH', byte1, 126 | mask << 7, length)
             else:
-                pass
+                fixed_hdr = struct.pack('!2BQ', byte1, 127 | mask << 7, length)
 
             ws_packet.append( fixed_hdr )
             ws_packet.append( data )
@@ -341,6 +453,20 @@ class WebSocketCodec(object):
             self.parent.error( 'unable to encode ws data: %s' % e )
         return b''.join(ws_packet)
     
+    def encodeMessage(self, data, opcode=WEBSOCKET_OPCODE_TEXT):
+        """
+        Encode a message in one frame, compressed if the extension is activated
+
+        @param data: data to encode
+        @type data: bytes
+
+        @param opcode: opcode
+        @type opcode: integer
+        """
+        if self.deflateActivated:
+            return self.encodeWsData(data=self.deflate(data), opcode=opcode, rsv1=1)
+        return self.encodeWsData(data=data, opcode=opcode)
+
     def encodeBinary(self, data):
         """
         Encode a binary message
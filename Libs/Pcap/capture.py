@@ -0,0 +1,400 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------------------------
+# Copyright (c) 2010-2020 Denis Machard
+# This file is part of the extensive automation project
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301 USA
+# -------------------------------------------------------------------
+
+"""
+Read pcap and pcapng files mapped in memory
+The packets are memoryview on the file, nothing is copied,
+same tuples as the pcap and pcapng readers: (link type, microseconds, packet)
+"""
+
+import mmap
+import array
+import struct
+
+try:
+    import numpy
+except ImportError: # optional, the index is built with arrays
+    numpy = None
+
+from Libs.Pcap.parse import FileFormat
+
+PCAP_MAGIC = 0xA1B2C3D4
+PCAP_MAGIC_NANO = 0xA1B23C4D
+PCAPNG_BYTEORDER_MAGIC = 0x1A2B3C4D
+
+PCAP_HEADER_LEN = 24
+PCAP_RECORD_LEN = 16
+
+BLOCK_SECTION_HEADER = 0x0A0D0D0A
+BLOCK_INTERFACE_DESCRIPTION = 0x00000001
+BLOCK_PACKET = 0x00000002
+BLOCK_SIMPLE_PACKET = 0x00000003
+BLOCK_ENHANCED_PACKET = 0x00000006
+
+# packets by chunk when the record headers are gathered with numpy
+INDEX_CHUNK = 1 << 20
+
+OPTION_END = 0
+OPTION_TSRESOL = 9
+OPTION_TSOFFSET = 14
+
+class Structs(object):
+    """
+    Structures of the headers, compiled once by byte order
+    """
+    def __init__(self, byteorder):
+        """
+        Constructor
+
+        @param byteorder: < or >
+        @type byteorder: string
+        """
+        # pcap: global header and record header
+        self.pcap_header = struct.Struct(byteorder + 'IHHiIII')
+        self.pcap_record = struct.Struct(byteorder + 'IIII')
+        self.pcap_caplen = struct.Struct(byteorder + '8xI')
+        # pcapng: type and length of the blocks
+        self.block = struct.Struct(byteorder + 'II')
+        self.uint32 = struct.Struct(byteorder + 'I')
+        self.uint64 = struct.Struct(byteorder + 'Q')
+        # interface, link type and snap len
+        self.interface = struct.Struct(byteorder + 'H2xI')
+        self.option = struct.Struct(byteorder + 'HH')
+        # interface, timestamp high and low, captured and original length
+        self.enhanced_packet = struct.Struct(byteorder + 'IIIII')
+        self.packet = struct.Struct(byteorder + 'H2xIIII')
+
+STRUCTS = { '<': Structs('<'), '>': Structs('>') }
+
+class Interface(object):
+    """
+    Interface of a pcapng section
+    """
+    def __init__(self, link_type):
+        """
+        Constructor
+        """
+        self.link_type = link_type
+        # timestamp to microseconds
+        self.tsresol = 1
+        self.tsoffset = 0
+
+class PacketIndex(object):
+    """
+    Offsets, lengths, timestamps and link types of all the packets,
+    numpy arrays if available, arrays otherwise
+    """
+    def __init__(self, offsets, lengths, timestamps, link_types):
+        """
+        Constructor
+        """
+        if numpy is not None:
+            offsets = numpy.frombuffer(offsets, dtype=numpy.uint64)
+            lengths = numpy.frombuffer(lengths, dtype=numpy.uint32)
+            timestamps = numpy.frombuffer(timestamps, dtype=numpy.float64)
+            link_types = numpy.frombuffer(link_types, dtype=numpy.uint16)
+        self.offsets = offsets
+        self.lengths = lengths
+        self.timestamps = timestamps
+        self.link_types = link_types
+
+    def __len__(self):
+        """
+        Number of packets
+        """
+        return len(self.offsets)
+
+class CaptureFile(object):
+    """
+    Pcap or pcapng file mapped in memory
+    """
+    def __init__(self, filename):
+        """
+        Constructor, the format is detected with the magic number
+
+        @param filename: path of the capture
+        @type filename: string
+        """
+        self.file_format = FileFormat.UNKNOWN
+        self.link_type = None
+        self.mm = None
+        self.view = None
+        self.index = None
+        self.size = 0
+        # offset of the last packet read, for the progress
+        self.position = 0
+
+        with open(filename, 'rb') as infile:
+            try:
+                self.mm = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # empty file
+                return
+        self.view = memoryview(self.mm)
+        self.size = len(self.mm)
+
+        if self.size < 4:
+            return
+        magic, = STRUCTS['<'].uint32.unpack_from(self.view, 0)
+        if magic == BLOCK_SECTION_HEADER:
+            self.file_format = FileFormat.PCAP_NG
+        else:
+            for byteorder in ['<', '>']:
+                magic, = STRUCTS[byteorder].uint32.unpack_from(self.view, 0)
+                if magic in [PCAP_MAGIC, PCAP_MAGIC_NANO] and self.size >= PCAP_HEADER_LEN:
+                    self.file_format = FileFormat.PCAP
+                    self.structs = STRUCTS[byteorder]
+                    self.nano = magic == PCAP_MAGIC_NANO
+                    self.link_type = self.structs.pcap_header.unpack_from(self.view, 0)[-1]
+                    break
+
+    def read_packet(self):
+        """
+        Read all the packets
+
+        @return: iterator on (link type, microseconds, packet)
+        @rtype: iterator
+        """
+        if self.file_format == FileFormat.PCAP:
+            return self.read_pcap()
+        if self.file_format == FileFormat.PCAP_NG:
+            return self.read_pcapng()
+        return iter([])
+
+    def read_pcap(self):
+        """
+        Walk the records of the pcap file
+        """
+        view = self.view
+        unpack_from = self.structs.pcap_record.unpack_from
+        link_type = self.link_type
+        nano = self.nano
+        end = self.size
+        offset = PCAP_HEADER_LEN
+        while offset + PCAP_RECORD_LEN <= end:
+            seconds, fraction, caplen, origlen = unpack_from(view, offset)
+            offset += PCAP_RECORD_LEN
+            if offset + caplen > end:
+                # truncated capture
+                return
+            if nano:
+                fraction //= 1000
+            self.position = offset
+            yield link_type, seconds * 1000000 + fraction, view[offset:offset + caplen]
+            offset += caplen
+
+    def read_pcapng(self):
+        """
+        Read the packets of the pcapng file
+        """
+        view = self.view
+        for link_type, micro_second, offset, caplen in self.walk_pcapng():
+            self.position = offset
+            yield link_type, micro_second, view[offset:offset + caplen]
+
+    def walk_pcapng(self):
+        """
+        Walk the blocks of the pcapng file, only the packets are returned
+
+        @return: iterator on (link type, microseconds, offset, length)
+        @rtype: iterator
+        """
+        view = self.view
+        end = self.size
+        offset = 0
+        structs = STRUCTS['<']
+        interfaces = []
+        while offset + 12 <= end:
+            block_type, block_len = structs.block.unpack_from(view, offset)
+            if block_type == BLOCK_SECTION_HEADER:
+                # the byte order can change with the section
+                magic, = STRUCTS['<'].uint32.unpack_from(view, offset + 8)
+                structs = STRUCTS['<'] if magic == PCAPNG_BYTEORDER_MAGIC else STRUCTS['>']
+                block_type, block_len = structs.block.unpack_from(view, offset)
+                interfaces = []
+            if block_len < 12 or offset + block_len > end:
+                # corrupted or truncated capture
+                return
+
+            if block_type == BLOCK_ENHANCED_PACKET:
+                iface, high, low, caplen, origlen = structs.enhanced_packet.unpack_from(view, offset + 8)
+                interface = interfaces[iface]
+                yield ( interface.link_type, ((high << 32) + low) * interface.tsresol + interface.tsoffset,
+                        offset + 28, caplen )
+            elif block_type == BLOCK_SIMPLE_PACKET:
+                origlen, = structs.uint32.unpack_from(view, offset + 8)
+                yield interfaces[0].link_type, 0, offset + 12, min(origlen, block_len - 16)
+            elif block_type == BLOCK_PACKET:
+                iface, high, low, caplen, origlen = structs.packet.unpack_from(view, offset + 8)
+                interface = interfaces[iface]
+                yield ( interface.link_type, ((high << 32) + low) * interface.tsresol + interface.tsoffset,
+                        offset + 28, caplen )
+            elif block_type == BLOCK_INTERFACE_DESCRIPTION:
+                interfaces.append( self.parse_interface(structs, offset, block_len) )
+                self.link_type = interfaces[0].link_type
+            offset += block_len
+
+    def parse_interface(self, structs, offset, block_len):
+        """
+        Read the link type and the resolution of the timestamps of the interface
+
+        @return: interface
+        @rtype: interface
+        """
+        view = self.view
+        link_type, snap_len = structs.interface.unpack_from(view, offset + 8)
+        interface = Interface(link_type)
+        pos = offset + 16
+        end = offset + block_len - 4
+        while pos + 4 <= end:
+            code, length = structs.option.unpack_from(view, pos)
+            if code == OPTION_END:
+                break
+            if code == OPTION_TSRESOL and length >= 1:
+                tsresol = view[pos + 4]
+                if not isinstance(tsresol, int): # python2 support
+                    tsresol = ord(tsresol)
+                # negative power of 10 or 2, to microseconds
+                if tsresol & 0x80:
+                    interface.tsresol = (2 ** -(tsresol & 0x7f)) * (10 ** 6)
+                else:
+                    interface.tsresol = (10 ** -(tsresol & 0x7f)) * (10 ** 6)
+            elif code == OPTION_TSOFFSET and length >= 8:
+                interface.tsoffset = structs.uint64.unpack_from(view, pos + 4)[0] * (10 ** 6)
+            pos += 4 + length + (-length % 4)
+        return interface
+
+    def build_index(self):
+        """
+        Build the index of the packets in one pass on the headers,
+        the timestamps of the pcap records are extracted with numpy if available
+
+        @return: index of the packets
+        @rtype: packetindex
+        """
+        if self.index is not None:
+            return self.index
+
+        offsets = array.array('Q')
+        lengths = array.array('I')
+        timestamps = array.array('d')
+        link_types = array.array('H')
+        if self.file_format == FileFormat.PCAP and numpy is not None:
+            # only the length is read in the loop, it gives the next header, the timestamps after
+            unpack_from = self.structs.pcap_caplen.unpack_from
+            view = self.view
+            end = self.size
+            offset = PCAP_HEADER_LEN
+            while offset + PCAP_RECORD_LEN <= end:
+                caplen, = unpack_from(view, offset)
+                if offset + PCAP_RECORD_LEN + caplen > end:
+                    break
+                offsets.append(offset + PCAP_RECORD_LEN)
+                lengths.append(caplen)
+                offset += PCAP_RECORD_LEN + caplen
+            self.index = PacketIndex(offsets, lengths, timestamps, link_types)
+            self.index_pcap_headers()
+            return self.index
+
+        if self.file_format == FileFormat.PCAP:
+            unpack_from = self.structs.pcap_record.unpack_from
+            view = self.view
+            end = self.size
+            offset = PCAP_HEADER_LEN
+            while offset + PCAP_RECORD_LEN <= end:
+                seconds, fraction, caplen, origlen = unpack_from(view, offset)
+                offset += PCAP_RECORD_LEN
+                if offset + caplen > end:
+                    break
+                if self.nano:
+                    fraction //= 1000
+                offsets.append(offset)
+                lengths.append(caplen)
+                timestamps.append(seconds * 1000000 + fraction)
+                offset += caplen
+            link_types.extend( [ self.link_type ] * len(lengths) )
+        elif self.file_format == FileFormat.PCAP_NG:
+            for link_type, micro_second, offset, caplen in self.walk_pcapng():
+                offsets.append( offset )
+                lengths.append( caplen )
+                timestamps.append( micro_second )
+                link_types.append( link_type )
+        self.index = PacketIndex(offsets, lengths, timestamps, link_types)
+        return self.index
+
+    def index_pcap_headers(self):
+        """
+        Extract the timestamps of the record headers with numpy, from the offsets of the packets,
+        one field of 4 bytes at a time and by chunks of packets to bound the temporary arrays
+        """
+        index = self.index
+        if not len(index):
+            return
+        data = numpy.frombuffer(self.mm, dtype=numpy.uint8)
+        uint32 = numpy.dtype(('<' if self.structs is STRUCTS['<'] else '>') + 'u4')
+        field = numpy.arange(4)
+        timestamps = numpy.empty(len(index), dtype=numpy.float64)
+        for start in range(0, len(index), INDEX_CHUNK):
+            # 16 bytes of header before each packet, seconds then fraction
+            positions = index.offsets[start:start + INDEX_CHUNK].astype(numpy.int64) - PCAP_RECORD_LEN
+            seconds = data[positions[:, None] + field].view(uint32).ravel()
+            fraction = data[positions[:, None] + (4 + field)].view(uint32).ravel().astype(numpy.float64)
+            if self.nano:
+                fraction = numpy.floor(fraction / 1000)
+            timestamps[start:start + len(positions)] = seconds.astype(numpy.float64) * 1000000 + fraction
+        index.timestamps = timestamps
+        index.link_types = numpy.full(len(index), self.link_type, dtype=numpy.uint16)
+        del data
+
+    def get_packet(self, i):
+        """
+        Return the packet of the index
+
+        @param i: position of the packet
+        @type i: integer
+
+        @return: link type, microseconds, packet
+        @rtype: tuple
+        """
+        index = self.build_index()
+        offset = int(index.offsets[i])
+        return ( int(index.link_types[i]), index.timestamps[i],
+                 self.view[offset:offset + int(index.lengths[i])] )
+
+    def close(self):
+        """
+        Unmap the file, delayed until the packets returned are released
+        """
+        self.index = None
+        if self.view is not None:
+            try:
+                self.view.release()
+            except BufferError:
+                pass
+            self.view = None
+        if self.mm is not None:
+            try:
+                self.mm.close()
+            except BufferError:
+                pass
+            self.mm = None
@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------------------------
+# Copyright (c) 2010-2020 Denis Machard
+# This file is part of the extensive automation project
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301 USA
+# -------------------------------------------------------------------
+
+"""
+Packet filter, compiled once from an expression like the bpf syntax:
+    tcp and host 10.0.0.1 and port 8080
+    udp and (src port 53 or dst host 192.168.1.1) and not port 67
+The packets are checked on the raw headers, before any decoding
+"""
+
+import socket
+import struct
+
+from Libs.Pcap.parse import LinkLayerType, NetworkProtocol, TransportProtocol
+
+IP_MIN_LEN = 20
+PORTS_LEN = 4
+
+# values of the headers, read once per packet
+ETHERNET = LinkLayerType.ETHERNET
+LINUX_SLL = LinkLayerType.LINUX_SLL
+P802_1Q = NetworkProtocol.P802_1Q
+PPPOE_SESSION = NetworkProtocol.PPPOE_SESSION
+IP = NetworkProtocol.IP
+PPP_IP = NetworkProtocol.PPP_IP
+TCP = TransportProtocol.TCP
+UDP = TransportProtocol.UDP
+
+# network protocol and first byte of the ip header with the version
+NETWORK = struct.Struct('!HB')
+# source and dest addresses, source and dest ports
+ADDRESSES = struct.Struct('!II')
+PORTS = struct.Struct('!HH')
+
+PROTOCOLS = { 'tcp': TCP, 'udp': UDP }
+DIRECTIONS = [ 'src', 'dst' ]
+
+class FilterError(Exception):
+    """
+    Invalid filter expression
+    """
+    pass
+
+def ip_offset(link_type, data):
+    """
+    Returns the offset of the ipv4 header in the packet, -1 if not ipv4
+
+    @param link_type: link type of the packet
+    @type link_type: integer
+
+    @param data: packet
+    @type data: memoryview/bytes
+
+    @return: offset
+    @rtype: integer
+    """
+    unpack_from = NETWORK.unpack_from
+    try:
+        if link_type == ETHERNET:
+            offset = 14
+            network_protocol, version = unpack_from(data, 12)
+            if network_protocol == P802_1Q:
+                offset += 4
+                network_protocol, version = unpack_from(data, 16)
+            if network_protocol == PPPOE_SESSION:
+                # ppp protocol at the end of the pppoe header
+                offset += 8
+                network_protocol, version = unpack_from(data, offset - 2)
+        elif link_type == LINUX_SLL:
+            offset = 16
+            network_protocol, version = unpack_from(data, 14)
+        else:
+            return -1
+    except struct.error:
+        # truncated packet
+        return -1
+    if network_protocol != IP and network_protocol != PPP_IP:
+        return -1
+    if version >> 4 != 4 or len(data) < offset + IP_MIN_LEN:
+        return -1
+    return offset
+
+def match_protocol(protocol):
+    """
+    Transport protocol of the ip header
+    """
+    def match(data, offset):
+        return data[offset+9] == protocol
+    return match
+
+def match_ip(data, offset):
+    """
+    All ipv4 packets
+    """
+    return True
+
+def match_host(address, direction):
+    """
+    Source and/or dest address of the ip header
+    """
+    address, = struct.unpack('!I', address)
+    unpack_from = ADDRESSES.unpack_from
+    def match_src(data, offset):
+        return unpack_from(data, offset+12)[0] == address
+    def match_dst(data, offset):
+        return unpack_from(data, offset+12)[1] == address
+    def match_any(data, offset):
+        return address in unpack_from(data, offset+12)
+    return { 'src': match_src, 'dst': match_dst, None: match_any }[direction]
+
+def match_port(port, direction):
+    """
+    Source and/or dest port of the tcp or udp header, only in the first fragment
+    """
+    unpack_from = PORTS.unpack_from
+    index = { 'src': 0, 'dst': 1, None: None }[direction]
+    def match(data, offset):
+        protocol = data[offset+9]
+        if protocol != TCP and protocol != UDP:
+            return False
+        if (data[offset+6] & 0x1F) or data[offset+7]:
+            # not the first fragment
+            return False
+        transport = offset + (data[offset] & 0xF) * 4
+        if len(data) < transport + PORTS_LEN:
+            return False
+        ports = unpack_from(data, transport)
+        if index is None:
+            return port in ports
+        return ports[index] == port
+    return match
+
+def match_and(matches):
+    """
+    All the expressions
+    """
+    def match(data, offset):
+        for m in matches:
+            if not m(data, offset):
+                return False
+        return True
+    return match
+
+def match_or(matches):
+    """
+    One of the expressions
+    """
+    def match(data, offset):
+        for m in matches:
+            if m(data, offset):
+                return True
+        return False
+    return match
+
+def match_not(m):
+    """
+    Negation of the expression
+    """
+    def match(data, offset):
+        return not m(data, offset)
+    return match
+
+def tokenize(expression):
+    """
+    Split the expression in tokens
+    """
+    for op, word in [ ('(', ' ( '), (')', ' ) '), ('&&', ' and '), ('||', ' or '), ('!', ' not ') ]:
+        expression = expression.replace(op, word)
+    return expression.lower().split()
+
+class Parser(object):
+    """
+    Parser of the expression, the primitives are compiled in closures
+    """
+    def __init__(self, expression):
+        """
+        Constructor
+
+        @param expression: filter expression
+        @type expression: string
+        """
+        self.expression = expression
+        self.tokens = tokenize(expression)
+        self.pos = 0
+
+    def peek(self):
+        """
+        Returns the next token or None
+        """
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return None
+
+    def next(self):
+        """
+        Returns the next token
+        """
+        token = self.peek()
+        if token is None:
+            raise FilterError("unexpected end of the filter: %s" % self.expression)
+        self.pos += 1
+        return token
+
+    def parse(self):
+        """
+        Parse the expression
+
+        @return: function called with the packet and the offset of the ip header
+        @rtype: function
+        """
+        m = self.parse_or()
+        if self.peek() is not None:
+            raise FilterError("unexpected '%s' in the filter: %s" % (self.peek(), self.expression))
+        return m
+
+    def parse_or(self):
+        """
+        expression or expression
+        """
+        matches = [ self.parse_and() ]
+        while self.peek() == 'or':
+            self.next()
+            matches.append( self.parse_and() )
+        if len(matches) == 1:
+            return matches[0]
+        return match_or(matches)
+
+    def parse_and(self):
+        """
+        expression and expression
+        """
+        matches = [ self.parse_not() ]
+        while self.peek() == 'and':
+            self.next()
+            matches.append( self.parse_not() )
+        if len(matches) == 1:
+            return matches[0]
+        return match_and(matches)
+
+    def parse_not(self):
+        """
+        not expression, (expression) or primitive
+        """
+        token = self.peek()
+        if token == 'not':
+            self.next()
+            return match_not( self.parse_not() )
+        if token == '(':
+            self.next()
+            m = self.parse_or()
+            if self.next() != ')':
+                raise FilterError("missing ')' in the filter: %s" % self.expression)
+            return m
+        return self.parse_primitive()
+
+    def parse_primitive(self):
+        """
+        [tcp|udp|ip] [src|dst] host address, [tcp|udp] [src|dst] port number
+        """
+        token = self.next()
+        protocol = None
+        if token in PROTOCOLS or token == 'ip':
+            protocol = token
+            if self.peek() not in DIRECTIONS + [ 'host', 'port' ]:
+                if protocol == 'ip':
+                    return match_ip
+                return match_protocol(PROTOCOLS[protocol])
+            token = self.next()
+
+        direction = None
+        if token in DIRECTIONS:
+            direction = token
+            token = self.next()
+
+        if token == 'host':
+            m = match_host(self.parse_address(self.next()), direction)
+        elif token == 'port':
+            if protocol == 'ip':
+                raise FilterError("port without tcp or udp in the filter: %s" % self.expression)
+            m = match_port(self.parse_port(self.next()), direction)
+        else:
+            raise FilterError("unexpected '%s' in the filter: %s" % (token, self.expression))
+
+        if protocol in PROTOCOLS:
+            return match_and( [ match_protocol(PROTOCOLS[protocol]), m ] )
+        return m
+
+    def parse_address(self, token):
+        """
+        Ipv4 address
+        """
+        try:
+            if len(token.split('.')) != 4:
+                raise ValueError()
+            return socket.inet_aton(token)
+        except (socket.error, ValueError, UnicodeError):
+            raise FilterError("invalid address '%s' in the filter: %s" % (token, self.expression))
+
+    def parse_port(self, token):
+        """
+        Port number
+        """
+        try:
+            port = int(token)
+        except ValueError:
+            port = -1
+        if not 0 <= port <= 65535:
+            raise FilterError("invalid port '%s' in the filter: %s" % (token, self.expression))
+        return port
+
+def compile_filter(expression):
+    """
+    Compile the filter expression
+
+    @param expression: filter expression
+    @type expression: string
+
+    @return: function called with the link type and the packet, returns True if the packet matches
+    @rtype: function
+    """
+    m = Parser(expression).parse()
+    def packet_filter(link_type, data):
+        offset = ip_offset(link_type, data)
+        if offset < 0:
+            return False
+        return m(data, offset)
+    return packet_filter
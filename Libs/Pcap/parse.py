@@ -157,9 +157,10 @@ def decodeLinuxSSL(packet):
         = struct.unpack(b'!HHHQH', linux_cooked)
     return n_protocol, packet[sll_header_len:]
     
-def decodePacket(packet, getTcp=False, getUdp=False):
+def decodeNetwork(packet):
     """
-    Decode packet
+    Decode the link and ip layers
+    return (transport_protocol, source, dest, ip_body) or None
     """
     link_type, micro_second, link_packet = packet
 
@@ -173,9 +174,17 @@ def decodePacket(packet, getTcp=False, getUdp=False):
 
     # decode ip layer
     if network_protocol == NetworkProtocol.IP or network_protocol == NetworkProtocol.PPP_IP:
-        transport_protocol, source, dest, ip_body = decodeIpV4(network_protocol, link_layer_body)
-    else:
+        return decodeIpV4(network_protocol, link_layer_body)
+    return None
+
+def decodePacket(packet, getTcp=False, getUdp=False):
+    """
+    Decode packet
+    """
+    network = decodeNetwork(packet)
+    if network is None:
         return None
+    transport_protocol, source, dest, ip_body = network
 
     # decode transport
     if getTcp:
@@ -188,4 +197,18 @@ def decodePacket(packet, getTcp=False, getUdp=False):
             source_port, dest_port, lgth, udp_sum, data = decodeUdp(ip_body)
             return (source, dest, source_port, dest_port, data)
         
-    return None
\ No newline at end of file
+    return None
+
+def decodeSegment(packet):
+    """
+    Decode tcp packet, with the flags and the sequence numbers for the reassembly
+    return (source, dest, source_port, dest_port, flags, seq, ack_seq, data) or None
+    """
+    network = decodeNetwork(packet)
+    if network is None:
+        return None
+    transport_protocol, source, dest, ip_body = network
+    if transport_protocol != TransportProtocol.TCP:
+        return None
+    source_port, dest_port, flags, seq, ack_seq, data = decodeTcp(ip_body)
+    return (source, dest, source_port, dest_port, flags, seq, ack_seq, data)
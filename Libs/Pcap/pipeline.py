@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------------------------
+# Copyright (c) 2010-2020 Denis Machard
+# This file is part of the extensive automation project
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301 USA
+# -------------------------------------------------------------------
+
+"""
+Pipeline of generators to extract the data of a capture:
+read and reject the packets with the compiled filter, decode, filter,
+then reassembly of the tcp streams and decoding of the protocol by the recorders
+Without qt, the pipeline is run in a thread and the results delivered by batch
+"""
+
+import threading
+
+import Libs.Pcap.parse as PcapParse
+
+# packets read between two progress notifications
+BATCH_PACKETS = 10000
+# results delivered in one time
+BATCH_RESULTS = 500
+
+class PacketReader(object):
+    """
+    Read the packets of the capture, the progress is notified by batch
+    """
+    def __init__(self, capture, progress=None, batch_size=BATCH_PACKETS, packet_filter=None):
+        """
+        Constructor
+
+        @param capture: capture mapped in memory
+        @type capture: capturefile
+
+        @param progress: called with the bytes read and the size of the capture,
+                         the reading is stopped if it returns False
+        @type progress: function/none
+
+        @param batch_size: number of packets between two notifications
+        @type batch_size: integer
+
+        @param packet_filter: compiled filter, called with the link type and the packet,
+                              the packets rejected are not returned
+        @type packet_filter: function/none
+        """
+        self.capture = capture
+        self.progress = progress
+        self.batch_size = batch_size
+        self.packet_filter = packet_filter
+        self.count = 0
+
+    def notify(self, done):
+        """
+        Notify the progress, returns False to stop
+        """
+        if self.progress is None:
+            return True
+        return self.progress(done, self.capture.size) is not False
+
+    def __iter__(self):
+        """
+        Iterate on the packets
+        """
+        capture = self.capture
+        batch_size = self.batch_size
+        packet_filter = self.packet_filter
+        if not self.notify(0):
+            return
+        for packet in capture.read_packet():
+            if packet_filter is None or packet_filter(packet[0], packet[2]):
+                yield packet
+            self.count += 1
+            if not self.count % batch_size:
+                if not self.notify(capture.position):
+                    return
+        self.notify(capture.size)
+
+def decode_packets(packets, tcp=False, udp=False):
+    """
+    Decode the link, ip and transport layers
+
+    @param packets: iterator on (link type, microseconds, packet)
+    @type packets: iterator
+
+    @return: iterator on (source, dest, source port, dest port, data)
+    @rtype: iterator
+    """
+    decode = PcapParse.decodePacket
+    for packet in packets:
+        try:
+            decoded = decode(packet, getTcp=tcp, getUdp=udp)
+        except Exception:
+            # truncated or malformed packet
+            continue
+        if decoded is not None:
+            yield decoded
+
+def filter_packets(decoded, ip, port):
+    """
+    Keep the packets with data sent to or received from the address,
+    the data is copied from the capture
+
+    @param decoded: iterator on (source, dest, source port, dest port, data)
+    @type decoded: iterator
+
+    @param ip: ip address expected
+    @type ip: string
+
+    @param port: port expected
+    @type port: integer
+
+    @return: iterator on ('sent' or 'recv', (source, dest, source port, dest port, data))
+    @rtype: iterator
+    """
+    for source, dest, source_port, dest_port, data in decoded:
+        if not len(data):
+            continue
+        sent = dest_port == port and dest == ip
+        recv = source_port == port and source == ip
+        if not sent and not recv:
+            continue
+        packet = (source, dest, source_port, dest_port, bytes(data))
+        if sent:
+            yield 'sent', packet
+        if recv:
+            yield 'recv', packet
+
+def decode_segments(packets):
+    """
+    Decode the tcp segments, with the flags and the sequence numbers
+
+    @param packets: iterator on (link type, microseconds, packet)
+    @type packets: iterator
+
+    @return: iterator on (source, dest, source port, dest port, flags, seq, ack, data)
+    @rtype: iterator
+    """
+    decode = PcapParse.decodeSegment
+    for packet in packets:
+        try:
+            decoded = decode(packet)
+        except Exception:
+            # truncated or malformed packet
+            continue
+        if decoded is not None:
+            yield decoded
+
+def filter_segments(segments, ip, port):
+    """
+    Keep the segments sent to or received from the address,
+    the segments without data are kept for the state of the connections
+
+    @param segments: iterator on (source, dest, source port, dest port, flags, seq, ack, data)
+    @type segments: iterator
+
+    @param ip: ip address expected
+    @type ip: string
+
+    @param port: port expected
+    @type port: integer
+
+    @return: iterator on ('sent' or 'recv', (source, dest, source port, dest port, flags, seq, ack, data))
+    @rtype: iterator
+    """
+    for segment in segments:
+        source, dest, source_port, dest_port = segment[:4]
+        if dest_port == port and dest == ip:
+            yield 'sent', segment
+        elif source_port == port and source == ip:
+            yield 'recv', segment
+
+class PipelineJob(threading.Thread):
+    """
+    Consume the pipeline in a thread and deliver the results by batch
+    """
+    def __init__(self, pipeline, onResults, onProgress, onFinished, batch_size=BATCH_RESULTS):
+        """
+        Constructor
+
+        @param pipeline: called in the thread with the function of progress,
+                         returns an iterator on the results
+        @type pipeline: function
+
+        @param onResults: called with a list of results
+        @type onResults: function
+
+        @param onProgress: called with the work done and the total
+        @type onProgress: function
+
+        @param onFinished: called at the end with None or the error
+        @type onFinished: function
+
+        @param batch_size: number of results by batch
+        @type batch_size: integer
+        """
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.pipeline = pipeline
+        self.onResults = onResults
+        self.onProgress = onProgress
+        self.onFinished = onFinished
+        self.batch_size = batch_size
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        """
+        Cancel the job, no more results are delivered
+        """
+        self.cancelled.set()
+
+    def progress(self, done, total):
+        """
+        Notify the progress, returns False if the job is cancelled
+        """
+        if self.cancelled.is_set():
+            return False
+        self.onProgress(done, total)
+        return True
+
+    def run(self):
+        """
+        Job loop
+        """
+        error = None
+        batch = []
+        try:
+            for result in self.pipeline(self.progress):
+                if self.cancelled.is_set():
+                    break
+                batch.append( result )
+                if len(batch) >= self.batch_size:
+                    self.onResults( batch )
+                    batch = []
+            if len(batch) and not self.cancelled.is_set():
+                self.onResults( batch )
+        except Exception as e:
+            error = "%s" % e
+        self.onFinished( error )
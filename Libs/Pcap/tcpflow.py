@@ -0,0 +1,592 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------------------------
+# Copyright (c) 2010-2020 Denis Machard
+# This file is part of the extensive automation project
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301 USA
+# -------------------------------------------------------------------
+
+"""
+Reassembly of the tcp streams of a capture
+The segments are ordered with the sequence numbers, the retransmissions are removed
+and the gaps are detected with the acknowledgments of the peer;
+the http messages are cut with the content length or the chunks
+"""
+
+import heapq
+import collections
+
+SEQ_MASK = 0xFFFFFFFF
+SEQ_HALF = 0x80000000
+
+FLAG_FIN = 0x01
+FLAG_SYN = 0x02
+FLAG_RST = 0x04
+FLAG_ACK = 0x10
+
+# data out of order kept by stream before skipping the gap
+MAX_PENDING = 1024*1024
+# connections in the table, the least recently used are closed first
+MAX_FLOWS = 65536
+
+PEERS = { 'sent': 'recv', 'recv': 'sent' }
+
+HTTP_METHODS = [ b'GET', b'POST', b'PUT', b'DELETE', b'HEAD', b'TRACE', b'OPTIONS',
+                 b'PATCH', b'SUBSCRIBE', b'NOTIFY', b'M-SEARCH', b'CONNECT' ]
+
+def seq_diff(seq, ref):
+    """
+    Signed difference between two sequence numbers, modulo 2^32
+    """
+    diff = (seq - ref) & SEQ_MASK
+    if diff >= SEQ_HALF:
+        return diff - SEQ_MASK - 1
+    return diff
+
+class Stream(object):
+    """
+    One direction of a connection, the data is delivered in the order of the sequence numbers
+    """
+    def __init__(self, addresses):
+        """
+        Constructor
+
+        @param addresses: source, dest, source port, dest port
+        @type addresses: tuple
+        """
+        self.addresses = addresses
+        # next sequence number expected, and bytes delivered since the start
+        self.next_seq = None
+        self.offset = 0
+        # segments after a gap: heap of (offset, data)
+        self.pending = []
+        self.pending_size = 0
+        self.closed = False
+        self.gaps = 0
+        self.retransmits = 0
+
+    def add(self, seq, flags, data):
+        """
+        Add a segment
+
+        @param seq: sequence number
+        @type seq: integer
+
+        @param flags: tcp flags
+        @type flags: integer
+
+        @param data: data of the segment
+        @type data: bytes/memoryview
+
+        @return: data delivered in order, None for a gap
+        @rtype: list
+        """
+        chunks = []
+        if flags & FLAG_SYN:
+            if self.next_seq is not None and seq_diff(seq + 1, self.next_seq) != 0:
+                # new connection with the same ports
+                self.reset()
+            seq = (seq + 1) & SEQ_MASK
+            if self.next_seq is None:
+                self.next_seq = seq
+        if self.next_seq is None:
+            # capture started during the connection
+            self.next_seq = seq
+        if len(data):
+            self.insert(seq, data, chunks)
+        if flags & (FLAG_FIN | FLAG_RST):
+            self.closed = True
+        return chunks
+
+    def reset(self):
+        """
+        Forget the state of the stream
+        """
+        self.next_seq = None
+        self.offset = 0
+        self.pending = []
+        self.pending_size = 0
+        self.closed = False
+
+    def insert(self, seq, data, chunks):
+        """
+        Insert the data of a segment
+        """
+        diff = seq_diff(seq, self.next_seq)
+        if diff < 0:
+            if -diff >= len(data):
+                self.retransmits += 1
+                return
+            # overlap with the data already delivered
+            data = data[-diff:]
+            diff = 0
+        if diff > 0:
+            heapq.heappush( self.pending, (self.offset + diff, bytes(data)) )
+            self.pending_size += len(data)
+            if self.pending_size > MAX_PENDING:
+                self.skip_gap(chunks)
+            return
+        self.deliver(data, chunks)
+        self.drain(chunks)
+
+    def deliver(self, data, chunks):
+        """
+        Deliver the data at the next sequence number
+        """
+        chunks.append( data )
+        self.offset += len(data)
+        self.next_seq = (self.next_seq + len(data)) & SEQ_MASK
+
+    def drain(self, chunks):
+        """
+        Deliver the pending segments which are now in order
+        """
+        pending = self.pending
+        while len(pending) and pending[0][0] <= self.offset:
+            offset, data = heapq.heappop(pending)
+            self.pending_size -= len(data)
+            overlap = self.offset - offset
+            if overlap < len(data):
+                self.deliver(data[overlap:], chunks)
+            else:
+                self.retransmits += 1
+
+    def skip_gap(self, chunks):
+        """
+        Skip the missing data until the first pending segment
+        """
+        if not len(self.pending):
+            return
+        missing = self.pending[0][0] - self.offset
+        self.offset += missing
+        self.next_seq = (self.next_seq + missing) & SEQ_MASK
+        self.gaps += 1
+        chunks.append( None )
+        self.drain(chunks)
+
+    def acknowledge(self, ack, chunks):
+        """
+        Data acknowledged by the peer, the data missing before is lost from the capture
+
+        @param ack: acknowledgment number of the peer
+        @type ack: integer
+
+        @param chunks: data delivered in order, None for a gap
+        @type chunks: list
+        """
+        while len(self.pending) and seq_diff(ack, self.next_seq) > 0:
+            self.skip_gap(chunks)
+
+    def flush(self):
+        """
+        Deliver all the pending segments, with the gaps
+
+        @return: data delivered in order, None for a gap
+        @rtype: list
+        """
+        chunks = []
+        while len(self.pending):
+            self.skip_gap(chunks)
+        return chunks
+
+class Connection(object):
+    """
+    Both directions of a connection, 'sent' to the server and 'recv' from the server
+    """
+    def __init__(self, key):
+        """
+        Constructor
+
+        @param key: client address and port, server address and port
+        @type key: tuple
+        """
+        client, client_port, server, server_port = key
+        self.streams = { 'sent': Stream( (client, server, client_port, server_port) ),
+                         'recv': Stream( (server, client, server_port, client_port) ) }
+
+    def add_segment(self, direction, flags, seq, ack, data):
+        """
+        Add a segment of the connection
+
+        @param direction: sent or recv
+        @type direction: string
+
+        @return: data delivered in order by direction, [ (direction, chunks) ]
+        @rtype: list
+        """
+        results = []
+        if flags & FLAG_ACK:
+            peer = PEERS[direction]
+            chunks = []
+            self.streams[peer].acknowledge(ack, chunks)
+            if len(chunks):
+                results.append( (peer, chunks) )
+        results.append( (direction, self.streams[direction].add(seq, flags, data)) )
+        if flags & FLAG_RST:
+            # both directions are closed by a reset
+            self.streams[PEERS[direction]].closed = True
+        return results
+
+    def is_closed(self):
+        """
+        Returns True when both directions are closed
+        """
+        return self.streams['sent'].closed and self.streams['recv'].closed
+
+class FlowTable(object):
+    """
+    Connections by client and server addresses
+    """
+    def __init__(self, factory=Connection, max_flows=MAX_FLOWS):
+        """
+        Constructor
+
+        @param factory: class of the connections
+        @type factory: class
+
+        @param max_flows: max number of connections opened
+        @type max_flows: integer
+        """
+        self.factory = factory
+        self.max_flows = max_flows
+        self.flows = collections.OrderedDict()
+
+    def get(self, direction, source, dest, source_port, dest_port):
+        """
+        Returns the connection of the segment, created if needed
+        The least recently used connection is returned as evicted if the table is full
+
+        @param direction: sent or recv
+        @type direction: string
+
+        @return: connection, connection evicted or None
+        @rtype: tuple
+        """
+        if direction == 'sent':
+            key = (source, source_port, dest, dest_port)
+        else:
+            key = (dest, dest_port, source, source_port)
+        conn = self.flows.get(key)
+        if conn is not None:
+            self.flows.move_to_end(key)
+            return conn, None
+        evicted = None
+        if len(self.flows) >= self.max_flows:
+            evicted = self.flows.popitem(last=False)[1]
+        conn = self.factory(key)
+        conn.key = key
+        self.flows[key] = conn
+        return conn, evicted
+
+    def remove(self, conn):
+        """
+        Remove the connection
+        """
+        self.flows.pop(conn.key, None)
+
+    def pop_all(self):
+        """
+        Remove and return all the connections
+        """
+        flows = list(self.flows.values())
+        self.flows.clear()
+        return flows
+
+def read_tcp_data(segments, table=None):
+    """
+    Reassemble the tcp streams, the data is returned in the order of the sequence numbers
+    without the retransmissions
+
+    @param segments: iterator on ('sent' or 'recv', (source, dest, source port, dest port, flags, seq, ack, data))
+    @type segments: iterator
+
+    @param table: table of the connections
+    @type table: flowtable/none
+
+    @return: iterator on ('sent' or 'recv', (source, dest, source port, dest port, data))
+    @rtype: iterator
+    """
+    if table is None:
+        table = FlowTable()
+    for direction, (source, dest, source_port, dest_port, flags, seq, ack, data) in segments:
+        conn, evicted = table.get(direction, source, dest, source_port, dest_port)
+        if evicted is not None:
+            for result in flush_tcp_data(evicted):
+                yield result
+        for sentrecv, chunks in conn.add_segment(direction, flags, seq, ack, data):
+            addresses = conn.streams[sentrecv].addresses
+            for chunk in chunks:
+                if chunk is not None:
+                    yield sentrecv, addresses + (bytes(chunk),)
+        if conn.is_closed():
+            table.remove(conn)
+            for result in flush_tcp_data(conn):
+                yield result
+    for conn in table.pop_all():
+        for result in flush_tcp_data(conn):
+            yield result
+
+def flush_tcp_data(conn):
+    """
+    Returns the data pending of the connection
+    """
+    for direction in [ 'sent', 'recv' ]:
+        stream = conn.streams[direction]
+        for chunk in stream.flush():
+            if chunk is not None:
+                yield direction, stream.addresses + (bytes(chunk),)
+
+class HttpParser(object):
+    """
+    Boundaries of the http messages in a buffer
+    """
+    def __init__(self, response):
+        """
+        Constructor
+
+        @param response: True for the responses, False for the requests
+        @type response: boolean
+        """
+        self.response = response
+        self.reset()
+
+    def reset(self):
+        """
+        Reset for the next message
+        """
+        self.header_len = None
+        self.length = None
+        self.chunked = False
+        self.chunk_pos = 0
+        self.scan = 0
+
+    def parse(self, buffer, method=None):
+        """
+        Returns the length of the message at the start of the buffer,
+        None if incomplete or until the end of the connection
+
+        @param buffer: data received
+        @type buffer: bytearray
+
+        @param method: method of the request, for the responses
+        @type method: bytes/none
+
+        @return: length of the message or None
+        @rtype: integer/none
+        """
+        if self.header_len is None:
+            end = buffer.find(b'\r\n\r\n', self.scan)
+            if end < 0:
+                self.scan = max(0, len(buffer) - 3)
+                return None
+            self.header_len = end + 4
+            self.read_headers( bytes(buffer[:end]), method )
+        if self.length is not None:
+            if len(buffer) >= self.length:
+                return self.length
+            return None
+        if self.chunked:
+            return self.parse_chunks(buffer)
+        # body until the end of the connection
+        return None
+
+    def read_headers(self, head, method):
+        """
+        Read the length of the body in the headers
+        """
+        lines = head.split(b'\r\n')
+        length = None
+        chunked = False
+        for line in lines[1:]:
+            name, sep, value = line.partition(b':')
+            name = name.strip().lower()
+            if name == b'content-length':
+                try:
+                    length = int(value.strip())
+                except ValueError:
+                    pass
+            elif name == b'transfer-encoding':
+                chunked = b'chunked' in value.lower()
+
+        if self.response:
+            try:
+                status = int(lines[0].split(b' ')[1])
+            except (IndexError, ValueError):
+                status = 0
+            if method == b'HEAD' or 100 <= status < 200 or status in [ 204, 304 ]:
+                self.length = self.header_len
+                return
+        if chunked:
+            self.chunked = True
+            self.chunk_pos = self.header_len
+        elif length is not None:
+            self.length = self.header_len + length
+        elif not self.response:
+            self.length = self.header_len
+
+    def parse_chunks(self, buffer):
+        """
+        Walk the chunks of the body, from the last chunk complete
+        """
+        pos = self.chunk_pos
+        while True:
+            end = buffer.find(b'\r\n', pos)
+            if end < 0:
+                break
+            try:
+                size = int( bytes(buffer[pos:end]).split(b';')[0].strip(), 16 )
+            except ValueError:
+                # malformed chunk, the message ends here
+                return len(buffer)
+            if size == 0:
+                # last chunk, then the trailers and an empty line
+                end = buffer.find(b'\r\n\r\n', end)
+                if end < 0:
+                    break
+                return end + 4
+            if len(buffer) < end + 2 + size + 2:
+                break
+            pos = end + 2 + size + 2
+        self.chunk_pos = pos
+        return None
+
+class HttpConnection(Connection):
+    """
+    Connection with the http messages in progress
+    """
+    def __init__(self, key):
+        """
+        Constructor
+        """
+        Connection.__init__(self, key)
+        self.buffers = { 'sent': bytearray(), 'recv': bytearray() }
+        self.parsers = { 'sent': HttpParser(response=False), 'recv': HttpParser(response=True) }
+        # wait the start of a message, at the beginning and after a gap
+        self.resync = { 'sent': True, 'recv': True }
+        # methods of the requests without response
+        self.methods = collections.deque()
+
+    def add(self, direction, chunks):
+        """
+        Add the data delivered by the stream and return the messages complete
+
+        @return: messages
+        @rtype: list
+        """
+        messages = []
+        buffer = self.buffers[direction]
+        for chunk in chunks:
+            if chunk is None:
+                # gap, the message in progress is lost
+                del buffer[:]
+                self.parsers[direction].reset()
+                self.resync[direction] = True
+                continue
+            if self.resync[direction]:
+                if not self.is_start(direction, chunk):
+                    continue
+                self.resync[direction] = False
+            buffer += chunk
+            self.read_messages(direction, messages)
+        return messages
+
+    def is_start(self, direction, data):
+        """
+        Returns True if the data is the start of a message
+        """
+        head = bytes(data[:16])
+        if direction == 'recv':
+            return head.startswith(b'HTTP/')
+        return head.split(b' ', 1)[0] in HTTP_METHODS
+
+    def read_messages(self, direction, messages):
+        """
+        Cut the messages complete in the buffer
+        """
+        buffer = self.buffers[direction]
+        parser = self.parsers[direction]
+        while len(buffer):
+            method = None
+            if direction == 'recv' and len(self.methods):
+                method = self.methods[0]
+            length = parser.parse(buffer, method)
+            if length is None:
+                return
+            self.add_message(direction, bytes(buffer[:length]), messages)
+            del buffer[:length]
+            parser.reset()
+
+    def add_message(self, direction, message, messages):
+        """
+        Add a message complete
+        """
+        if direction == 'sent':
+            self.methods.append( message.split(b' ', 1)[0] )
+        elif len(self.methods):
+            self.methods.popleft()
+        messages.append( (direction, self.streams[direction].addresses + (message,)) )
+
+    def close(self):
+        """
+        Return the messages pending, the responses without length end with the connection
+
+        @return: messages
+        @rtype: list
+        """
+        messages = []
+        for direction in [ 'sent', 'recv' ]:
+            messages.extend( self.add(direction, self.streams[direction].flush()) )
+            buffer = self.buffers[direction]
+            parser = self.parsers[direction]
+            if direction == 'recv' and len(buffer) and parser.header_len is not None \
+                    and parser.length is None and not parser.chunked:
+                self.add_message(direction, bytes(buffer), messages)
+                del buffer[:]
+        return messages
+
+def read_http_messages(segments, table=None):
+    """
+    Reassemble the tcp streams and cut the http messages
+
+    @param segments: iterator on ('sent' or 'recv', (source, dest, source port, dest port, flags, seq, ack, data))
+    @type segments: iterator
+
+    @param table: table of the connections
+    @type table: flowtable/none
+
+    @return: iterator on ('request' or 'response', (source, dest, source port, dest port, message))
+    @rtype: iterator
+    """
+    if table is None:
+        table = FlowTable(factory=HttpConnection)
+    kinds = { 'sent': 'request', 'recv': 'response' }
+    for direction, (source, dest, source_port, dest_port, flags, seq, ack, data) in segments:
+        conn, evicted = table.get(direction, source, dest, source_port, dest_port)
+        messages = []
+        if evicted is not None:
+            messages.extend( evicted.close() )
+        for sentrecv, chunks in conn.add_segment(direction, flags, seq, ack, data):
+            messages.extend( conn.add(sentrecv, chunks) )
+        if conn.is_closed():
+            table.remove(conn)
+            messages.extend( conn.close() )
+        for sentrecv, message in messages:
+            yield kinds[sentrecv], message
+    for conn in table.pop_all():
+        for sentrecv, message in conn.close():
+            yield kinds[sentrecv], message
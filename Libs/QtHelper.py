@@ -34,7 +34,8 @@ from PyQt5.QtWidgets import (QToolButton, QApplication, QTextEdit, QCompleter,
                             QWidget, QLineEdit, QPlainTextEdit,
                             QPushButton, QHBoxLayout, QLabel, QDialog, QDesktopWidget, 
                             QVBoxLayout, QSizePolicy, QProgressBar, QAction, QFrame)
-from PyQt5.QtCore import (Qt, pyqtSignal, QVariant, QSize, QPointF, QRect, QStringListModel)
+from PyQt5.QtCore import (Qt, pyqtSignal, QVariant, QSize, QPointF, QRect, QStringListModel,
+                          QObject, QEventLoop)
 from PyQt5.Qsci import (QsciScintilla, QsciLexerPython, QsciLexerXML, 
                         QsciLexerBash, QsciLexerJSON, QsciAPIs)
 IS_QT5 = True
@@ -45,6 +46,10 @@ import random
 import math
 import time
 
+import Libs.NetLayerLib.Messages as Messages
+import Libs.EventDecoder as EventDecoder
+import Libs.Pcap.pipeline as PcapPipeline
+
 # unicode = str with python3
 if sys.version_info > (3,):
     unicode = str
@@ -58,41 +63,8 @@ CHART_COLOR_ORANGE  = QColor(237, 189, 45, 200)
 
 
 
-def bytes_to_unicode(ob):
-    """
-    Byte to unicode with exception...
-    Only for py3, will be removed on future version...
-    """
-    t = type(ob)
-    if t in (list, tuple):
-        try:
-            l = [str(i, 'utf-8') if type(i) is bytes else i for i in ob]
-        except UnicodeDecodeError as e:
-            l = [ i for i in ob] # keep as bytes
-        l = [bytes_to_unicode(i) if type(i) in (list, tuple, dict) else i for i in l]
-        ro = tuple(l) if t is tuple else l
-    elif t is dict:
-        byte_keys = [i for i in ob if type(i) is bytes]
-        for bk in byte_keys:
-            v = ob[bk]
-            del(ob[bk])
-            try:
-                ob[str(bk,'utf-8')] = v
-            except UnicodeDecodeError as e:
-                ob[bk] = v # keep as bytes
-        for k in ob:
-            if type(ob[k]) is bytes:
-                try:
-                    ob[k] = str(ob[k], 'utf-8')
-                except UnicodeDecodeError as e:
-                    ob[k] = ob[k] # keep as bytes
-            elif type(ob[k]) in (list, tuple, dict):
-                ob[k] = bytes_to_unicode(ob[k])
-        ro = ob
-    else:
-        ro = ob
-        print("unprocessed object: {0} {1}".format(t, ob))
-    return ro
+# same conversion as the network layer, used for the events of the trx files
+bytes_to_unicode = Messages.bytes_to_unicode
     
 class CloseToolButton(QToolButton):
     """
@@ -1366,4 +1338,160 @@ class PieChart(QWidget):
         Remove all items
         """
         self.__datas = []
-        self.update()
\ No newline at end of file
+        self.update()
+
+class EventsLoader(QObject):
+    """
+    Decode the events of a test result in a pool of processes
+    The events are delivered by batch in the gui thread with a queued signal
+    """
+    EventsDecoded = pyqtSignal(object, list)
+    Finished = pyqtSignal(object)
+    def __init__(self, parent=None):
+        """
+        Constructor
+        """
+        QObject.__init__(self, parent)
+        self.job = None
+        
+        # signals emitted from the thread of the job, queued to the gui thread
+        self.EventsDecoded.connect(self.onEventsDecoded)
+        self.Finished.connect(self.onFinished)
+        
+    def decode(self, lines, callback):
+        """
+        Decode the lines and wait the end, the gui is refreshed during the decoding
+        The callback is called with the list of (line number, event, error) in the order of lines,
+        the decoding is cancelled if the callback returns False
+
+        @param lines: iterator on (line number, line)
+        @type lines: iterator
+
+        @param callback: function called on each batch of events
+        @type callback: function
+
+        @return: False if cancelled
+        @rtype: boolean
+        """
+        self.cancel()
+        
+        job = EventDecoder.DecodingJob( lines=lines, 
+                                        onEvents=lambda events: self.EventsDecoded.emit(job, events),
+                                        onFinished=lambda: self.Finished.emit(job) )
+        job.callback = callback
+        job.completed = True
+        job.loop = QEventLoop()
+        self.job = job
+        
+        job.start()
+        job.loop.exec_()
+        return job.completed
+        
+    def cancel(self):
+        """
+        Cancel the decoding in progress
+        """
+        if self.job is not None:
+            self.job.completed = False
+            self.job.cancel()
+            
+    def onEventsDecoded(self, job, events):
+        """
+        On events decoded
+        """
+        if job.cancelled.is_set():
+            return
+        if job.callback(events) is False:
+            job.completed = False
+            job.cancel()
+            
+    def onFinished(self, job):
+        """
+        On decoding finished
+        """
+        if job is self.job:
+            self.job = None
+        job.loop.quit()
+
+class PipelineLoader(QObject):
+    """
+    Run a pipeline of generators in a thread, the gui is refreshed during the job
+    The results and the progress are delivered by batch in the gui thread with queued signals
+    """
+    ResultsReady = pyqtSignal(object, list)
+    ProgressChanged = pyqtSignal(object, object, object)
+    Finished = pyqtSignal(object, object)
+    def __init__(self, parent=None):
+        """
+        Constructor
+        """
+        QObject.__init__(self, parent)
+        self.job = None
+
+        # signals emitted from the thread of the job, queued to the gui thread
+        self.ResultsReady.connect(self.onResultsReady)
+        self.ProgressChanged.connect(self.onProgressChanged)
+        self.Finished.connect(self.onFinished)
+
+    def run(self, pipeline, callback, progress=None):
+        """
+        Consume the results of the pipeline in a thread and wait the end
+
+        @param pipeline: called in the thread with the function of progress, 
+                         returns an iterator on the results
+        @type pipeline: function
+
+        @param callback: function called on each batch of results
+        @type callback: function
+
+        @param progress: function called with the work done and the total
+        @type progress: function/none
+
+        @return: None or the error
+        @rtype: none/string
+        """
+        self.cancel()
+
+        job = PcapPipeline.PipelineJob( pipeline=pipeline,
+                                        onResults=lambda batch: self.ResultsReady.emit(job, batch),
+                                        onProgress=lambda done, total: self.ProgressChanged.emit(job, done, total),
+                                        onFinished=lambda error: self.Finished.emit(job, error) )
+        job.callback = callback
+        job.progressCallback = progress
+        job.error = None
+        job.loop = QEventLoop()
+        self.job = job
+
+        job.start()
+        job.loop.exec_()
+        return job.error
+
+    def cancel(self):
+        """
+        Cancel the job in progress
+        """
+        if self.job is not None:
+            self.job.cancel()
+
+    def onResultsReady(self, job, batch):
+        """
+        On a batch of results
+        """
+        if not job.cancelled.is_set():
+            job.callback(batch)
+
+    def onProgressChanged(self, job, done, total):
+        """
+        On progress of the job
+        """
+        if not job.cancelled.is_set() and job.progressCallback is not None:
+            job.progressCallback(done, total)
+
+    def onFinished(self, job, error):
+        """
+        On job finished
+        """
+        if job is self.job:
+            self.job = None
+        job.error = error
+        job.loop.quit()
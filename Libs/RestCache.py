@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------------------------
+# Copyright (c) 2010-2020 Denis Machard
+# This file is part of the extensive automation project
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301 USA
+# -------------------------------------------------------------------
+
+"""
+Cache of the rest responses
+Responses are stored on disk with the ETag or Last-Modified of the server
+and revalidated with a conditional request, the least recently used are removed first
+"""
+
+import sys
+import os
+import json
+import hashlib
+import collections
+
+from Libs import Logger
+
+# unicode = str with python3
+if sys.version_info > (3,):
+    unicode = str
+
+INDEX_FILE = "index.json"
+
+class RestCache(Logger.ClassLogger):
+    """
+    Rest cache, size bounded with LRU eviction
+    """
+    def __init__(self, cachePath, maxSize=64*1024*1024):
+        """
+        Constructor
+
+        @param cachePath: folder of the cache
+        @type cachePath: string
+
+        @param maxSize: max size of the responses stored in bytes
+        @type maxSize: integer
+        """
+        self.cachePath = cachePath
+        self.maxSize = maxSize
+        self.entries = collections.OrderedDict()
+        self.size = 0
+
+        self.loadIndex()
+
+    def makeKey(self, server, uri, request, body):
+        """
+        Return the key of the request
+
+        @param server: scheme, address and port of the server
+        @type server: string
+
+        @param uri: uri of the request
+        @type uri: string
+
+        @param request: GET or POST
+        @type request: string
+
+        @param body: body of the request
+        @type body: string
+
+        @return: key
+        @rtype: string
+        """
+        req = "%s %s %s %s" % (server, request, uri, body)
+        return hashlib.sha1( req.encode("utf8") ).hexdigest()
+
+    def loadIndex(self):
+        """
+        Load the index of the cache from the disk
+        """
+        try:
+            if not os.path.exists(self.cachePath):
+                os.makedirs(self.cachePath)
+
+            indexFile = os.path.join(self.cachePath, INDEX_FILE)
+            if os.path.exists(indexFile):
+                with open(indexFile, "r") as f:
+                    index = json.load(f)
+                for key, entry in index:
+                    if os.path.exists( os.path.join(self.cachePath, key) ):
+                        self.entries[key] = entry
+                        self.size += entry['size']
+        except Exception as e:
+            self.error( "unable to load the rest cache: %s" % e )
+            self.entries.clear()
+            self.size = 0
+
+    def saveIndex(self):
+        """
+        Save the index of the cache on the disk, the least recently used first
+        """
+        try:
+            indexFile = os.path.join(self.cachePath, INDEX_FILE)
+            with open(indexFile + ".tmp", "w") as f:
+                json.dump( list(self.entries.items()), f )
+            os.replace(indexFile + ".tmp", indexFile)
+        except Exception as e:
+            self.error( "unable to save the rest cache: %s" % e )
+
+    def validators(self, key):
+        """
+        Return the headers to revalidate the response stored
+
+        @param key: key of the request
+        @type key: string
+
+        @return: headers If-None-Match and If-Modified-Since
+        @rtype: dict
+        """
+        headers = {}
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry['etag']:
+                headers["If-None-Match"] = entry['etag']
+            if entry['last-modified']:
+                headers["If-Modified-Since"] = entry['last-modified']
+        return headers
+
+    def get(self, key):
+        """
+        Return the response stored, on not modified response
+
+        @param key: key of the request
+        @type key: string
+
+        @return: body of the response or None
+        @rtype: bytes/none
+        """
+        if key not in self.entries:
+            return None
+        try:
+            with open(os.path.join(self.cachePath, key), "rb") as f:
+                data = f.read()
+        except Exception as e:
+            self.error( "unable to read the rest cache: %s" % e )
+            self.remove(key)
+            return None
+
+        self.entries.move_to_end(key)
+        return data
+
+    def put(self, key, uri, data, etag=None, lastModified=None):
+        """
+        Store the response, only with a validator provided by the server
+
+        @param key: key of the request
+        @type key: string
+
+        @param uri: uri of the request
+        @type uri: string
+
+        @param data: body of the response
+        @type data: bytes
+
+        @param etag: ETag header
+        @type etag: string/none
+
+        @param lastModified: Last-Modified header
+        @type lastModified: string/none
+        """
+        if not etag and not lastModified:
+            self.remove(key)
+            return
+        if len(data) > self.maxSize:
+            return
+
+        self.remove(key, save=False)
+        try:
+            with open(os.path.join(self.cachePath, key), "wb") as f:
+                f.write(data)
+        except Exception as e:
+            self.error( "unable to write the rest cache: %s" % e )
+            return
+
+        self.entries[key] = { 'uri': uri, 'size': len(data),
+                              'etag': etag, 'last-modified': lastModified }
+        self.size += len(data)
+
+        # remove the least recently used responses
+        while self.size > self.maxSize:
+            self.remove( next(iter(self.entries)), save=False )
+        self.saveIndex()
+
+    def remove(self, key, save=True):
+        """
+        Remove a response from the cache
+
+        @param key: key of the request
+        @type key: string
+
+        @param save: save the index
+        @type save: boolean
+        """
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        self.size -= entry['size']
+        try:
+            os.remove( os.path.join(self.cachePath, key) )
+        except Exception as e:
+            pass
+        if save: self.saveIndex()
+
+    def clear(self):
+        """
+        Remove all responses
+        """
+        for key in list(self.entries):
+            self.remove(key, save=False)
+        self.saveIndex()
@@ -56,6 +56,7 @@ import platform
 import subprocess
 import json
 import uuid
+import multiprocessing
 import shutil
 import base64 
 
@@ -146,6 +147,7 @@ import ServerExplorer as WServerExplorer
 from Resources import Resources
 from Translations import Translations
 import Workspace.FileModels.TestResult as TestResultModel
+import Libs.EventDecoder as EventDecoder
 import Settings
 
 import Recorder as WRecorder
@@ -413,6 +415,8 @@ class MainApplication(QMainWindow, Logger.ClassLogger):
         self.trace('Initializing test results...')
         showMessageSplashscreen( self.tr('Initializing test results...') )
         TestResults.initialize( parent = self )
+        EventDecoder.initialize( workers=int(Settings.instance().readValue( key = 'TestRun/decoder-workers' )) )
+        self.eventsLoader = QtHelper.EventsLoader(self)
 
         self.trace('Initializing assistant engine...')
         showMessageSplashscreen( self.tr('Initializing assistant engine...') )
@@ -893,6 +897,7 @@ class MainApplication(QMainWindow, Logger.ClassLogger):
         UCI.finalize()
         RCI.finalize()
         TestResults.finalize()
+        EventDecoder.finalize()
         WWorkspace.finalize()
         WServerExplorer.finalize()
         WRecorder.finalize()
@@ -2185,10 +2190,18 @@ class MainApplication(QMainWindow, Logger.ClassLogger):
                 idFile = "%s" % uuid.uuid4()
                 newPath = "%s/ResultLogs/%s.trx" % (QtHelper.dirExec(),idFile)
                 
-                if not fromServer:
-                    shutil.copyfile(fileName, newPath )
+                if dataModel.indexed:
+                    if not fromServer:
+                        shutil.copyfile(fileName, newPath )
+                    else:
+                        shutil.move(fileName, newPath )
                 else:
-                    shutil.move(fileName, newPath )
+                    # convert to the indexed format, a testcase is read from its blocks only
+                    if not dataModel.saveIndexed( absPath=newPath ):
+                        raise Exception( 'unable to convert the test result' )
+                    if fromServer:
+                        os.remove(fileName)
+                dataModel.testresult = "" # free memory, no more needed
                 
                 wTest.setLocalData(newPath)
 
@@ -2202,28 +2215,23 @@ class MainApplication(QMainWindow, Logger.ClassLogger):
                     all = f.readlines()
                     maxSize = len(all)
 
-                    i = 1
                     # change the cursort to busy
                     self.setCursorBusy()
-                    for line in all:
-                        self.DataProgress.emit(i,maxSize)
-                        try:
-                            # decode in base 64 and unpickle the data
-                            if sys.version_info > (3,): # python3 support
-                                l = base64.b64decode(line)
-                                event = cPickle.loads( l, encoding="bytes")
-                                event = QtHelper.bytes_to_unicode(event)
-                            else:
-                                l = base64.b64decode(line)
-                                event = cPickle.loads( l )
-                        except Exception as e:
-                            self.error( line )
-                            self.error( "unable to load line: %s" % e )
-                        else:
+                    
+                    # decoded in background, the events are delivered by batch in the order of lines
+                    def onEvents(events):
+                        """
+                        On a batch of events decoded
+                        """
+                        for n, event, err in events:
+                            if event is None:
+                                self.error( err )
+                                continue
                             event['test-id'] = testId
-                        # self.Notify.emit(('event', event ))
-                        self.LoadLocalTestResult.emit( ('event', event ) )
-                        i += 1
+                            self.LoadLocalTestResult.emit( ('event', event ) )
+                        self.DataProgress.emit(n+1, maxSize)
+                        
+                    self.eventsLoader.decode( lines=enumerate(all), callback=onEvents )
 
                     f.close()
                     
@@ -2237,6 +2245,7 @@ class MainApplication(QMainWindow, Logger.ClassLogger):
                 self.trace("time to load test result v2 (in seconds): %0.2f" % (stopFlag-startFlag))
                 
                 wTest.headerReady = True
+                wTest.indexLocalData()
             # end of new
             else: # backward compatibility, not efficient with big test result
                 startFlag = time.time()
@@ -3350,6 +3359,9 @@ if __name__ == '__main__':
     """
     # performance measurement only for debug mode
     starttime = time.time()
+    
+    # the events of the test results are decoded in a pool of processes
+    multiprocessing.freeze_support()
 
     # Construct the main app
     if sys.platform == "win32":
@@ -53,8 +53,10 @@ import DefaultTemplates
 
 if sys.version_info > (3,):
     import Libs.Pcap.parse as PcapParse
-    import Libs.Pcap.pcap as PcapReader
-    import Libs.Pcap.pcapng as PcapngReader
+    import Libs.Pcap.capture as PcapCapture
+    import Libs.Pcap.pipeline as PcapPipeline
+    import Libs.Pcap.tcpflow as PcapTcpFlow
+    import Libs.Pcap.filter as PcapFilter
 else:
     import dpkt
 
@@ -100,6 +102,7 @@ class DHttpReplay(QtHelper.EnhancedQDialog, Logger.ClassLogger):
         self.responses = []
         self.defaultTemplates = DefaultTemplates.Templates()
         self.testType = None
+        self.pipelineLoader = QtHelper.PipelineLoader(self)
 
         self.createDialog()
         self.createConnections()
@@ -488,7 +491,7 @@ class DHttpReplay(QtHelper.EnhancedQDialog, Logger.ClassLogger):
     def decodeHttpRequest(self, data):
         """
         Decode http request
-        Content chunked not yet implemented
+        The message is complete, cut with the content length or the chunks
         """
         http = {"type": "request"}
         lines = data.splitlines()
@@ -506,7 +509,7 @@ class DHttpReplay(QtHelper.EnhancedQDialog, Logger.ClassLogger):
             self.error("unable to decode status code in the http response: %s" % request_line)
             return None
 
-        http["body"] = data.split(b"\r\n\r\n")[1]
+        http["body"] = data.split(b"\r\n\r\n", 1)[1]
         
         headers = []
         contentLenght=0
@@ -517,20 +520,20 @@ class DHttpReplay(QtHelper.EnhancedQDialog, Logger.ClassLogger):
                 if k.lower() == b"content-length":
                     contentLenght = int(v)
                 if k.lower() == b"transfer-encoding":
-                    if v.lowert() == b"chunked":
+                    if v.strip().lower() == b"chunked":
                         contentChunked=True
                         
                 headers.append(hdr)
                 
         http["headers"] = headers
 
-        if len(http["body"]) != contentLenght:
+        if not contentChunked and len(http["body"]) != contentLenght:
             return None # need more data
         return http
         
     def decodeHttpResponse(self, data):
         """
-        Decode http response without body
+        Decode http response, the headers only
         """
         http = {"type": "response"}
         lines = data.splitlines()
@@ -547,7 +550,7 @@ class DHttpReplay(QtHelper.EnhancedQDialog, Logger.ClassLogger):
             self.error("unable to decode status code in the http response: %s" % status_line)
             return None
         
-        http["headers"] = lines[1:]
+        http["headers"] = data.split(b"\r\n\r\n", 1)[0].splitlines()[1:]
         return http
 
     def readFileV2(self, fileName):
@@ -555,20 +558,20 @@ class DHttpReplay(QtHelper.EnhancedQDialog, Logger.ClassLogger):
         Read pcap file 
         Support pcap-ng too
         """
-        fd = open(fileName, 'rb')
-        fileFormat, fileHead = PcapParse.extractFormat(fd)
+        # the file is mapped in memory, the packets are not copied
+        capture = PcapCapture.CaptureFile(fileName)
+        fileFormat = capture.file_format
         if fileFormat == PcapParse.FileFormat.PCAP:
             self.trace("pcap file detected")
-            pcapFile = PcapReader.PcapFile(fd, fileHead).read_packet
-            self.readFilePacket(pcapFile=pcapFile)
+            self.readFilePacket(capture=capture)
         elif fileFormat == PcapParse.FileFormat.PCAP_NG:
             self.trace("pcap-png file detected")
-            pcapFile = PcapngReader.PcapngFile(fd, fileHead).read_packet
-            self.readFilePacket(pcapFile=pcapFile)
+            self.readFilePacket(capture=capture)
         else:
             self.addLogError(txt="<< Error to open the network trace")
             self.error( 'unable to open the network trace: file format = %s' % fileFormat )
             QMessageBox.critical(self, "Import" , "File not supported")
+        capture.close()
             
     def __readRequest(self, buffer, data, request, output ):
         """
@@ -585,95 +588,117 @@ class DHttpReplay(QtHelper.EnhancedQDialog, Logger.ClassLogger):
         else:
             print( "need more data, no body separator detected on request" )
         
-    def readFilePacket(self, pcapFile):
+    def onReadProgress(self, done, total):
+        """
+        On progress of the reading of the capture, in kilobytes
+
+        @param done: bytes read
+        @type done: integer
+
+        @param total: size of the capture
+        @type total: integer
+        """
+        self.progressBar.setMaximum( max(1, total // 1024) )
+        self.progressBar.setValue( done // 1024 )
+
+    def readHttpMessages(self, segments, stats):
+        """
+        Reassemble the tcp streams and decode the http requests and responses,
+        called in the thread of the pipeline
+
+        @param segments: iterator on ('sent' or 'recv', tcp segment)
+        @type segments: iterator
+
+        @param stats: number of tcp packets sent and received
+        @type stats: dict
+
+        @return: iterator on ('request' or 'response', (source, dest, source port, dest port, data, decoded))
+        @rtype: iterator
+        """
+        def countSegments(segments):
+            """
+            Count the tcp packets with data
+            """
+            for sentrecv, segment in segments:
+                if len(segment[7]):
+                    stats[sentrecv] += 1
+                yield sentrecv, segment
+
+        for reqrsp, message in PcapTcpFlow.read_http_messages( countSegments(segments) ):
+            (source, dest, source_port, dest_port, data) = message
+            if reqrsp == 'request':
+                decoded = self.decodeHttpRequest(data = data)
+            else:
+                decoded = self.decodeHttpResponse(data = data)
+            if decoded is not None:
+                yield reqrsp, (source, dest, source_port, dest_port, data, decoded)
+
+    def onHttpMessages(self, messages):
+        """
+        On a batch of http messages decoded
+        """
+        for reqrsp, message in messages:
+            if reqrsp == 'request':
+                self.requests.append( message )
+            else:
+                self.responses.append( message )
+
+    def reject(self):
+        """
+        On dialog closed or cancelled, the reading of the capture in progress is cancelled
+        """
+        self.pipelineLoader.cancel()
+        super(DHttpReplay, self).reject()
+
+    def readFilePacket(self, capture):
         """
         Read file packet by packet
+
+        @param capture: capture mapped in memory
+        @type capture: capturefile
         """
         ip_expected = str( self.ipEdit.text() )
         port_expected = int( self.portEdit.text() )
+        try:
+            # the other packets are rejected on the raw headers, before decoding
+            packetFilter = PcapFilter.compile_filter( "tcp and host %s and port %s" % (ip_expected, port_expected) )
+        except PcapFilter.FilterError as e:
+            self.addLogError(txt="<< Invalid ip or port")
+            self.error( 'unable to filter the network trace: %s' % e )
+            return
 
-        # read packet)
-        packets = pcapFile()
-        ethernetPackets = list(packets)
-        self.addLogSuccess(txt="<< Number of packets detected: %s " % len(ethernetPackets))
-
-        # extract tcp packet according to the expected ip and port
-        tcpPacketsSent = []
-        tcpPacketsRecv = []
-        i = 1
-        self.progressBar.setMaximum(len(ethernetPackets))
-        self.progressBar.setValue(0)
-        for pkt in ethernetPackets:
-            self.progressBar.setValue(i)
-            i += 1
-            pktDecoded = PcapParse.decodePacket(pkt, getTcp=True, getUdp=False)
-            if pktDecoded is not None:
-                (source, dest, source_port, dest_port, data) = pktDecoded
-                # skip when no data exists
-                if dest == ip_expected and int(dest_port) == int(port_expected) and len(data) > 0 :
-                    tcpPacketsSent.append( pktDecoded )
-                if source == ip_expected and int(source_port) == int(port_expected) and len(data) > 0:
-                    tcpPacketsRecv.append( pktDecoded )
-        self.addLogSuccess(txt="<< Number of TCP packets sent: %s " % len(tcpPacketsSent))
-        self.addLogSuccess(txt="<< Number of TCP packets received: %s " % len(tcpPacketsRecv))        
-        
-        # decode https requests
+        # read, decode, filter the tcp packets according to the expected ip and port,
+        # reassemble the tcp streams, then decode the http requests and responses
+        # the capture is read in a thread and the dialog stays responsive
         self.requests = []
-        buf_req = b''
-        i = 1
-        self.progressBar.setMaximum(len(tcpPacketsSent))
-        self.progressBar.setValue(0)
-        # decode the complete packet
-        for req in tcpPacketsSent:
-            self.progressBar.setValue(i)
-            i += 1
-            (source, dest, source_port, dest_port, data) = req
-            if buf_req:
-                buf_req += data
-                if b'\r\n\r\n' in data:
-                    reqDecoded = self.decodeHttpRequest(data = buf_req)
-                    if reqDecoded is not None:
-                        self.requests.append( (source, dest, source_port, dest_port, buf_req, reqDecoded) ) 
-                        buf_req = b''
-            else:
-                if isRequest(data):
-                    buf_req += data
-                    if b'\r\n\r\n' in data:
-                        reqDecoded = self.decodeHttpRequest(data = buf_req)
-                        if reqDecoded is not None:
-                            self.requests.append( (source, dest, source_port, dest_port, buf_req, reqDecoded) ) 
-                            buf_req = b''
-                            
-        self.addLogSuccess(txt="<< Number of HTTP requests extracted: %s " % len(self.requests))
-        
-        # decode https response
         self.responses = []
-        buf_rsp = b''
-        i = 1
-        self.progressBar.setMaximum(len(tcpPacketsRecv))
         self.progressBar.setValue(0)
-        # decode just headers for response
-        for req in tcpPacketsRecv:
-            self.progressBar.setValue(i)
-            i += 1
-            (source, dest, source_port, dest_port, data) = req
-            if buf_rsp:
-                buf_rsp += data
-                # try to decode response without body
-                if b'\r\n\r\n' in data:
-                    rspDecoded = self.decodeHttpResponse(data = buf_rsp)
-                    if rspDecoded is not None:
-                        self.responses.append( (source, dest, source_port, dest_port, buf_rsp, rspDecoded) ) 
-                        buf_rsp = b''
-            else:
-                # is http response ?
-                if data.startswith(b'HTTP/'):
-                    buf_rsp += data
-                    if b'\r\n\r\n' in data:
-                        rspDecoded = self.decodeHttpResponse(data = buf_rsp)
-                        if rspDecoded is not None:
-                            self.responses.append( (source, dest, source_port, dest_port, buf_rsp, rspDecoded) ) 
-                            buf_rsp = b''
+        reader = PcapPipeline.PacketReader(capture, packet_filter=packetFilter)
+        stats = { 'sent': 0, 'recv': 0 }
+        def pipeline(progress):
+            """
+            Pipeline of the http messages, called in the thread
+            """
+            reader.progress = progress
+            decoded = PcapPipeline.decode_segments(reader)
+            segments = PcapPipeline.filter_segments(decoded, ip=ip_expected, port=port_expected)
+            return self.readHttpMessages(segments, stats)
+        # the import is disabled until the end of the reading
+        self.openAction.setEnabled(False)
+        error = self.pipelineLoader.run( pipeline=pipeline, callback=self.onHttpMessages, 
+                                         progress=self.onReadProgress )
+        self.openAction.setEnabled(True)
+        if not self.isVisible():
+            # dialog closed during the reading, the job is cancelled
+            return
+        if error is not None:
+            self.addLogError(txt="<< Error to read the network trace")
+            self.error( 'unable to read the network trace: %s' % error )
+
+        self.addLogSuccess(txt="<< Number of packets detected: %s " % reader.count)
+        self.addLogSuccess(txt="<< Number of TCP packets sent: %s " % stats['sent'])
+        self.addLogSuccess(txt="<< Number of TCP packets received: %s " % stats['recv'])
+        self.addLogSuccess(txt="<< Number of HTTP requests extracted: %s " % len(self.requests))
         self.addLogSuccess(txt="<< Number of HTTP responses extracted: %s " % len(self.responses))
 
         if self.requests:
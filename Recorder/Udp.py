@@ -53,8 +53,9 @@ import Settings
 import DefaultTemplates
 
 import Libs.Pcap.parse as PcapParse
-import Libs.Pcap.pcap as PcapReader
-import Libs.Pcap.pcapng as PcapngReader
+import Libs.Pcap.capture as PcapCapture
+import Libs.Pcap.pipeline as PcapPipeline
+import Libs.Pcap.filter as PcapFilter
 
 TU=0
 TS=1
@@ -83,6 +84,7 @@ class DUdpReplay(QtHelper.EnhancedQDialog, Logger.ClassLogger):
         self.responses = []
         self.defaultTemplates = DefaultTemplates.Templates()
         self.testType = None
+        self.pipelineLoader = QtHelper.PipelineLoader(self)
 
         self.createDialog()
         self.createConnections()
@@ -433,49 +435,82 @@ class DUdpReplay(QtHelper.EnhancedQDialog, Logger.ClassLogger):
         Read pcap file 
         Support pcap-ng too
         """
-        fd = open(fileName, 'rb')
-        fileFormat, fileHead = PcapParse.extractFormat(fd)
+        # the file is mapped in memory, the packets are not copied
+        capture = PcapCapture.CaptureFile(fileName)
+        fileFormat = capture.file_format
         if fileFormat == PcapParse.FileFormat.PCAP:
             self.trace("pcap file detected")
-            pcapFile = PcapReader.PcapFile(fd, fileHead).read_packet
-            self.readFilePacket(pcapFile=pcapFile)
+            self.readFilePacket(capture=capture)
         elif fileFormat == PcapParse.FileFormat.PCAP_NG:
             self.trace("pcap-png file detected")
-            pcapFile = PcapngReader.PcapngFile(fd, fileHead).read_packet
-            self.readFilePacket(pcapFile=pcapFile)
+            self.readFilePacket(capture=capture)
         else:
             self.addLogError(txt="<< Error to open the network trace")
             self.error( 'unable to open the network trace: file format = %s' % fileFormat )
             QMessageBox.critical(self, "Import" , "File not supported")
+        capture.close()
         
-    def readFilePacket(self, pcapFile):
+    def onReadProgress(self, done, total):
+        """
+        On progress of the reading of the capture, in kilobytes
+
+        @param done: bytes read
+        @type done: integer
+
+        @param total: size of the capture
+        @type total: integer
+        """
+        self.progressBar.setMaximum( max(1, total // 1024) )
+        self.progressBar.setValue( done // 1024 )
+
+    def reject(self):
+        """
+        On dialog closed or cancelled, the reading of the capture in progress is cancelled
+        """
+        self.pipelineLoader.cancel()
+        super(DUdpReplay, self).reject()
+
+    def readFilePacket(self, capture):
         """
         Read file packet by packet
+
+        @param capture: capture mapped in memory
+        @type capture: capturefile
         """
         ip_expected = str( self.ipEdit.text() )
         port_expected = int( self.portEdit.text() )
+        try:
+            packetFilter = PcapFilter.compile_filter( "udp and host %s and port %s" % (ip_expected, port_expected) )
+        except PcapFilter.FilterError as e:
+            self.addLogError(txt="<< Invalid ip or port")
+            self.error( 'unable to filter the network trace: %s' % e )
+            return
 
-        # read packet)
-        packets = pcapFile()
-        ethernetPackets = list(packets)
-        self.addLogSuccess(txt="<< Total packets detected: %s " % len(ethernetPackets))
-
-        # extract udp packet according to the expected ip and port
+        # extract udp packet according to the expected ip and port,
+        # the capture is read in a thread and the dialog stays responsive
         self.requests = []
-        i = 1
-        self.progressBar.setMaximum(len(ethernetPackets))
         self.progressBar.setValue(0)
-        for pkt in ethernetPackets:
-            self.progressBar.setValue(i)
-            i += 1
-            pktDecoded = PcapParse.decodePacket(pkt, getTcp=False, getUdp=True)
-            if pktDecoded is not None:
-                (source, dest, source_port, dest_port, data) = pktDecoded
-                # skip when no data exists
-                if dest == ip_expected and int(dest_port) == int(port_expected) and len(data) > 0 :
-                    self.requests.append( ('sent', pktDecoded) )
-                if source == ip_expected and int(source_port) == int(port_expected) and len(data) > 0:
-                    self.requests.append( ( 'recv', pktDecoded) )
+        reader = PcapPipeline.PacketReader(capture, packet_filter=packetFilter)
+        def pipeline(progress):
+            """
+            Read, decode and filter the packets, called in the thread
+            """
+            reader.progress = progress
+            decoded = PcapPipeline.decode_packets(reader, udp=True)
+            return PcapPipeline.filter_packets(decoded, ip=ip_expected, port=port_expected)
+        # the import is disabled until the end of the reading
+        self.openAction.setEnabled(False)
+        error = self.pipelineLoader.run( pipeline=pipeline, callback=self.requests.extend, 
+                                         progress=self.onReadProgress )
+        self.openAction.setEnabled(True)
+        if not self.isVisible():
+            # dialog closed during the reading, the job is cancelled
+            return
+        if error is not None:
+            self.addLogError(txt="<< Error to read the network trace")
+            self.error( 'unable to read the network trace: %s' % error )
+
+        self.addLogSuccess(txt="<< Total packets detected: %s " % reader.count)
         self.addLogSuccess(txt="<< Number of UDP packets detected: %s" % len(self.requests))
 
         if self.requests:
@@ -417,7 +417,7 @@ class RestClientInterface(QObject, Logger.ClassLogger):
         except Exception as e:
             self.CriticalMsg.emit( "Critical Error", "Bad json encode: %s" % e)
         else:
-            if QtHelper.str2bool( Settings.instance().readValue( key = 'Server/rest-support' ) ):
+            if Settings.instance().readValue( key = 'Server/rest-support', rType = 'bool' ):
                 self.WebCall.emit(uri, request, body)
             else:
                 self.WarningMsg.emit( self.tr("The REST API interface disabled") )
@@ -2218,7 +2218,7 @@ class RestClientInterface(QObject, Logger.ClassLogger):
         ServerExplorer.instance().rest().setWsCookie(cook="session_id=%s" % self.__sessionId)
         
         # start timer
-        percentRefresh = int(Settings.instance().readValue( key = 'Network/refresh-session' ))
+        percentRefresh = Settings.instance().readValue( key = 'Network/refresh-session', rType = 'int' )
         interval = int( int(self.__expires) * percentRefresh / 100 )
         self.refreshTimer.start( interval * 1000 )
         
@@ -2310,7 +2310,7 @@ class RestClientInterface(QObject, Logger.ClassLogger):
         Called on response
         """
         self.trace("on test result reseted")
-        if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+        if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
             self.application().showMessageTray(msg="The repository is now empty!")
         else:
             self.InformationMsg.emit( self.tr("Empty remote repository") , self.tr("The repository is now empty!") )
@@ -2343,7 +2343,7 @@ class RestClientInterface(QObject, Logger.ClassLogger):
         if not details["save-as"]:
             self.OpenTestResult.emit( (fileName, details["result-name"]) )
         else:
-            if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+            if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
                 self.application().showMessageTray(msg="Download terminated!")
             else:                    
                 self.InformationMsg.emit( title=self.tr("Download Test Result"), 
@@ -2432,7 +2432,7 @@ class RestClientInterface(QObject, Logger.ClassLogger):
         Called on response
         """
         self.trace("on task killed")
-        if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+        if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
             self.application().showMessageWarningTray(msg="Test(s) killed!")
         else:
             self.WarningMsg.emit( self.tr("Kill test") , self.tr("The test is stopped!") )
@@ -2444,7 +2444,7 @@ class RestClientInterface(QObject, Logger.ClassLogger):
         Called on response
         """
         self.trace("on task killed")
-        if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+        if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
             self.application().showMessageWarningTray(msg="All test(s) killed!")
         else:
             self.WarningMsg.emit( self.tr("Kill tests") , self.tr("All tests are stopped!") )
@@ -2456,7 +2456,7 @@ class RestClientInterface(QObject, Logger.ClassLogger):
         Called on response
         """
         self.trace("on task killed")
-        if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+        if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
             self.application().showMessageWarningTray(msg="All test(s) killed!")
         else:
             self.WarningMsg.emit( self.tr("Kill tests") , self.tr("All tests are stopped!") )
@@ -2468,7 +2468,7 @@ class RestClientInterface(QObject, Logger.ClassLogger):
         Called on response
         """
         self.trace("on task cancelled")
-        if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+        if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
             self.application().showMessageWarningTray(msg="Test(s) cancelled!")
         else:
             self.WarningMsg.emit( self.tr("Kill test") , self.tr("The test is cancelled!") )
@@ -2480,7 +2480,7 @@ class RestClientInterface(QObject, Logger.ClassLogger):
         Called on response
         """
         self.trace("on task cancelled")
-        if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+        if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
             self.application().showMessageWarningTray(msg="All test(s) cancelled!")
         else:
             self.WarningMsg.emit( self.tr("Kill tests") , self.tr("All tests are cancelled!") )
@@ -2490,7 +2490,7 @@ class RestClientInterface(QObject, Logger.ClassLogger):
         Called on response
         """
         self.trace("on task cancelled")
-        if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+        if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
             self.application().showMessageWarningTray(msg="All test(s) cancelled!")
         else:
             self.WarningMsg.emit( self.tr("Kill tests") , self.tr("All tests are cancelled!") )
@@ -2500,7 +2500,7 @@ class RestClientInterface(QObject, Logger.ClassLogger):
         Called on response
         """
         self.trace("on tests metrics reseted")
-        if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+        if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
             self.ResetStatistics.emit()
             self.application().showMessageWarningTray(msg="Statistics are reseted!")
         else:
@@ -2634,7 +2634,7 @@ class RestClientInterface(QObject, Logger.ClassLogger):
         Called on response
         """
         self.trace("on task schedule")
-        if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+        if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
             self.application().showMessageWarningTray(msg="Test(s) rescheduled!")
         else:
             self.InformationMsg.emit( self.tr("Re-schedule test execution") , self.tr("Test execution rescheduled!") )
@@ -2824,7 +2824,7 @@ class RestClientInterface(QObject, Logger.ClassLogger):
         # remove unneeded data
         del content
 
-        if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+        if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
             self.application().showMessageTray(msg="Download terminated!")
         else:
             self.InformationMsg.emit( title=self.tr("Download Backup"), 
@@ -2847,7 +2847,7 @@ class RestClientInterface(QObject, Logger.ClassLogger):
         # remove unneeded data
         del content
 
-        if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+        if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
             self.application().showMessageTray(msg="Download terminated!")
         else:
             self.InformationMsg.emit( title=self.tr("Download Backup"), 
@@ -2870,7 +2870,7 @@ class RestClientInterface(QObject, Logger.ClassLogger):
         # remove unneeded data
         del content
 
-        if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+        if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
             self.application().showMessageTray(msg="Download terminated!")
         else:
             self.InformationMsg.emit( title=self.tr("Download Backup"), 
@@ -2893,7 +2893,7 @@ class RestClientInterface(QObject, Logger.ClassLogger):
         # remove unneeded data
         # del content
 
-        # if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+        # if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
             # self.application().showMessageTray(msg="Download terminated!")
         # else:
             # self.InformationMsg.emit( title=self.tr("Download Backup"), 
@@ -2904,7 +2904,7 @@ class RestClientInterface(QObject, Logger.ClassLogger):
         Called on response
         """
         self.trace("on reset tests") 
-        if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+        if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
             self.application().showMessageTray(msg="The tests repository is now empty!")
         else:
             self.InformationMsg.emit( self.tr("Empty remote tests repository") , 
@@ -3018,8 +3018,8 @@ class RestClientInterface(QObject, Logger.ClassLogger):
         if not details["client-available"]:
             if details["recheck"]:
                 self.updateTimer.stop()
-                if QtHelper.str2bool( Settings.instance().readValue( key = 'Update/enable' ) ):
-                    self.updateTimer.start( int(Settings.instance().readValue( key = 'Update/retry' )) )
+                if Settings.instance().readValue( key = 'Update/enable', rType = 'bool' ):
+                    self.updateTimer.start( Settings.instance().readValue( key = 'Update/retry', rType = 'int' ) )
             else:
                 self.InformationMsg.emit( self.tr("Check for update") , self.tr("No update available") )
         else:
@@ -3552,7 +3552,7 @@ class RestClientInterface(QObject, Logger.ClassLogger):
         """
         self.trace("on adapter added from wsdl url")
         
-        if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+        if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
             self.application().showMessageTray(msg="Adapter generated successfully!")
         else:
             self.InformationMsg.emit( self.tr("Adapter generator") , 
@@ -3566,7 +3566,7 @@ class RestClientInterface(QObject, Logger.ClassLogger):
         """
         self.trace("on adapter added from wsdl file") 
         
-        if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+        if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
             self.application().showMessageTray(msg="Adapter generated successfully!")
         else:
             self.InformationMsg.emit( self.tr("Adapter generator") , 
@@ -3580,7 +3580,7 @@ class RestClientInterface(QObject, Logger.ClassLogger):
         """
         self.trace("on default all tests") 
         
-        if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+        if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
             self.application().showMessageTray(msg="All tests are updated!")
         else:
             self.InformationMsg.emit( self.tr("Set default version"), 
@@ -3634,7 +3634,7 @@ class RestClientInterface(QObject, Logger.ClassLogger):
         """
         self.trace("on tests scheduled")
         
-        if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+        if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
             self.application().showMessageTray(msg="Group of test(s) enqueued to run.")
         else:
             self.InformationMsg.emit( self.tr("Tests Execution") , 
@@ -3650,28 +3650,28 @@ class RestClientInterface(QObject, Logger.ClassLogger):
                                    "postponed-background", "successive-background" ]:
             TestResults.instance().delWidgetTest( testId = details["tab-id"] )
             if details["message"] == "successive-background":  
-                if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+                if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
                     self.application().showMessageTray(msg="Your test is running several time in background.")
                 else:
                     self.InformationMsg.emit( self.tr("Test Execution") ,
                                               self.tr("Your test is running several time in background.") )
                                               
             elif details["message"] == "recursive-background":
-                if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+                if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
                     self.application().showMessageTray(msg="Recursive test execution scheduled!")
                 else:
                     self.InformationMsg.emit( self.tr("Test Execution") , 
                                               self.tr('Recursive test execution scheduled!') )
                                               
             elif details["message"] == "postponed-background":
-                if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+                if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
                     self.application().showMessageTray(msg="Test execution postponed!")
                 else:
                     self.InformationMsg.emit( self.tr("Test Execution") , 
                                               self.tr('Test execution postponed!') )
                                               
             elif details["message"] == "background":
-                if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+                if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
                     self.application().showMessageTray(msg="Your test is running in background.")
                 else:
                     self.InformationMsg.emit( self.tr("Test Execution") , 
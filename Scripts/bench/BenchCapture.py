@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------------------------
+# Copyright (c) 2010-2020 Denis Machard
+# This file is part of the extensive automation project
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301 USA
+# -------------------------------------------------------------------
+
+"""
+Benchmark of the capture reader mapped in memory (Libs/Pcap/capture.py)
+against the pcap and pcapng readers, on synthetic captures of http requests:
+ - time and peak of memory to read all the packets
+ - time to build the index of the packets, with numpy if installed
+ - time to decode the tcp packets read from the mapping
+The packets read are compared with the ones of the previous readers
+
+Usage: python Scripts/bench/BenchCapture.py [number of packets]
+"""
+
+import sys
+import os
+import struct
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from Libs.Pcap import capture, parse, pcap, pcapng
+
+LINKTYPE_ETHERNET = 1
+TIMESTAMP = 1600000000
+
+def packet(i):
+    """
+    Ethernet, ipv4 and tcp headers with a http request of variable size
+    """
+    payload = (b"GET /%d HTTP/1.1\r\nHost: 10.0.0.2\r\n\r\n" % i) * (1 + i % 5)
+    tcp = struct.pack('!HHIIBB6x', 40000 + i % 7, 80, i, 0, 5 << 4, 0x18)
+    ip = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + len(tcp) + len(payload), i & 0xFFFF, 0, 64, 6, 0,
+                     b"\x0a\x00\x00\x01", b"\x0a\x00\x00\x02")
+    return b"\x00\x11\x22\x33\x44\x55\x66\x77\x88\x99\xaa\xbb\x08\x00" + ip + tcp + payload
+
+def writePcap(filename, count):
+    """
+    Pcap file in little endian with microseconds
+    """
+    with open(filename, 'wb') as f:
+        f.write( struct.pack('<IHHiIII', capture.PCAP_MAGIC, 2, 4, 0, 0, 65535, LINKTYPE_ETHERNET) )
+        for i in range(count):
+            p = packet(i)
+            f.write( struct.pack('<IIII', TIMESTAMP + i // 1000, (i % 1000) * 1000, len(p), len(p)) )
+            f.write( p )
+
+def writePcapng(filename, count):
+    """
+    Pcapng file with one interface in nanoseconds and enhanced packet blocks
+    """
+    with open(filename, 'wb') as f:
+        # section header: byte order magic, version 1.0, unknown section length
+        f.write( struct.pack('<IIIHHqI', capture.BLOCK_SECTION_HEADER, 28, capture.PCAPNG_BYTEORDER_MAGIC,
+                             1, 0, -1, 28) )
+        # interface with the if_tsresol option: 10^-9
+        options = struct.pack('<HHB3x', capture.OPTION_TSRESOL, 1, 9) + struct.pack('<HH', capture.OPTION_END, 0)
+        f.write( struct.pack('<IIHHI', capture.BLOCK_INTERFACE_DESCRIPTION, 20 + len(options),
+                             LINKTYPE_ETHERNET, 0, 65535) + options + struct.pack('<I', 20 + len(options)) )
+        for i in range(count):
+            p = packet(i)
+            padding = (-len(p)) % 4
+            blockLen = 32 + len(p) + padding
+            ts = (TIMESTAMP + i // 1000) * 10**9 + (i % 1000) * 10**6
+            f.write( struct.pack('<IIIIIII', capture.BLOCK_ENHANCED_PACKET, blockLen, 0, ts >> 32,
+                                 ts & 0xFFFFFFFF, len(p), len(p)) )
+            f.write( p + b"\x00" * padding + struct.pack('<I', blockLen) )
+
+def readPrevious(filename, reader):
+    """
+    List of all the packets read with the previous reader, as in the replay dialogs
+    """
+    with open(filename, 'rb') as f:
+        fileFormat, head = parse.extractFormat(f)
+        return list( reader(f, head).read_packet() )
+
+def peak(func):
+    """
+    Return the peak of memory allocated by the function
+    """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def iterate(cf):
+    """
+    Read all the packets of the mapping, nothing is kept
+    """
+    n = 0
+    for p in cf.read_packet():
+        n += 1
+    return n
+
+def bench(filename, reader):
+    """
+    Compare the readers on the capture
+    """
+    start = time.perf_counter()
+    packets = readPrevious(filename, reader)
+    previousTime = time.perf_counter() - start
+    previousPeak = peak( lambda: readPrevious(filename, reader) )
+
+    cf = capture.CaptureFile(filename)
+    start = time.perf_counter()
+    count = iterate(cf)
+    mmapTime = time.perf_counter() - start
+    mmapPeak = peak( lambda: iterate(cf) )
+
+    same = count == len(packets) and all( a[0] == b[0] and a[1] == b[1] and a[2] == bytes(b[2])
+                                          for a, b in zip(packets, cf.read_packet()) )
+
+    start = time.perf_counter()
+    index = cf.build_index()
+    indexTime = time.perf_counter() - start
+    sameIndex = len(index) == count and all( bytes(cf.get_packet(i)[2]) == packets[i][2]
+                                              and cf.get_packet(i)[1] == packets[i][1]
+                                              for i in range(0, count, 997) )
+
+    start = time.perf_counter()
+    decoded = sum( 1 for p in cf.read_packet() if parse.decodePacket(p, getTcp=True) is not None )
+    decodeTime = time.perf_counter() - start
+    cf.close()
+
+    print("%s: %d packets, %.1f MB" % (os.path.basename(filename), count, os.path.getsize(filename) / 1e6))
+    print("  previous list  %6.2f s  peak=%7.1f MB" % (previousTime, previousPeak / 1e6))
+    print("  mmap iterate   %6.2f s  peak=%7.1f MB" % (mmapTime, mmapPeak / 1e6))
+    print("  mmap index     %6.2f s  numpy=%s" % (indexTime, capture.numpy is not None))
+    print("  mmap decode    %6.2f s  %d tcp packets" % (decodeTime, decoded))
+    print("  same packets=%s same index=%s" % (same, sameIndex))
+    return same and sameIndex
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    directory = tempfile.mkdtemp()
+    ok = True
+    try:
+        for name, writer, reader in [ ("bench.pcap", writePcap, pcap.PcapFile),
+                                      ("bench.pcapng", writePcapng, pcapng.PcapngFile) ]:
+            filename = os.path.join(directory, name)
+            try:
+                writer(filename, count)
+                ok = bench(filename, reader) and ok
+            finally:
+                if os.path.exists(filename):
+                    os.remove(filename)
+    finally:
+        os.rmdir(directory)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------------------------
+# Copyright (c) 2010-2020 Denis Machard
+# This file is part of the extensive automation project
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301 USA
+# -------------------------------------------------------------------
+
+"""
+Matrix of the compression algorithms and levels available for the body
+of the messages over typical payloads, with the time to send the bodies of
+a test run on a lan and on a wan link (compression, transfer and decompression)
+The best settings of the Network section are printed for both links
+
+Usage: python Scripts/bench/BenchCompression.py [duration of each case in seconds]
+"""
+
+import sys
+import os
+import time
+import pickle
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from Libs.NetLayerLib import Messages
+
+import TestEvents
+
+# bandwidth of the links in bytes per second
+LINKS = [ ("lan", 1000 * 1000 * 1000 / 8), ("wan", 10 * 1000 * 1000 / 8) ]
+
+# levels tested for each algorithm, -1 is the default level
+LEVELS = {
+    Messages.COMPRESSION_NONE: [ -1 ],
+    Messages.COMPRESSION_ZLIB: [ 1, 3, 6, 9 ],
+    Messages.COMPRESSION_LZ4: [ 0, 3, 9 ],
+    Messages.COMPRESSION_ZSTD: [ 1, 3, 9 ],
+}
+
+# sizes of the small bodies tested for the minimum size, bodies smaller are sent without compression
+SMALL_SIZES = [ 96, 128, 160, 192, 256, 384, 512, 768, 1024, 2048 ]
+
+def body(data):
+    """
+    Body serialized as in the messages
+    """
+    return pickle.dumps(data, protocol=2)
+
+def payloads():
+    """
+    Typical bodies and their number in a test run
+    """
+    return [
+        ( "control", body( { "cmd": "get-probes", "task-id": 12 } ), 200 ),
+        ( "1 event", body( { "task-id": 1, "event": TestEvents.testEvent(1) } ), 2000 ),
+        ( "1 payload", body( { "task-id": 1, "event": TestEvents.testEvent(3) } ), 600 ),
+        ( "50 events", body( { "task-id": 1, "events": TestEvents.testEvents(50) } ), 40 ),
+        ( "256KB payload", body( { "task-id": 1, "event": TestEvents.testEvent(7, payloadSize=256 * 1024) } ), 4 ),
+        ( "random 64KB", body( { "file": os.urandom(64 * 1024) } ), 4 ),
+    ]
+
+def smallBody(size):
+    """
+    Body of an event with the short message extended up to the size
+    """
+    event = { "event": "testcase", "level": "info", "short-msg": "" }
+    text = " ".join( TestEvents.testEvent(i)["short-msg"] for i in range(size // 40 + 1) )
+    event["short-msg"] = text[:max(0, size - len(body( { "task-id": 1, "event": event } )))]
+    return body( { "task-id": 1, "event": event } )
+
+def timeit(func, duration):
+    """
+    Return the best time of one call, the function is called during the duration
+    """
+    best = None
+    end = time.perf_counter() + duration
+    while best is None or time.perf_counter() < end:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def measure(algo, level, data, duration):
+    """
+    Return the size compressed, the time to compress and to decompress
+    """
+    codec = Messages.Messages()
+    codec.setCompression(algo=algo, level=level, minSize=0)
+    compressed = codec.compress(data)
+    if codec.decompress(compressed) != data:
+        raise Exception("%s level %s: body corrupted" % (algo, level))
+    return ( len(compressed), timeit( lambda: codec.compress(data), duration ),
+             timeit( lambda: codec.decompress(compressed), duration ) )
+
+def transfer(size, compressTime, decompressTime, bandwidth):
+    """
+    Time to send one body on the link
+    """
+    return compressTime + size / bandwidth + decompressTime
+
+def matrix(duration):
+    """
+    Measure all the cases and print the matrix
+    """
+    results = {}
+    for name, data, count in payloads():
+        print("%s: %d bytes, %d in a test run" % (name, len(data), count))
+        for algo in Messages.supportedCompressions():
+            for level in LEVELS[algo]:
+                size, compressTime, decompressTime = measure(algo, level, data, duration)
+                results[ (name, algo, level) ] = (len(data), size, compressTime, decompressTime, count)
+                line = "  %-5s %3d  ratio=%5.2f  compress=%8.1f us  decompress=%8.1f us" % (
+                        algo, level, float(len(data)) / size, compressTime * 1e6, decompressTime * 1e6 )
+                for link, bandwidth in LINKS:
+                    line += "  %s=%8.1f us" % (link, transfer(size, compressTime, decompressTime, bandwidth) * 1e6)
+                print(line)
+    return results
+
+def runTime(results, algo, level, minSize, bandwidth):
+    """
+    Time to send the bodies of a test run with the settings
+    """
+    total = 0.0
+    for (name, a, l), (rawSize, size, compressTime, decompressTime, count) in results.items():
+        if minSize and rawSize < minSize:
+            # sent without compression
+            if a != Messages.COMPRESSION_NONE:
+                continue
+        elif a != algo or l != level:
+            continue
+        total += count * transfer(size, compressTime, decompressTime, bandwidth)
+    return total
+
+def minimumSize(algo, level, bandwidth, duration):
+    """
+    Return the size from which the compression is faster than the raw body on the link
+    """
+    minSize = None
+    for size in SMALL_SIZES:
+        data = smallBody(size)
+        compressed = transfer( *measure(algo, level, data, duration) + (bandwidth,) )
+        raw = transfer( *measure(Messages.COMPRESSION_NONE, -1, data, duration) + (bandwidth,) )
+        print("  %5d bytes: %-5s %3d=%7.1f us  none=%7.1f us" % (len(data), algo, level, compressed * 1e6, raw * 1e6))
+        if compressed < raw:
+            if minSize is None: minSize = len(data)
+        else:
+            minSize = None
+    return minSize
+
+def recommend(results, duration):
+    """
+    Print the settings with the lowest time for each link
+    """
+    cases = [ (algo, level) for algo in Messages.supportedCompressions() for level in LEVELS[algo] ]
+    for link, bandwidth in LINKS:
+        print("")
+        print("%s, %.0f Mbit/s: time to send the bodies of a test run" % (link, bandwidth * 8 / 1e6))
+        best = None
+        for algo, level in cases:
+            total = runTime(results, algo, level, 0, bandwidth)
+            print("  %-5s %3d  %9.1f ms" % (algo, level, total * 1000))
+            if best is None or total < best[0]:
+                best = (total, algo, level)
+        total, algo, level = best
+        minSize = 0
+        if algo != Messages.COMPRESSION_NONE:
+            print("%s: minimum size of the compression" % link)
+            minSize = minimumSize(algo, level, bandwidth, duration)
+            if minSize is None:
+                algo, level, minSize = Messages.COMPRESSION_NONE, -1, 0
+            total = runTime(results, algo, level, minSize, bandwidth)
+        print("%s best: compression=%s compression-level=%s compression-min-size=%s (%.1f ms)" % (
+                link, algo, level, minSize, total * 1000))
+
+if __name__ == '__main__':
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 0.2
+    recommend( matrix(duration), duration )
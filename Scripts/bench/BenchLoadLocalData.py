@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------------------------
+# Copyright (c) 2010-2020 Denis Machard
+# This file is part of the extensive automation project
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301 USA
+# -------------------------------------------------------------------
+
+"""
+Loading of one testcase from a local test result of 200k events, as done
+by TestResult.loadLocalData without the gui:
+ - previous loading: scan of all the lines of the test result in memory,
+   with the membership test in the range of lines of the testcase
+ - current loading: lines of the testcase only (blocks of the indexed format)
+   decoded by EventDecoder and delivered by batch
+
+The test results are generated in the old and the indexed formats, the old
+format is parsed with lxml as in the application
+
+Usage: python Scripts/bench/BenchLoadLocalData.py [number of events] [number of testcases] [workers]
+"""
+
+import sys
+import os
+import io
+import zlib
+import base64
+import pickle
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import Workspace.FileModels.TestResult as TestResultModel
+import Libs.EventDecoder as EventDecoder
+
+import TestEvents
+
+# time budget of the previous loading, the total is extrapolated after
+OLD_BUDGET = 10.0
+
+def encodeLine(event):
+    """
+    Line of the test result, event pickled and encoded in base64
+    """
+    return base64.b64encode( pickle.dumps(event, protocol=2) ).decode("ascii") + "\n"
+
+def generate(path, nbEvents, nbTestcases):
+    """
+    Generate a test result of one script with several testcases
+
+    @return: start and stop indexes of the testcases, as in the tree of the test result
+    @rtype: list
+    """
+    lines = [ encodeLine( { "event": "script-started", "script_id": "1", "timestamp": "10:00:00.000" } ) ]
+    indexes = []
+    perTestcase = nbEvents // nbTestcases
+    for tc in range(nbTestcases):
+        tcId = "1-%d" % (tc + 1)
+        first = len(lines)
+        for i in range(perTestcase):
+            lines.append( encodeLine( TestEvents.testEvent(tc * perTestcase + i, scriptId="1", tcId=tcId) ) )
+        # same indexes as the items of the tree: lines from startIndex-1 to stopIndex-2
+        indexes.append( (tcId, first + 1, len(lines) + 1) )
+    lines.append( encodeLine( { "event": "script-stopped", "script_id": "1", "timestamp": "11:00:00.000" } ) )
+
+    testresult = "".join(lines)
+    testheader = "".join(lines[:1])
+
+    # old format, the xml is written directly because DataModel.toXml expects bytes
+    xml = [ '<?xml version="1.0" encoding="utf-8" ?>', '<file>',
+            '<properties><comments><comment><author>bench</author><datetime>0</datetime>'
+            '<post>bench</post></comment></comments></properties>',
+            '<testresult><![CDATA[%s]]></testresult>' % base64.b64encode( zlib.compress(testresult.encode("utf8")) ).decode("ascii"),
+            '<testheader><![CDATA[%s]]></testheader>' % base64.b64encode( zlib.compress(testheader.encode("utf8")) ).decode("ascii"),
+            '</file>' ]
+    with open(path + ".trx", "wb") as f:
+        f.write( zlib.compress( "\n".join(xml).encode("utf8") ) )
+
+    dataModel = TestResultModel.DataModel( testResult=testresult, testHeader=testheader )
+    dataModel.properties = { "properties": { "comments": { "comment": [] } } }
+    if not dataModel.saveIndexed( absPath=path + ".trxi" ):
+        raise Exception("unable to save the indexed test result")
+    return indexes
+
+def loadOld(path, startIndex, stopIndex):
+    """
+    Previous loading, see loadLocalData before the streaming
+
+    @return: number of events, total time, extrapolated if the budget is exceeded
+    @rtype: tuple
+    """
+    start = time.perf_counter()
+    dataModel = TestResultModel.DataModel()
+    dataModel.load( absPath=path + ".trx" )
+    f = io.StringIO( dataModel.testresult )
+    count = 0
+    n = 0
+    for n, line in enumerate(f):
+        if n + 1 in list(range(startIndex, stopIndex)):
+            event = EventDecoder.decodeLine(line)
+            if event["script_id"] == "1":
+                count += 1
+        if time.perf_counter() - start > OLD_BUDGET:
+            break
+    elapsed = time.perf_counter() - start
+    total = dataModel.testresult.count("\n")
+    return count, elapsed * total / (n + 1), n + 1 < total
+
+def loadNew(path, startIndex, stopIndex):
+    """
+    Current loading, see loadLocalData
+
+    @return: number of events, time of the first batch, total time
+    @rtype: tuple
+    """
+    start = time.perf_counter()
+    dataModel = TestResultModel.DataModel()
+    dataModel.load( absPath=path + ".trxi" )
+    lines = dataModel.getLines( firstLine=startIndex - 1, lastLine=stopIndex - 2 )
+
+    state = { "count": 0, "first": None }
+    finished = threading.Event()
+    def onEvents(events):
+        if state["first"] is None:
+            state["first"] = time.perf_counter() - start
+        for n, event, err in events:
+            if event is None:
+                raise Exception(err)
+            if event["script_id"] == "1":
+                state["count"] += 1
+    job = EventDecoder.DecodingJob( lines=lines, onEvents=onEvents, onFinished=finished.set )
+    job.start()
+    finished.wait()
+    job.join()
+    return state["count"], state["first"], time.perf_counter() - start
+
+if __name__ == '__main__':
+    nbEvents = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    nbTestcases = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    EventDecoder.initialize( workers=int(sys.argv[3]) if len(sys.argv) > 3 else 0 )
+
+    path = os.path.join( tempfile.mkdtemp(), "bench" )
+    start = time.perf_counter()
+    indexes = generate(path, nbEvents, nbTestcases)
+    print("%d events in %d testcases generated in %.1f s: %s.trx %d bytes, %s.trxi %d bytes" % (
+            nbEvents, nbTestcases, time.perf_counter() - start, path, os.path.getsize(path + ".trx"),
+            path, os.path.getsize(path + ".trxi") ) )
+    print("decoding workers: %d" % EventDecoder.getWorkers())
+
+    try:
+        for tcId, startIndex, stopIndex in [ indexes[0], indexes[len(indexes) // 2], indexes[-1] ]:
+            print("testcase %s, lines %d to %d" % (tcId, startIndex - 1, stopIndex - 2))
+            count, first, total = loadNew(path, startIndex, stopIndex)
+            print("  current   %6d events  first batch=%7.3f s  total=%7.3f s" % (count, first, total))
+            count, total, extrapolated = loadOld(path, startIndex, stopIndex)
+            print("  previous  %6d events                       total=%7.3f s%s" % (
+                    count, total, " (extrapolated)" if extrapolated else ""))
+    finally:
+        EventDecoder.finalize()
+        for ext in [ ".trx", ".trxi" ]:
+            os.remove(path + ext)
+        os.rmdir( os.path.dirname(path) )
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------------------------
+# Copyright (c) 2010-2020 Denis Machard
+# This file is part of the extensive automation project
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301 USA
+# -------------------------------------------------------------------
+
+"""
+Benchmark of the encoding and decoding of notifies with test events,
+text codec (base64) against binary codec, with the body zipped as
+without negotiation and without compression
+
+Usage: python Scripts/bench/BenchMessages.py [duration of each case in seconds]
+"""
+
+import sys
+import os
+import copy
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from Libs.NetLayerLib import Messages
+
+import TestEvents
+
+# compression of the body: None is the default without negotiation, zipped without the algorithm byte
+COMPRESSIONS = [ ("zlib", None), ("none", Messages.COMPRESSION_NONE) ]
+
+def bodies():
+    """
+    Bodies of the notifies: one event, a batch of live events and one big payload
+    """
+    return [
+        ( "1 event", { "task-id": 1, "event": TestEvents.testEvent(3) } ),
+        ( "50 events", { "task-id": 1, "events": TestEvents.testEvents(50) } ),
+        ( "256KB payload", { "task-id": 1, "event": TestEvents.testEvent(3, payloadSize=256 * 1024) } ),
+    ]
+
+def codec(name, compression):
+    """
+    Return a codec configured as after the registration
+    """
+    c = Messages.Messages(userId="bench")
+    c.setCodec(name)
+    if compression is not None:
+        c.setCompression(algo=compression)
+    return c
+
+def timeit(func, duration):
+    """
+    Return the best time of one call, the function is called during the duration
+    """
+    best = None
+    end = time.perf_counter() + duration
+    while best is None or time.perf_counter() < end:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def bench(bodyName, body, codecName, compressionName, compression, duration):
+    """
+    Encode and decode one notify
+    """
+    encoder = codec(codecName, compression)
+    decoder = codec(codecName, compression)
+    msg = encoder.notify(tid=1, body=body)
+    decoded = decoder.decode(msgraw=msg)
+    # the bytes in utf-8 are decoded by the codec
+    if decoded[1]['body'] != Messages.bytes_to_unicode(copy.deepcopy(body)):
+        raise Exception("%s %s %s: body corrupted" % (bodyName, codecName, compressionName))
+
+    encodeTime = timeit( lambda: encoder.notify(tid=1, body=body), duration )
+    decodeTime = timeit( lambda: decoder.decode(msgraw=msg), duration )
+    print("  %-7s %-5s size=%8d  encode=%9.1f us  decode=%9.1f us" % (
+            codecName, compressionName, len(msg), encodeTime * 1e6, decodeTime * 1e6 ) )
+
+if __name__ == '__main__':
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 0.5
+    for bodyName, body in bodies():
+        print(bodyName)
+        for codecName in [ Messages.CODEC_TEXT, Messages.CODEC_BINARY ]:
+            for compressionName, compression in COMPRESSIONS:
+                bench(bodyName, body, codecName, compressionName, compression, duration)
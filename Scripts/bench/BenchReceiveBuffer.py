@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------------------------
+# Copyright (c) 2010-2020 Denis Machard
+# This file is part of the extensive automation project
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301 USA
+# -------------------------------------------------------------------
+
+"""
+Benchmark of the receive path of TcpClientThread, several megabytes of
+frames are written in a socketpair by a thread and read with:
+ - the previous buffer of bytes joined on each read and split on the terminator
+ - ReceiveBuffer.recvInto and nextFrame with the terminator
+ - ReceiveBuffer.recvInto and nextSizedFrame with the length prefix
+
+Usage: python Scripts/bench/BenchReceiveBuffer.py [total size in MB]
+"""
+
+import sys
+import os
+import socket
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from Libs.NetLayerLib.TcpClient import ReceiveBuffer, RECV_SIZE, FRAME_LENGTH
+
+TERMINATOR = b"\x00"
+
+# frame sizes of each profile, used in turn
+PROFILES = [
+    ( "small", [ 120, 300, 80, 1500 ] ),
+    ( "mixed", [ 200, 4096, 65536, 900, 250000 ] ),
+    ( "large", [ 1024 * 1024, 3 * 1024 * 1024, 512 * 1024 ] ),
+]
+
+def frames(sizes, total):
+    """
+    Frames of the profile until the total size, the content never contains the terminator
+    """
+    ret = []
+    size = 0
+    i = 0
+    while size < total:
+        length = sizes[i % len(sizes)]
+        ret.append( (b"%08d" % i + b"x" * length)[:length] )
+        size += length
+        i += 1
+    return ret
+
+def encode(frames, sized):
+    """
+    Frames as sent on the network
+    """
+    if sized:
+        return b"".join( FRAME_LENGTH.pack(len(f)) + f for f in frames )
+    return b"".join( f + TERMINATOR for f in frames )
+
+def write(sock, data):
+    """
+    Write all the data in the socket
+    """
+    sock.sendall(data)
+    sock.shutdown(socket.SHUT_WR)
+
+def readJoined(sock):
+    """
+    Previous receive path: recv of 8192 bytes, bytes joined and split on the terminator
+    """
+    count = size = 0
+    buf = b''
+    while True:
+        read = sock.recv(8192)
+        if not read:
+            break
+        buf = b''.join([buf, read])
+        pdus = buf.split(TERMINATOR)
+        for pdu in pdus[:-1]:
+            count += 1
+            size += len(pdu)
+        buf = pdus[-1]
+    return count, size
+
+def readTerminator(sock):
+    """
+    Receive buffer, frames ended by the terminator
+    """
+    count = size = 0
+    rxBuffer = ReceiveBuffer()
+    while rxBuffer.recvInto(sock, RECV_SIZE):
+        frame = rxBuffer.nextFrame(TERMINATOR)
+        while frame is not None:
+            count += 1
+            size += len(frame)
+            frame = rxBuffer.nextFrame(TERMINATOR)
+    return count, size
+
+def readSized(sock):
+    """
+    Receive buffer, frames prefixed by their length
+    """
+    count = size = 0
+    rxBuffer = ReceiveBuffer()
+    while rxBuffer.recvInto(sock, RECV_SIZE):
+        frame = rxBuffer.nextSizedFrame()
+        while frame is not None:
+            count += 1
+            size += len(frame)
+            frame = rxBuffer.nextSizedFrame()
+    return count, size
+
+def bench(name, reader, sized, data):
+    """
+    Feed the frames in a socketpair and read them
+    """
+    reader_sock, writer_sock = socket.socketpair()
+    writer = threading.Thread(target=write, args=(writer_sock, encode(data, sized)))
+    start = time.perf_counter()
+    writer.start()
+    count, size = reader(reader_sock)
+    elapsed = time.perf_counter() - start
+    writer.join()
+    reader_sock.close()
+    writer_sock.close()
+
+    if count != len(data) or size != sum( len(f) for f in data ):
+        raise Exception("%s: %d frames of %d bytes read, %d expected" % (name, count, size, len(data)))
+    print("  %-12s %7d frames  %8.3f s  %8.1f MB/s" % (name, count, elapsed, size / elapsed / 1e6))
+
+if __name__ == '__main__':
+    total = int(float(sys.argv[1]) * 1e6) if len(sys.argv) > 1 else 32 * 1000 * 1000
+    for profile, sizes in PROFILES:
+        data = frames(sizes, total)
+        print("%s frames, %.1f MB" % (profile, total / 1e6))
+        bench("joined", readJoined, False, data)
+        bench("terminator", readTerminator, False, data)
+        bench("sized", readSized, True, data)
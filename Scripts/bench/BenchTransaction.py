@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------------------------
+# Copyright (c) 2010-2020 Denis Machard
+# This file is part of the extensive automation project
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301 USA
+# -------------------------------------------------------------------
+
+"""
+Round trip of synchronous requests through the transaction manager on a
+loopback tcp connection, the response is waited on the event of the
+transaction and with the previous sleep polling of 100ms
+
+Usage: python Scripts/bench/BenchTransaction.py [number of requests]
+"""
+
+import sys
+import os
+import socket
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from Libs.NetLayerLib import Messages
+from Libs.NetLayerLib import TransactionManager
+from Libs.NetLayerLib.TcpClient import ReceiveBuffer
+
+TERMINATOR = b"\x00"
+
+class Manager(TransactionManager.TransactionManager):
+    """
+    Transaction manager without traces
+    """
+    def trace(self, txt):
+        pass
+
+def readMessages(sock, codec, callback):
+    """
+    Read the messages ended by the terminator until the connection is closed
+    """
+    rxBuffer = ReceiveBuffer()
+    while rxBuffer.recvInto(sock):
+        frame = rxBuffer.nextFrame(TERMINATOR)
+        while frame is not None:
+            callback( codec.decode(msgraw=frame) )
+            frame = rxBuffer.nextFrame(TERMINATOR)
+
+def serve(sock):
+    """
+    Server side, each request is answered with ok and the same body
+    """
+    codec = Messages.Messages()
+    def onRequest(message):
+        request = message[1]
+        sock.sendall( codec.ok(tid=request['tid'], body=request['body']) + TERMINATOR )
+    readMessages(sock, codec, onRequest)
+    sock.close()
+
+def pollResponse(transaction, responseTimeout = 30.0):
+    """
+    Previous wait of the response, the event is checked every 100ms
+    """
+    startTime = transaction.timestamp
+    while not transaction.event.is_set():
+        time.sleep(0.1)
+        if (time.time() - startTime) >= responseTimeout:
+            break
+    transaction.release()
+    return transaction.response
+
+def waitResponse(transaction, responseTimeout = 30.0):
+    """
+    Wait of the response on the event
+    """
+    return transaction.result(timeout=responseTimeout)
+
+def bench(name, wait, count):
+    """
+    Send count synchronous requests one after the other
+    """
+    server, client = loopback()
+    serverThread = threading.Thread(target=serve, args=(server,))
+    serverThread.start()
+
+    manager = Manager()
+    manager.start()
+    codec = Messages.Messages(userId="bench")
+    readerThread = threading.Thread( target=readMessages,
+                                     args=(client, Messages.Messages(), lambda m: manager.onMessage(message=m)) )
+    readerThread.start()
+
+    body = { 'cmd': 'get-probes', 'probes': [ 'probe%d' % i for i in range(10) ] }
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        transaction = manager.newTransaction(waitResponse=True)
+        client.sendall( codec.cmd(tid=transaction.tid, body=body) + TERMINATOR )
+        response = wait(transaction)
+        latencies.append( time.perf_counter() - start )
+        if response is None or response['body'] != body:
+            raise Exception("%s: bad response for the transaction %s" % (name, transaction.tid))
+
+    client.shutdown(socket.SHUT_WR)
+    serverThread.join()
+    readerThread.join()
+    client.close()
+    manager.stop()
+
+    latencies.sort()
+    print("%-8s %6d requests  p50=%8.3f ms  p99=%8.3f ms  max=%8.3f ms  %8.1f requests/s" % (
+            name, count, latencies[count // 2] * 1000, latencies[min(count - 1, count * 99 // 100)] * 1000,
+            latencies[-1] * 1000, count / sum(latencies) ) )
+
+def loopback():
+    """
+    Return a connected pair of tcp sockets on the loopback
+    """
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind( ('127.0.0.1', 0) )
+    listener.listen(1)
+    client = socket.create_connection( listener.getsockname() )
+    client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    server, _ = listener.accept()
+    server.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    listener.close()
+    return server, client
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    bench("event", waitResponse, count)
+    # 100ms per request at least, a few requests are enough
+    bench("polling", pollResponse, min(count, 20))
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------------------------
+# Copyright (c) 2010-2020 Denis Machard
+# This file is part of the extensive automation project
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301 USA
+# -------------------------------------------------------------------
+
+"""
+Check and benchmark of Messages.bytes_to_unicode against the previous
+implementation, python3 only
+
+Usage: python Scripts/bench/BenchUnicode.py [iterations]
+"""
+
+import sys
+import os
+import copy
+import io
+import time
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from Libs.NetLayerLib import Messages
+
+def old_bytes_to_unicode(ob):
+    """
+    Previous implementation, kept as reference
+    """
+    t = type(ob)
+    if t in (list, tuple):
+        try:
+            l = [str(i, 'utf-8') if type(i) is bytes else i for i in ob]
+        except UnicodeDecodeError as e:
+            l = [ i for i in ob] # keep as bytes
+        l = [old_bytes_to_unicode(i) if type(i) in (list, tuple, dict) else i for i in l]
+        ro = tuple(l) if t is tuple else l
+    elif t is dict:
+        byte_keys = [i for i in ob if type(i) is bytes]
+        for bk in byte_keys:
+            v = ob[bk]
+            del(ob[bk])
+            try:
+                ob[str(bk,'utf-8')] = v
+            except UnicodeDecodeError as e:
+                ob[bk] = v # keep as bytes
+        for k in ob:
+            if type(ob[k]) is bytes:
+                try:
+                    ob[k] = str(ob[k], 'utf-8')
+                except UnicodeDecodeError as e:
+                    ob[k] = ob[k] # keep as bytes
+            elif type(ob[k]) in (list, tuple, dict):
+                ob[k] = old_bytes_to_unicode(ob[k])
+        ro = ob
+    else:
+        ro = ob
+        print("unprocessed object: {0} {1}".format(t, ob))
+    return ro
+
+INVALID = b"\xff\xfe invalid utf8"
+
+VECTORS = [
+    ( "empty dict", {} ),
+    ( "empty list", [] ),
+    ( "empty tuple", () ),
+    ( "scalar", 42 ),
+    ( "bytes keys and values", { b"key": b"value", "str": b"caf\xc3\xa9", b"k2": "v2" } ),
+    ( "invalid utf8 key", { INVALID: b"value", b"other": b"ok" } ),
+    ( "invalid utf8 value", { b"key": INVALID, b"other": b"ok" } ),
+    ( "key order", { b"b": 1, "a": 2, b"c": 3, "d": 4 } ),
+    ( "decoded key collision", { "k": 1, b"k": 2 } ),
+    ( "list of bytes", [ b"a", b"b", "c", b"\xc3\xa9" ] ),
+    ( "list with invalid utf8", [ b"a", INVALID, b"c" ] ),
+    ( "tuple of bytes", ( b"a", 1, None ) ),
+    ( "tuple with invalid utf8", ( b"a", INVALID ) ),
+    ( "non string leaves", { b"int": 1, b"float": 1.5, b"none": None, b"bool": True,
+                             b"bytearray": bytearray(b"raw"), b"set": set([1]) } ),
+    ( "nested", { b"level1": { b"level2": [ b"a", ( b"b", { b"c": [ b"d", INVALID ] } ) ],
+                               b"bin": INVALID },
+                  "list": [ { b"x": b"y" }, [ b"z", 1 ], ( ) ] } ),
+    ( "list of dicts with invalid utf8", [ { b"k": b"v" }, INVALID, [ b"inner" ] ] ),
+]
+
+def event(i):
+    """
+    Event as received from the server, with bytes keys and values
+    """
+    return {
+        b"event": b"script",
+        b"task-id": i,
+        b"script_id": b"x" * 16,
+        b"from-component": b"TESTCASE",
+        b"timestamp": b"1589000000.123",
+        b"short-msg": b"Step %d passed" % i,
+        b"level": b"info",
+        b"color": b"#E7E7E7",
+        b"data": { b"summary": b"GET /index.html", b"raw": b"\x89PNG\r\n\x1a\n",
+                   b"layers": [ b"ethernet", b"ip", b"tcp", b"http" ],
+                   b"header": ( b"Content-Type", b"text/html" ) },
+    }
+
+def same(a, b):
+    """
+    Strict equality, the types and the order of the dict keys are also checked
+    """
+    if type(a) is not type(b):
+        return False
+    if type(a) is dict:
+        if list(a) != list(b):
+            return False
+        return all( same(a[k], b[k]) for k in a )
+    if type(a) in (list, tuple):
+        return len(a) == len(b) and all( same(x, y) for x, y in zip(a, b) )
+    return a == b
+
+def check():
+    """
+    Run the vectors on both implementations
+    """
+    failed = 0
+    for name, vector in VECTORS:
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = old_bytes_to_unicode(copy.deepcopy(vector))
+        result = Messages.bytes_to_unicode(copy.deepcopy(vector))
+        if same(expected, result):
+            print("ok      %s" % name)
+        else:
+            failed += 1
+            print("FAILED  %s\n  old: %r\n  new: %r" % (name, expected, result))
+    return failed
+
+def bench(iterations):
+    """
+    Time both implementations on a list of events
+    """
+    events = [ event(i) for i in range(1000) ]
+    for name, func in [ ("old", old_bytes_to_unicode), ("new", Messages.bytes_to_unicode) ]:
+        best = None
+        for i in range(iterations):
+            data = copy.deepcopy(events)
+            start = time.perf_counter()
+            func(data)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print("%s: %.2f ms for %d events (best of %d)" % (name, best * 1000, len(events), iterations))
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    failed = check()
+    bench(iterations)
+    sys.exit(1 if failed else 0)
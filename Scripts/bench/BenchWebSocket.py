@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------------------------
+# Copyright (c) 2010-2020 Denis Machard
+# This file is part of the extensive automation project
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301 USA
+# -------------------------------------------------------------------
+
+"""
+Benchmark of the websocket codec, messages chunked in text frames of
+wsMaxPayloadSize bytes against one frame compressed with permessage-deflate
+The frames are encoded as in TcpClientThread.sendPacket and decoded as in
+TcpClientThread.readFramesWs, without network
+
+Usage: python Scripts/bench/BenchWebSocket.py [wsMaxPayloadSize] [total size in MB]
+"""
+
+import sys
+import os
+import json
+import base64
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from Libs.NetLayerLib import WebSocket
+from Libs.NetLayerLib import Messages
+from Libs.NetLayerLib.TcpClient import ReceiveBuffer
+
+class Parent(object):
+    """
+    Parent of the codec, errors are displayed
+    """
+    def trace(self, txt):
+        pass
+    def error(self, txt):
+        print("error: %s" % txt)
+
+def event(i):
+    """
+    Test event as sent by the test server
+    """
+    return { "event": "script", "task-id": i, "script_id": "x" * 16,
+             "from-component": "TESTCASE", "timestamp": "1589000000.%03d" % (i % 1000),
+             "short-msg": "Step %d passed" % i, "level": "info", "color": "#E7E7E7" }
+
+def payloads(size, count):
+    """
+    Typical payloads of about size bytes, count different messages of each kind
+    so that the compression context does not see the same message twice
+    """
+    nbEvents = max(1, size // 200)
+    ret = [ ("json", []), ("message", []), ("random", []) ]
+    for i in range(count):
+        events = [ event(i * nbEvents + j) for j in range(nbEvents) ]
+        ret[0][1].append( json.dumps(events).encode("utf8")[:size] )
+        ret[1][1].append( Messages.Messages(userId="bench").notify(tid=i, body=events) )
+        ret[2][1].append( base64.b64encode(os.urandom(size * 3 // 4)) )
+    return ret
+
+def encodeChunked(codec, data, maxPayloadSize):
+    """
+    One text frame per chunk, see TcpClientThread.sendPacket
+    """
+    chunks = [ data[x:x+maxPayloadSize] for x in range(0, len(data), maxPayloadSize) ]
+    return [ codec.encodeText(data=chunk) for chunk in chunks ]
+
+def encodeDeflated(codec, data, maxPayloadSize):
+    """
+    One compressed frame, see TcpClientThread.sendPacket
+    """
+    return [ codec.encodeMessage(data=data) ]
+
+def decode(codec, frames):
+    """
+    Decode the frames received, see TcpClientThread.readFramesWs
+    """
+    rxBuffer = ReceiveBuffer()
+    rxBufferWs = bytearray()
+    fragments = []
+    compressedMsg = False
+    for frame in frames:
+        rxBuffer.extend(frame)
+        while len(rxBuffer) >= 2:
+            (data, opcode, fin, compressed, consumed, needmore) = codec.decodeWsFrame(buffer=rxBuffer.view())
+            if needmore:
+                break
+            if opcode != WebSocket.WEBSOCKET_OPCODE_CONTINUATION:
+                fragments = []
+                compressedMsg = bool(compressed)
+            if compressedMsg:
+                fragments.append( bytes(data) )
+                if fin:
+                    rxBufferWs.extend( codec.inflate(b''.join(fragments)) )
+                    fragments = []
+            else:
+                rxBufferWs.extend(data)
+            del data
+            rxBuffer.consume(consumed)
+    return bytes(rxBufferWs)
+
+def bench(name, messages, encoder, deflate, maxPayloadSize):
+    """
+    Encode and decode the messages with the same codecs,
+    the compression context is kept between the messages
+    """
+    sender = WebSocket.WebSocketCodec(parent=Parent())
+    receiver = WebSocket.WebSocketCodec(parent=Parent())
+    sender.deflateActivated = deflate
+    receiver.deflateActivated = deflate
+
+    encodeTime = decodeTime = 0.0
+    wire = nbFrames = 0
+    for data in messages:
+        start = time.perf_counter()
+        frames = encoder(sender, data, maxPayloadSize)
+        encodeTime += time.perf_counter() - start
+
+        start = time.perf_counter()
+        received = decode(receiver, frames)
+        decodeTime += time.perf_counter() - start
+
+        if received != data:
+            raise Exception("%s: message corrupted" % name)
+        wire += sum( len(f) for f in frames )
+        nbFrames += len(frames)
+
+    count = len(messages)
+    total = sum( len(data) for data in messages )
+    print("  %-9s %-8s size=%-8d frames=%-6d wire=%6.1f%%  encode=%7.1f MB/s  decode=%7.1f MB/s  total=%7.1f MB/s" % (
+            name, "deflate" if deflate else "chunked", total // count, nbFrames // count, 100.0 * wire / total,
+            total / encodeTime / 1e6, total / decodeTime / 1e6, total / (encodeTime + decodeTime) / 1e6 ) )
+
+if __name__ == '__main__':
+    maxPayloadSize = int(sys.argv[1]) if len(sys.argv) > 1 else WebSocket.WEBSOCKET_MAX_BASIC_DATA1024
+    totalSize = int(float(sys.argv[2]) * 1e6) if len(sys.argv) > 2 else 20 * 1000 * 1000
+
+    print("wsMaxPayloadSize=%d" % maxPayloadSize)
+    for size in [ 1024, 16 * 1024, 256 * 1024, 1024 * 1024 ]:
+        print("message of %d bytes" % size)
+        for name, messages in payloads(size, max(1, totalSize // size)):
+            bench(name, messages, encodeChunked, False, maxPayloadSize)
+            bench(name, messages, encodeDeflated, True, maxPayloadSize)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------------------------
+# Copyright (c) 2010-2020 Denis Machard
+# This file is part of the extensive automation project
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301 USA
+# -------------------------------------------------------------------
+
+"""
+Synthetic test events for the benchmarks, with the keys read by the views
+of the test results: one event in four carries a payload
+"""
+
+import random
+
+LEVELS = [ "info", "send", "received", "step-started", "step-passed", "warning" ]
+COLORS = [ "#E7E7E7", "#C1EEFF", "#DAF7A6", "#FFD59B" ]
+COMPONENTS = [ ("TESTCASE", "TC"), ("HTTP", "ADP"), ("TCP", "ADP"), ("SSH", "ADP") ]
+
+TYPE_DATA_PAYLOAD_V1 = "%payload-v1%"
+
+# words of the html bodies, compressed about 3 to 4 times as real pages
+WORDS = [ "<div", "class=\"row\">", "<span>", "</span>", "</div>", "<a", "href=\"/items/", "\">",
+          "</a>", "<td>", "</td>", "<tr>", "</tr>", "status", "value", "name", "id=", "item",
+          "error", "the", "of", "and", "result", "\n" ]
+
+def payload(i, size, rnd):
+    """
+    Payload of an adapter event as shown in the detailed view, the layers
+    and the raw data in the header of the payload at the last position
+    """
+    words = []
+    length = 0
+    while length < size:
+        word = rnd.choice(WORDS) if rnd.random() < 0.8 else "%d" % rnd.randint(0, 99999)
+        words.append( word )
+        length += len(word) + 1
+    body = " ".join(words)[:size]
+    raw = ("HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body)).encode("utf8")
+    return [
+        ( "TCP", { "source-port": "%d" % (40000 + i % 1000), "destination-port": "80",
+                   "seq": "%d" % (i * 1460), "ack": "%d" % (i * 7) } ),
+        ( "HTTP", { "response": { "version": "HTTP/1.1", "code": "200", "phrase": "OK" },
+                    "headers": { "content-length": "%d" % len(body), "content-type": "text/html",
+                                 "server": "Apache" },
+                    "body": body } ),
+        ( TYPE_DATA_PAYLOAD_V1, { "len": len(raw), "raw": raw, "time": "%.6f" % (i / 1000.0) } ),
+    ]
+
+def testEvent(i, scriptId="1", tcId="1-1", payloadSize=512, seed=None):
+    """
+    Event of a testcase, as received from the server
+
+    @param i: number of the event
+    @type i: integer
+
+    @param scriptId: identifier of the script
+    @type scriptId: string
+
+    @param tcId: identifier of the testcase
+    @type tcId: string
+
+    @param payloadSize: size of the body of the payloads
+    @type payloadSize: integer
+
+    @param seed: seed of the random content, i by default
+    @type seed: integer/none
+
+    @return: event
+    @rtype: dict
+    """
+    rnd = random.Random(i if seed is None else seed)
+    component, fromLevel = COMPONENTS[i % len(COMPONENTS)]
+    event = { "event": "testcase", "script_id": scriptId, "tc_id": tcId, "test-internal-id": tcId,
+              "timestamp": "%02d:%02d:%02d.%03d" % (10 + i // 3600000 % 12, i // 60000 % 60, i // 1000 % 60, i % 1000),
+              "level": LEVELS[i % len(LEVELS)], "color": COLORS[i % len(COLORS)],
+              "from-component": component, "from-level": fromLevel, "to-level": "TC",
+              "short-msg": "%s %d: %s" % (component.lower(), i, "".join( rnd.choice("abcdef ") for j in range(40) )),
+              "multiline": False }
+    if i % 4 == 3:
+        event["type-msg"] = TYPE_DATA_PAYLOAD_V1
+        event["data-msg"] = payload(i, payloadSize, rnd)
+    return event
+
+def testEvents(count, start=0, **kwargs):
+    """
+    List of events of a testcase
+
+    @param count: number of events
+    @type count: integer
+
+    @param start: number of the first event
+    @type start: integer
+
+    @return: events
+    @rtype: list
+    """
+    return [ testEvent(i, **kwargs) for i in range(start, start + count) ]
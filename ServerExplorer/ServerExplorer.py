@@ -72,6 +72,7 @@ import json
 import zlib
   
 from Libs import PyBlowFish
+from Libs import RestCache
 
 NETWORK_ERRORS = {}
 NETWORK_ERRORS[1] = "The remote server refused the connection."
@@ -98,6 +99,14 @@ NETWORK_ERRORS[301] = "The Network Access API cannot honor the request because t
 NETWORK_ERRORS[302] = "The requested operation is invalid for this protocol."
 NETWORK_ERRORS[399] = "A breakdown in protocol was detected (parsing error, invalid or unexpected responses."
 
+# session requests are sent alone, the cookie can change with the response
+REST_EXCLUSIVE_URIS = [ RCI.CMD_LOGIN, RCI.CMD_LOGOUT, RCI.CMD_REFRESH ]
+
+# responses kept in the cache and revalidated with the server
+REST_CACHEABLE_URIS = [ RCI.CMD_TESTS_LISTING, RCI.CMD_ADAPTERS_LISTING, RCI.CMD_TR_LISTING,
+                        RCI.CMD_DOCS_CACHE, RCI.CMD_TESTS_STATISTICS, RCI.CMD_ADAPTERS_STATISTICS,
+                        RCI.CMD_TR_STATISTICS ]
+
 def sanitize_url(url):
     """sanitize url, remove double slash"""
     return re.sub(r"([^:]/)(/)+", r"\1", url)
@@ -109,6 +118,7 @@ class RestNetworkHandler(QObject, Logger.ClassLogger):
     StartWorking = pyqtSignal()
     StopWorking = pyqtSignal()
     InProgress = pyqtSignal(int, int)
+    QueueChanged = pyqtSignal(int, int)
     def __init__(self, parent = None):
         """
         Constructor
@@ -126,7 +136,25 @@ class RestNetworkHandler(QObject, Logger.ClassLogger):
         
         self.__parent = parent
         self.httpPostReq = []
-        self.reqInProgress= None
+        self.reqInProgress = {}
+        self.reqProgress = {}
+        
+        # number of requests sent in parallel
+        self.maxReqInProgress = 1
+        try:
+            self.maxReqInProgress = max(1, int(Settings.instance().readValue( key = 'Network/rest-concurrency' )))
+        except Exception as e:
+            self.error( "bad value for the rest concurrency: %s" % e )
+            
+        # cache of the responses
+        self.cache = None
+        if QtHelper.str2bool( Settings.instance().readValue( key = 'Network/rest-cache' ) ):
+            try:
+                cacheSize = int(Settings.instance().readValue( key = 'Network/rest-cache-size' ))
+                self.cache = RestCache.RestCache( cachePath="%s/Cache/" % QtHelper.dirExec(),
+                                                  maxSize=cacheSize*1024*1024 )
+            except Exception as e:
+                self.error( "unable to initialize the rest cache: %s" % e )
 
         self.manager = QNetworkAccessManager()
         self.manager.finished.connect(self.onNetworkFinished)
@@ -134,9 +162,21 @@ class RestNetworkHandler(QObject, Logger.ClassLogger):
 
     def onNetworkProgress(self, bytesRead, totalBytes):
         """
-        On network progress
+        On network progress, cumulated for all requests in progress
         """
-        self.InProgress.emit(bytesRead, totalBytes)
+        reply = self.sender()
+        if reply in self.reqInProgress:
+            if totalBytes == -1:
+                totalBytes = 0
+                bytesRead = 0
+            self.reqProgress[reply] = (bytesRead, totalBytes)
+        
+        bytesReadAll = sum( [ r for r, t in self.reqProgress.values() ] )
+        totalBytesAll = sum( [ t for r, t in self.reqProgress.values() ] )
+        if not totalBytesAll:
+            bytesReadAll = 0
+            totalBytesAll = -1
+        self.InProgress.emit(bytesReadAll, totalBytesAll)
 
     def onNetworkSslErrors(self, reply, errors):
         """
@@ -164,15 +204,41 @@ class RestNetworkHandler(QObject, Logger.ClassLogger):
             if sys.version_info < (3,): httpCode = httpCode.toString()
                 
             self.trace("rest http code response: %s" % httpCode)
+            
+            # not modified, the response is read from the cache
+            # or store the new response
+            cacheKey = self.getCacheKey( req=self.reqInProgress.get(reply) )
+            if cacheKey is not None and httpCode is not None:
+                if int(httpCode) == 304:
+                    cached = self.cache.get( key=cacheKey )
+                    if cached is not None:
+                        self.trace("rest response read from the cache")
+                        rsp = cached
+                        httpCode = 200
+                    else:
+                        # removed from the cache since the request was sent,
+                        # sent again first without the validators
+                        self.trace("rest response no more in the cache, request sent again")
+                        self.cache.remove( key=cacheKey )
+                        self.httpPostReq.insert( 0, self.reqInProgress[reply] )
+                        self.releaseReply(reply)
+                        return
+                elif int(httpCode) == 200:
+                    etag = bytes(reply.rawHeader(b"ETag")).decode("utf8")
+                    lastModified = bytes(reply.rawHeader(b"Last-Modified")).decode("utf8")
+                    self.cache.put( key=cacheKey, uri=self.reqInProgress[reply][0], data=bytes(rsp), 
+                                    etag=etag, lastModified=lastModified )
             if httpCode is None: 
                 # self.error("no http code, timeout?")
                 # self.stopWorking()
                 # RCI.instance().onGenericError( title=self.tr("REST Error"), 
                                                 # err="Connection lost!" )
                 # self.__parent.stopConnection()
-                return
+                
+                # no response, the request is released below and the next ones can be sent
+                self.stopWorking()
             
-            if int(httpCode) in [ 401 ]:
+            elif int(httpCode) in [ 401 ]:
                 self.error("rest authentication failed, http body content for REST: %s" % (rsp) )
                 self.stopWorking()
                 try:
@@ -216,13 +282,23 @@ class RestNetworkHandler(QObject, Logger.ClassLogger):
                             self.error( "something is wrong in the rest response - %s" % str(e) )
                             self.error( "rest response received... %s" % json_rsp)
                             
+        self.releaseReply(reply)
+            
+    def releaseReply(self, reply):
+        """
+        Release the reply, the next requests queued can be sent
+        """
         reply.close()
         reply.deleteLater()
         
-        self.reqInProgress = None
-        if len(self.httpPostReq):
-            self.__NetworkCall( req=self.httpPostReq.pop(0) )
-            
+        self.reqInProgress.pop(reply, None)
+        self.reqProgress.pop(reply, None)
+        self.sendPendingCalls()
+        
+        # some requests are always in progress
+        if len(self.reqInProgress):
+            self.startWorking()
+
     def closeEvent(self, event):
         """
         On close event
@@ -230,6 +306,30 @@ class RestNetworkHandler(QObject, Logger.ClassLogger):
         self.httpPostId = None
         event.accept()
 
+    def getCacheKey(self, req):
+        """
+        Return the key of the request in the cache, None if not cacheable
+        """
+        if self.cache is None or req is None:
+            return None
+        uri, request, body = req
+        if uri not in REST_CACHEABLE_URIS:
+            return None
+        server = "%s://%s:%s/%s" % (self.WsScheme.lower(), self.WsAddress, self.WsPort, self.WsWebpath) 
+        return self.cache.makeKey( server=server, uri=uri, request=request, body=body )
+        
+    def getQueueDepth(self):
+        """
+        Return the number of requests waiting to be sent
+        """
+        return len(self.httpPostReq)
+        
+    def getNbInProgress(self):
+        """
+        Return the number of requests sent and waiting a response
+        """
+        return len(self.reqInProgress)
+
     def setWsAddress(self, address, port, scheme, webpath, hostname ):
         """
         Set webservice address
@@ -295,17 +395,49 @@ class RestNetworkHandler(QObject, Logger.ClassLogger):
 
     def NetworkCall(self, req ):
         """
-        Network call
+        Network call, the request is queued and sent as soon as possible
         """
         self.httpPostReq.append( req )
-        if self.reqInProgress is None:
-            self.__NetworkCall( req=self.httpPostReq.pop(0) )
+        self.sendPendingCalls()
+        
+    def sendPendingCalls(self):
+        """
+        Send the requests queued in the order of arrival, until the max of requests in progress
+         - a session request (login, logout, refresh) is sent alone
+         - requests on the same uri are sent one after the other
+        """
+        urisInProgress = [ uri for uri, request, body in self.reqInProgress.values() ]
+        exclusiveInProgress = len( [ uri for uri in urisInProgress if uri in REST_EXCLUSIVE_URIS ] )
+        
+        i = 0
+        while i < len(self.httpPostReq) and not exclusiveInProgress:
+            if len(self.reqInProgress) >= self.maxReqInProgress:
+                break
+                
+            uri = self.httpPostReq[i][0]
+            if uri in REST_EXCLUSIVE_URIS:
+                # wait the end of all requests, and nothing can be sent before it
+                if not len(self.reqInProgress):
+                    self.__NetworkCall( req=self.httpPostReq.pop(i) )
+                break
+            
+            if uri in urisInProgress:
+                # keep the order with the previous request on the same uri
+                i += 1
+                continue
+
+            req = self.httpPostReq.pop(i)
+            urisInProgress.append( uri )
+            self.__NetworkCall( req=req )
             
+        self.QueueChanged.emit( len(self.httpPostReq), len(self.reqInProgress) )
+        
     def __NetworkCall(self, req):
         """
         Sub network call
         """
         self.startWorking()
+        reqQueued = req
 
         self.trace('prepare post request for REST api %s' % str(req) )
         
@@ -316,6 +448,13 @@ class RestNetworkHandler(QObject, Logger.ClassLogger):
             url = sanitize_url(url)
             
             req   = QNetworkRequest ( QUrl(url) )
+            
+            # revalidate the response stored in the cache
+            cacheKey = self.getCacheKey( req=reqQueued )
+            if cacheKey is not None:
+                for k, v in self.cache.validators( key=cacheKey ).items():
+                    req.setRawHeader( k.encode("utf8"), v.encode("utf8") )
+                    
             if request == "POST":
                 if sys.version_info > (3,):
                     req.setRawHeader( b"Host", bytes(self.WsHostname, 'utf8') )
@@ -357,6 +496,7 @@ class RestNetworkHandler(QObject, Logger.ClassLogger):
                 raise Exception("request not yet supported" % request)
                 
             reply.downloadProgress.connect(self.onNetworkProgress)
+            self.reqInProgress[reply] = reqQueued
 
         except Exception as e:
             self.error( str(e) )
@@ -390,6 +530,9 @@ class WServerProgress(QWidget, Logger.ClassLogger):
         self.progressBar2.setAlignment(Qt.AlignCenter)
         self.progressBar2.setObjectName("progressBar")
 
+        self.queueLabel = QLabel("0/0")
+        self.queueLabel.setToolTip( self.tr("API requests queued/in progress") )
+        
         layout.addWidget( QLabel("| API:") )
         
         layout2 = QVBoxLayout()
@@ -398,9 +541,10 @@ class WServerProgress(QWidget, Logger.ClassLogger):
         layout2.addWidget( self.progressBar2 )
         
         layout.addLayout(layout2)
+        layout.addWidget( self.queueLabel )
         
         self.setLayout(layout)
-        self.setFixedWidth(180)
+        self.setFixedWidth(220)
         self.setFixedHeight(15)
 
     def stopWorkingRest(self):
@@ -424,6 +568,12 @@ class WServerProgress(QWidget, Logger.ClassLogger):
         self.progressBar2.setMaximum(totalBytes)
         self.progressBar2.setValue(bytesRead)
         
+    def updateQueueRest(self, nbQueued, nbInProgress):
+        """
+        Update the number of requests queued and in progress
+        """
+        self.queueLabel.setText( "%s/%s" % (nbQueued, nbInProgress) )
+        
 class WServerStatus(QWidget, Logger.ClassLogger):
     """
     Server status widget
@@ -899,6 +1049,7 @@ class WServerExplorer(QWidget, Logger.ClassLogger):
         self.RestService.StartWorking.connect(self.OnRestStartWorking)
         self.RestService.StopWorking.connect(self.OnRestStopWorking)
         self.RestService.InProgress.connect(self.onRestNetworkProgress)
+        self.RestService.QueueChanged.connect(self.wServerProgress.updateQueueRest)
         
     def onRestNetworkProgress(self, bytesRead, totalBytes):
         """
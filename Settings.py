@@ -31,7 +31,7 @@ try:
                             QColorDialog, QLineEdit, QTabWidget, QSizePolicy, QIntValidator , QMessageBox, 
                             QTableWidget, QAbstractItemView, QTableWidgetItem, QMenu, QDialog, QFrame, QStyleFactory,
                             QListWidget, QListView, QStackedWidget, QDialogButtonBox, QListWidgetItem, QIcon)
-    from PyQt4.QtCore import (Qt, QSize, QSettings)
+    from PyQt4.QtCore import (Qt, QSize, QSettings, QObject, pyqtSignal)
 except ImportError:
     from PyQt5.QtGui import (QFont, QColor, QPalette, QIntValidator, QIcon)
     from PyQt5.QtWidgets import (QWidget, QGroupBox, QComboBox, QGridLayout, QLabel, 
@@ -40,7 +40,7 @@ except ImportError:
                             QMessageBox, QTableWidget, QAbstractItemView, QTableWidgetItem, 
                             QMenu, QDialog, QFrame, QListWidget, QListView, QStackedWidget, 
                             QDialogButtonBox, QListWidgetItem, QStyleFactory)
-    from PyQt5.QtCore import (Qt, QSize, QSettings)
+    from PyQt5.QtCore import (Qt, QSize, QSettings, QObject, pyqtSignal)
     
 import sys
 import os
@@ -57,6 +57,7 @@ if sys.version_info > (3,):
     unicode = str
     
 from Libs import QtHelper, Logger, PyBlowFish
+import Libs.NetLayerLib.Messages as Messages
 import DefaultTemplates
 
 arg = sys.argv[0]
@@ -1203,6 +1204,13 @@ class ModulesTemplatesWidget(QWidget, Logger.ClassLogger):
         except Exception as e:
             self.error( "unable to save templates for development: %s" % e )
             
+# presets of the compression (algorithm, level, minimum size),
+# from the output of Scripts/bench/BenchCompression.py
+# lan at 1 Gbit/s: the compression costs more than the transfer
+# wan at 10 Mbit/s: zlib level 3 from 128 bytes, level 6 is as small but slower
+COMPRESSION_LAN = ( Messages.COMPRESSION_NONE, -1, 0 )
+COMPRESSION_WAN = ( Messages.COMPRESSION_ZLIB, 3, 128 )
+
 class NetworkWidget(QWidget, Logger.ClassLogger):
     """
     Network widget
@@ -1282,11 +1290,50 @@ class NetworkWidget(QWidget, Logger.ClassLogger):
         proxyGroup.setLayout(proxyLayout)
         # end of new
         
+        # compression of the messages, negotiated with the server
+        compressionGroup = QGroupBox(self.tr('Compression'))
+        
+        self.compressionCombo = QComboBox(self)
+        self.compressionCombo.addItems( Messages.supportedCompressions() )
+        compressionSetting = instance().readValue( key = 'Network/compression' )
+        index = self.compressionCombo.findText( compressionSetting )
+        if index != -1: self.compressionCombo.setCurrentIndex(index)
+        
+        self.compressionLevelEdit = QLineEdit(instance().readValue( key = 'Network/compression-level' ))
+        self.compressionLevelEdit.setSizePolicy( QSizePolicy.Expanding, QSizePolicy.Fixed )
+        validator = QIntValidator (self)
+        self.compressionLevelEdit.setValidator(validator)
+        
+        self.compressionMinSizeEdit = QLineEdit(instance().readValue( key = 'Network/compression-min-size' ))
+        self.compressionMinSizeEdit.setSizePolicy( QSizePolicy.Expanding, QSizePolicy.Fixed )
+        validator = QIntValidator (self)
+        self.compressionMinSizeEdit.setValidator(validator)
+        
+        compressionLayout = QGridLayout()
+        compressionLayout.addWidget( QLabel("Algorithm"), 1, 0 )
+        compressionLayout.addWidget( self.compressionCombo, 1, 1 )
+        compressionLayout.addWidget( QLabel("Level (-1 for default)"), 2, 0 )
+        compressionLayout.addWidget( self.compressionLevelEdit, 2, 1 )
+        compressionLayout.addWidget( QLabel("Minimum size (bytes)"), 3, 0 )
+        compressionLayout.addWidget( self.compressionMinSizeEdit, 3, 1 )
+        
+        self.compressionLanButton = QPushButton("LAN")
+        self.compressionLanButton.clicked.connect(self.setCompressionLan)
+        self.compressionWanButton = QPushButton("WAN")
+        self.compressionWanButton.clicked.connect(self.setCompressionWan)
+        layoutPresets = QHBoxLayout()
+        layoutPresets.addWidget( self.compressionLanButton )
+        layoutPresets.addWidget( self.compressionWanButton )
+        compressionLayout.addWidget( QLabel("Presets"), 4, 0 )
+        compressionLayout.addLayout( layoutPresets, 4, 1 )
+        compressionGroup.setLayout(compressionLayout)
+        
         # final layout
         subLayout = QGridLayout()
         subLayout.addWidget(secureGroup, 0, 0)
         subLayout.addWidget(portsGroup, 0, 1)
         subLayout.addWidget(proxyGroup, 1, 0)
+        subLayout.addWidget(compressionGroup, 1, 1)
 
         mainLayout = QVBoxLayout()
         mainLayout.addLayout(subLayout)
@@ -1294,6 +1341,31 @@ class NetworkWidget(QWidget, Logger.ClassLogger):
         
         self.setLayout(mainLayout)
         
+    def setCompression(self, preset):
+        """
+        Set the fields of the compression, saved with the settings
+
+        @param preset: algorithm, level and minimum size
+        @type preset: tuple
+        """
+        algo, level, minSize = preset
+        index = self.compressionCombo.findText( algo )
+        if index != -1: self.compressionCombo.setCurrentIndex(index)
+        self.compressionLevelEdit.setText( "%s" % level )
+        self.compressionMinSizeEdit.setText( "%s" % minSize )
+        
+    def setCompressionLan(self):
+        """
+        Compression for a server on the local network
+        """
+        self.setCompression(preset=COMPRESSION_LAN)
+        
+    def setCompressionWan(self):
+        """
+        Compression for a remote server
+        """
+        self.setCompression(preset=COMPRESSION_WAN)
+        
     def saveSettings(self):
         """
         Save settings
@@ -1326,6 +1398,16 @@ class NetworkWidget(QWidget, Logger.ClassLogger):
         instance().setValue( key = 'Server/addr-proxy-http', value = proxyAddr )
         instance().setValue( key = 'Server/port-proxy-http', value = proxyPort )
         
+        # compression, used on the next connection
+        compressionLevel = "%s" % self.compressionLevelEdit.text()
+        compressionMinSize = "%s" % self.compressionMinSizeEdit.text()
+        if not len(compressionLevel): compressionLevel = "-1"
+        if not len(compressionMinSize): compressionMinSize = "0"
+        
+        instance().setValue( key = 'Network/compression', value = "%s" % self.compressionCombo.currentText() )
+        instance().setValue( key = 'Network/compression-level', value = compressionLevel )
+        instance().setValue( key = 'Network/compression-min-size', value = compressionMinSize )
+        
 class GeneralWidget(QWidget, Logger.ClassLogger):
     """
     General widget
@@ -1912,12 +1994,20 @@ class SettingsDialog(QDialog, Logger.ClassLogger):
         self.NetworkConf.saveSettings()
         self.ToolsConf.saveSettings()
 
+        # written in the files, the values changed are notified
+        instance().syncValues()
+
         self.accept()
 
-class Settings(object):
+# conversions cached, the values returned are not mutable
+CACHED_TYPES = [ 'str', 'int', 'bool', 'float' ]
+
+class Settings(QObject):
     """
     Settings accessor
+    The values converted are cached in memory, the files are written on synchronization
     """
+    SettingsChanged = pyqtSignal(list)
     def __init__(self, parent = None, offlineMode=False):
         """
         Settings of the application
@@ -1925,6 +2015,7 @@ class Settings(object):
         @param parent:
         @type parent:
         """
+        QObject.__init__(self)
         self.offlineMode = offlineMode
         self.serverContext = {}
         self.dirExec = QtHelper.dirExec()
@@ -1937,6 +2028,11 @@ class Settings(object):
         self.toolsFileName = "tools.ini"
         self.fileNameTools = "%s/Files/%s" % ( self.dirExec, self.toolsFileName )
         self.settingsTools = QSettings( self.fileNameTools,  QSettings.IniFormat    )
+
+        # (key, type) -> value converted
+        self.cache = {}
+        # keys changed since the last synchronization
+        self.changed = set()
         
         self.appName = self.readValue( key = 'Common/Name' )
 
@@ -1953,9 +2049,14 @@ class Settings(object):
     def syncValues(self):
         """
         Synchronize value
+        Write the values in the files and notify the keys changed
         """
         self.settings.sync()
         self.settingsTools.sync()
+        if self.changed:
+            changed = sorted(self.changed)
+            self.changed = set()
+            self.SettingsChanged.emit( changed )
 
     def readValue (self, key, rType = 'str'):
         """
@@ -1964,13 +2065,31 @@ class Settings(object):
         @param key:
         @type key:
 
-        @param rType: expected values in str, qstr an qlist
+        @param rType: expected values in str, int, bool, float, qstr an qlist
         @type rType: string
 
         @return:
         @rtype: str
         """
-        ret = self.settings.value(key)
+        try:
+            return self.cache[(key, rType)]
+        except KeyError:
+            pass
+        ret = self.convertValue( self.settings.value(key), rType )
+        if rType in CACHED_TYPES:
+            self.cache[(key, rType)] = ret
+        return ret
+
+    def convertValue (self, ret, rType):
+        """
+        Convert the value read in the settings
+
+        @param ret: value read
+        @type ret: object
+
+        @param rType: expected values in str, int, bool, float, qstr an qlist
+        @type rType: string
+        """
         if ret is None:
             return ''
         if rType == 'str':
@@ -1981,6 +2100,14 @@ class Settings(object):
             if isinstance(ret, str): # python3 support
                 return int(ret)
             return int(ret.toString())
+        elif rType == 'bool':
+            if isinstance(ret, str): # python3 support
+                return QtHelper.str2bool(ret)
+            return QtHelper.str2bool(str(ret.toString()))
+        elif rType == 'float':
+            if isinstance(ret, str): # python3 support
+                return float(ret)
+            return float(ret.toString())
         elif rType == 'qstr':
             if sys.version_info > (3,):  # python3 support
                 return ret
@@ -1992,9 +2119,18 @@ class Settings(object):
         else:
             return ret
 
+    def invalidate(self, key):
+        """
+        Remove the values of the key from the cache
+        """
+        for rType in CACHED_TYPES:
+            self.cache.pop( (key, rType), None )
+        self.changed.add(key)
+
     def setValue(self, key, value):
         """
         Set value
+        Written in the file on the next synchronization
 
         @param key:
         @type key:
@@ -2003,13 +2139,14 @@ class Settings(object):
         @type value:
         """
         self.settings.setValue( key, value)
-        self.settings.sync()
+        self.invalidate(key)
         
     def removeValue(self, key):
         """
         Remove value
         """
         self.settings.remove(key)
+        self.invalidate(key)
 
     def readToolValue (self, key, rType = 'str'):
         """
@@ -2018,33 +2155,13 @@ class Settings(object):
         @param key:
         @type key:
 
-        @param rType: expected values in str, qstr an qlist
+        @param rType: expected values in str, int, bool, float, qstr an qlist
         @type rType: string
 
         @return:
         @rtype: str
         """
-        ret = self.settingsTools.value(key)
-        if ret is None:
-            return ''
-        if rType == 'str':
-            if isinstance(ret, str):  # python3 support
-                return ret
-            return str(ret.toString())
-        elif rType == 'int':
-            if isinstance(ret, str):  # python3 support
-                return int(ret)
-            return int(ret.toString())
-        elif rType == 'qstr':
-            if sys.version_info > (3,):  # python3 support
-                return ret
-            return ret.toString()
-        elif rType == 'qlist':
-            if sys.version_info > (3,):   # python3 support
-                return ret
-            return ret.toStringList()
-        else:
-            return ret
+        return self.convertValue( self.settingsTools.value(key), rType )
 
     def setToolValue(self, key, value):
         """
@@ -2057,7 +2174,6 @@ class Settings(object):
         @type value:
         """
         self.settingsTools.setValue( key, value)
-        self.settingsTools.sync()
         
     def removeToolValue(self, key):
         """
@@ -2091,4 +2207,5 @@ def finalize ():
     """
     global ST
     if ST:
+        ST.syncValues()
         ST = None
\ No newline at end of file
@@ -35,6 +35,7 @@ import copy
 import os
 import urllib
 import json
+import functools
 from threading import Thread
 
 try:
@@ -48,9 +49,11 @@ if sys.version_info > (3,):
     
 from PyQt5.QtCore import (QObject, pyqtSignal)
     
-from Libs import PyBlowFish, QtHelper, Logger
+from Libs import PyBlowFish, Logger
 import Libs.NetLayerLib.ClientAgent as NetLayerLib
 import Libs.NetLayerLib.Messages as Messages
+import Libs.NetLayerLib.Reactor as Reactor
+import Libs.NetLayerLib.FifoCallBack as FifoCallBack
 
 import UserClientInterface as UCI
 import Settings
@@ -68,17 +71,46 @@ class TestsPool(QObject, Logger.ClassLogger):
         QObject.__init__(self, parent)
         self.parent = parent
         self.tests = []
+        
+        # all channels share one io loop and one callback thread
+        self.reactor = None
+        self.fifoCallback = None
+
+    def startLoop(self):
+        """
+        Start the io loop and the callback thread shared by channels
+        """
+        if self.reactor is None:
+            self.reactor = Reactor.Reactor()
+            self.reactor.error = self.error
+            self.reactor.start()
+            self.fifoCallback = FifoCallBack.FifoCallbackThread()
+            self.fifoCallback.start()
+
+    def stopLoop(self):
+        """
+        Stop the io loop and the callback thread
+        """
+        if self.reactor is not None:
+            self.reactor.stop()
+            self.reactor.join()
+            self.fifoCallback.stop()
+            self.fifoCallback.join()
+            self.reactor = None
+            self.fifoCallback = None
 
     def newChannel(self, testId):
         """
         Create a new channel
         """
-        test = TestClientInterface( parent = self.parent )
+        self.startLoop()
+        test = TestClientInterface( parent = self.parent, reactor=self.reactor, 
+                                    fifoCallback=self.fifoCallback )
         test.setServerAddress(ip = UCI.instance().addressResolved, port = int(UCI.instance().portData) )
         
-        test.onConnectionSuccessful = self.onConnectionSuccessful
-        test.onWsHanshakeSuccess = self.onWsHanshakeSuccess
-        test.onRequest = self.onRequest
+        test.onConnectionSuccessful = functools.partial(self.onConnectionSuccessful, instance=test)
+        test.onWsHanshakeSuccess = functools.partial(self.onWsHanshakeSuccess, instance=test)
+        test.onRequest = functools.partial(self.onRequest, instance=test)
         test.startCA()
 
         self.tests.append( (testId,test) ) 
@@ -88,8 +120,8 @@ class TestsPool(QObject, Logger.ClassLogger):
         """
         On connection successful
         """
-        websocketSupport = QtHelper.str2bool(Settings.instance().readValue( key = 'Server/data-websocket' ))
-        websocketSsl = QtHelper.str2bool(Settings.instance().readValue( key = 'Server/data-ssl' ))
+        websocketSupport = Settings.instance().readValue( key = 'Server/data-websocket', rType = 'bool' )
+        websocketSsl = Settings.instance().readValue( key = 'Server/data-ssl', rType = 'bool' )
         if websocketSupport:
             self.trace('Websocket initialization...')
             wspath = Settings.instance().readValue( key = 'Server/websocket-path' )
@@ -120,13 +152,15 @@ class TestsPool(QObject, Logger.ClassLogger):
         for testId, test in self.tests:
             test.closeConnection()
             test.stopCA()
+        self.tests = []
+        self.stopLoop()
             
 class TestClientInterface(QObject, Logger.ClassLogger, NetLayerLib.ClientAgent):
     """
     User client interface
     """
     Notify = pyqtSignal(tuple)  
-    def __init__(self, parent = None):
+    def __init__(self, parent = None, reactor = None, fifoCallback = None):
         """
         Qt Class User Client Interface
         Signals:
@@ -134,21 +168,31 @@ class TestClientInterface(QObject, Logger.ClassLogger, NetLayerLib.ClientAgent):
 
         @param parent: 
         @type parent:
+
+        @param reactor: shared io loop
+        @type reactor: Reactor or None
+
+        @param fifoCallback: shared callback thread
+        @type fifoCallback: FifoCallbackThread or None
         """
         QObject.__init__(self, parent)
         NetLayerLib.ClientAgent.__init__(self, typeAgent = NetLayerLib.TYPE_AGENT_USER,
-                            keepAliveInterval=int(Settings.instance().readValue( key = 'Network/keepalive-interval' )), 
-                            inactivityTimeout=int(Settings.instance().readValue( key = 'Network/inactivity-timeout' )),
-                            timeoutTcpConnect=int(Settings.instance().readValue( key = 'Network/tcp-connect-timeout' )),
-                            responseTimeout=int(Settings.instance().readValue( key = 'Network/response-timeout' )),
-                            selectTimeout=float(Settings.instance().readValue( key = 'Network/select-timeout' )),
-                            sslSupport=QtHelper.str2bool(Settings.instance().readValue( key = 'Server/data-ssl' )),
-                            wsSupport=QtHelper.str2bool(Settings.instance().readValue( key = 'Server/data-websocket' )),
-                            pickleVer=int(Settings.instance().readValue( key = 'Network/pickle-version' )),
-                            tcpKeepAlive=QtHelper.str2bool(Settings.instance().readValue( key = 'Network/tcp-keepalive' )), 
-                            tcpKeepIdle=int(Settings.instance().readValue( key = 'Network/tcp-keepidle' )),
-                            tcpKeepCnt=int(Settings.instance().readValue( key = 'Network/tcp-keepcnt' )), 
-                            tcpKeepIntvl=int(Settings.instance().readValue( key = 'Network/tcp-keepintvl' ))
+                            keepAliveInterval=Settings.instance().readValue( key = 'Network/keepalive-interval', rType = 'int' ), 
+                            inactivityTimeout=Settings.instance().readValue( key = 'Network/inactivity-timeout', rType = 'int' ),
+                            timeoutTcpConnect=Settings.instance().readValue( key = 'Network/tcp-connect-timeout', rType = 'int' ),
+                            responseTimeout=Settings.instance().readValue( key = 'Network/response-timeout', rType = 'int' ),
+                            selectTimeout=Settings.instance().readValue( key = 'Network/select-timeout', rType = 'float' ),
+                            sslSupport=Settings.instance().readValue( key = 'Server/data-ssl', rType = 'bool' ),
+                            wsSupport=Settings.instance().readValue( key = 'Server/data-websocket', rType = 'bool' ),
+                            pickleVer=Settings.instance().readValue( key = 'Network/pickle-version', rType = 'int' ),
+                            tcpKeepAlive=Settings.instance().readValue( key = 'Network/tcp-keepalive', rType = 'bool' ), 
+                            tcpKeepIdle=Settings.instance().readValue( key = 'Network/tcp-keepidle', rType = 'int' ),
+                            tcpKeepCnt=Settings.instance().readValue( key = 'Network/tcp-keepcnt', rType = 'int' ), 
+                            tcpKeepIntvl=Settings.instance().readValue( key = 'Network/tcp-keepintvl', rType = 'int' ),
+                            compression=Settings.instance().readValue( key = 'Network/compression' ) or None,
+                            compressionLevel=Settings.instance().readValue( key = 'Network/compression-level', rType = 'int' ),
+                            compressionMinSize=Settings.instance().readValue( key = 'Network/compression-min-size', rType = 'int' ),
+                            reactor=reactor, fifoCallback=fifoCallback
                         )
         self.parent = parent
 
@@ -25,7 +25,9 @@
 Detailed view module
 """
 import sys
+import time
 import base64
+import binascii
 # unicode = str with python3
 if sys.version_info > (3,):
     unicode = str
@@ -36,7 +38,7 @@ from PyQt5.QtWidgets import (QTextEdit, QDialogButtonBox, QVBoxLayout, QTreeWidg
                             QTreeWidget, QTreeView, QWidget, QLabel, QDialog, QToolBar, 
                             QSizePolicy, QScrollArea, QFileDialog, QHBoxLayout, QSplitter, 
                             QTabWidget, QTableWidget, QAbstractItemView, QApplication, QMenu)
-from PyQt5.QtCore import (Qt, pyqtSignal, QSize)
+from PyQt5.QtCore import (Qt, pyqtSignal, QSize, QAbstractItemModel, QModelIndex)
     
 from Libs import QtHelper, Logger
 import Settings
@@ -48,7 +50,6 @@ except NameError: # support python3
     xrange = range
     
 import base64
-import copy
 
 TYPE_DATA_PAYLOAD_V1            = '%payload-v1%'
 TYPE_DATA_TIMER                 = 'timer'
@@ -56,6 +57,13 @@ TYPE_DATA_STEP                  = 'step'
 TYPE_DATA_MATCH                 = 'match'
 TYPE_DATA_MATCH_RECEIVED        = 'match-received'
 
+# length of the values displayed in the trees
+PREVIEW_LIMIT                   = 50
+# length of the values in the tooltips of the payload
+TOOLTIP_LIMIT                   = 1024
+# bytes rendered in the hex view
+HEX_LIMIT                       = 256*1024
+
 #Char  Dec  Oct  Hex   WhatAreThey
 #---------------------------------------
 #(nul)   0 0000 0x00   Null 
@@ -229,7 +237,7 @@ class KeyItem(QTreeWidgetItem):
                     self.setToolTip(INDEX_COL_VALUE, str(value) )
             else:
                 self.setToolTip(INDEX_COL_VALUE, QString(value) )
-            limit = 50
+            limit = PREVIEW_LIMIT
             if noLimit:
                 self.setText(INDEX_COL_VALUE, value)
             else:
@@ -907,7 +915,497 @@ class TreeMemory(object):
                     subRet.append( (j,[]) )
         return subRet
         
-class DetailedView(QWidget):
+def getPreview(value):
+    """
+    Returns the preview of the value, the first line truncated,
+    only the beginning of the value is read
+
+    @param value: value of the key
+    @type value: string/bytes/integer/list
+
+    @return: preview
+    @rtype: string
+    """
+    if isinstance(value, (list, tuple, int, float, long)):
+        value = str(value)
+    # the utf8 characters are on 4 bytes max
+    head = value[:PREVIEW_LIMIT*4+1]
+    truncated = len(head) < len(value)
+    if isinstance(head, bytes):
+        head = head.decode('utf8', 'ignore')
+    lines = head.splitlines()
+    if not len(lines):
+        return ""
+    if len(lines[0]) > PREVIEW_LIMIT:
+        return "%s [...]" % lines[0][:PREVIEW_LIMIT]
+    if len(lines) > 1 or truncated:
+        return "%s [...]" % lines[0]
+    return lines[0]
+
+class PayloadNode(object):
+    """
+    Key of the payload, the children are created on the first expand
+    """
+    def __init__(self, key, parent=None, row=0, value=None, valueRaw=None, 
+                 colorKey='b', source=None):
+        """
+        Constructor
+
+        @param key: key displayed
+        @type key: string
+
+        @param parent: parent node, None for the root
+        @type parent: payloadnode/none
+
+        @param row: position in the parent
+        @type row: integer
+
+        @param value: value of the key
+        @type value: string/none
+
+        @param valueRaw: raw layer of the key
+        @type valueRaw: string/none
+
+        @param colorKey: b or bl
+        @type colorKey: string
+
+        @param source: payload of the children
+        @type source: dict/list/tuple/none
+        """
+        self.key = key
+        self.parent = parent
+        self.row = row
+        self.value = value
+        self.dataraw = valueRaw
+        self.color = colorKey
+        self.source = source
+        self.children = None
+        self.preview = None
+
+    def hasChildren(self):
+        """
+        Returns True if the node can have children, without loading them
+        """
+        if self.children is not None:
+            return len(self.children) > 0
+        return isinstance(self.source, (dict, list, tuple)) and len(self.source) > 0
+
+    def loadChildren(self):
+        """
+        Create the children from the payload, same rules as the template trees
+        """
+        self.children = []
+        source = self.source
+        self.source = None
+        if isinstance(source, (list, tuple)):
+            if len(source) != 2:
+                return
+            key, val = source
+            if key == TYPE_DATA_PAYLOAD_V1:
+                return
+            valueRaw = None
+            if isinstance(val, dict):
+                valueRaw = val.get('%%raw-layer%%')
+            self.children.append( PayloadNode( key=key, parent=self, row=0, valueRaw=valueRaw, 
+                                               colorKey='bl', source=val ) )
+        elif isinstance(source, dict):
+            for h, v in source.items():
+                if isinstance(v, (int, float)):
+                    v = str(v)
+                if isinstance(v, (list, tuple)):
+                    if len(v) == 2:
+                        sk, sv = v
+                        self.children.append( PayloadNode( key=str(h), parent=self, row=len(self.children), 
+                                                           value=sk, source=sv ) )
+                elif str(h) != '%%raw-layer%%':
+                    self.children.append( PayloadNode( key=str(h), parent=self, row=len(self.children), 
+                                                       value=v ) )
+
+    def getPreview(self):
+        """
+        Returns the preview of the value, computed on the first display
+        """
+        if self.value is None:
+            return ""
+        if self.preview is None:
+            try:
+                self.preview = getPreview(self.value)
+            except Exception:
+                self.preview = "[TEMPLATE MALFORMED (%s)]" % type(self.value)
+        return self.preview
+
+    def getToolTip(self):
+        """
+        Returns the tooltip of the value, truncated
+        """
+        if self.value is None:
+            return None
+        if isinstance(self.value, bytes):
+            return "binary data..."
+        value = "%s" % self.value
+        if len(value) > TOOLTIP_LIMIT:
+            return "%s [...]" % value[:TOOLTIP_LIMIT]
+        return value
+
+    def getTextKey(self):
+        """
+        Returns the text of the key
+        """
+        return self.key
+
+    def getTextValue(self):
+        """
+        Returns the text of the value
+        """
+        if isinstance(self.value, bytes):
+            return 'binary data...'
+        return self.value
+
+    def getData(self):
+        """
+        Returns the raw layer or the value, None if nothing to display
+        """
+        if self.dataraw is not None:
+            return self.dataraw
+        return self.value
+
+class PayloadModel(QAbstractItemModel):
+    """
+    Model of the payload of the events, lazy loading of the keys
+    """
+    def __init__(self, parent=None):
+        """
+        Constructor
+        """
+        QAbstractItemModel.__init__(self, parent)
+        self.root = PayloadNode(key='')
+        self.root.children = []
+        self.labels = [ "Key", "Value" ]
+
+    def setPayload(self, data):
+        """
+        Set the payload, only the first level is created
+
+        @param data: list of (key, value)
+        @type data: list
+        """
+        self.beginResetModel()
+        self.root = PayloadNode(key='', source=None)
+        self.root.children = []
+        for kv in data:
+            node = PayloadNode(key='', source=kv)
+            node.loadChildren()
+            for child in node.children:
+                child.parent = self.root
+                child.row = len(self.root.children)
+                self.root.children.append( child )
+        self.endResetModel()
+
+    def clear(self):
+        """
+        Remove the payload
+        """
+        self.beginResetModel()
+        self.root = PayloadNode(key='')
+        self.root.children = []
+        self.endResetModel()
+
+    def getNode(self, index):
+        """
+        Returns the node of the index, the root if not valid
+        """
+        if index.isValid():
+            return index.internalPointer()
+        return self.root
+
+    def index(self, row, column, parent=QModelIndex()):
+        """
+        Returns the index of the child
+        """
+        node = self.getNode(parent)
+        if node.children is None or row < 0 or row >= len(node.children):
+            return QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index):
+        """
+        Returns the index of the parent
+        """
+        if not index.isValid():
+            return QModelIndex()
+        node = index.internalPointer().parent
+        if node is None or node is self.root:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def rowCount(self, parent=QModelIndex()):
+        """
+        Returns the number of children loaded
+        """
+        if parent.column() > 0:
+            return 0
+        node = self.getNode(parent)
+        if node.children is None:
+            return 0
+        return len(node.children)
+
+    def columnCount(self, parent=QModelIndex()):
+        """
+        Returns the number of columns
+        """
+        return len(self.labels)
+
+    def hasChildren(self, parent=QModelIndex()):
+        """
+        Returns True if the node can be expanded
+        """
+        if parent.column() > 0:
+            return False
+        return self.getNode(parent).hasChildren()
+
+    def canFetchMore(self, parent):
+        """
+        Returns True if the children are not loaded
+        """
+        node = self.getNode(parent)
+        return node.children is None and node.hasChildren()
+
+    def fetchMore(self, parent):
+        """
+        Load the children of the node
+        """
+        node = self.getNode(parent)
+        if node.children is not None:
+            return
+        node.loadChildren()
+        if len(node.children):
+            self.beginInsertRows(parent, 0, len(node.children) - 1)
+            self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        """
+        Returns the data of the cell
+        """
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role == Qt.DisplayRole:
+            if index.column() == INDEX_COL_KEY:
+                return node.key
+            return node.getPreview()
+        if role == Qt.ToolTipRole:
+            if index.column() == INDEX_COL_KEY:
+                return node.key
+            return node.getToolTip()
+        if role == Qt.ForegroundRole:
+            if node.color == "bl":
+                return QColor(Qt.blue)
+            return QColor(Qt.black)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        """
+        Returns the labels of the columns
+        """
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.labels[section]
+        return None
+
+class PayloadTreeView(QWidget):
+    """
+    Tree view of the payload of the events
+    """
+    DataClicked = pyqtSignal(object)
+    def __init__ (self, parent):
+        """
+        Constructor
+
+        @param parent:
+        @type parent: 
+        """
+        QWidget.__init__(self, parent)
+        self.parent = parent
+        # rows of the nodes expanded, restored on the next payload
+        self.treeIndexes = []
+        self.createWidgets()
+        self.createConnections()
+
+    def createWidgets(self):
+        """
+        Create qt widgets
+        """
+        layout = QVBoxLayout()
+        self.frameLabel = QLabel()
+        layout.addWidget( self.frameLabel )
+
+        self.model = PayloadModel(self)
+        self.tree = QTreeView()
+        self.tree.setModel(self.model)
+        self.tree.setUniformRowHeights(True)
+        self.tree.setColumnWidth(INDEX_COL_KEY, 200)
+
+        layout.addWidget( self.tree )   
+        layout.setContentsMargins(0,0,0,0)
+        self.setLayout(layout)
+
+    def createConnections (self):
+        """
+        QtSignals connection
+        """
+        self.tree.clicked.connect(self.itemClicked)
+        self.tree.doubleClicked.connect(self.itemDoubleClicked)
+        self.tree.expanded.connect(self.itemExpanded)
+        self.tree.collapsed.connect(self.snapshot)
+
+    def setLabel (self, txt, bold = True):
+        """
+        Set label
+
+        @param txt:
+        @type txt: 
+
+        @param bold:
+        @type bold: boolean
+        """
+        self.frameLabel.setText(txt)
+        font = QFont()    
+        font.setBold(True)
+        self.frameLabel.setFont( font )
+
+    def setPayload(self, data):
+        """
+        Set the payload of the event
+
+        @param data: list of (key, value)
+        @type data: list
+        """
+        self.model.setPayload(data)
+
+    def clear (self):
+        """
+        Clear
+        """
+        self.model.clear()
+        self.frameLabel.setText('')
+
+    def currentNode(self):
+        """
+        Returns the node selected or None
+        """
+        index = self.tree.currentIndex()
+        if not index.isValid():
+            return None
+        return self.model.getNode(index)
+
+    def itemExpanded(self, index):
+        """
+        On item expanded, the children are loaded
+        """
+        if self.model.canFetchMore(index):
+            self.model.fetchMore(index)
+        self.snapshot()
+
+    def itemClicked(self, index):
+        """
+        On item clicked, the data is displayed in the raw views
+        """
+        data = self.model.getNode(index).getData()
+        if data is not None:
+            self.DataClicked.emit(data)
+
+    def itemDoubleClicked(self, index):
+        """
+        On item double clicked, the value is displayed in a dialog
+        """
+        data = self.model.getNode(index).getData()
+        if data is None:
+            return
+        if sys.version_info > (3,): # python3 support
+            if isinstance(data, bytes):
+                data = str(data, 'utf8', errors="ignore")
+        else:
+            try:
+                data = removeNonPrintableCharacter(datas=data.decode('utf8'))
+            except Exception:
+                pass
+        if isinstance(data, tuple):
+            self.parent.getParent().error( 'detailed view, item clicked: %s' % str(data) )
+            return
+        editorDialog = DescriptionDialog(data)
+        editorDialog.exec_()
+
+    def expandIndex(self, index):
+        """
+        Expand the item and all the subtree
+        """
+        index = index.sibling(index.row(), INDEX_COL_KEY)
+        if self.model.canFetchMore(index):
+            self.model.fetchMore(index)
+        self.tree.setExpanded(index, True)
+        for i in xrange( self.model.rowCount(index) ):
+            child = self.model.index(i, 0, index)
+            if self.model.hasChildren(child):
+                self.expandIndex(index=child)
+
+    def expandAll(self):
+        """
+        Expand all items, the children are loaded
+        """
+        for i in xrange( self.model.rowCount() ):
+            index = self.model.index(i, 0)
+            if self.model.hasChildren(index):
+                self.expandIndex(index=index)
+
+    def collapseAll(self):
+        """
+        Collapse all items
+        """
+        self.tree.collapseAll()
+
+    def snapshot(self, index=None):
+        """
+        Save the items expanded
+        """
+        self.treeIndexes = self.__snapshot(parent=QModelIndex())
+
+    def __snapshot(self, parent):
+        """
+        Sub function of snapshot, only the children loaded are visited
+        """
+        subRet = []
+        for i in xrange( self.model.rowCount(parent) ):
+            index = self.model.index(i, 0, parent)
+            if self.tree.isExpanded(index):
+                subRet.append( (i, self.__snapshot(parent=index)) )
+        return subRet
+
+    def restore(self):
+        """
+        Expand the items saved
+        """
+        indexes = self.treeIndexes
+        self.tree.blockSignals(True)
+        try:
+            self.__restore(parent=QModelIndex(), indexes=indexes)
+        finally:
+            self.tree.blockSignals(False)
+        self.treeIndexes = indexes
+
+    def __restore(self, parent, indexes):
+        """
+        Sub function of restore
+        """
+        for i, subIdx in indexes:
+            index = self.model.index(i, 0, parent)
+            if not index.isValid():
+                continue
+            if self.model.canFetchMore(index):
+                self.model.fetchMore(index)
+            self.tree.setExpanded(index, True)
+            if len(subIdx):
+                self.__restore(parent=index, indexes=subIdx)
+
+class DetailedView(QWidget, Logger.ClassLogger):
     """
     Detailed view
     """
@@ -921,12 +1419,16 @@ class DetailedView(QWidget):
         QWidget.__init__(self, parent)
         self.parent = parent
         self.treeIndexesSelected = []
+        # data displayed in the tabs, rendered when the tab is visible
+        self.rawData = None
+        self.rawRendered = set()
+        self.timings = []
+        self.timingLast = 0
 
         self.createActions()
         self.createWidgets()
         
         self.TemplateTreeMemory = TreeMemory(treeWidget=self.treeWidgetLeft)  
-        self.EventTreeMemory = TreeMemory(treeWidget=self.treeWidgetLeft2)
         
         self.createConnections()
 
@@ -1013,8 +1515,8 @@ class DetailedView(QWidget):
         self.treeWidgetRight.TemplateCollapsed.connect(self.onTemplateCollapsed)
         self.treeWidgetRight.TemplateClicked.connect(self.onTemplateClicked)
         
-        self.treeWidgetLeft2.tree.itemExpanded.connect(self.EventTreeMemory.snapshot)
-        self.treeWidgetLeft2.tree.itemCollapsed.connect(self.EventTreeMemory.snapshot)
+        self.treeWidgetLeft2.DataClicked.connect(self.setRawData)
+        self.rightTab.currentChanged.connect(self.renderTab)
         self.treeWidgetLeft.tree.itemExpanded.connect(self.TemplateTreeMemory.snapshot)
         self.treeWidgetLeft.tree.itemCollapsed.connect(self.TemplateTreeMemory.snapshot)
         
@@ -1029,8 +1531,7 @@ class DetailedView(QWidget):
         """
         Display the tree value of the left
         """
-        currentItem = self.treeWidgetLeft2.tree.currentItem()
-        self.treeWidgetLeft2.itemDoubleClicked(itm=currentItem)
+        self.treeWidgetLeft2.itemDoubleClicked(index=self.treeWidgetLeft2.tree.currentIndex())
 
     def displayTreeValueLeft3(self):
         """
@@ -1190,13 +1691,8 @@ class DetailedView(QWidget):
         self.treeWidgetLeft = QTreeWidgetTemplate( self, signalsReadMore=True ) 
         self.treeWidgetLeft.tree.setContextMenuPolicy(Qt.CustomContextMenu)
 
-        # tree for events
-        self.treeWidgetLeft2 = QTreeWidgetTemplate( self, signals=True, 
-                                                    textHexa=self.hexEdit, 
-                                                    textRaw=self.rawEdit , 
-                                                    imgRaw=self.imgEdit, 
-                                                    xmlRaw=self.xmlEdit, 
-                                                    htmlRaw=self.htmlEdit )
+        # tree for events, the raw views are updated on click
+        self.treeWidgetLeft2 = PayloadTreeView( self )
         self.treeWidgetLeft2.tree.setContextMenuPolicy(Qt.CustomContextMenu)
 
         self.treeWidgetLeft3 = QTreeWidgetTemplate( self, signals=True, 
@@ -1258,7 +1754,9 @@ class DetailedView(QWidget):
         Copy the key item to clipboard
         """
         # retrieve the text to copy
-        currentItem = self.treeWidgetLeft2.tree.currentItem()
+        currentItem = self.treeWidgetLeft2.currentNode()
+        if currentItem is None:
+            return
         itemKey = currentItem.getTextKey()
 
         # set clipboard 
@@ -1306,7 +1804,9 @@ class DetailedView(QWidget):
         Copy the value item to clipboard
         """
         # retrieve the text to copy
-        currentItem = self.treeWidgetLeft2.tree.currentItem()
+        currentItem = self.treeWidgetLeft2.currentNode()
+        if currentItem is None:
+            return
         itemValue = currentItem.getTextValue()
 
         # set clipboard 
@@ -1353,13 +1853,13 @@ class DetailedView(QWidget):
         """
         Expand all items
         """
-        self.treeWidgetLeft2.tree.expandAll()
+        self.treeWidgetLeft2.expandAll()
 
     def collapseAllItems(self):
         """
         Collapse all items
         """
-        self.treeWidgetLeft2.tree.collapseAll()
+        self.treeWidgetLeft2.collapseAll()
 
     def expandAllItemsLeft3(self):
         """
@@ -1412,9 +1912,9 @@ class DetailedView(QWidget):
         """
         Expand the subtree item
         """
-        currentItem = self.treeWidgetLeft2.tree.currentItem()
-        if currentItem is not None:
-            self.expandItem(itm=currentItem)
+        currentIndex = self.treeWidgetLeft2.tree.currentIndex()
+        if currentIndex.isValid():
+            self.treeWidgetLeft2.expandIndex(index=currentIndex)
 
     def expandSubtreeItemLeft(self):
         """
@@ -1505,9 +2005,9 @@ class DetailedView(QWidget):
         @param pos:
         @type pos:
         """
-        item = self.treeWidgetLeft2.tree.itemAt(pos)
+        item = self.treeWidgetLeft2.tree.indexAt(pos)
         self.menu = QMenu()
-        if item:
+        if item.isValid():
             self.menu.addAction( self.expandSubtreeAction )
             self.menu.addAction( self.expandAllAction )
             self.menu.addAction( self.collapseAllAction )
@@ -1532,6 +2032,7 @@ class DetailedView(QWidget):
         @param shortName: 
         @type shortName:
         """
+        self.startTiming()
         if dataType == TYPE_DATA_PAYLOAD_V1:
 
             if isinstance(data, list):
@@ -1541,6 +2042,7 @@ class DetailedView(QWidget):
                 self.vSplitter4.hide()
                 self.vSplitter2.hide()
                 self.vSplitter.hide()
+                self.addTiming("reset")
 
                 # extract payload header
                 payloadHeader = data[-1:][0] # last position of the list
@@ -1548,14 +2050,16 @@ class DetailedView(QWidget):
                 payloadName, payloadValue = payloadHeader
                 if payloadName == TYPE_DATA_PAYLOAD_V1:
                     self.extractHeader(val=payloadValue)
+                self.addTiming("header")
 
-                # read payload
-                for kv in data:
-                    self.loadTreeTemplate(kv, parent=self.treeWidgetLeft2.tree)
+                # read payload, the keys are created on expand
+                self.treeWidgetLeft2.setPayload(data)
+                self.addTiming("tree")
                 
                 # expand item ?
                 if QtHelper.str2bool(Settings.instance().readValue( key = 'TestRun/auto-expandcollapse-events' )):
-                    self.EventTreeMemory.restore()
+                    self.treeWidgetLeft2.restore()
+                    self.addTiming("expand")
   
             else:
                 pass
@@ -1567,6 +2071,7 @@ class DetailedView(QWidget):
                 self.vSplitter4.hide()
                 self.vSplitter2.hide()
                 self.vSplitter.hide()
+                self.addTiming("reset")
                 
                 # extract payload header
                 payloadHeader = data[-1:][0] # last position of the list
@@ -1574,14 +2079,15 @@ class DetailedView(QWidget):
                 payloadName, payloadValue = payloadHeader
                 if payloadName == TYPE_DATA_PAYLOAD_V1:
                     self.extractHeader(val=payloadValue)
+                self.addTiming("header")
 
                 # read payload
-                for kv in data:
-                    self.loadTreeTemplate(kv, parent=self.treeWidgetLeft2.tree)
+                self.treeWidgetLeft2.setPayload(data)
 
-                itm = self.treeWidgetLeft2.tree.topLevelItem( 0 )
-                if itm is not None:
-                    itm.setExpanded(True)
+                index = self.treeWidgetLeft2.model.index(0, 0)
+                if index.isValid():
+                    self.treeWidgetLeft2.expandIndex(index=index)
+                self.addTiming("tree")
             else:
                 pass
 
@@ -1606,6 +2112,7 @@ class DetailedView(QWidget):
                 # read payload
                 for kv in data:
                     self.loadTreeTemplate(kv, parent=self.treeWidgetLeft.tree, template=True)
+                self.addTiming("tree")
                     
                 if QtHelper.str2bool(Settings.instance().readValue( key = 'TestRun/auto-expandcollapse-templates' )):
                     self.TemplateTreeMemory.restore()
@@ -1650,6 +2157,7 @@ class DetailedView(QWidget):
                 # read received template
                 for kv in expected:
                     self.loadTreeTemplate(kv, parent=self.treeWidgetRight.tree,template=True)
+                self.addTiming("tree")
                     
                 if QtHelper.str2bool(Settings.instance().readValue( key = 'TestRun/auto-expandcollapse-templates' )):
                     self.TemplateTreeMemory.restore()
@@ -1689,6 +2197,34 @@ class DetailedView(QWidget):
                 else:
                     self.textEdit.setHtml(html=data)
                 self.textEdit.setEnabled(True)
+        self.traceTimings(dataType=dataType)
+
+    def startTiming(self):
+        """
+        Start the timing of the display of an event
+        """
+        self.timings = []
+        self.timingLast = time.time()
+
+    def addTiming(self, step):
+        """
+        Save the time of the step, since the previous step
+
+        @param step: name of the step
+        @type step: string
+        """
+        now = time.time()
+        self.timings.append( (step, now - self.timingLast) )
+        self.timingLast = now
+
+    def traceTimings(self, dataType):
+        """
+        Trace the time of each step of the display
+        """
+        self.addTiming("other")
+        total = sum( t for step, t in self.timings )
+        steps = ", ".join( [ "%s=%0.1f" % (step, t*1000) for step, t in self.timings ] )
+        self.trace("time to display the event %s (in ms): %0.1f (%s)" % (dataType, total*1000, steps) )
 
     def loadTreeTemplate (self, keyval, parent, template=False):
         """
@@ -1711,8 +2247,8 @@ class DetailedView(QWidget):
                 if template:
                     key, clr = self.getColor(txt=key)
                 if isinstance(val, dict):
-                    if '%%raw-layer%%' in val:
-                        valueRaw = copy.deepcopy( val['%%raw-layer%%'] )
+                    # read only, not copied
+                    valueRaw = val.get('%%raw-layer%%')
 
                 keyItem = KeyItem( key = key, valueRaw=valueRaw, parent = parent, 
                                    colorKey = clr, colorValue = clrValue, 
@@ -1816,32 +2352,72 @@ class DetailedView(QWidget):
             resume = 'Length: %s, Arrival Time: %s' % ( QtHelper.bytes2human(sz), 
                                                         QtHelper.formatTimestamp(t, milliseconds=True) )
         self.treeWidgetLeft2.setLabel(resume  )
-        
-        # update image view
-        self.imgEdit.setImage(content=hx)
-        
-        if sys.version_info > (3,): # python3 support
-            hx = str(hx, 'utf-8', errors='ignore')
-            
-        # fills raw view
+
+        # the views are filled when displayed
+        self.setRawData(data=hx)
+
+    def setRawData(self, data):
+        """
+        Set the data of the raw, xml, html, image and hex views,
+        only the current view is rendered
+
+        @param data: raw data
+        @type data: bytes/string
+        """
+        self.rawData = data
+        self.rawRendered = set()
         self.rawEdit.setEnabled(True)
-        if sys.version_info > (3,):
-            rawTxt = hx
-        else:
-            rawTxt = removeNonPrintableCharacter(datas=hx)
-        self.rawEdit.setPlainText( rawTxt )
         self.htmlEdit.setEnabled(True)
-        self.htmlEdit.setHtml( rawTxt )
-
-        # fills xml view
         self.xmlEdit.setEnabled(True)
-        xmlTxt = rawTxt.replace('><', '>\r\n<')
-        self.xmlEdit.setText(xmlTxt)
-
-        # fills hex view
         self.hexEdit.setEnabled(True)
-        hexas = ["%02X" % (ord(ch),) for ch in str(hx) ]
-        self.hexEdit.setPlainText( ' '.join(hexas) )
+        self.renderTab(index=self.rightTab.currentIndex())
+
+    def renderTab(self, index):
+        """
+        Render the raw data in the tab, once for each data
+
+        @param index: index of the tab
+        @type index: integer
+        """
+        if self.rawData is None or index in self.rawRendered:
+            return
+        self.rawRendered.add(index)
+        start = time.time()
+
+        widget = self.rightTab.widget(index)
+        data = self.rawData
+        if widget is self.imgEdit:
+            try:
+                self.imgEdit.setImage(content=data)
+            except UnicodeEncodeError:
+                pass
+        elif widget is self.hexEdit:
+            if not isinstance(data, bytes):
+                data = data.encode('utf8')
+            hexas = binascii.hexlify( data[:HEX_LIMIT] ).decode('ascii').upper()
+            hexText = ' '.join( [ hexas[i:i+2] for i in xrange(0, len(hexas), 2) ] )
+            if len(data) > HEX_LIMIT:
+                hexText += ' [... %s]' % QtHelper.bytes2human(len(data))
+            self.hexEdit.setPlainText( hexText )
+        else:
+            if sys.version_info > (3,): # python3 support
+                if isinstance(data, bytes):
+                    rawTxt = str(data, 'utf8', errors="ignore")
+                else:
+                    rawTxt = data
+            else:
+                try:
+                    rawTxt = removeNonPrintableCharacter(datas=data.decode('utf8'))
+                except Exception:
+                    rawTxt = removeNonPrintableCharacter(datas=data)
+
+            if widget is self.rawEdit:
+                self.rawEdit.setPlainText( rawTxt )
+            elif widget is self.htmlEdit:
+                self.htmlEdit.setHtml( rawTxt )
+            elif widget is self.xmlEdit:
+                self.xmlEdit.setText( rawTxt.replace('><', '>\r\n<') )
+        self.trace("time to render the tab %s (in ms): %0.1f" % (self.rightTab.tabText(index), (time.time()-start)*1000) )
 
     def reset (self):
         """
@@ -1855,6 +2431,8 @@ class DetailedView(QWidget):
         self.htmlEdit.resetView()
         self.imgEdit.resetView()
         self.xmlEdit.setText("")
+        self.rawData = None
+        self.rawRendered = set()
 
         self.treeWidgetLeft.clear()
         self.treeWidgetLeft2.clear()
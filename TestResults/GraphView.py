@@ -23,6 +23,8 @@
 
 """
 Module to display events logs in a flow chart
+Only the items of the steps visible are created, they are recycled on scroll
+and the consecutive steps are aggregated when zoomed out
 """
 import sys
 
@@ -34,19 +36,91 @@ from PyQt5.QtGui import (QColor, QPen, QBrush, QCursor, QPainter)
 from PyQt5.QtWidgets import (QGraphicsLineItem, QGraphicsRectItem, QGraphicsTextItem, 
                             QWidget, QGraphicsScene, QGraphicsView, QVBoxLayout, 
                             QTextEdit, QSplitter)
-from PyQt5.QtCore import (Qt)
+from PyQt5.QtCore import (Qt, QTimer)
 
 from Libs import QtHelper, Logger
 import Settings
 
 import math
 
+# vertical space between two steps
+STEP_SPACING    = 80
+# width of the diagram and position of the timestamps
+DIAGRAM_WIDTH   = 400
+TIMESTAMP_POS   = -200
+# steps aggregated when a step is smaller than this height on screen, in pixels
+MIN_STEP_PIXELS = 20
+# steps displayed around the visible area
+MARGIN_STEPS    = 2
+# limits of the zoom
+MIN_SCALE       = 0.001
+MAX_SCALE       = 4.0
+# max number of steps described in the text of an aggregate
+MAX_GROUP_TEXT  = 50
+
+def toText(name):
+    """
+    Return the name as text
+    """
+    if sys.version_info > (3,) and isinstance(name, bytes): 
+        name = str(name, "utf8", errors="ignore")
+    return name
+
+class Step(object):
+    """
+    Step of the diagram, the item is created only when visible
+    """
+    def __init__(self, parent, index, text, color, width, height, data, timestamp):
+        """
+        Constructor
+        """
+        self.parentWidget = parent
+        self.index = index
+        self.text = text
+        self.color = color
+        self.width = width
+        self.height = height
+        self.data = data
+        self.timestamp = timestamp
+        self.status = True
+        self.filled = False
+        # block item bound to the step, None if not visible
+        self.item = None
+
+    def x(self):
+        """
+        Return the position x of the step
+        """
+        if self.width in [ 100, 300 ]:
+            return DIAGRAM_WIDTH/2 - self.width/2
+        return 0
+
+    def y(self):
+        """
+        Return the position y of the step
+        """
+        return self.index * STEP_SPACING
+
+    def setColor(self, blockColor):
+        """
+        Set color
+        """
+        self.color = blockColor
+        self.filled = True
+        self.parentWidget.stepChanged(self)
+
+    def setData(self, data):
+        """
+        Set data
+        """
+        self.data = data
+        self.parentWidget.stepChanged(self)
 
 class LineItem(QGraphicsLineItem ):
     """
     Line Item
     """
-    def __init__(self, sourceItem, destItem, colorStr="#A5A2A5", arrowWidth=1  ):
+    def __init__(self, colorStr="#A5A2A5", arrowWidth=1  ):
         QGraphicsLineItem .__init__(self)
 
         color = QColor(0, 0, 0)
@@ -55,27 +129,13 @@ class LineItem(QGraphicsLineItem ):
         self.arrowWidth = arrowWidth
         self.arrowColor = color
 
-        self.sourceItem = sourceItem
-        self.destItem = destItem
-        
-        self.setTestLine()
-        
-    def setTestLine(self):
+    def bind(self, sourceStep, destStep):
         """
-        Set the test line
-        """        
-        pos1 = self.sourceItem.scenePos()
-        pos2 = self.destItem.scenePos()
-        
-        fromRect = self.sourceItem.rect()
-        toRect = self.destItem.rect()
-        
-        h1 = fromRect.height()
-        w1 = fromRect.width()
-        h2 = toRect.height()
-        w2 = toRect.width()
-        
-        self.setLine( pos1.x() + w1 / 2, pos1.y() + h1,  pos2.x() + w2 / 2, pos2.y() )
+        Set the line between two steps
+        """
+        self.setLine( sourceStep.x() + sourceStep.width / 2, sourceStep.y() + sourceStep.height,  
+                      destStep.x() + destStep.width / 2, destStep.y() )
+        self.show()
         
 class TimestampItem(QGraphicsRectItem):
     """ 
@@ -89,16 +149,21 @@ class TimestampItem(QGraphicsRectItem):
 
         self.parentWidget = parent
 
-        if sys.version_info > (3,):
-            if isinstance(name, bytes):
-                name = str(name, "utf8", errors="ignore")
-            
-        self.label = QGraphicsTextItem(name, self)
+        self.label = QGraphicsTextItem(toText(name), self)
 
         self.setColor(blockColor="#FFFFFF")
 
         self.changeSize(width, height)
 
+    def bind(self, step):
+        """
+        Display the timestamp of the step
+        """
+        self.label.setPlainText( toText(step.timestamp) )
+        self.changeSize(self.rect().width(), self.rect().height())
+        self.setPos(TIMESTAMP_POS, step.y())
+        self.show()
+
     def setColor(self, blockColor):
         """
         Set color
@@ -140,21 +205,77 @@ class BlockItem(QGraphicsRectItem):
         self.parentWidget = parent
         self.internalData = data
         self.status = status
+        self.step = None
         
         color = QColor(0, 0, 0)
         color.setNamedColor( blockColor )
         self.setPen(QPen(color, 2)) 
 
-        if sys.version_info > (3,) and isinstance(name, bytes): 
-            name = str(name, "utf8", errors="ignore")
-            
-        self.label = QGraphicsTextItem(name, self)
+        self.label = QGraphicsTextItem(toText(name), self)
 
         self.setFlags(self.ItemIsSelectable)    
         self.setCursor(QCursor(Qt.PointingHandCursor))
         
         self.changeSize(width, height)
 
+    def bind(self, step):
+        """
+        Display the step
+
+        @param step: step
+        @type step: step
+        """
+        self.step = step
+        self.internalData = step.data
+        self.status = step.status
+        step.item = self
+
+        self.label.setPlainText( toText(step.text) )
+        color = QColor(0, 0, 0)
+        color.setNamedColor( step.color )
+        if step.filled:
+            self.setPen(QPen(color, 1))
+            self.setBrush(QBrush(color))
+        else:
+            self.setPen(QPen(color, 2)) 
+            self.setBrush(QBrush())
+        self.changeSize(step.width, step.height)
+        self.setPos(step.x(), step.y())
+        self.show()
+
+    def bindGroup(self, steps):
+        """
+        Display consecutive steps in one block
+
+        @param steps: steps
+        @type steps: list
+        """
+        self.step = None
+        
+        failed = [ stp for stp in steps if stp.status == False ]
+        color = QColor(0, 0, 0)
+        color.setNamedColor( failed[0].color if len(failed) else steps[-1].color )
+        self.setPen(QPen(color, 1))
+        self.setBrush(QBrush(color))
+
+        self.label.setPlainText( "%s steps" % len(steps) )
+        self.internalData = "\n".join( [ "%s: %s" % (toText(stp.timestamp), toText(stp.text)) 
+                                         for stp in steps[:MAX_GROUP_TEXT] ] )
+        if len(steps) > MAX_GROUP_TEXT:
+            self.internalData += "\n..."
+        self.changeSize(DIAGRAM_WIDTH, len(steps) * STEP_SPACING - STEP_SPACING / 2)
+        self.setPos(0, steps[0].y())
+        self.show()
+
+    def release(self):
+        """
+        Unbind the step, the item is hidden and can be reused
+        """
+        if self.step is not None:
+            self.step.item = None
+            self.step = None
+        self.hide()
+
     def setData(self, data):
         """
         Set data
@@ -214,6 +335,39 @@ class BlockItem(QGraphicsRectItem):
             self.parentWidget.logEdit.setText(data)
         else:
             self.parentWidget.logEdit.setText("")
+
+class FlowChartGraphicsView(QGraphicsView):
+    """
+    Graphics view with zoom on ctrl+wheel
+    """
+    def __init__(self, scene, parent):
+        """
+        Constructor
+        """
+        QGraphicsView.__init__(self, scene)
+        self.parentWidget = parent
+
+    def wheelEvent(self, event):
+        """
+        On wheel event, zoom with the control key
+        """
+        if not (event.modifiers() & Qt.ControlModifier):
+            QGraphicsView.wheelEvent(self, event)
+            return
+
+        factor = 1.25 if event.angleDelta().y() > 0 else 0.8
+        scale = self.transform().m22() * factor
+        if MIN_SCALE <= scale <= MAX_SCALE:
+            self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
+            self.scale(factor, factor)
+            self.parentWidget.scheduleUpdate()
+
+    def resizeEvent(self, event):
+        """
+        On resize event
+        """
+        QGraphicsView.resizeEvent(self, event)
+        self.parentWidget.scheduleUpdate()
             
 class FlowChartView(QWidget):
     """
@@ -229,8 +383,16 @@ class FlowChartView(QWidget):
         QWidget.__init__(self, parent)
         
         self.steps = []
-        self.timestamps = []
-        self.arrows = []
+        # items displayed by key, ('step', index), ('time', index), ('line', index) or ('group', ...)
+        self.displayed = {}
+        # items hidden, ready to be reused
+        self.blocksPool = []
+        self.timestampsPool = []
+        self.arrowsPool = []
+
+        self.updatePending = False
+        self.scrollPending = False
+        self.autoScrolling = QtHelper.str2bool( Settings.instance().readValue( key = 'TestRun/auto-scrolling-graph' ) )
         
         self.createWidget()
     
@@ -239,10 +401,13 @@ class FlowChartView(QWidget):
         Create the widget
         """
         self.diagramScene = QGraphicsScene(self)
+        # few items moved often, no index
+        self.diagramScene.setItemIndexMethod(QGraphicsScene.NoIndex)
 
-        self.view = QGraphicsView(self.diagramScene)
+        self.view = FlowChartGraphicsView(self.diagramScene, self)
         
         self.view.setRenderHint(QPainter.Antialiasing)
+        self.view.verticalScrollBar().valueChanged.connect(self.scheduleUpdate)
 
         # set the main layout
         layout = QVBoxLayout()
@@ -266,62 +431,161 @@ class FlowChartView(QWidget):
         """
         Clear all 
         """
-        #self.diagramScene.clear()
-  
-        for stp in self.steps:
-            self.diagramScene.removeItem(stp)
-
-        for stp in self.arrows:
-            self.diagramScene.removeItem(stp)
-            
-        for stamp in self.timestamps:
-            self.diagramScene.removeItem(stamp)
-            
-        self.diagramScene.clear()
+        for key in list(self.displayed.keys()):
+            self.releaseItem(key)
+        self.steps = []
+        self.updateSceneRect()
         self.diagramScene.update()
         self.view.resetCachedContent()
 
-        self.steps = []
-        self.arrows = []
-        self.timestamps = []
         self.logEdit.setText("")
+
+    def activeAutoscrolling(self):
+        """
+        Scroll to the last step added
+        """
+        self.autoScrolling = True
+
+    def disableAutoscrolling(self):
+        """
+        Disable the scrolling to the last step added
+        """
+        self.autoScrolling = False
         
     def addStep(self, text, color="#A5A2A5", width=400, height=40, data=None, 
                       textBold=False, textItalic=False, timestamp="00:00:00"):
         """
-        Add step
+        Add step, the items are created later if the step is visible
+        """
+        newStep = Step(self, len(self.steps), text, color=color, width=width, 
+                       height=height, data=data, timestamp=timestamp)
+        self.steps.append( newStep )
+        self.updateSceneRect()
+        
+        if self.autoScrolling and not self.scrollPending:
+            self.scrollPending = True
+            QTimer.singleShot(0, self.scrollToLastStep)
+        self.scheduleUpdate()
+        return newStep
+
+    def scrollToLastStep(self):
+        """
+        Scroll to the last step
         """
-        # take the last one
+        self.scrollPending = False
         if len(self.steps):
-            latestBlock = self.steps[-1:][0]
-        else:
-            latestBlock = None
+            lastStep = self.steps[-1]
+            self.view.centerOn(lastStep.x() + lastStep.width / 2, lastStep.y())
+
+    def updateSceneRect(self):
+        """
+        Resize the scene for all the steps
+        """
+        self.diagramScene.setSceneRect( TIMESTAMP_POS, 0, DIAGRAM_WIDTH - TIMESTAMP_POS, 
+                                        max(1, len(self.steps)) * STEP_SPACING )
+
+    def stepChanged(self, step):
+        """
+        On step updated, the items displayed are updated
+        """
+        if step.item is not None:
+            step.item.bind(step)
+        elif self.getGroupSize() > 1:
+            # the aggregates are computed again
+            for key in list(self.displayed.keys()):
+                if key[0] == 'group':
+                    self.releaseItem(key)
+            self.scheduleUpdate()
+
+    def scheduleUpdate(self, value=None):
+        """
+        Update the items visible on the next loop, once for several changes
+        """
+        if not self.updatePending:
+            self.updatePending = True
+            QTimer.singleShot(0, self.updateVisibleItems)
+
+    def getGroupSize(self):
+        """
+        Return the number of steps by block according to the zoom, power of 2
+        """
+        pixels = STEP_SPACING * self.view.transform().m22()
+        if pixels >= MIN_STEP_PIXELS:
+            return 1
+        return 2 ** int(math.ceil( math.log(MIN_STEP_PIXELS / pixels, 2) ))
+
+    def updateVisibleItems(self):
+        """
+        Display the steps in the visible area only, the other items are reused
+        """
+        self.updatePending = False
         
-        newBlock = BlockItem(self, text, blockColor=color, width=width, 
-                             height=height, data=data, bold=textBold, 
-                             italic=textItalic)
-        if width == 100:
-            newBlock.setPos( 400/2 - 100/2, len(self.steps) * 80 )
-        elif width == 300:
-            newBlock.setPos( 400/2 - 300/2, len(self.steps) * 80 )
+        rect = self.view.mapToScene( self.view.viewport().rect() ).boundingRect()
+        first = max(0, int(rect.top() // STEP_SPACING) - MARGIN_STEPS)
+        last = min(len(self.steps) - 1, int(rect.bottom() // STEP_SPACING) + MARGIN_STEPS)
+
+        wanted = {}
+        group = self.getGroupSize()
+        if group == 1:
+            for i in range(first, last + 1):
+                wanted[ ('step', i) ] = i
+                wanted[ ('time', i) ] = i
+                if i > 0:
+                    wanted[ ('line', i) ] = i
         else:
-            newBlock.setPos(0, len(self.steps) * 80 )
-        
-        self.steps.append( newBlock )
-        self.diagramScene.addItem(newBlock)
-        
-        newTimestampBlock = TimestampItem(self, timestamp)
-        newTimestampBlock.setPos(-200, len(self.timestamps) * 80 )
-        
-        self.timestamps.append( newTimestampBlock )
-        self.diagramScene.addItem(newTimestampBlock)
-        
-        if latestBlock is not None:
-            newArrow = LineItem(latestBlock, newBlock)
-            self.diagramScene.addItem(newArrow)
-            self.arrows.append( newArrow )
-        
-        if  QtHelper.str2bool( Settings.instance().readValue( key = 'TestRun/auto-scrolling-graph' ) ):
-            self.view.centerOn(newBlock)
-        return newBlock
-        
\ No newline at end of file
+            for start in range(first - first % group, last + 1, group):
+                # the number of steps is in the key, the last group grows with the new steps
+                count = min(group, len(self.steps) - start)
+                wanted[ ('group', start, count) ] = start
+
+        for key in list(self.displayed.keys()):
+            if key not in wanted:
+                self.releaseItem(key)
+        for key, i in wanted.items():
+            if key not in self.displayed:
+                self.displayItem(key, i)
+
+    def displayItem(self, key, i):
+        """
+        Display an item for the key, reused from the pool if possible
+        """
+        if key[0] in [ 'step', 'group' ]:
+            if len(self.blocksPool):
+                item = self.blocksPool.pop()
+            else:
+                item = BlockItem(self)
+                self.diagramScene.addItem(item)
+            if key[0] == 'step':
+                item.bind( self.steps[i] )
+            else:
+                item.bindGroup( self.steps[i:i+key[2]] )
+        elif key[0] == 'time':
+            if len(self.timestampsPool):
+                item = self.timestampsPool.pop()
+            else:
+                item = TimestampItem(self, "")
+                self.diagramScene.addItem(item)
+            item.bind( self.steps[i] )
+        else:
+            if len(self.arrowsPool):
+                item = self.arrowsPool.pop()
+            else:
+                item = LineItem()
+                self.diagramScene.addItem(item)
+            item.bind( self.steps[i-1], self.steps[i] )
+        self.displayed[key] = item
+
+    def releaseItem(self, key):
+        """
+        Hide the item of the key and put it in the pool
+        """
+        item = self.displayed.pop(key)
+        if key[0] in [ 'step', 'group' ]:
+            item.release()
+            self.blocksPool.append(item)
+        elif key[0] == 'time':
+            item.hide()
+            self.timestampsPool.append(item)
+        else:
+            item.hide()
+            self.arrowsPool.append(item)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------------------------
+# Copyright (c) 2010-2020 Denis Machard
+# This file is part of the extensive automation project
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA 02110-1301 USA
+# -------------------------------------------------------------------
+
+"""
+Module to search the events in all the testcases of the test result
+"""
+import sys
+
+# unicode = str with python3
+if sys.version_info > (3,):
+    unicode = str
+
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QLabel,
+                            QTreeWidget, QTreeWidgetItem, QAbstractItemView)
+from PyQt5.QtCore import (Qt, QTimer, pyqtSignal)
+
+COL_TEST        = 0
+COL_NUM         = 1
+COL_TIMESTAMP   = 2
+COL_EVENT       = 3
+COL_FROM        = 4
+COL_TEXT        = 5
+
+# delay before searching when the query is updated, in milliseconds
+SEARCH_DELAY    = 300
+
+class SearchView(QWidget):
+    """
+    Search view
+    """
+    GotoMatch = pyqtSignal(str, int)
+    def __init__(self, parent, index):
+        """
+        Constructs the search view
+
+        @param parent:
+        @type parent:
+
+        @param index: index of the events
+        @type index: eventindex
+        """
+        QWidget.__init__(self, parent)
+        self.index = index
+
+        self.searchTimer = QTimer(self)
+        self.searchTimer.setSingleShot(True)
+        self.searchTimer.setInterval(SEARCH_DELAY)
+
+        self.createWidgets()
+        self.createConnections()
+
+    def createWidgets (self):
+        """
+        QtWidgets creation
+        """
+        self.queryEdit = QLineEdit()
+        self.queryEdit.setPlaceholderText("words, level:error, from:component, time:10:42, prefix*")
+        self.resultLabel = QLabel()
+
+        layoutQuery = QHBoxLayout()
+        layoutQuery.addWidget(self.queryEdit)
+        layoutQuery.addWidget(self.resultLabel)
+
+        self.results = QTreeWidget()
+        self.results.setRootIsDecorated(False)
+        self.results.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.results.setHeaderLabels( [ "Test Id", "No.", "Timestamp", "Event Type", "Component Type", "Text" ] )
+        self.results.setColumnWidth(COL_TEST, 60)
+        self.results.setColumnWidth(COL_NUM, 50)
+        self.results.setColumnWidth(COL_TIMESTAMP, 80)
+        self.results.setColumnWidth(COL_EVENT, 110)
+        self.results.setColumnWidth(COL_FROM, 150)
+
+        layout = QVBoxLayout()
+        layout.addLayout(layoutQuery)
+        layout.addWidget(self.results)
+        layout.setContentsMargins(0,0,0,0)
+        self.setLayout(layout)
+
+    def createConnections (self):
+        """
+        QtSignals connection
+        """
+        self.queryEdit.textChanged.connect(self.searchTimer.start)
+        self.queryEdit.returnPressed.connect(self.search)
+        self.searchTimer.timeout.connect(self.search)
+        self.results.itemActivated.connect(self.onItemActivated)
+
+    def search(self):
+        """
+        Search the events matching the query
+        """
+        self.searchTimer.stop()
+        self.results.clear()
+
+        query = self.queryEdit.text()
+        if not len(query.strip()):
+            self.resultLabel.setText("")
+            return
+
+        nb, matches = self.index.search(query=query)
+        items = []
+        for testId, position, timestamp, level, component, text in matches:
+            item = QTreeWidgetItem( [ testId, "%s" % position, timestamp, level.upper(), component, text ] )
+            item.setData(COL_TEST, Qt.UserRole, (testId, position) )
+            items.append(item)
+        self.results.addTopLevelItems(items)
+
+        if nb > len(matches):
+            text = "%s matches, %s displayed" % (nb, len(matches))
+        else:
+            text = "%s matches" % nb
+        if self.index.isIndexing():
+            text += " (indexing...)"
+        self.resultLabel.setText(text)
+
+    def onItemActivated(self, item, column):
+        """
+        On result activated, go to the event
+        """
+        testId, position = item.data(COL_TEST, Qt.UserRole)
+        self.GotoMatch.emit(testId, position)
+
+    def reset(self):
+        """
+        Clear the results
+        """
+        self.results.clear()
+        self.resultLabel.setText("")
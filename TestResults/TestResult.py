@@ -33,28 +33,19 @@ if sys.version_info > (3,):
 from PyQt5.QtGui import (QCursor, QColor)
 from PyQt5.QtWidgets import (QLabel, QTextEdit, QDialogButtonBox, QVBoxLayout, 
                             QPushButton, QHBoxLayout, QWidget, QTabWidget, QSplitter, 
-                            QDialog, QMessageBox, QApplication, QLineEdit, QFrame)
-from PyQt5.QtCore import (Qt)
+                            QDialog, QMessageBox, QLineEdit, QFrame)
+from PyQt5.QtCore import (Qt, QTimer)
     
 import time
 import base64
 import os
 
-try:
-    import cStringIO
-except ImportError: # support python 3
-    import io as cStringIO
-try:
-    import cPickle
-except ImportError: # support python 3
-    import pickle as cPickle
-
 try:
     xrange
 except NameError: # support python3
     xrange = range
 
-from Libs import QtHelper, Logger
+from Libs import QtHelper, Logger, EventStore, EventIndex
 
 import Settings
 import Workspace.FileModels.TestResult as TestResultModel
@@ -66,18 +57,26 @@ try:
     import TextualView
     import TestsView
     import DetailedView
+    import SearchView
 except ImportError:
     from . import GraphView
     from . import ResumeView
     from . import TextualView
     from . import TestsView
     from . import DetailedView
+    from . import SearchView
     
 import UserClientInterface as UCI
 import RestClientInterface as RCI
 
 DURATION_PRECISION = 3
 
+# interval to refresh the memory used by the events, in milliseconds
+MEMORY_REFRESH_INTERVAL = 2000
+
+# events displayed in the views, the others are applied immediately in a batch
+VIEW_EVENTS = [ 'testglobal', 'testplan', 'testabstract', 'testsuite', 'testunit', 'testcase' ]
+
 class CommentDialog(QtHelper.EnhancedQDialog, Logger.ClassLogger):
     """
     Comment dialog
@@ -168,7 +167,11 @@ class WTestResult(QWidget, Logger.ClassLogger):
         
         # default variables
         self.script = {}
-        self.scriptEvents = {}
+        # the local test results are indexed from the file, in one time
+        self.eventIndex = EventIndex.EventIndex()
+        self.scriptEvents = EventStore.EventStore( maxMemory=Settings.instance().readValue( key = 'TestRun/events-memory', rType = 'int' )*1024*1024,
+                                                   spillPath="%s/Tmp/" % QtHelper.dirExec(),
+                                                   index=None if self.local else self.eventIndex )
         self.testcases = {}
         self.separators = {}
         
@@ -186,11 +189,18 @@ class WTestResult(QWidget, Logger.ClassLogger):
         self.dataModel = None
         self.headerReady = False
         self.isLoading = False
+        self.pendingTest = None
+        self.eventsLoader = QtHelper.EventsLoader(self)
+
+        # live events added in the views at the end of the batch
+        self.batching = False
+        self.liveEvents = []
+
+        # memory used by the events, refreshed periodically
+        self.memoryTimer = QTimer(self)
+        self.memoryTimer.timeout.connect(self.updateMemoryUsage)
+        self.memoryTimer.start(MEMORY_REFRESH_INTERVAL)
 
-        # new in v16
-        self.bigTr = False
-        self.bigCache = { 'index': 0, 'testId': '', 'testName': '', "nb-total": 0 }
-        
         self.taskUuid = None
         self.setDefaultFilter()
 
@@ -212,12 +222,13 @@ class WTestResult(QWidget, Logger.ClassLogger):
         self.logsItem = TestsView.TestsView(parent=self, local = self.local)
         
         self.resumeView = ResumeView.TextualView(parent=self)
-        if  QtHelper.str2bool( Settings.instance().readValue( key = 'TestRun/hide-resume-view' ) ):
+        if  Settings.instance().readValue( key = 'TestRun/hide-resume-view', rType = 'bool' ):
             self.hideResumeView()
 
         self.graphView = GraphView.FlowChartView(parent=self)
         self.logsView = TextualView.TextualView2(parent=self)
         self.hexLogsView = DetailedView.DetailedView(parent=self)
+        self.searchView = SearchView.SearchView(parent=self, index=self.eventIndex)
     
         self.displayTab = QTabWidget()
 
@@ -230,6 +241,7 @@ class WTestResult(QWidget, Logger.ClassLogger):
 
         self.displayTab.addTab(hSplitter, self.tr('Events') )
         self.displayTab.addTab(self.graphView, self.tr('Diagram') )
+        self.displayTab.addTab(self.searchView, self.tr('Search') )
         
         defaultTab = Settings.instance().readValue( key = 'TestRun/default-tab-run' )
         self.displayTab.setCurrentIndex(int(defaultTab))   
@@ -266,6 +278,7 @@ class WTestResult(QWidget, Logger.ClassLogger):
         self.logsItem.TestName.connect( self.refreshTestName )
         self.logsView.ShowHexaView.connect( self.showHexaView )
         self.resumeView.GotoEvent.connect( self.gotoEvent )
+        self.searchView.GotoMatch.connect( self.gotoMatch )
         self.logsItem.AddPostTest.connect( self.addPostTest )
         self.logsItem.ExportVerdict.connect(self.exportVerdict)
         self.logsItem.ExportReport.connect(self.exportReport)
@@ -281,8 +294,10 @@ class WTestResult(QWidget, Logger.ClassLogger):
         # new in v12
         self.logsItem.ActiveScrollingDiagram.connect(self.activeScrollingDiagram)
         self.logsItem.DisableScrollingDiagram.connect(self.disableScrollingDiagram)
-        # new in v16
-        self.logsItem.LoadNext.connect( self.loadNext )
+        self.logsItem.GotoEventNumber.connect( self.gotoEventNumber )
+        self.logsItem.FindNextEvent.connect( self.findNextEvent )
+        # the values of the settings dialog are applied on save
+        Settings.instance().SettingsChanged.connect( self.onSettingsChanged )
         
     def setDefaultFilter(self):
         """
@@ -294,13 +309,13 @@ class WTestResult(QWidget, Logger.ClassLogger):
         """
         Active scrolling on diagram
         """
-        pass
+        self.graphView.activeAutoscrolling()
 
     def disableScrollingDiagram(self):
         """
         Disable scrolling on diagram
         """
-        pass
+        self.graphView.disableAutoscrolling()
         
     def activeScrollingEventLogs(self):
         """
@@ -323,15 +338,32 @@ class WTestResult(QWidget, Logger.ClassLogger):
         if not loaded:
             self.error( 'unable to load local data model (%s)' % self.localFilename  )
 
+    def indexLocalData(self):
+        """
+        Index all the events of the local test result in background
+        """
+        if self.dataModel is None:
+            return
+        self.eventIndex.indexLines( lines=self.dataModel.getLines() )
+
     def delLocalData(self):
         """
         Delete the local file
         """
+        self.eventIndex.close()
+        self.scriptEvents.clear()
         try:
             if len(self.localFilename): os.remove(self.localFilename)
         except Exception as e:
             pass
             
+    def updateMemoryUsage(self):
+        """
+        Update the memory used by the events of the test result
+        """
+        self.logsItem.setMemoryUsage( memory=self.scriptEvents.getMemory(), 
+                                      disk=self.scriptEvents.getDisk() )
+
     def showResumeView(self):
         """
         Show the resume view
@@ -404,8 +436,35 @@ class WTestResult(QWidget, Logger.ClassLogger):
         if data['row-pos'] is None:
             self.error( 'none value on row position: %s' % data  )
             return
-        self.logsView.textualViewer.setFocus()
-        self.logsView.textualViewer.selectRow( data['row-pos'] ) 
+        self.logsView.gotoRow( row=data['row-pos'] ) 
+
+    def gotoMatch(self, testId, position):
+        """
+        Load the testcase of the event found and go to the event
+        """
+        item = self.testcases.get(testId, self.script.get(testId))
+        if item is None:
+            self.parent.showMessageTray( msg='Test %s not found' % testId )
+            return
+
+        self.displayTab.setCurrentIndex(0)
+        self.logsItem.logs.setCurrentItem(item)
+        self.logsItem.loadTest(item)
+        self.gotoEventNumber(number=position)
+
+    def gotoEventNumber(self, number):
+        """
+        Go to the event number of the testcase displayed
+        """
+        if not self.logsView.gotoNumber(number=number):
+            self.parent.showMessageTray( msg='Event %s not found or filtered' % number )
+
+    def findNextEvent(self):
+        """
+        Go to the next event matching the filter
+        """
+        if not self.logsView.findNext():
+            self.parent.showMessageTray( msg='No more events matching the filter' )
 
     def showHexaView (self, data, dataType, shortName):
         """
@@ -420,7 +479,7 @@ class WTestResult(QWidget, Logger.ClassLogger):
         """
         Kill the test
         """
-        if not ( Settings.instance().readValue( key = 'TestRun/ask-before-kill' ) == 'True' ):
+        if not Settings.instance().readValue( key = 'TestRun/ask-before-kill', rType = 'bool' ):
             RCI.instance().killTask(taskId=self.TID)
         else:
             reply = QMessageBox.warning(self, "Kill test", "Are you sure you want to stop the execution of the test?",
@@ -447,6 +506,17 @@ class WTestResult(QWidget, Logger.ClassLogger):
         """
         self.currentEdit.setText( "%s" % testName)
   
+    def onSettingsChanged(self, keys):
+        """
+        On settings saved, apply the values used by the test result
+
+        @param keys: keys changed
+        @type keys: list
+        """
+        if 'TestRun/events-memory' in keys:
+            self.scriptEvents.maxMemory = Settings.instance().readValue( key = 'TestRun/events-memory', rType = 'int' )*1024*1024
+            self.scriptEvents.checkMemory()
+
     def loadTest (self, testId, testName):
         """
         Called when the user selects an test item
@@ -455,29 +525,29 @@ class WTestResult(QWidget, Logger.ClassLogger):
         @param testId:
         @type testId: 
         """
-        self.bigTr = False
-        self.bigCache = { 'index': 0, 'testId': '', 'testName': '', "nb-total": 0 }
-        self.logsItem.disableControls()
-        
         if sys.version_info < (3,):
             testId = "%s" % testId
             testName = "%s" % testName
            
+        # selection changed during the decoding, loaded when the decoding in progress is unwound
+        if self.isLoading:
+            self.pendingTest = (testId, testName)
+            self.logsView.setExpectedEventId(testId)
+            self.eventsLoader.cancel()
+            return
+            
+        self.isLoading = True
+        self.logsItem.disableControls()
+        
         # new in v12.1
         # reload all events from selected testcase each time for local testresult only
         if self.local:
-            del self.scriptEvents
-            self.scriptEvents = {}
+            self.scriptEvents.clear()
         # end of new
         
         self.graphView.reset()
         self.resumeView.reset()
         self.logsView.reset()
-            
-        if self.isLoading:
-            return
-            
-        self.isLoading = True
         
         if not self.isRunning:
             self.hexLogsView.reset() # fix bad behaviour to be confirm
@@ -490,88 +560,33 @@ class WTestResult(QWidget, Logger.ClassLogger):
                 self.setCursor(QCursor(Qt.BusyCursor) )
                 self.loadLocalData(testId=testId, testName=testName)
 
-        if testId in self.scriptEvents:
-            nbMax = len(self.scriptEvents[ testId ])
+        # the events of the testcase displayed are kept in memory
+        self.scriptEvents.select(testId)
+        if testId in self.scriptEvents and self.pendingTest is None:
+            events = self.scriptEvents[ testId ]
+            nbMax = len(events)
 
             self.trace("test result: nb event detected in testcase %s" % (nbMax) )
             
             self.logsItem.progressBar.setMaximum( nbMax )
-            if len(self.scriptEvents[ testId ]) > 200:
+            if nbMax > 200:
                 self.setCursor(QCursor(Qt.BusyCursor) )
 
-            # add limitation to avoid freeze, new in v16
-            if not self.isRunning:
-                if len(self.scriptEvents[ testId ]) > int(Settings.instance().readValue( key = 'TestRun/chunk-events' )): 
-                    nbMax = int(Settings.instance().readValue( key = 'TestRun/chunk-events' ))
-                    self.bigTr = True
-                    self.logsItem.progressBar.setMaximum( nbMax )
-                
-            i = 0
-            for evt in self.scriptEvents[ testId ][:nbMax]:
-                # add progress bar
-                i += 1
-                self.logsItem.progressBar.setValue(i)
-               
-                # exit loop if the expected event id changed
-                if self.logsView.getExpectedEventId() != testId:
-                    break
-                    
-                # load data
-                if Settings.instance() is None:
-                    break
-                    
-                row_pos = self.logsView.addEvent( event = evt, ihmId=i)
-                self.resumeView.addEvent( event = evt, rowp = row_pos, ihmId=i )
+            # the rows of the textual view are fetched by pages on scroll
+            if Settings.instance() is not None:
+                rows = self.logsView.addEvents( events = events, ihmId=1 )
+                for i, (evt, row_pos) in enumerate(zip(events, rows), 1):
+                    self.resumeView.addEvent( event = evt, rowp = row_pos, ihmId=i )
+                self.logsItem.progressBar.setValue( nbMax )
+            self.logsItem.enableControls()
 
         self.setCursor(QCursor(Qt.ArrowCursor) )
         self.isLoading = False
         
-        if self.bigTr:
-            # memorize somes informations
-            self.bigCache['index'] = i
-            self.bigCache['testId'] = testId
-            self.bigCache['testName'] = testName
-            self.bigCache['nb-total'] = len(self.scriptEvents[ testId ])
-            
-            self.logsItem.enableControls()
-            self.parent.showMessageTray( msg='Test %s is truncated...' % self.name )
-
-    def loadNext(self):
-        """
-        """
-        if not self.bigTr:
-            self.logsItem.disableControls()
-            return
-
-        nbMax = int(Settings.instance().readValue( key = 'TestRun/chunk-events' ))
-        
-        if (self.bigCache['nb-total'] - self.bigCache['index']) <nbMax:
-            self.logsItem.progressBar.setMaximum( (self.bigCache['nb-total'] - self.bigCache['index']) )
-        else:
-            self.logsItem.progressBar.setMaximum( nbMax )
-        
-        if self.bigCache['index'] >= self.bigCache['nb-total']:
-            self.logsItem.disableControls()
-            return
-            
-        i = 0
-        self.graphView.reset()
-        self.resumeView.reset()
-        self.logsView.reset()
-
-        for evt in self.scriptEvents[ self.bigCache['testId'] ][ self.bigCache['index']: self.bigCache['index']+nbMax+1]:
-            i += 1
-
-            self.logsItem.progressBar.setValue(i)
-        
-            row_pos = self.logsView.addEvent( event = evt, ihmId=self.bigCache['index']+i )
-            self.resumeView.addEvent( event = evt, rowp = i, ihmId= self.bigCache['index'])
-        
-        self.bigCache['index'] = self.bigCache['index'] + i
-
-        if self.bigCache['index'] >= self.bigCache['nb-total']:
-            self.logsItem.disableControls()
-            return
+        if self.pendingTest is not None:
+            testId, testName = self.pendingTest
+            self.pendingTest = None
+            self.loadTest(testId=testId, testName=testName)
             
     def loadLocalData(self, testId, testName):
         """
@@ -596,93 +611,60 @@ class WTestResult(QWidget, Logger.ClassLogger):
         
         self.trace("read index from %s to %s" % (startIndex, stopIndex) )
         startFlag = time.time()
+        
+        # only the lines of the item are read, by blocks with the indexed format
+        if stopIndex == 0: # test can be kill so stop index can be equal to zero
+            firstLine, lastLine = startIndex, None
+        else:
+            firstLine, lastLine = startIndex-1, stopIndex-2
         try:
-            self.trace("local data: convert to io")
-            f = cStringIO.StringIO( self.dataModel.testresult )
+            self.trace("local data: read lines")
+            f = self.dataModel.getLines( firstLine=firstLine, lastLine=lastLine )
         except Exception as e:
-            self.error( "unable to convert to io logs: %s" % str(e) )
+            self.error( "unable to read logs: %s" % str(e) )
             return
         else:
             self.logsItem.progressBar.setMaximum( stopIndex-startIndex )
             self.setCursor(QCursor(Qt.BusyCursor) )
             
-            i = 0
-            scriptId = None
-            for n,line in enumerate(f):
-                # exit loop if the expected event id changed
+            # decoded in background, the events are delivered by batch in the order of lines
+            state = { 'i': 0, 'scriptId': None }
+            def onEvents(events):
+                """
+                On a batch of events decoded
+                """
+                # exit if the expected event id changed
                 if self.logsView.getExpectedEventId() != testId:
-                    break
+                    return False
                     
-                if stopIndex == 0 and n+1 > startIndex: # test can be kill so stop index can be equal to zero?
-                    i += 1
-                    self.logsItem.progressBar.setValue(i)
-                    try:
-                        #decode in base 64 and unpickle the data
-                        if sys.version_info > (3,): # python3 support
-                            l = base64.b64decode(line)
-                            event = cPickle.loads( l, encoding="bytes")
-                            event = QtHelper.bytes_to_unicode(event)
-                        else:
-                            l = base64.b64decode(line)
-                            event = cPickle.loads( l )
-                    except Exception as e:
-                        self.error( line )
-                        self.error( "unable to load line: %s" % e )
-                    else:
-                        event['test-id'] = testId
-                        
-                        # new in v12.1 change for parallel testcase
-                        if scriptId is None: scriptId = event['script_id']
-                        if scriptId != event['script_id']: 
-                            continue
-                        # end of new
+                for n, event, err in events:
+                    state['i'] += 1
+                    if event is None:
+                        self.error( err )
+                        continue
                         
-                        if n == startIndex:
-                            # cleanup all testcases
-                            if 'tc_id' in event:
-                                if event['tc_id'] in self.scriptEvents:
-                                    del self.scriptEvents[ "%s" % event['tc_id'] ]
-                            else:
-                                if event['script_id'] in self.scriptEvents:
-                                    del self.scriptEvents[ "%s" % event['script_id'] ]
-                        self.populateData(event=event, typeData=itemSelected.typeItem)
+                    event['test-id'] = testId
+                    
+                    # new in v12.1 change for parallel testcase
+                    if state['scriptId'] is None: state['scriptId'] = event['script_id']
+                    if state['scriptId'] != event['script_id']: 
+                        continue
+                    # end of new
                         
-                if n+1 in list(xrange(startIndex,stopIndex)): # or n in [25,29] 
-                    i += 1
-                    self.logsItem.progressBar.setValue(i)
-                    try:
-                        #decode in base 64 and unpickle the data
-                        if sys.version_info > (3,): # python3 support
-                            l = base64.b64decode(line)
-                            event = cPickle.loads( l, encoding="bytes")
-                            event = QtHelper.bytes_to_unicode(event)
+                    if n == startIndex:
+                        # cleanup all testcases
+                        if 'tc_id' in event:
+                            if event['tc_id'] in self.scriptEvents:
+                                del self.scriptEvents[ "%s" % event['tc_id'] ]
                         else:
-                            l = base64.b64decode(line)
-                            event = cPickle.loads( l )
-                    except Exception as e:
-                        self.error( line )
-                        self.error( "unable to load line: %s" % e )
-                    else:
-                        event['test-id'] = testId
-                        
-                        # new in v12.1 change for parallel testcase
-                        if scriptId is None: scriptId = event['script_id']
-                        if scriptId != event['script_id']: 
-                            continue
-                        # end of new
-                            
-                        if n == startIndex:
-                            # cleanup all testcases
-                            if 'tc_id' in event:
-                                if event['tc_id'] in self.scriptEvents:
-                                    del self.scriptEvents[ "%s" % event['tc_id'] ]
-                            else:
-                                if event['script_id'] in self.scriptEvents:
-                                    del self.scriptEvents[ "%s" % event['script_id'] ]
-                        self.populateData(event=event, typeData=itemSelected.typeItem)
-                        
-                # workaround in v11.2 to avoid app gui freeze
-                QApplication.processEvents()
+                            if event['script_id'] in self.scriptEvents:
+                                del self.scriptEvents[ "%s" % event['script_id'] ]
+                    self.populateData(event=event, typeData=itemSelected.typeItem)
+                    
+                self.logsItem.progressBar.setValue(state['i'])
+                return True
+                
+            self.eventsLoader.decode( lines=f, callback=onEvents )
                 
             self.setCursor(QCursor(Qt.ArrowCursor) )
         stopFlag = time.time()
@@ -698,52 +680,34 @@ class WTestResult(QWidget, Logger.ClassLogger):
             event['tc_id'] = "%s" % event['tc_id']
 
         if event['event'] == 'testglobal' and typeData == 'testglobal':
-            if not event['script_id'] in self.scriptEvents:
-                self.scriptEvents[ event['script_id'] ] = [ event ]
-            else:
-                self.scriptEvents[ event['script_id'] ].append( event )
+            self.scriptEvents.append( event['script_id'], event )
             if not event['script_id'] in self.script:
                 return
                 
         if event['event'] == 'testplan' and typeData == 'testplan':
-            if not event['script_id'] in self.scriptEvents:
-                self.scriptEvents[ event['script_id'] ] = [ event ]
-            else:
-                self.scriptEvents[ event['script_id'] ].append( event )
+            self.scriptEvents.append( event['script_id'], event )
             if not event['script_id'] in self.script:
                 return
                 
         if event['event'] == 'testabstract' and typeData == 'testabstract':
-            if not event['script_id']  in self.scriptEvents:
-                self.scriptEvents[ event['script_id'] ] = [ event ]
-            else:
-                self.scriptEvents[ event['script_id'] ].append( event )
+            self.scriptEvents.append( event['script_id'], event )
             if not event['script_id'] in self.script:
                 return
                 
         if event['event'] == 'testsuite' and typeData == 'testsuite':
-            if not event['script_id']  in self.scriptEvents:
-                self.scriptEvents[ event['script_id'] ] = [ event ]
-            else:
-                self.scriptEvents[ event['script_id'] ].append( event )
+            self.scriptEvents.append( event['script_id'], event )
             if not event['script_id'] in self.script:
                 return
                 
         if event['event'] == 'testunit' and typeData == 'testunit':
-            if not event['script_id']  in self.scriptEvents:
-                self.scriptEvents[ event['script_id'] ] = [ event ]
-            else:
-                self.scriptEvents[ event['script_id'] ].append( event )
+            self.scriptEvents.append( event['script_id'], event )
             if not event['script_id'] in self.script:
                 return
         
         if event['event'] == 'testcase' and typeData == 'testcase':
             if not event['script_id'] in self.script:
                 return  # error
-            if not event['tc_id'] in self.scriptEvents:
-                self.scriptEvents[ event['tc_id'] ] = [ event ]
-            else:
-                self.scriptEvents[ event['tc_id'] ].append( event )
+            self.scriptEvents.append( event['tc_id'], event )
                 
     def killWidgetTest(self):
         """
@@ -762,6 +726,7 @@ class WTestResult(QWidget, Logger.ClassLogger):
         Reset global
         """
         self.isLoading = False
+        self.pendingTest = None
         
         self.graphView.reset()
         self.logsItem.reset()
@@ -771,13 +736,13 @@ class WTestResult(QWidget, Logger.ClassLogger):
 
         self.tpTreeItem = None
         self.script = {}
-        self.scriptEvents = {}
+        self.scriptEvents.clear()
+        self.eventIndex.clear()
+        self.searchView.reset()
         self.testcases = {}
         
         self.currentEdit.setText( "" )
         
-        self.bigTr = False
-        self.bigCache = { 'index': 0, 'testId': '', 'testName': '', "nb-total": 0 }
         self.logsItem.disableControls()
 
     def breakpoint(self, tid):
@@ -814,6 +779,52 @@ class WTestResult(QWidget, Logger.ClassLogger):
             wtc = self.logsItem.logs.itemWidget(tcItem, 0)
             if wtc.isRunning:  wtc.setUNDEF()
 
+    def notifyReceivedBatch (self, events):
+        """
+        Dispatch a batch of live events,
+        the views are updated once for the events to display
+
+        @param events: events
+        @type events: list
+        """
+        self.batching = True
+        try:
+            for data in events:
+                self.notifyReceived( data = data )
+        finally:
+            self.batching = False
+            self.flushLiveEvents()
+
+    def addLiveEvent(self, testId, event):
+        """
+        Add a live event in the views, at the end of the batch
+
+        @param testId: test id expected by the views
+        @type testId: string
+
+        @param event: event
+        @type event: dict
+        """
+        if self.logsView.getExpectedEventId() != testId:
+            self.flushLiveEvents()
+            self.logsView.setExpectedEventId(testId)
+        self.liveEvents.append( event )
+        if not self.batching:
+            self.flushLiveEvents()
+
+    def flushLiveEvents(self):
+        """
+        Add the live events pending in the views
+        """
+        if not len(self.liveEvents):
+            return
+        events = self.liveEvents
+        self.liveEvents = []
+        
+        rows = self.logsView.addEvents( events = events, ihmId=0 )
+        for evt, row_pos in zip(events, rows):
+            self.resumeView.addEvent( event = evt, rowp = row_pos, ihmId=row_pos )
+
     def notifyReceived (self, data, fromLocal=False):
         """
         Dispatch events
@@ -821,6 +832,10 @@ class WTestResult(QWidget, Logger.ClassLogger):
         @param data:
         @type data: dict
         """
+        # the views can be reset by the event, the pending events are added before
+        if data['event'] not in VIEW_EVENTS:
+            self.flushLiveEvents()
+
         if 'task-uuid' in data:
             self.taskUuid = data['task-uuid']
         
@@ -848,7 +863,7 @@ class WTestResult(QWidget, Logger.ClassLogger):
             
             self.parent.showMessageTray( msg='Test %s terminated.' % self.name )
             # show the app
-            if  QtHelper.str2bool( Settings.instance().readValue( key = 'TestRun/show-test-terminated' ) ):
+            if  Settings.instance().readValue( key = 'TestRun/show-test-terminated', rType = 'bool' ):
                 self.parent.setVisible(True)
 
         ############# test global events
@@ -875,10 +890,7 @@ class WTestResult(QWidget, Logger.ClassLogger):
                 duration = "%.3f" % float(data['duration'])
             self.logsItem.finishRootItem( rootItem = rootTreeItem, duration=duration, typeItem='testglobal', event=data)            
         elif data['event'] == 'testglobal':
-            if not data['script_id'] in self.scriptEvents:
-                self.scriptEvents[ data['script_id'] ] = [ data ]
-            else:
-                self.scriptEvents[ data['script_id'] ].append( data )
+            self.scriptEvents.append( data['script_id'], data )
             if not data['script_id'] in self.script:
                 return
             
@@ -887,9 +899,7 @@ class WTestResult(QWidget, Logger.ClassLogger):
             if len(itemsSelected) > 1:
                 rootTreeItem.setSelected(False)
             if rootTreeItem.isSelected():
-                self.logsView.setExpectedEventId(data['script_id'])
-                row_pos = self.logsView.addEvent( event = data )
-                self.resumeView.addEvent( event = data, rowp = row_pos, ihmId=row_pos  )
+                self.addLiveEvent( testId=data['script_id'], event=data )
 
         ############# test plan events
         elif data['event'] == 'testplan-separator-terminated':
@@ -931,10 +941,7 @@ class WTestResult(QWidget, Logger.ClassLogger):
                                           typeItem='testplan', 
                                           event=data)          
         elif data['event'] == 'testplan':
-            if not data['script_id'] in self.scriptEvents:
-                self.scriptEvents[ data['script_id'] ] = [ data ]
-            else:
-                self.scriptEvents[ data['script_id'] ].append( data )
+            self.scriptEvents.append( data['script_id'], data )
             if not data['script_id'] in self.script:
                 return
                 
@@ -943,11 +950,7 @@ class WTestResult(QWidget, Logger.ClassLogger):
             if len(itemsSelected) > 1:
                 rootTreeItem.setSelected(False)
             if rootTreeItem.isSelected():
-                self.logsView.setExpectedEventId(data['script_id'])
-                row_pos = self.logsView.addEvent( event = data )
-                self.resumeView.addEvent( event = data, 
-                                          rowp = row_pos, 
-                                          ihmId=row_pos )
+                self.addLiveEvent( testId=data['script_id'], event=data )
         
         ############# test abstract events
         elif data['event'] == 'testabstract-started':
@@ -976,17 +979,12 @@ class WTestResult(QWidget, Logger.ClassLogger):
                                           typeItem='testabstract' , 
                                           event=data)     
         elif data['event'] == 'testabstract':
-            if not data['script_id']  in self.scriptEvents:
-                self.scriptEvents[ data['script_id'] ] = [ data ]
-            else:
-                self.scriptEvents[ data['script_id'] ].append( data )
+            self.scriptEvents.append( data['script_id'], data )
             if not data['script_id'] in self.script:
                 return
             rootTreeItem = self.script[ data['script_id'] ]
             if rootTreeItem.isSelected():
-                self.logsView.setExpectedEventId(data['script_id'])
-                row_pos = self.logsView.addEvent( event = data )
-                self.resumeView.addEvent( event = data, rowp = row_pos, ihmId=row_pos )
+                self.addLiveEvent( testId=data['script_id'], event=data )
                 
         ############# test unit events
         elif data['event'] == 'testunit-started':
@@ -1015,10 +1013,7 @@ class WTestResult(QWidget, Logger.ClassLogger):
                                           typeItem='testunit', 
                                           event=data )     
         elif data['event'] == 'testunit':
-            if not data['script_id']  in self.scriptEvents:
-                self.scriptEvents[ data['script_id'] ] = [ data ]
-            else:
-                self.scriptEvents[ data['script_id'] ].append( data )
+            self.scriptEvents.append( data['script_id'], data )
             if not data['script_id'] in self.script:
                 return
             
@@ -1027,9 +1022,7 @@ class WTestResult(QWidget, Logger.ClassLogger):
             if len(itemsSelected) > 1:
                 rootTreeItem.setSelected(False)
             if rootTreeItem.isSelected():
-                self.logsView.setExpectedEventId(data['script_id'])
-                row_pos = self.logsView.addEvent( event = data )
-                self.resumeView.addEvent( event = data, rowp = row_pos, ihmId=row_pos )
+                self.addLiveEvent( testId=data['script_id'], event=data )
 
         ############# test suite events
         elif data['event'] == 'testsuite-started':
@@ -1057,10 +1050,7 @@ class WTestResult(QWidget, Logger.ClassLogger):
                                           duration=duration, 
                                           event=data )      
         elif data['event'] == 'testsuite':
-            if not data['script_id']  in self.scriptEvents:
-                self.scriptEvents[ data['script_id'] ] = [ data ]
-            else:
-                self.scriptEvents[ data['script_id'] ].append( data )
+            self.scriptEvents.append( data['script_id'], data )
             if not data['script_id'] in self.script:
                 return
                 
@@ -1069,9 +1059,7 @@ class WTestResult(QWidget, Logger.ClassLogger):
             if len(itemsSelected) > 1:
                 rootTreeItem.setSelected(False)
             if rootTreeItem.isSelected():
-                self.logsView.setExpectedEventId(data['script_id'])
-                row_pos = self.logsView.addEvent( event = data )
-                self.resumeView.addEvent( event = data, rowp = row_pos, ihmId=row_pos )
+                self.addLiveEvent( testId=data['script_id'], event=data )
         
         ############# test case events
         elif data['event'] == 'testcase-started':
@@ -1111,10 +1099,7 @@ class WTestResult(QWidget, Logger.ClassLogger):
             if not data['script_id'] in self.script:
                 return  # error
             #
-            if not data['tc_id'] in self.scriptEvents:
-                self.scriptEvents[ data['tc_id'] ] = [ data ]
-            else:
-                self.scriptEvents[ data['tc_id'] ].append( data )
+            self.scriptEvents.append( data['tc_id'], data )
             if not data['tc_id'] in self.testcases:
                 return
             itemsSelected = self.logsItem.logs.selectedItems()
@@ -1123,6 +1108,4 @@ class WTestResult(QWidget, Logger.ClassLogger):
             if len(itemsSelected) > 1:
                 testcaseItem.setSelected(False)
             if testcaseItem.isSelected():
-                self.logsView.setExpectedEventId(data['tc_id'])
-                row_pos = self.logsView.addEvent( event = data )
-                self.resumeView.addEvent( event = data, rowp = row_pos, ihmId=row_pos )
\ No newline at end of file
+                self.addLiveEvent( testId=data['tc_id'], event=data )
@@ -32,9 +32,11 @@ if sys.version_info > (3,):
 
 from PyQt5.QtGui import (QIcon)
 from PyQt5.QtWidgets import (QTabWidget, QVBoxLayout, QToolButton, QTabBar, QWidget)
-from PyQt5.QtCore import (Qt, QSize)
+from PyQt5.QtCore import (Qt, QSize, QObject, QTimer)
     
 import threading
+import time
+import collections
 
 from Libs import QtHelper, Logger
 try:
@@ -133,6 +135,110 @@ class SeparateResults(QtHelper.EnhancedQDialog):
         if  QtHelper.str2bool( Settings.instance().readValue( key = 'TestRun/auto-focus' ) ):
             self.secondTab.setCurrentWidget( wTestResult )
 
+# max number of events applied on a test in one pass
+BATCH_EVENTS = 500
+
+class NotifyDispatcher(QObject, Logger.ClassLogger):
+    """
+    Coalesce the events received for the tests,
+    the events are buffered by test and applied in one pass on each frame
+    """
+    def __init__(self, parent, frame=30, maxQueue=20000):
+        """
+        Constructor
+
+        @param parent: test results widget
+        @type parent: wtestresults
+
+        @param frame: interval between two passes and time budget of a pass, in milliseconds
+        @type frame: integer
+
+        @param maxQueue: max number of events buffered, a pass is forced when reached
+        @type maxQueue: integer
+        """
+        QObject.__init__(self, parent)
+        self.testResults = parent
+        self.frame = frame
+        self.maxQueue = maxQueue
+        self.pending = collections.OrderedDict()
+        self.queued = 0
+        self.stats = { 'events': 0, 'passes': 0, 'forced-passes': 0, 
+                       'max-queue': 0, 'max-batch': 0, 'max-pass-time': 0.0 }
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.flush)
+
+    def push(self, testId, data):
+        """
+        Buffer an event for the test
+
+        @param testId: test id
+        @type testId: integer
+
+        @param data: event
+        @type data: dict
+        """
+        if testId not in self.pending:
+            self.pending[testId] = collections.deque()
+        self.pending[testId].append( data )
+        self.queued += 1
+        self.stats['events'] += 1
+        self.stats['max-queue'] = max(self.stats['max-queue'], self.queued)
+
+        if self.queued >= self.maxQueue:
+            # back-pressure, the gui is late
+            self.stats['forced-passes'] += 1
+            self.trace( "notify dispatcher: queue full, forced pass %s" % self.getStats() )
+            self.flush(budget=None)
+        elif not self.timer.isActive():
+            self.timer.start(self.frame)
+
+    def flush(self, budget=-1):
+        """
+        Apply the events buffered to the tests, until the time budget is exhausted
+
+        @param budget: time budget in milliseconds, the frame if -1, no limit if None
+        @type budget: integer/none
+        """
+        self.timer.stop()
+        if budget == -1:
+            budget = self.frame
+        start = time.time()
+        
+        while len(self.pending):
+            testId, events = next(iter(self.pending.items()))
+            batch = [ events.popleft() for i in range(min(BATCH_EVENTS, len(events))) ]
+            if not len(events):
+                del self.pending[testId]
+            else:
+                # the other tests are served before the next batch
+                self.pending.move_to_end(testId)
+            self.queued -= len(batch)
+            self.stats['max-batch'] = max(self.stats['max-batch'], len(batch))
+
+            self.testResults.applyNotify(testId=testId, events=batch)
+            
+            if budget is not None and (time.time() - start) * 1000 > budget:
+                break
+
+        self.stats['passes'] += 1
+        self.stats['max-pass-time'] = max(self.stats['max-pass-time'], time.time() - start)
+        if len(self.pending):
+            self.timer.start(0)
+
+    def getQueued(self):
+        """
+        Return the number of events buffered
+        """
+        return self.queued
+
+    def getStats(self):
+        """
+        Return the statistics of the dispatcher
+        """
+        return dict(self.stats, queued=self.queued)
+
 class WTestResults(QWidget, Logger.ClassLogger):
     """
     Test results widget
@@ -149,6 +255,9 @@ class WTestResults(QWidget, Logger.ClassLogger):
         self.__mutex = threading.RLock()
         self.testId = 0
         self.tests = {}
+        self.dispatcher = NotifyDispatcher( self, 
+                                            frame=int(Settings.instance().readValue( key = 'TestRun/notify-frame' )),
+                                            maxQueue=int(Settings.instance().readValue( key = 'TestRun/notify-queue-size' )) )
 
     def resetTests(self):
         """
@@ -241,12 +350,33 @@ class WTestResults(QWidget, Logger.ClassLogger):
         @type data:
         """
         testId = int(data['test-id'])
+        if not fromLocal:
+            # the live events are applied by batch on each frame
+            self.dispatcher.push( testId=testId, data=data )
+            return
+            
         if testId in self.tests:
             WTestResult = self.tests[testId]
             WTestResult.notifyReceived( data = data, fromLocal=fromLocal )
         else:
             pass # error
 
+    def applyNotify(self, testId, events):
+        """
+        Apply a batch of live events on the test
+
+        @param testId: test id
+        @type testId: integer
+
+        @param events: events
+        @type events: list
+        """
+        if testId in self.tests:
+            WTestResult = self.tests[testId]
+            WTestResult.notifyReceivedBatch( events = events )
+        else:
+            pass # error
+
     def killWidgetTest(self, tid):
         """
         Kill the wdiget test
@@ -30,7 +30,7 @@ import sys
 if sys.version_info > (3,):
     unicode = str
 
-from PyQt5.QtGui import (QIcon, QBrush, QColor, QMovie, QPixmap )
+from PyQt5.QtGui import (QIcon, QBrush, QColor, QMovie, QPixmap, QIntValidator )
 from PyQt5.QtWidgets import (QTreeWidgetItem, QWidget, QPushButton, QVBoxLayout, 
                             QLabel, QLineEdit, QHBoxLayout, QTreeWidget, QToolBar, QFrame, 
                             QFormLayout, QGridLayout, QGroupBox, QComboBox, QCheckBox,
@@ -561,7 +561,8 @@ class TestsView(QWidget):
     ReplayTest = pyqtSignal()
     CloseTest = pyqtSignal()
     LoadTest = pyqtSignal(str, str)
-    LoadNext = pyqtSignal()
+    GotoEventNumber = pyqtSignal(int)
+    FindNextEvent = pyqtSignal()
     # new in v12.1
     ActiveScrollingEventLogs = pyqtSignal()
     DisableScrollingEventLogs = pyqtSignal()
@@ -906,15 +907,31 @@ class TestsView(QWidget):
         self.progressBar.setProperty("value", 0)
         self.progressBar.setObjectName("progressBar")
         
-        self.progressNext = QPushButton("Next")
-        self.progressNext.setEnabled(False)
-        self.progressNext.setMaximumHeight(15)
-        self.progressNext.setMaximumWidth(50)
-        self.progressNext.setFlat(False)
+        self.gotoNumberEdit = QLineEdit()
+        self.gotoNumberEdit.setValidator( QIntValidator(0, 2147483647, self) )
+        self.gotoNumberEdit.setPlaceholderText("No.")
+        self.gotoNumberEdit.setEnabled(False)
+        self.gotoNumberEdit.setMaximumWidth(70)
+
+        self.gotoButton = QPushButton("Go")
+        self.gotoButton.setEnabled(False)
+        self.gotoButton.setMaximumWidth(50)
+        self.gotoButton.setFlat(False)
+
+        self.findNextButton = QPushButton("Next match")
+        self.findNextButton.setEnabled(False)
+        self.findNextButton.setMaximumWidth(80)
+        self.findNextButton.setFlat(False)
         
         layoutProgress = QHBoxLayout()
         layoutProgress.addWidget(self.progressBar)
-        layoutProgress.addWidget(self.progressNext)
+        layoutProgress.addWidget(self.gotoNumberEdit)
+        layoutProgress.addWidget(self.gotoButton)
+        layoutProgress.addWidget(self.findNextButton)
+
+        self.memoryLabel = QLabel()
+        self.memoryLabel.setToolTip("Events in memory, events written on the disk")
+        layoutProgress.addWidget(self.memoryLabel)
         
         layout.addWidget(self.optionsTab)
         layout.addWidget(self.filterBox)
@@ -929,13 +946,32 @@ class TestsView(QWidget):
         """
         Disable controls
         """
-        self.progressNext.setEnabled(False)
+        self.gotoNumberEdit.setEnabled(False)
+        self.gotoButton.setEnabled(False)
+        self.findNextButton.setEnabled(False)
 
     def enableControls(self):
         """
         Enable controls
         """
-        self.progressNext.setEnabled(True)
+        self.gotoNumberEdit.setEnabled(True)
+        self.gotoButton.setEnabled(True)
+        self.findNextButton.setEnabled(True)
+
+    def setMemoryUsage(self, memory, disk):
+        """
+        Display the size of the events in memory and on the disk
+
+        @param memory: size in memory in bytes
+        @type memory: integer
+
+        @param disk: size on the disk in bytes
+        @type disk: integer
+        """
+        text = "%s" % QtHelper.bytes2human(memory)
+        if disk:
+            text += " / %s" % QtHelper.bytes2human(disk)
+        self.memoryLabel.setText(text)
 
     def activeBreakpoint(self, tid):
         """
@@ -1016,13 +1052,23 @@ class TestsView(QWidget):
         self.autoscrollEventsViewCheckBox.stateChanged.connect(self.toggleScrollingTestEvents)
         self.autoscrollDiagramViewCheckBox.stateChanged.connect(self.toggleScrollingDiagram)
         
-        self.progressNext.clicked.connect(self.loadNextEvents)
+        self.gotoNumberEdit.returnPressed.connect(self.gotoEventNumber)
+        self.gotoButton.clicked.connect(self.gotoEventNumber)
+        self.findNextButton.clicked.connect(self.findNextEvent)
         
-    def loadNextEvents(self):
+    def gotoEventNumber(self):
+        """
+        Go to the event number
+        """
+        if not len(self.gotoNumberEdit.text()):
+            return
+        self.GotoEventNumber.emit( int(self.gotoNumberEdit.text()) )
+
+    def findNextEvent(self):
         """
-        Load next events
+        Find the next event matching the filter
         """
-        self.LoadNext.emit()
+        self.FindNextEvent.emit()
         
     def onUpDownPressed(self):
         """
@@ -25,6 +25,7 @@
 Module to display events logs
 """
 import sys
+import collections
 
 # unicode = str with python3
 if sys.version_info > (3,):
@@ -70,23 +71,145 @@ COL_TEXT        = 6
 
 ROW_HEIGHT      = 20
 
+# icons displayed in the text column according to the level of the event
+LEVEL_ICONS     = { 'timer-started': ":/timer.png", 'timer-stopped': ":/timer_ok.png",
+                    'timer-exceeded': ":/timer_ko.png", 'received': ":/arrow_left.png",
+                    'send': ":/arrow_right.png", 'step-failed': ":/steps.png" }
+
+# colors, fonts and icons shared by all the rows, created on the first use
+COLORS = {}
+FONTS = {}
+ICONS = {}
+
+def getColor(name):
+    """
+    Return the color according to the name, cached
+
+    @param name: named color (#E7E6FF)
+    @type name: string
+
+    @return: color
+    @rtype: qcolor
+    """
+    color = COLORS.get(name)
+    if color is None:
+        color = QColor(0, 0, 0)
+        color.setNamedColor( name )
+        COLORS[name] = color
+    return color
+
+def getFont(bold=False, italic=False):
+    """
+    Return the font according to the style, cached
+
+    @param bold: bold font
+    @type bold: boolean
+
+    @param italic: italic font
+    @type italic: boolean
+
+    @return: font
+    @rtype: qfont
+    """
+    key = (bold, italic)
+    font = FONTS.get(key)
+    if font is None:
+        font = QFont()
+        font.setBold(bold)
+        font.setItalic(italic)
+        FONTS[key] = font
+    return font
+
+def getIcon(level):
+    """
+    Return the icon according to the level of the event, cached
+
+    @param level: level of the event
+    @type level: string
+
+    @return: icon or None
+    @rtype: qicon/none
+    """
+    if level not in LEVEL_ICONS:
+        return None
+    icon = ICONS.get(level)
+    if icon is None:
+        icon = QIcon(LEVEL_ICONS[level])
+        ICONS[level] = icon
+    return icon
+
+def getText(event):
+    """
+    Return the text to display for the event,
+    only the first line if the event is not multiline
+
+    @param event: event
+    @type event: dict
+
+    @return: text
+    @rtype: string
+    """
+    short_msg = event['short-msg']
+    if event.get('multiline', False):
+        if sys.version_info > (3,): # py3 support
+            return short_msg
+        try:
+            return short_msg.decode('utf8')
+        except Exception as e:
+            return short_msg
+
+    if not len(short_msg):
+        return ''
+    if sys.version_info > (3,): # py3 support
+        return short_msg.splitlines()[0]
+    try:
+        return short_msg.decode('utf8').splitlines()[0]
+    except Exception as e:
+        return short_msg.splitlines()[0]
+
 class EventsTableModel2(QAbstractTableModel):
     """
     Events table model
+    The rows are fetched by pages on demand, the values displayed are computed
+    by page and only the pages recently used are kept in memory
     """
-    def __init__(self, hdrs):
+    def __init__(self, hdrs, pageSize=500, maxPages=20):
         """
         Events table model
+
+        @param hdrs: headers
+        @type hdrs: list
+
+        @param pageSize: number of rows by page
+        @type pageSize: integer
+
+        @param maxPages: max number of pages computed kept in memory
+        @type maxPages: integer
         """
         QAbstractTableModel.__init__(self)
         self.hdrs = hdrs
+        self.pageSize = max(1, pageSize)
+        self.maxPages = max(1, maxPages)
         self.stored_data = []
+        self.numbers = {}
+        self.initColumns()
+
+    def initColumns(self):
+        """
+        Initialize the rows fetched and the pages computed
+        """
+        self.fetched = 0
+        self.pages = collections.OrderedDict()
+        # height of the multiline rows only, the others have the default height
+        self.heights = {}
 
-    def rowCount(self, parent=None):
+    def rowCount(self, parent=QModelIndex()):
         """
-        Returns the number of row
+        Returns the number of row fetched
         """
-        return len(self.stored_data)
+        if parent is not None and parent.isValid():
+            return 0
+        return self.fetched
 
     def columnCount(self, parent=None):
         """
@@ -107,91 +230,24 @@ class EventsTableModel2(QAbstractTableModel):
         """
         Handle data
         """
-        result = None
-        if index.isValid():
-            if role == Qt.DisplayRole:
-                if index.column() == COL_NUM:
-                    if self.stored_data[index.row()]['ihm_id'] > 0 :
-                        result = str( self.stored_data[index.row()]['ihm_id']-1 )
-                    else:
-                        result = str( index.row() )
-                    
-                if index.column() == COL_TIMESTAMP:
-                    result = self.stored_data[index.row()]['timestamp']
-                if index.column() == COL_EVENT:
-                    result = self.stored_data[index.row()]['level'].upper()
-                if index.column() == COL_FROM:
-                    result = self.stored_data[ index.row() ]['from-component']
-                if index.column() == COL_FROM_LEVEL:
-                    result = self.stored_data[ index.row() ]['from-level']
-                if index.column() == COL_TO_LEVEL:
-                    result = self.stored_data[ index.row() ]['to-level']
-                if index.column() == COL_TEXT:
-                    short_msg = self.stored_data[ index.row() ]['short-msg']
-                    multiline = False
-                    if 'multiline' in self.stored_data[ index.row() ]:
-                        multiline = self.stored_data[ index.row() ]['multiline']
-                    if multiline:
-                        if sys.version_info > (3,): # py3 support
-                            result = short_msg
-                        else:
-                            try:
-                                result = short_msg.decode('utf8')
-                            except Exception as e:
-                                result = short_msg
-                    else:
-                        if not len(short_msg):
-                            result = ''
-                        else:
-                            if sys.version_info > (3,): # py3 support
-                                result = short_msg.splitlines()[0]
-                            else:
-                                try:
-                                    result = short_msg.decode('utf8').splitlines()[0]
-                                except Exception as e:
-                                    result = short_msg.splitlines()[0]
-                                    
-            elif role == Qt.ForegroundRole :
-                if not 'color-text' in self.stored_data[ index.row() ]:
-                    return None
-                data_col = self.stored_data[ index.row() ]['color-text']
-                result = QColor(0, 0, 0)
-                result.setNamedColor( data_col )
-            elif role == Qt.BackgroundColorRole:
-                if not 'color' in self.stored_data[ index.row() ]:
-                    return None
-                data_col = self.stored_data[ index.row() ]['color']
-                result = QColor(0, 0, 0)
-                result.setNamedColor( data_col )
-            elif role == Qt.FontRole:
-                if index.column() == COL_TEXT:
-                    result = QFont()
-                    if 'bold' in self.stored_data[ index.row() ]:
-                        data_col = self.stored_data[ index.row() ]['bold']
-                        if isinstance(data_col, bool):
-                            result.setBold(data_col)
-                    if 'italic' in self.stored_data[ index.row() ]:
-                        data_col = self.stored_data[ index.row() ]['italic']
-                        if isinstance(data_col, bool):
-                            result.setItalic(data_col)
-            elif role == Qt.DecorationRole:
-                if index.column() == COL_TEXT:
-                    if not 'level' in self.stored_data[ index.row() ]:
-                        return None
-                    data_col = self.stored_data[ index.row() ]['level']
-                    if data_col == 'timer-started':
-                        result = QIcon(":/timer.png")
-                    if data_col == 'timer-stopped':
-                        result = QIcon(":/timer_ok.png")
-                    if data_col == 'timer-exceeded':
-                        result = QIcon(":/timer_ko.png")
-                    if data_col == 'received':
-                        result = QIcon(":/arrow_left.png")
-                    if data_col == 'send':
-                        result = QIcon(":/arrow_right.png")
-                    if data_col == 'step-failed':
-                        result = QIcon(":/steps.png")
-        return  result
+        if not index.isValid():
+            return None
+
+        columns, foregrounds, backgrounds, fonts, icons = self.getPage( index.row() // self.pageSize )
+        row = index.row() % self.pageSize
+        if role == Qt.DisplayRole:
+            return columns[index.column()][row]
+        elif role == Qt.ForegroundRole :
+            return foregrounds[row]
+        elif role == Qt.BackgroundColorRole:
+            return backgrounds[row]
+        elif role == Qt.FontRole:
+            if index.column() == COL_TEXT:
+                return fonts[row]
+        elif role == Qt.DecorationRole:
+            if index.column() == COL_TEXT:
+                return icons[row]
+        return None
 
     def setData(self, index, value, role=Qt.EditRole):
         """
@@ -200,30 +256,224 @@ class EventsTableModel2(QAbstractTableModel):
         if not index.isValid(): return False
         return True
 
+    def getValues(self, row):
+        """
+        Return the values displayed for the row
+
+        @param row: row position
+        @type row: integer
+
+        @return: value by column
+        @rtype: dict
+        """
+        data = self.stored_data[row]
+        return { COL_NUM: str( self.getNumber(row) ), COL_TIMESTAMP: data['timestamp'], 
+                 COL_EVENT: data['level'].upper(), COL_FROM: data['from-component'],
+                 COL_FROM_LEVEL: data['from-level'], COL_TO_LEVEL: data['to-level'],
+                 COL_TEXT: getText(data) }
+
+    def getValue(self, row, column):
+        """
+        Return the value displayed for the row in one column
+
+        @param row: row position
+        @type row: integer
+
+        @param column: column
+        @type column: integer
+
+        @return: value or None
+        @rtype: string
+        """
+        data = self.stored_data[row]
+        if column == COL_NUM:
+            return str( self.getNumber(row) )
+        if column == COL_TEXT:
+            return getText(data)
+        if column == COL_EVENT:
+            return data['level'].upper()
+        key = { COL_TIMESTAMP: 'timestamp', COL_FROM: 'from-component', 
+                COL_FROM_LEVEL: 'from-level', COL_TO_LEVEL: 'to-level' }.get(column)
+        return data[key] if key is not None else None
+
+    def getNumber(self, row):
+        """
+        Return the event number displayed for the row
+
+        @param row: row position
+        @type row: integer
+
+        @return: event number
+        @rtype: integer
+        """
+        ihmId = self.stored_data[row]['ihm_id']
+        if ihmId > 0:
+            return ihmId - 1
+        return row
+
+    def getPage(self, page):
+        """
+        Return the values displayed for the rows of the page, 
+        computed if not in memory
+
+        @param page: page number
+        @type page: integer
+
+        @return: columns, foregrounds, backgrounds, fonts and icons of the rows
+        @rtype: tuple
+        """
+        if page in self.pages:
+            self.pages.move_to_end(page)
+            return self.pages[page]
+
+        columns = [ [] for hdr in self.hdrs ]
+        foregrounds = []
+        backgrounds = []
+        fonts = []
+        icons = []
+        first = page * self.pageSize
+        for row in xrange(first, min(first + self.pageSize, len(self.stored_data))):
+            data = self.stored_data[row]
+            values = self.getValues(row)
+            for col, column in enumerate(columns):
+                column.append( values.get(col) )
+
+            foregrounds.append( getColor(data['color-text']) if 'color-text' in data else None )
+            backgrounds.append( getColor(data['color']) if 'color' in data else None )
+
+            bold = data.get('bold', False)
+            italic = data.get('italic', False)
+            fonts.append( getFont( bold=bold if isinstance(bold, bool) else False,
+                                   italic=italic if isinstance(italic, bool) else False ) )
+            icons.append( getIcon(data.get('level')) )
+
+        self.pages[page] = (columns, foregrounds, backgrounds, fonts, icons)
+        # remove the least recently used pages
+        while len(self.pages) > self.maxPages:
+            self.pages.popitem(last=False)
+        return self.pages[page]
+
+    def canFetchMore(self, parent=QModelIndex()):
+        """
+        Return True if rows are not fetched
+        """
+        if parent is not None and parent.isValid():
+            return False
+        return self.fetched < len(self.stored_data)
+
+    def fetchMore(self, parent=QModelIndex()):
+        """
+        Fetch the next page
+        """
+        if parent is not None and parent.isValid():
+            return
+        self.fetchUntil( row=self.fetched + self.pageSize - 1 )
+
+    def fetchUntil(self, row):
+        """
+        Fetch the rows until the row provided
+
+        @param row: row position
+        @type row: integer
+        """
+        last = min(row, len(self.stored_data) - 1)
+        if last < self.fetched:
+            return
+
+        first = self.fetched
+        for i in xrange(first, last + 1):
+            data = self.stored_data[i]
+            if data.get('multiline', False):
+                self.heights[i] = ROW_HEIGHT*len(data['short-msg'].splitlines())
+
+        self.beginInsertRows(QModelIndex(), first, last)
+        self.fetched = last + 1
+        self.endInsertRows()
+
+    def appendEvents(self, events):
+        """
+        Add the events at the end in one time
+        The rows are fetched immediately if all the previous rows are fetched,
+        only the first page for a table empty
+
+        @param events: list of events
+        @type events: list
+
+        @return: row positions
+        @rtype: list
+        """
+        if not len(events):
+            return []
+
+        first = len(self.stored_data)
+        for row, data in enumerate(events, first):
+            data.update( {'row_id': row } )
+        self.stored_data.extend( events )
+        for row in xrange(first, len(self.stored_data)):
+            self.numbers.setdefault( self.getNumber(row), row )
+
+        # the last page is not complete anymore
+        self.pages.pop( first // self.pageSize, None )
+
+        if self.fetched == first:
+            last = first + len(events) - 1
+            if first == 0:
+                last = min(last, self.pageSize - 1)
+            self.fetchUntil( row=last )
+                
+        return list(xrange(first, first + len(events)))
+
     def insertAtEnd(self, data):
         """
         Insert row at the end
         """
-        row_pos = self.rowCount()
-        self.beginInsertRows(QModelIndex(), row_pos, row_pos)
-        data.update( {'row_id': row_pos } )
-        self.stored_data.append( data )
-        self.endInsertRows()
-        if row_pos == 0: 
-            # self.reset()
-            if sys.version_info > (3,):
-                self.beginResetModel() 
-                self.endResetModel()
+        return self.appendEvents(events=[data])[0]
+
+    def findNumber(self, number):
+        """
+        Return the row of the event number displayed
+
+        @param number: event number
+        @type number: integer
+
+        @return: row position or -1
+        @rtype: integer
+        """
+        return self.numbers.get( int(number), -1 )
+
+    def findMatch(self, regExp, column, start=0):
+        """
+        Return the first row matching the regexp from the start row, fetched or not
+
+        @param regExp: regular expression
+        @type regExp: qregexp
+
+        @param column: column to search, -1 for all columns
+        @type column: integer
+
+        @param start: first row to search
+        @type start: integer
+
+        @return: row position or -1
+        @rtype: integer
+        """
+        for row in xrange(max(0, start), len(self.stored_data)):
+            if column >= 0:
+                values = [ self.getValue(row, column) ]
             else:
-                self.reset()
-                
-        return row_pos
+                values = self.getValues(row).values()
+            for value in values:
+                if value is not None and regExp.indexIn(value) != -1:
+                    return row
+        return -1
 
     def clear(self):
         """
         Clear
         """
         self.stored_data = []
+        self.numbers = {}
+        self.initColumns()
         # self.reset()
         if sys.version_info > (3,):
             self.beginResetModel() 
@@ -279,7 +529,9 @@ class EventsTableView(QTableView):
         """
         QtWidgets creation
         """
-        self.model = EventsTableModel2( hdrs=['No.', 'Timestamp', 'From', 'To', 'Event Type', 'Component Type', 'Text' ] )
+        self.model = EventsTableModel2( hdrs=['No.', 'Timestamp', 'From', 'To', 'Event Type', 'Component Type', 'Text' ],
+                                        pageSize=int(Settings.instance().readValue( key = 'TestRun/page-events' )),
+                                        maxPages=int(Settings.instance().readValue( key = 'TestRun/max-pages' )) )
         if  QtHelper.str2bool( Settings.instance().readValue( key = 'TestRun/auto-scrolling-textual' ) ):
             self.activeAutoscrolling()
 
@@ -290,6 +542,7 @@ class EventsTableView(QTableView):
         self.setSortingEnabled(False)
 
         self.proxyModel.setSourceModel(self.model)
+        self.model.rowsInserted.connect(self.onRowsInserted)
 
         self.setFrameShape(QFrame.NoFrame)
         self.setShowGrid(True)
@@ -298,6 +551,8 @@ class EventsTableView(QTableView):
         self.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.setContextMenuPolicy(Qt.CustomContextMenu)
         self.verticalHeader().setVisible(False)
+        self.verticalHeader().setMinimumSectionSize(ROW_HEIGHT)
+        self.verticalHeader().setDefaultSectionSize(ROW_HEIGHT)
         self.horizontalHeader().setHighlightSections(False)
         self.setHorizontalScrollMode(QAbstractItemView.ScrollPerPixel)
         self.setStyleSheet("""
@@ -353,10 +608,52 @@ class EventsTableView(QTableView):
         """
         Insert item
         """
-        row_pos = self.model.insertAtEnd(data=dataEvent)
-        self.setRowsHeight()
+        return self.insertItems(dataEvents=[dataEvent])[0]
 
-        return row_pos
+    def insertItems(self, dataEvents):
+        """
+        Insert items in one time
+
+        @param dataEvents: list of events
+        @type dataEvents: list
+
+        @return: row positions
+        @rtype: list
+        """
+        return self.model.appendEvents(events=dataEvents)
+
+    def onRowsInserted(self, parent, first, last):
+        """
+        On rows fetched, set the height of the new rows
+        """
+        self.setRowsHeight(rows=xrange(first, last+1))
+
+    def gotoRow(self, row):
+        """
+        Fetch the rows until the row of the model, then select it
+
+        @param row: row position in the model
+        @type row: integer
+
+        @return: False if the row is hidden by the filter
+        @rtype: boolean
+        """
+        self.model.fetchUntil(row=row)
+        index = self.proxyModel.mapFromSource( self.model.index(row, 0) )
+        if not index.isValid():
+            return False
+        self.selectRow( index.row() )
+        self.scrollTo( index, QAbstractItemView.PositionAtCenter )
+        return True
+
+    def getCurrentRow(self):
+        """
+        Return the row of the model selected or -1
+        """
+        indexes = self.selectionModel().selectedRows()
+        if not len(indexes):
+            return -1
+        return self.proxyModel.mapToSource( indexes[0] ).row()
 
     def clear (self):
         """
@@ -364,16 +661,21 @@ class EventsTableView(QTableView):
         """
         self.model.clear()
 
-    def setRowsHeight(self):
+    def setRowsHeight(self, rows=None):
         """
-        Set rows height
+        Set the height of the multiline rows, the others have the default height
+
+        @param rows: rows of the model to update, all rows if None
+        @type rows: list/none
         """
-        for i in xrange(len(self.model.stored_data)):
-            rowHeight = ROW_HEIGHT
-            if 'multiline' in self.model.stored_data[i]:
-                if self.model.stored_data[i]['multiline']:
-                    rowHeight = ROW_HEIGHT*len(self.model.stored_data[i]['short-msg'].splitlines())
-            self.setRowHeight( i  , rowHeight )
+        if rows is None:
+            rows = sorted(self.model.heights)
+        for row in rows:
+            if row not in self.model.heights:
+                continue
+            index = self.proxyModel.mapFromSource( self.model.index(row, 0) )
+            if index.isValid():
+                self.setRowHeight( index.row(), self.model.heights[row] )
 
 class TextualView2(QWidget):
     """
@@ -440,6 +742,49 @@ class TextualView2(QWidget):
         self.textualViewer.proxyModel.setFilterKeyColumn( currentIndex )
         self.textualViewer.setRowsHeight()
 
+    def gotoRow(self, row):
+        """
+        Go to the row, fetched if needed
+
+        @param row: row position
+        @type row: integer
+
+        @return: False if the row is hidden by the filter
+        @rtype: boolean
+        """
+        self.textualViewer.setFocus()
+        return self.textualViewer.gotoRow(row=row)
+
+    def gotoNumber(self, number):
+        """
+        Go to the event number
+
+        @param number: event number displayed in the first column
+        @type number: integer
+
+        @return: False if the event is not found
+        @rtype: boolean
+        """
+        row = self.textualViewer.model.findNumber(number=number)
+        if row == -1:
+            return False
+        return self.gotoRow(row=row)
+
+    def findNext(self):
+        """
+        Go to the next event matching the filter after the selected one
+
+        @return: False if no more event matches
+        @rtype: boolean
+        """
+        proxyModel = self.textualViewer.proxyModel
+        row = self.textualViewer.model.findMatch( regExp=proxyModel.filterRegExp(),
+                                                  column=proxyModel.filterKeyColumn(),
+                                                  start=self.textualViewer.getCurrentRow() + 1 )
+        if row == -1:
+            return False
+        return self.gotoRow(row=row)
+
     def selectionChanged(self, selected, deselected):
         """
         On selection changed
@@ -516,20 +861,66 @@ class TextualView2(QWidget):
         @param event:
         @type event: 
         """
+        if not self.prepareEvent(event=event, ihmId=ihmId):
+            return
+
+        row_pos = self.textualViewer.insertItem( dataEvent=event)
+        
+        self.updateEventId(event=event)
+        return row_pos
+
+    def addEvents(self, events, ihmId=1):
+        """
+        Adds events in one time, the table is updated once
+
+        @param events: list of events
+        @type events: list
+
+        @param ihmId: id of the first event, 0 for the live events numbered by row
+        @type ihmId: integer
+
+        @return: row position of each event, None if not displayed
+        @rtype: list
+        """
+        accepted = []
+        positions = []
+        for i, event in enumerate(events):
+            if self.prepareEvent(event=event, ihmId=ihmId+i if ihmId else 0):
+                positions.append( len(accepted) )
+                accepted.append( event )
+            else:
+                positions.append( None )
+
+        rows = self.textualViewer.insertItems( dataEvents=accepted )
+
+        if len(accepted):
+            self.updateEventId(event=accepted[-1])
+        return [ rows[p] if p is not None else None for p in positions ]
+
+    def prepareEvent(self, event, ihmId=0):
+        """
+        Check if the event must be displayed and update the graph
+
+        @param event:
+        @type event: 
+
+        @return: True if the event must be added in the table
+        @rtype: boolean
+        """
         event["ihm_id"] = ihmId
         
         # new in v11.2
         if 'tc_id' in event:
             if self.expectedEventId != event['tc_id']:  
-                return
+                return False
         else:
             if self.expectedEventId != event['script_id']:  
-                return
+                return False
         # end of new
         
         # new in v12.1, no more display events after the "END" testcase event
         if self.endEventDetected:
-            return
+            return False
             
         if "flag-end" in event:
             if event['flag-end']:
@@ -585,15 +976,18 @@ class TextualView2(QWidget):
                 
                 blockItem.setData(data=event['data-msg'])
 
-        row_pos = self.textualViewer.insertItem( dataEvent=event)
-        
+        return True
+
+    def updateEventId(self, event):
+        """
+        Update the id of the last event displayed
+        """
         if event['event'] == 'script':
             self.eventId =  event['script_id']
         elif event['event'] == 'testcase':
             self.eventId =  event['tc_id']
         else:
             self.eventId = None
-        return row_pos
 
     def reset (self):
         """
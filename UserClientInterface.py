@@ -214,18 +214,21 @@ class UserClientInterface(QObject, Logger.ClassLogger, NetLayerLib.ClientAgent):
         """
         QObject.__init__(self, parent)
         NetLayerLib.ClientAgent.__init__(self, typeAgent = NetLayerLib.TYPE_AGENT_USER,
-                            keepAliveInterval=int(Settings.instance().readValue( key = 'Network/keepalive-interval' )), 
-                            inactivityTimeout=int(Settings.instance().readValue( key = 'Network/inactivity-timeout' )),
-                            timeoutTcpConnect=int(Settings.instance().readValue( key = 'Network/tcp-connect-timeout' )),
-                            responseTimeout=int(Settings.instance().readValue( key = 'Network/response-timeout' )),
-                            selectTimeout=float(Settings.instance().readValue( key = 'Network/select-timeout' )),
-                            sslSupport=QtHelper.str2bool(Settings.instance().readValue( key = 'Server/data-ssl' )),
-                            wsSupport=QtHelper.str2bool(Settings.instance().readValue( key = 'Server/data-websocket' )),
-                            pickleVer=int(Settings.instance().readValue( key = 'Network/pickle-version' )),
-                            tcpKeepAlive=QtHelper.str2bool(Settings.instance().readValue( key = 'Network/tcp-keepalive' )), 
-                            tcpKeepIdle=int(Settings.instance().readValue( key = 'Network/tcp-keepidle' )),
-                            tcpKeepCnt=int(Settings.instance().readValue( key = 'Network/tcp-keepcnt' )), 
-                            tcpKeepIntvl=int(Settings.instance().readValue( key = 'Network/tcp-keepintvl' ))
+                            keepAliveInterval=Settings.instance().readValue( key = 'Network/keepalive-interval', rType = 'int' ), 
+                            inactivityTimeout=Settings.instance().readValue( key = 'Network/inactivity-timeout', rType = 'int' ),
+                            timeoutTcpConnect=Settings.instance().readValue( key = 'Network/tcp-connect-timeout', rType = 'int' ),
+                            responseTimeout=Settings.instance().readValue( key = 'Network/response-timeout', rType = 'int' ),
+                            selectTimeout=Settings.instance().readValue( key = 'Network/select-timeout', rType = 'float' ),
+                            sslSupport=Settings.instance().readValue( key = 'Server/data-ssl', rType = 'bool' ),
+                            wsSupport=Settings.instance().readValue( key = 'Server/data-websocket', rType = 'bool' ),
+                            pickleVer=Settings.instance().readValue( key = 'Network/pickle-version', rType = 'int' ),
+                            tcpKeepAlive=Settings.instance().readValue( key = 'Network/tcp-keepalive', rType = 'bool' ), 
+                            tcpKeepIdle=Settings.instance().readValue( key = 'Network/tcp-keepidle', rType = 'int' ),
+                            tcpKeepCnt=Settings.instance().readValue( key = 'Network/tcp-keepcnt', rType = 'int' ), 
+                            tcpKeepIntvl=Settings.instance().readValue( key = 'Network/tcp-keepintvl', rType = 'int' ),
+                            compression=Settings.instance().readValue( key = 'Network/compression' ) or None,
+                            compressionLevel=Settings.instance().readValue( key = 'Network/compression-level', rType = 'int' ),
+                            compressionMinSize=Settings.instance().readValue( key = 'Network/compression-min-size', rType = 'int' )
                         )
         self.parent = parent
         self.password = ""
@@ -274,7 +277,7 @@ class UserClientInterface(QObject, Logger.ClassLogger, NetLayerLib.ClientAgent):
         """
         Return scheme
         """
-        if eval( Settings.instance().readValue( key = 'Server/api-ssl' ) ):
+        if Settings.instance().readValue( key = 'Server/api-ssl', rType = 'bool' ):
             scheme = 'https'
         else:
             scheme = 'http'
@@ -331,8 +334,8 @@ class UserClientInterface(QObject, Logger.ClassLogger, NetLayerLib.ClientAgent):
         # self.password = hashlib.sha1( password.encode('utf8') ).hexdigest()
 
         # read port from settings, can be changed from preferences
-        self.portWs = int( Settings.instance().readValue( key = 'Server/port-api' ) )
-        self.portData = int( Settings.instance().readValue( key = 'Server/port-data' ) )
+        self.portWs = Settings.instance().readValue( key = 'Server/port-api', rType = 'int' )
+        self.portData = Settings.instance().readValue( key = 'Server/port-data', rType = 'int' )
         
         resolved = NetLayerLib.ClientAgent.setServerAddress(self, ip = address, port = int(self.portData) )
         if resolved is None:
@@ -532,8 +535,8 @@ class UserClientInterface(QObject, Logger.ClassLogger, NetLayerLib.ClientAgent):
         On connection
         """
         try:
-            websocketSupport = QtHelper.str2bool(Settings.instance().readValue( key = 'Server/data-websocket' ))
-            websocketSsl = QtHelper.str2bool(Settings.instance().readValue( key = 'Server/data-ssl' ))
+            websocketSupport = Settings.instance().readValue( key = 'Server/data-websocket', rType = 'bool' )
+            websocketSsl = Settings.instance().readValue( key = 'Server/data-ssl', rType = 'bool' )
             if websocketSupport:
                 self.trace('Websocket initialization...')
                 wspath = Settings.instance().readValue( key = 'Server/websocket-path' )
@@ -550,8 +553,8 @@ class UserClientInterface(QObject, Logger.ClassLogger, NetLayerLib.ClientAgent):
         On proxy connection with success
         """
         try:
-            websocketSupport = QtHelper.str2bool(Settings.instance().readValue( key = 'Server/data-websocket' ))
-            websocketSsl = QtHelper.str2bool(Settings.instance().readValue( key = 'Server/data-ssl' ))
+            websocketSupport = Settings.instance().readValue( key = 'Server/data-websocket', rType = 'bool' )
+            websocketSsl = Settings.instance().readValue( key = 'Server/data-ssl', rType = 'bool' )
             if websocketSupport:
                 self.trace('Websocket initialization through proxy...')
                 wspath = Settings.instance().readValue( key = 'Server/websocket-path' )
@@ -599,7 +602,7 @@ class UserClientInterface(QObject, Logger.ClassLogger, NetLayerLib.ClientAgent):
         """
         self.trace('on disconnection byserver=%s inactivitserver=%s...' %(byServer, inactivityServer) )
            
-        if QtHelper.str2bool( Settings.instance().readValue( key = 'Server/rest-support' ) ):
+        if Settings.instance().readValue( key = 'Server/rest-support', rType = 'bool' ):
             if not byServer:
                 RCI.instance().logout()
 
@@ -610,7 +613,7 @@ class UserClientInterface(QObject, Logger.ClassLogger, NetLayerLib.ClientAgent):
             
             self.Disconnected.emit() 
             
-            if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+            if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
                 self.application().showMessageWarningTray(msg="%s\n%s" % (self.tr("Inactivity detected, connection closed"), 
                                                                             self.tr("Please to reconnect!")))
             else:  
@@ -629,7 +632,7 @@ class UserClientInterface(QObject, Logger.ClassLogger, NetLayerLib.ClientAgent):
             
             msg = "Disconnected by the server.\nPlease to reconnect"
             if byServer:
-                if QtHelper.str2bool( Settings.instance().readValue( key = 'Common/systray-notifications' ) ):
+                if Settings.instance().readValue( key = 'Common/systray-notifications', rType = 'bool' ):
                     self.application().showMessageWarningTray(msg=self.tr(msg))
                 else: 
                     self.emitWarningMsg(title=self.tr("Connection"), err=self.tr(msg))
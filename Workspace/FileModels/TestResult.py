@@ -39,6 +39,18 @@ import zlib
 import datetime
 import base64
 import re
+import os
+import io
+import json
+import struct
+import bisect
+
+# indexed format: the events are stored in compressed blocks of lines
+# with the index of the blocks at the end of the file
+#   magic | header | block 1 | ... | block n | index | trailer (index offset and size) | magic
+INDEXED_MAGIC       = b"TRXI\x01"
+INDEXED_TRAILER     = struct.Struct("!QI")
+INDEXED_BLOCK_LINES = 500
 
 r = re.compile( u"[^\x09\x0A\x0D\x20-\x7E\x85\xA0-\xFF\u0100-\uD7FF\uE000-\uFDCF\uFDE0-\uFFFD]")
 def removeInvalidXML(string):
@@ -107,6 +119,12 @@ class DataModel(Logger.ClassLogger):
         self.testresult = testResult
         self.testheader = testHeader
         
+        # indexed format, the test result is read by blocks from the file
+        self.indexed = False
+        self.absPath = None
+        self.blocks = []
+        self.blocksLine = []
+        
     def addComment(self, user_name, user_post, post_timestamp):
         """
         Add one comment
@@ -175,9 +193,16 @@ class DataModel(Logger.ClassLogger):
         """
         self.properties = {}
         self.testresult = ''
+        self.indexed = False
+        self.absPath = absPath
+        self.blocks = []
+        self.blocksLine = []
         
         if rawData is None:
             try:
+                if isIndexed(absPath=absPath):
+                    return self.loadIndexed(absPath=absPath)
+                    
                 f = open(absPath, 'rb')
                 read_data = f.read()
                 f.close()
@@ -237,4 +262,136 @@ class DataModel(Logger.ClassLogger):
         except Exception as e:
             self.error( "[parse] %s" % str(e) )
             return False
-        return True
\ No newline at end of file
+        return True
+
+    def loadIndexed (self, absPath):
+        """ 
+        Load the indexed format, only the header, the properties 
+        and the index of the blocks are read
+
+        @param absPath: 
+        @type absPath:
+        """
+        try:
+            with open(absPath, 'rb') as f:
+                f.seek( -(INDEXED_TRAILER.size + len(INDEXED_MAGIC)), os.SEEK_END )
+                indexOffset, indexSize = INDEXED_TRAILER.unpack( f.read(INDEXED_TRAILER.size) )
+                f.seek(indexOffset)
+                index = json.loads( zlib.decompress( f.read(indexSize) ).decode('utf8') )
+                
+                headerOffset, headerSize = index['header']
+                f.seek(headerOffset)
+                self.testheader = bytes2str( zlib.decompress( f.read(headerSize) ) )
+        except Exception as e:
+            self.error( "[loadIndexed] %s" % str(e) )
+            return False
+            
+        self.properties = { 'properties': index['properties'] }
+        self.blocks = index['blocks']
+        self.blocksLine = [ firstLine for offset, size, firstLine in self.blocks ]
+        self.indexed = True
+        return True
+        
+    def saveIndexed (self, absPath):
+        """ 
+        Save the test result in the indexed format
+
+        @param absPath: 
+        @type absPath:
+        """
+        try:
+            testresult = self.testresult
+            testheader = self.testheader
+            if not isinstance(testresult, bytes): testresult = testresult.encode('utf8')
+            if not isinstance(testheader, bytes): testheader = testheader.encode('utf8')
+            
+            with open(absPath, 'wb') as f:
+                f.write( INDEXED_MAGIC )
+                
+                hdr = zlib.compress(testheader)
+                index = { 'header': [ f.tell(), len(hdr) ], 'blocks': [],
+                          'properties': self.properties.get('properties', {}) }
+                f.write( hdr )
+                
+                lines = testresult.splitlines(True)
+                for firstLine in range(0, len(lines), INDEXED_BLOCK_LINES):
+                    block = zlib.compress( b''.join(lines[firstLine:firstLine+INDEXED_BLOCK_LINES]) )
+                    index['blocks'].append( [ f.tell(), len(block), firstLine ] )
+                    f.write( block )
+                    
+                indexOffset = f.tell()
+                idx = zlib.compress( json.dumps(index).encode('utf8') )
+                f.write( idx )
+                f.write( INDEXED_TRAILER.pack(indexOffset, len(idx)) )
+                f.write( INDEXED_MAGIC )
+        except Exception as e:
+            self.error( "[saveIndexed] %s" % str(e) )
+            return False
+        return True
+        
+    def getLines (self, firstLine=0, lastLine=None):
+        """ 
+        Return the lines of the test result between two lines (included)
+        Only the blocks needed are read with the indexed format
+
+        @param firstLine: number of the first line, from zero
+        @type firstLine: integer
+
+        @param lastLine: number of the last line, None until the end
+        @type lastLine: integer/none
+
+        @return: iterator on (line number, line)
+        @rtype: iterator
+        """
+        firstLine = max(0, firstLine)
+        if not self.indexed:
+            f = io.StringIO( bytes2str(self.testresult) )
+            for n, line in enumerate(f):
+                if lastLine is not None and n > lastLine:
+                    break
+                if n >= firstLine:
+                    yield (n, line)
+            f.close()
+            return
+            
+        if not len(self.blocks):
+            return
+        i = max(0, bisect.bisect_right(self.blocksLine, firstLine) - 1)
+        with open(self.absPath, 'rb') as f:
+            for offset, size, blockLine in self.blocks[i:]:
+                if lastLine is not None and blockLine > lastLine:
+                    break
+                f.seek(offset)
+                block = bytes2str( zlib.decompress( f.read(size) ) )
+                for n, line in enumerate(block.splitlines(True), blockLine):
+                    if lastLine is not None and n > lastLine:
+                        break
+                    if n >= firstLine:
+                        yield (n, line)
+
+def isIndexed(absPath):
+    """
+    Return True if the file is a test result in the indexed format
+    """
+    with open(absPath, 'rb') as f:
+        return f.read(len(INDEXED_MAGIC)) == INDEXED_MAGIC
+        
+def convertToIndexed(srcPath, dstPath):
+    """
+    Convert a test result to the indexed format
+
+    @param srcPath: test result in the old format
+    @type srcPath: string
+
+    @param dstPath: test result in the indexed format
+    @type dstPath: string
+
+    @return: True on success
+    @rtype: boolean
+    """
+    dataModel = DataModel()
+    if not dataModel.load( absPath=srcPath ):
+        return False
+    if dataModel.indexed:
+        return False
+    return dataModel.saveIndexed( absPath=dstPath )